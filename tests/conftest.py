@@ -0,0 +1,34 @@
+"""tools/ のスクリプトはフラットなモジュールとして互いを import するため、tools/ をパスに加える"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tools'))
+
+from yaml_io import dump_yaml  # noqa: E402
+
+
+SAMPLE_RENAME_DICT = {
+    'version': '1.0',
+    'tables': {
+        'msthospital': {'new': 'mst_medical_facility', 'description': '医療機関マスタ'},
+        'mstgovcity': {'new': 'mhlw_municipality', 'description': '市区町村'},
+        'tblorder': {'new': 'tbl_order', 'description': '注文'},
+    },
+    'columns': {
+        'msthospital': {'hpcode': {'new': 'medical_facility_code', 'description': '医療機関コード'}},
+        'tblorder': {'regdate': {'new': 'regdate', 'description': '登録日時'}},
+    },
+}
+
+
+@pytest.fixture
+def rename_dict_path(tmp_path):
+    """小さな rename_dictionary.yaml（dictionary/ の下に置く）"""
+    path = tmp_path / 'dictionary' / 'rename_dictionary.yaml'
+    path.parent.mkdir()
+    with open(path, 'w', encoding='utf-8') as f:
+        dump_yaml(SAMPLE_RENAME_DICT, f)
+    return path
@@ -0,0 +1,118 @@
+"""add_audit_fields.py: 命名辞書の add_columns によるカラムの追加と、ファイルの書き換え"""
+
+import os
+import stat
+
+import pytest
+
+from add_audit_fields import (inject_columns, load_injection_rules, process_files, process_yaml_file,
+                              write_text_atomic)
+from yaml_io import load_yaml
+
+
+RULES = [
+    {'name': 'created_by', 'after': 'created_at', 'column': {'name': 'created_by', 'data_type': 'TEXT'}},
+    {'name': 'updated_by', 'after': 'updated_at', 'column': {'name': 'updated_by', 'data_type': 'TEXT'}},
+]
+
+TABLE_YAML = """table_name: mst_user
+columns:
+- name: id
+  data_type: INTEGER
+- name: created_at
+  data_type: TIMESTAMP
+- name: updated_at
+  data_type: TIMESTAMP
+"""
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    path = tmp_path / 'mst_user.yaml'
+    path.write_text(TABLE_YAML, encoding='utf-8')
+    return path
+
+
+@pytest.mark.parametrize('mode', [0o644, 0o664, 0o600])
+def test_rewrite_keeps_file_mode(table_path, mode):
+    """一時ファイル経由で書き換えても元のファイルの権限を保つ"""
+    os.chmod(table_path, mode)
+    result = process_yaml_file(table_path, RULES)
+    assert result['status'] == 'updated'
+    assert stat.S_IMODE(table_path.stat().st_mode) == mode
+
+
+def test_new_file_follows_umask(tmp_path):
+    """新しく作るファイルは mkstemp の 0600 ではなく umask に従う"""
+    previous = os.umask(0o022)
+    try:
+        path = tmp_path / 'new.yaml'
+        write_text_atomic('a: 1\n', path)
+    finally:
+        os.umask(previous)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith('.tmp')]
+
+
+def test_load_injection_rules(tmp_path):
+    """migration.add_columns の after を除いた項目が挿入するカラム定義になる"""
+    naming_path = tmp_path / 'naming.yaml'
+    naming_path.write_text("""terms:
+- id: AUDIT_COLUMNS
+  migration:
+    add_columns:
+    - {name: created_by, after: created_at, data_type: TEXT, nullable: false}
+""", encoding='utf-8')
+    assert load_injection_rules(naming_path) == [
+        {'name': 'created_by', 'after': 'created_at',
+         'column': {'name': 'created_by', 'data_type': 'TEXT', 'nullable': False}}]
+    with pytest.raises(KeyError):
+        load_injection_rules(naming_path, 'UNKNOWN')
+
+
+def test_inject_columns():
+    """Y の直後に X を入れる。X が既にある・Y がない場合は何もしない"""
+    columns = [{'name': 'id'}, {'name': 'created_at'}, {'name': 'updated_at'}, {'name': 'updated_by'}]
+    new_columns, added = inject_columns(columns, RULES)
+    assert [column['name'] for column in new_columns] == ['id', 'created_at', 'created_by', 'updated_at',
+                                                          'updated_by']
+    assert added == ['created_by']
+    assert inject_columns([{'name': 'id'}], RULES) == ([{'name': 'id'}], [])
+
+
+def test_process_adds_columns_once(table_path):
+    """宣言の順に追加し、2回目は何も変えない"""
+    assert process_yaml_file(table_path, RULES)['added'] == ['created_by', 'updated_by']
+    columns = load_yaml(table_path)['columns']
+    assert [column['name'] for column in columns] == ['id', 'created_at', 'created_by', 'updated_at', 'updated_by']
+
+    text = table_path.read_text(encoding='utf-8')
+    result = process_yaml_file(table_path, RULES)
+    assert (result['status'], result['added']) == ('unchanged', [])
+    assert table_path.read_text(encoding='utf-8') == text
+
+
+def test_dry_run_outputs_diff_without_writing(table_path):
+    """--dry-run はファイルを書き換えず、unified diff を返す"""
+    result = process_yaml_file(table_path, RULES, dry_run=True)
+    assert result['status'] == 'updated'
+    assert table_path.read_text(encoding='utf-8') == TABLE_YAML
+    assert result['diff'].startswith('--- a/mst_user.yaml\n+++ b/mst_user.yaml\n')
+    added_lines = [line for line in result['diff'].splitlines() if line.startswith('+') and 'name:' in line]
+    assert added_lines == ['+- name: created_by', '+- name: updated_by']
+
+
+def test_process_files_parallel_matches_serial(tmp_path):
+    """--jobs でも入力順に同じ結果を返す"""
+    paths = []
+    for i in range(4):
+        path = tmp_path / f't{i}.yaml'
+        path.write_text(TABLE_YAML if i % 2 == 0 else 'table_name: t\n', encoding='utf-8')
+        paths.append(path)
+
+    def summary(results):
+        return [(result['file'], result['status'], result['diff']) for result in results]
+
+    serial = summary(process_files(paths, RULES, dry_run=True))
+    assert [status for _, status, _ in serial] == ['updated', 'skipped', 'updated', 'skipped']
+    assert summary(process_files(paths, RULES, dry_run=True, jobs=2)) == serial
@@ -0,0 +1,56 @@
+"""build_alias_map.py: トライ木による最長一致置換"""
+
+from build_alias_map import build_alias_trie, iter_identifiers, rewrite_identifier
+from yaml_io import dump_yaml
+
+
+NAMING_DICT = {
+    'terms': [
+        {'id': 'MEDICAL_DEVICE', 'canonical': {'en': 'medical_device'},
+         'synonyms': {'en': ['medical_equipment', 'Medical Device']},
+         'migration': {'rename_tokens': [{'from': 'medical_entity', 'to': 'medical_device'}]}},
+        {'id': 'DEVICE_CLASSIFICATION', 'canonical': {'en': 'medical_device_classification'}},
+        {'id': 'CLASSIFICATION_VOCAB', 'canonical': {'en': 'classification'},
+         'forbidden': {'en': ['type', 'device']}},
+    ],
+}
+
+
+def rewrite(identifier):
+    return rewrite_identifier(identifier, build_alias_trie(NAMING_DICT))
+
+
+def test_synonym_and_rename_token():
+    """同義語・migration の rename_tokens は正規語に置換する"""
+    new, applied = rewrite('medical_equipment_id')
+    assert new == 'medical_device_id'
+    assert applied == [{'kind': 'synonym', 'from': 'medical_equipment', 'to': 'medical_device',
+                        'term': 'MEDICAL_DEVICE'}]
+    assert rewrite('core.tbl_medical_entity')[0] == 'core.tbl_medical_device'
+
+
+def test_canonical_shields_forbidden_token():
+    """正規語の一部として現れる禁止語はフラグしない（最長一致）"""
+    assert rewrite('medical_device_classification_code') == ('medical_device_classification_code', [])
+    assert rewrite('medical_device_name') == ('medical_device_name', [])
+
+
+def test_forbidden_is_flagged_not_replaced():
+    new, applied = rewrite('device_type')
+    assert new == 'device_type'
+    assert [(a['kind'], a['from'], a['term']) for a in applied] == [
+        ('forbidden', 'device', 'CLASSIFICATION_VOCAB'), ('forbidden', 'type', 'CLASSIFICATION_VOCAB')]
+
+
+def test_case_is_kept_for_unmatched_tokens():
+    """一致しないトークンは元の大文字・小文字のまま、一致は小文字で比較する"""
+    assert rewrite('MST_Medical_Equipment')[0] == 'MST_medical_device'
+
+
+def test_iter_identifiers(tmp_path):
+    path = tmp_path / 'mst_device.yaml'
+    with open(path, 'w', encoding='utf-8') as f:
+        dump_yaml({'table_name': 'mst_device', 'columns': [{'name': 'device_type'}, {'comment': 'x'}]}, f)
+    (tmp_path / 'notes.yaml').write_text('- a\n', encoding='utf-8')
+    assert list(iter_identifiers([path, tmp_path / 'notes.yaml'])) == [
+        (path, 'mst_device', None), (path, 'mst_device', 'device_type')]
@@ -0,0 +1,77 @@
+"""catalog_introspect.py: SQLiteのカタログからテーブル定義・リネーム案を作る"""
+
+import copy
+import sqlite3
+from pathlib import Path
+
+from catalog_introspect import build_table_models, propose_renames, read_sqlite_catalog
+from lint_names import lint_table, load_rules
+from yaml_rename import load_rename_dictionary, process_table_data
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def make_db(path):
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE msthospital (hpcode TEXT PRIMARY KEY, hpname VARCHAR(100) NOT NULL, memo TEXT);
+        CREATE TABLE tblorder (order_id INTEGER, line_no INTEGER, regdate TIMESTAMP,
+                               PRIMARY KEY (order_id, line_no));
+        CREATE INDEX ix_order_regdate ON tblorder (regdate);
+    """)
+    connection.commit()
+    connection.close()
+
+
+def test_read_sqlite_catalog(tmp_path):
+    """テーブルとカラムを2回のクエリで読み、複合主キーも拾う"""
+    db_path = tmp_path / 'catalog.db'
+    make_db(db_path)
+    tables, columns = read_sqlite_catalog(db_path)
+    assert tables == [(None, 'msthospital', None), (None, 'tblorder', None)]
+    assert columns[0] == (None, 'msthospital', 0, 'hpcode', 'TEXT', False, None, True)
+    assert [(row[3], row[7]) for row in columns if row[1] == 'tblorder'] == [
+        ('order_id', True), ('line_no', True), ('regdate', False)]
+
+
+def test_models_and_renames(tmp_path, rename_dict_path):
+    db_path = tmp_path / 'catalog.db'
+    make_db(db_path)
+    models = build_table_models(*read_sqlite_catalog(db_path), 'sqlite:catalog.db')
+    hospital = models[0]
+    assert hospital['table_name'] == 'msthospital'
+    assert hospital['metadata']['history'][0]['comment'] == 'DBカタログ（sqlite:catalog.db）から作成'
+    assert hospital['columns'][0] == {'name': 'hpcode', 'description': '', 'data_type': 'text',
+                                      'primary_key': True, 'nullable': False, 'comment': None}
+    assert hospital['columns'][1]['data_type'] == 'varchar(100)' and not hospital['columns'][1]['nullable']
+    assert hospital['columns'][2]['nullable']
+
+    rename_dict = load_rename_dictionary(rename_dict_path)
+    proposals = []
+    for model in models:
+        renamed, _, _, _ = process_table_data(copy.deepcopy(model), rename_dict, 'sqlite:catalog.db')
+        proposals.extend(propose_renames(model, renamed))
+    assert proposals == [('table', 'msthospital', 'msthospital', 'mst_medical_facility'),
+                         ('column', 'msthospital', 'hpcode', 'medical_facility_code'),
+                         ('table', 'tblorder', 'tblorder', 'tbl_order')]
+
+
+def test_non_default_schema_is_qualified():
+    models = build_table_models([('core', 'users', 'ユーザー'), ('public', 'orders', None)],
+                                [('core', 'users', 1, 'user_id', 'integer', True, 'ID', True),
+                                 ('other', 'orders', 1, 'x', 'integer', False, None, False)], 'postgresql')
+    assert [model['table_name'] for model in models] == ['core.users', 'orders']
+    assert models[0]['description'] == 'ユーザー' and models[0]['columns'][0]['description'] == 'ID'
+    assert models[1]['columns'] == []
+
+
+def test_catalog_models_lint_like_yaml(tmp_path):
+    """カタログから作った定義も lint_names のルールでチェックできる"""
+    db_path = tmp_path / 'catalog.db'
+    make_db(db_path)
+    rules = load_rules(PROJECT_ROOT / 'lint/lint_config.yaml',
+                       PROJECT_ROOT / 'dictionary/naming_dictionary_v0.2.1.yaml')
+    models = build_table_models(*read_sqlite_catalog(db_path), 'sqlite:catalog.db')
+    violations = lint_table(models[0], rules)
+    assert violations and {violation['table'] for violation in violations} == {'msthospital'}
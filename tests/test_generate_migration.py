@@ -0,0 +1,77 @@
+"""generate_migration.py: up → down の往復（SQLite）と、連鎖・循環・競合の扱い"""
+
+from pathlib import Path
+
+from generate_migration import build_plan, render_script, verify_sqlite
+from yaml_rename import load_rename_dictionary
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def table(new):
+    return {'new': new}
+
+
+def columns(**renames):
+    return {old: {'new': new} for old, new in renames.items()}
+
+
+def round_trip(rename_dict):
+    plan = build_plan(rename_dict)
+    return plan, verify_sqlite(plan, rename_dict, 'public')
+
+
+def test_chain_and_swap_round_trip():
+    """A→B と B→C の連鎖、A↔B の入れ替えは一時名を経由して up → down で元に戻る"""
+    rename_dict = {
+        'tables': {'ta': table('tb'), 'tb': table('tc'), 'sa': table('sb'), 'sb': table('sa')},
+        'columns': {'ta': columns(c1='c2', c2='c1', c3='c3'), 'sb': columns(x='y')},
+    }
+    plan, problems = round_trip(rename_dict)
+    assert problems == []
+    assert plan['table_moves'] == {('public', 'ta'): ('public', 'tb'), ('public', 'tb'): ('public', 'tc'),
+                                   ('public', 'sa'): ('public', 'sb'), ('public', 'sb'): ('public', 'sa')}
+    # up / down それぞれで、テーブルとカラムの循環に1つずつ
+    assert plan['temporaries'] == 4
+    assert plan['conflicts'] == []
+
+
+def test_schema_change_round_trip():
+    """スキーマをまたぐ変更も往復できる"""
+    rename_dict = {'tables': {'legacy.orders': table('sales.orders'), 'orders': table('order_header')},
+                   'columns': {'legacy.orders': columns(regdate='created_at')}}
+    assert round_trip(rename_dict)[1] == []
+
+
+def test_conflicts_are_excluded():
+    """同じ名前への変更、残るテーブルへの変更、それを待つ変更は出力せずに競合として記録する"""
+    rename_dict = {
+        'tables': {'a': table('x'), 'b': table('x'), 'keep': table('keep'), 'c': table('keep'),
+                   'd': table('c'), 'e': table('f')},
+        'columns': {'e': columns(p='q', r='q', s='s', t='s')},
+    }
+    plan, problems = round_trip(rename_dict)
+    assert problems == []
+    assert plan['table_moves'] == {('public', 'e'): ('public', 'f')}
+    assert plan['column_moves'] == {}
+    reasons = {(conflict['kind'], conflict['old']): conflict['reason'] for conflict in plan['conflicts']}
+    assert set(reasons) == {('table', 'public.a'), ('table', 'public.b'), ('table', 'public.c'),
+                            ('table', 'public.d'), ('column', 'p'), ('column', 'r'), ('column', 't')}
+    assert reasons[('table', 'public.d')] == '変更先の名前の変更が競合のため出力されない'
+
+
+def test_down_reverses_groups():
+    """down.sql はグループを逆順に出力する"""
+    plan = build_plan({'tables': {'a': table('b'), 'c': table('d')}, 'columns': {}})
+    up = render_script(plan, 'up', 'postgresql', 'public', [])
+    down = render_script(plan, 'down', 'postgresql', 'public', [])
+    assert up.count('BEGIN;') == down.count('BEGIN;') == 2
+    assert up.index('a RENAME TO b') < up.index('c RENAME TO d')
+    assert down.index('d RENAME TO c') < down.index('b RENAME TO a')
+
+
+def test_project_dictionary_round_trip():
+    """リポジトリの変換辞書から作った up / down が SQLite で往復できる"""
+    rename_dict = load_rename_dictionary(PROJECT_ROOT / 'dictionary/rename_dictionary.yaml', use_snapshot=False)
+    assert round_trip(rename_dict)[1] == []
@@ -0,0 +1,64 @@
+"""instrumentation.py: フェーズ時間の集計（スレッドをまたいだファイル単位の内訳）"""
+
+import threading
+import time
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture
+def timings(monkeypatch):
+    monkeypatch.setattr(instrumentation, '_timings', None)
+    return instrumentation.enable('test')
+
+
+def test_disabled_is_noop(monkeypatch):
+    monkeypatch.setattr(instrumentation, '_timings', None)
+    with instrumentation.collect_phases() as phases:
+        with instrumentation.phase('read'):
+            pass
+    assert phases is None
+    assert not instrumentation.enabled()
+
+
+def test_nested_collect_phases(timings):
+    with instrumentation.track_file('a.yaml', {'worker': 0.5}) as outer:
+        with instrumentation.phase('read'):
+            pass
+        with instrumentation.collect_phases() as inner:
+            with instrumentation.phase('parse'):
+                pass
+        assert set(inner) == {'parse'}
+        assert set(outer) == {'worker', 'read'}
+    with instrumentation.phase('write'):
+        pass
+    assert set(timings.files['a.yaml']) == {'worker', 'read', 'total'}
+    assert set(timings.phases) == {'worker', 'read', 'write'}
+
+
+def test_threads_keep_their_own_file_phases(timings):
+    """並行するスレッドのフェーズ時間は、それぞれのスレッドで処理中のファイルに記録する"""
+    barrier = threading.Barrier(4)
+
+    def work(index):
+        with instrumentation.track_file(f'file{index}.yaml'):
+            barrier.wait()
+            for _ in range(20):
+                with instrumentation.phase(f'stage{index}'):
+                    time.sleep(0.0005)
+            barrier.wait()
+        instrumentation.count('files')
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(timings.files) == [f'file{index}.yaml' for index in range(4)]
+    for index in range(4):
+        assert set(timings.files[f'file{index}.yaml']) == {f'stage{index}', 'total'}
+        assert len(timings.phases[f'stage{index}']) == 1
+    assert timings.counters == {'files': 4}
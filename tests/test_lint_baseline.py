@@ -0,0 +1,74 @@
+"""lint_names.py: baseline の照合と --update-baseline（対象外のファイルの項目を残す）"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from lint_names import Baseline
+from yaml_io import dump_yaml, load_yaml
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def violation(table, column=None, rule='forbidden_token', message='禁止語'):
+    return {'table': table, 'column': column, 'rule': rule, 'message': message}
+
+
+def write_baseline(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        dump_yaml({'violations': [dict(zip(Baseline.FIELDS, entry)) for entry in entries]}, f)
+
+
+def test_match_counts_duplicates(tmp_path):
+    """同じ違反は baseline にある件数までしか既知として扱わない"""
+    table_file = tmp_path / 'mst_a.yaml'
+    key = (table_file.as_posix(), 'mst_a', 'type', 'forbidden_token', '禁止語')
+    write_baseline(tmp_path / 'baseline.yaml', [key])
+    baseline = Baseline(tmp_path / 'baseline.yaml')
+    assert baseline.consume(table_file, violation('mst_a', 'type'))
+    assert not baseline.consume(table_file, violation('mst_a', 'type'))
+    assert baseline.matched == 1
+
+
+def test_save_keeps_entries_outside_targets(tmp_path):
+    checked, other = tmp_path / 'checked', tmp_path / 'other'
+    old_checked = ((checked / 'mst_a.yaml').as_posix(), 'mst_a', 'type', 'forbidden_token', '禁止語')
+    removed = ((checked / 'sub' / 'mst_gone.yaml').as_posix(), 'mst_gone', None, 'table_regex', '形式')
+    kept = ((other / 'mst_b.yaml').as_posix(), 'mst_b', 'kind', 'forbidden_token', '禁止語')
+    path = tmp_path / 'baseline.yaml'
+    write_baseline(path, [old_checked, removed, kept])
+
+    baseline = Baseline(path, load=False)
+    assert not baseline.consume(checked / 'mst_a.yaml', violation('mst_a', 'type'))
+    assert not baseline.consume(checked / 'mst_a.yaml', violation('mst_a', 'memo_flag', 'boolean_prefix', '接頭辞'))
+    assert baseline.save([checked]) == 3
+
+    saved = [tuple(entry[field] for field in Baseline.FIELDS) for entry in load_yaml(path)['violations']]
+    assert sorted(saved, key=str) == sorted([old_checked, kept, (old_checked[0], 'mst_a', 'memo_flag',
+                                                                 'boolean_prefix', '接頭辞')], key=str)
+
+    # 対象を指定しなければ、今回の違反だけで書き直す
+    assert Baseline(path, load=False).save() == 0
+
+
+def test_update_baseline_on_subset(tmp_path):
+    """一部のファイルだけで --update-baseline しても、ほかのファイルの項目は消えない"""
+    for name in ('checked', 'other'):
+        (tmp_path / name).mkdir()
+        with open(tmp_path / name / 'tbl_device.yaml', 'w', encoding='utf-8') as f:
+            dump_yaml({'table_name': 'tbl_device', 'columns': [{'name': 'device_type'}]}, f)
+    baseline_path = tmp_path / 'lint_baseline.yaml'
+
+    def lint(*args):
+        return subprocess.run([sys.executable, str(PROJECT_ROOT / 'tools/lint_names.py'), '--no-daemon',
+                               '--no-cache', '--baseline', str(baseline_path), *map(str, args)],
+                              capture_output=True, text=True)
+
+    assert lint('--update-baseline', tmp_path / 'checked', tmp_path / 'other').returncode == 0
+    entries = load_yaml(baseline_path)['violations']
+    assert {Path(entry['file']).parent.name for entry in entries} == {'checked', 'other'}
+
+    assert lint('--update-baseline', tmp_path / 'checked').returncode == 0
+    assert load_yaml(baseline_path)['violations'] == entries
+    assert lint(tmp_path / 'checked', tmp_path / 'other').returncode == 0
@@ -0,0 +1,42 @@
+"""lint_names.py: 結果キャッシュとキャッシュなし実行の時間の比較"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from lint_names import file_set_digest
+from yaml_io import dump_yaml
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def lint(cache_path, *paths):
+    result = subprocess.run([sys.executable, str(PROJECT_ROOT / 'tools/lint_names.py'), '--no-daemon',
+                             '--no-baseline', '--cache', str(cache_path), *map(str, paths)],
+                            capture_output=True, text=True)
+    return result.stdout
+
+
+def test_cold_run_is_compared_only_for_the_same_files(tmp_path):
+    tables = tmp_path / 'tables'
+    tables.mkdir()
+    for name in ('mst_a', 'mst_b'):
+        with open(tables / f'{name}.yaml', 'w', encoding='utf-8') as f:
+            dump_yaml({'table_name': name, 'columns': [{'name': 'id'}]}, f)
+    cache_path = tmp_path / 'lint_cache.json'
+
+    assert 'キャッシュ: ヒット 0 / 再チェック 2' in lint(cache_path, tables)
+    # 別のファイルの組み合わせ（1ファイル）では、2ファイルのキャッシュなし実行と比べない
+    output = lint(cache_path, tables / 'mst_a.yaml')
+    assert 'キャッシュ: ヒット 1 / 再チェック 0' in output
+    assert 'キャッシュなし時' not in output
+
+    output = lint(cache_path, tables)
+    assert 'キャッシュ: ヒット 2 / 再チェック 0' in output
+    assert '(2ファイル)' in output
+
+    cold_runs = json.loads(cache_path.read_text(encoding='utf-8'))['cold_runs']
+    assert list(cold_runs) == [file_set_digest([str((tables / name).resolve()) for name in ('mst_a.yaml',
+                                                                                           'mst_b.yaml')])]
@@ -0,0 +1,82 @@
+"""lint_names.py --watch: 変更の処理（TableWatcher.handle）と変換の出力先の除外"""
+
+from pathlib import Path
+
+import pytest
+
+import yaml_rename
+from file_watch import PollingWatcher, _watch_dirs
+from lint_names import TableWatcher
+from yaml_io import dump_yaml
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_table(path, table_name, columns):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        dump_yaml({'metadata': {'description': 'テーブル定義書'}, 'table_name': table_name, 'description': '',
+                   'columns': [{'name': name, 'data_type': 'text', 'primary_key': False, 'nullable': True}
+                               for name in columns]}, f)
+
+
+@pytest.fixture
+def watcher(tmp_path, rename_dict_path, monkeypatch):
+    """変換の出力先（schema/tables/renamed）が監視対象（schema/tables）の中にある状態"""
+    root = tmp_path / 'schema' / 'tables'
+    write_table(root / 'msthospital.yaml', 'msthospital', ['hpcode', 'hpname'])
+    state = TableWatcher([root], PROJECT_ROOT / 'lint/lint_config.yaml',
+                         PROJECT_ROOT / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                         rename_dictionary=rename_dict_path, rename_output=root / 'renamed')
+    writes = []
+    write = yaml_rename.write_converted_text
+    monkeypatch.setattr(yaml_rename, 'write_converted_text',
+                        lambda text, output_path: writes.append(output_path) or write(text, output_path))
+    state.writes = writes
+    return state
+
+
+def test_output_is_not_reprocessed(watcher):
+    root = watcher.paths[0]
+    output = (root / 'renamed' / 'mst_medical_facility.yaml').resolve()
+
+    lines = watcher.process_all()
+    assert any('→ 変換' in line for line in lines)
+    assert watcher.writes == [output]
+    assert 'medical_facility_code' in output.read_text(encoding='utf-8')
+
+    # 書き出したファイルの変更通知は表のファイルとして扱わない（ループしない）
+    assert not watcher.is_table_file(output)
+    assert watcher.handle({output}) == []
+    # 内容が変わらない保存では書き直さない
+    assert watcher.handle({root / 'msthospital.yaml'}) == []
+    assert watcher.writes == [output]
+    # 全体の処理し直しでも出力先のファイルは対象にしない
+    watcher.process_all()
+    assert list(watcher.results) == [root / 'msthospital.yaml']
+
+
+def test_changed_source_is_rewritten(watcher):
+    root = watcher.paths[0]
+    watcher.process_all()
+    write_table(root / 'msthospital.yaml', 'msthospital', ['hpcode', 'hpname', 'memo'])
+    lines = watcher.handle({root / 'msthospital.yaml'})
+    assert lines == []  # 違反の数も出力先も変わらない
+    assert len(watcher.writes) == 2
+    assert 'memo' in watcher.writes[-1].read_text(encoding='utf-8')
+
+
+def test_watcher_does_not_see_its_own_output(watcher):
+    """出力先を除いて監視するため、変換の書き出しが次の変更として返らない"""
+    root = watcher.paths[0]
+    watcher.process_all()
+    assert root / 'renamed' not in _watch_dirs(watcher.watch_paths(), watcher.exclude_paths())
+
+    files = PollingWatcher(watcher.watch_paths(), interval=0.01, exclude=watcher.exclude_paths())
+    write_table(root / 'msthospital.yaml', 'msthospital', ['hpcode', 'hpname', 'memo'])
+    changed = files.wait(1)
+    assert changed == {root / 'msthospital.yaml'}
+    watcher.handle(changed)
+    assert len(watcher.writes) == 2
+    assert files.wait(0.05) == set()
@@ -0,0 +1,117 @@
+"""rename_journal.py: compact / rollback（rename_dictionary.yaml とシャードの両方）と update_rename_dictionary の追記"""
+
+import pytest
+
+from rename_journal import (append_changes, compact, journal_path_for, last_seq, load_with_journal, make_change,
+                            read_journal, rollback)
+from rename_shards import SHARD_INDEX, load_shard_index, shard_dir_for, split_shards
+from update_rename_dictionary import update_rename_dictionary
+from yaml_io import load_yaml
+from yaml_rename import load_rename_dictionary
+
+
+@pytest.fixture(params=['yaml', 'shards'])
+def layout(request, rename_dict_path):
+    """rename_dictionary.yaml だけの構成と、シャードに分けた構成"""
+    if request.param == 'shards':
+        split_shards(rename_dict_path)
+    return request.param
+
+
+def modify_table(rename_dict_path, table, before, after):
+    return append_changes(journal_path_for(rename_dict_path),
+                          [make_change('modify', table, None, {'new': before}, {'new': after})], 'test')
+
+
+def test_replaying_journal_is_idempotent(rename_dict_path):
+    """各行は変更後の値を持つため、同じ変更を2回重ねても結果は同じ"""
+    modify_table(rename_dict_path, 'tblorder', 'tbl_order', 'tbl_sales_order')
+    once = load_with_journal(rename_dict_path)
+    entries, _ = read_journal(journal_path_for(rename_dict_path))
+    append_changes(journal_path_for(rename_dict_path),
+                   [{key: entries[0][1][key] for key in ('op', 'table', 'column', 'before', 'after')}], 'test')
+    assert load_with_journal(rename_dict_path) == once
+
+
+def test_compact(rename_dict_path, layout):
+    """compact はジャーナルを辞書（シャードがあればシャードと索引）に反映して印1行にする"""
+    modify_table(rename_dict_path, 'tblorder', 'tbl_order', 'tbl_sales_order')
+    before = load_with_journal(rename_dict_path)
+
+    assert compact(rename_dict_path) == 1
+    entries, compacted_seq = read_journal(journal_path_for(rename_dict_path))
+    assert entries == [] and compacted_seq == 1
+    assert load_with_journal(rename_dict_path) == before
+    assert load_rename_dictionary(rename_dict_path)['tables']['tblorder']['new'] == 'tbl_sales_order'
+
+    if layout == 'shards':
+        shard_dir = shard_dir_for(rename_dict_path)
+        assert load_shard_index(shard_dir)['journal_seq'] == 1
+        assert load_yaml(shard_dir / 'tbl.yaml')['tables']['tblorder']['new'] == 'tbl_sales_order'
+        # シャードの構成では rename_dictionary.yaml は書き換えない
+        assert load_yaml(rename_dict_path)['tables']['tblorder']['new'] == 'tbl_order'
+    else:
+        assert load_yaml(rename_dict_path)['tables']['tblorder']['new'] == 'tbl_sales_order'
+
+    assert compact(rename_dict_path) == 0
+
+
+def test_rollback(rename_dict_path, layout):
+    """rollback は打ち消しの行を追記し、SEQ の時点の内容に戻す"""
+    modify_table(rename_dict_path, 'tblorder', 'tbl_order', 'tbl_sales_order')
+    at_seq_1 = load_with_journal(rename_dict_path)
+    append_changes(journal_path_for(rename_dict_path),
+                   [make_change('add', 'rawlog', None, None, {'new': 'raw_log'}),
+                    make_change('remove', 'mstgovcity', None, at_seq_1['tables']['mstgovcity'], None)], 'test')
+
+    entries = rollback(rename_dict_path, 1)
+    assert [entry['op'] for entry in entries] == ['add', 'remove']
+    assert load_with_journal(rename_dict_path) == at_seq_1
+    rename_dict = load_rename_dictionary(rename_dict_path)
+    assert 'rawlog' not in rename_dict['tables']
+    assert rename_dict['tables']['mstgovcity']['new'] == 'mhlw_municipality'
+
+
+def test_rollback_before_compact_is_refused(rename_dict_path, layout):
+    """compact より前の時点には戻せない"""
+    modify_table(rename_dict_path, 'tblorder', 'tbl_order', 'tbl_sales_order')
+    modify_table(rename_dict_path, 'tblorder', 'tbl_sales_order', 'tbl_order2')
+    compact(rename_dict_path)
+    with pytest.raises(ValueError):
+        rollback(rename_dict_path, 1)
+
+
+def test_update_appends_to_journal(rename_dict_path, layout):
+    """update_rename_dictionary はどちらの構成でもジャーナルに追記するだけで、辞書・シャードを書き直さない"""
+    files_before = {path: path.read_bytes() for path in rename_dict_path.parent.rglob('*.yaml')}
+    new_tables = {'tblorder': {'new': 'tblorder', 'description': '注文'},
+                  'rawlog': {'new': 'rawlog', 'description': 'ログ'}}
+    new_columns = {'rawlog': {'hpcode': {'new': 'hpcode', 'description': 'コード'}}}
+
+    assert update_rename_dictionary(new_tables, new_columns, rename_dict_path)
+    assert {path: path.read_bytes() for path in rename_dict_path.parent.rglob('*.yaml')} == files_before
+    assert not list(rename_dict_path.parent.rglob('*.backup_*'))
+    assert last_seq(journal_path_for(rename_dict_path)) == 2
+
+    rename_dict = load_rename_dictionary(rename_dict_path)
+    assert rename_dict['tables']['rawlog']['new'] == 'rawlog'
+    # 既存の旧カラム名と同じものは既存の変換先を使う
+    assert rename_dict['columns']['rawlog']['hpcode']['new'] == 'medical_facility_code'
+
+    rollback(rename_dict_path, 0)
+    assert 'rawlog' not in load_rename_dictionary(rename_dict_path)['tables']
+
+
+def test_update_with_compact_writes_only_changed_shards(rename_dict_path):
+    """シャードの構成の --compact は追加のあったシャードと索引だけを書き戻す"""
+    split_shards(rename_dict_path)
+    shard_dir = shard_dir_for(rename_dict_path)
+    untouched = (shard_dir / 'mst.yaml').read_bytes()
+
+    assert update_rename_dictionary({'rawlog': {'new': 'rawlog', 'description': 'ログ'}}, {}, rename_dict_path,
+                                    compact_after=True)
+    assert (shard_dir / 'mst.yaml').read_bytes() == untouched
+    assert load_yaml(shard_dir / 'raw.yaml')['tables']['rawlog']['new'] == 'rawlog'
+    assert load_shard_index(shard_dir)['tables']['rawlog'] == 'raw'
+    assert (shard_dir / SHARD_INDEX).exists()
+    assert read_journal(journal_path_for(rename_dict_path)) == ([], 1)
@@ -0,0 +1,112 @@
+"""rename_rules.py の migration ルールと、yaml_rename.py の変換辞書との優先順位"""
+
+import pytest
+
+from rename_rules import RenameRules, compile_rename_rules
+from yaml_rename import apply_rules_to_dictionary, process_table_data, resolve_column_name, resolve_table_name
+
+
+NAMING_DICT = {
+    'terms': [
+        {'id': 'TIMESTAMP_STYLE', 'migration': {'rename_columns': [{'from': '*_datetime', 'to': '*_at'}]}},
+        {'id': 'AUDIT_COLUMNS', 'migration': {'rename_columns': [{'from': 'regdate', 'to': 'created_at'}]}},
+        {'id': 'MEDICAL_DEVICE', 'migration': {'rename_tokens': [
+            {'from': 'medical_equipment', 'to': 'medical_device'},
+            {'from': 'device_classification', 'to': 'medical_device_classification'},
+        ]}},
+    ],
+}
+
+RENAME_DICT = {
+    'tables': {
+        'medical_equipment_ledger': {'new': 'device_ledger'},
+        'medical_equipment_log': {'new': 'medical_equipment_log'},
+    },
+    'columns': {
+        'medical_equipment_log': {
+            'regdate': {'new': 'registered_on'},
+            'upload_datetime': {'new': 'upload_datetime'},
+        },
+    },
+}
+
+
+@pytest.fixture
+def rules():
+    return compile_rename_rules(NAMING_DICT)
+
+
+@pytest.mark.parametrize('name, kind, expected', [
+    ('upload_datetime', 'column', 'upload_at'),
+    ('regdate', 'column', 'created_at'),
+    ('medical_equipment_id', 'column', 'medical_device_id'),
+    ('medical_equipment_datetime', 'column', 'medical_device_at'),
+    ('medical_equipment_ledger', 'table', 'medical_device_ledger'),
+    # テーブル名には rename_columns を適用しない
+    ('upload_datetime', 'table', 'upload_datetime'),
+    # トークンの境界でだけ一致する
+    ('xmedical_equipment', 'column', 'xmedical_equipment'),
+    ('facility_id', 'column', 'facility_id'),
+])
+def test_apply(rules, name, kind, expected):
+    assert rules.apply(name, kind)[0] == expected
+
+
+@pytest.mark.parametrize('name', ['upload_datetime', 'regdate', 'medical_equipment_datetime',
+                                  'device_classification', 'medical_device_classification'])
+def test_apply_is_idempotent(rules, name):
+    """変換後の名前にもう一度適用しても変わらない"""
+    once, _ = rules.apply(name)
+    assert rules.apply(once) == (once, [])
+
+
+def test_fired_rules(rules):
+    """適用したルールを宣言順に返し、適用なしなら空"""
+    new_name, fired = rules.apply('medical_equipment_datetime')
+    assert fired == ['TIMESTAMP_STYLE.rename_columns[0]: *_datetime → *_at',
+                     'MEDICAL_DEVICE.rename_tokens[0]: medical_equipment → medical_device']
+    assert rules.apply('hpcode') == ('hpcode', [])
+
+
+def test_spec_round_trip(rules):
+    """naming_daemon.py で送る形から同じルールに戻る"""
+    restored = RenameRules(**rules.as_spec())
+    for name in ('upload_datetime', 'medical_equipment_id', 'regdate'):
+        assert restored.apply(name) == rules.apply(name)
+
+
+def test_dictionary_takes_precedence(rules):
+    """変換辞書の完全一致が優先され、new が旧名のまま（未決定）の項目にだけルールを適用する"""
+    assert resolve_table_name('medical_equipment_ledger', RENAME_DICT, rules) == ('device_ledger', 'rename_dictionary')
+    assert resolve_table_name('medical_equipment_log', RENAME_DICT, rules)[0] == 'medical_device_log'
+    assert resolve_column_name('medical_equipment_log', 'regdate', RENAME_DICT, rules) == (
+        'registered_on', 'rename_dictionary')
+    assert resolve_column_name('medical_equipment_log', 'upload_datetime', RENAME_DICT, rules)[0] == 'upload_at'
+    assert resolve_column_name('medical_equipment_log', 'hpcode', RENAME_DICT, rules) == ('hpcode', None)
+    assert resolve_column_name('medical_equipment_log', 'upload_datetime', RENAME_DICT) == ('upload_datetime', None)
+
+
+def test_apply_rules_to_dictionary_matches_resolve(rules):
+    """辞書全体に適用した結果は resolve_* と同じで、元の辞書は変更しない"""
+    resolved = apply_rules_to_dictionary(RENAME_DICT, rules)
+    assert resolved['tables']['medical_equipment_ledger']['new'] == 'device_ledger'
+    assert resolved['tables']['medical_equipment_log']['new'] == 'medical_device_log'
+    assert resolved['columns']['medical_equipment_log']['regdate']['new'] == 'registered_on'
+    assert resolved['columns']['medical_equipment_log']['upload_datetime']['new'] == 'upload_at'
+    assert RENAME_DICT['columns']['medical_equipment_log']['upload_datetime']['new'] == 'upload_datetime'
+    assert apply_rules_to_dictionary(RENAME_DICT, None) is RENAME_DICT
+
+
+def test_process_table_data_records_rules(rules):
+    """変換レポートにどのルールで変換したかを記録する"""
+    table = {'table_name': 'medical_equipment_log',
+             'columns': [{'name': 'regdate'}, {'name': 'upload_datetime'}, {'name': 'hpcode'}]}
+    converted, stats, old_table, new_table = process_table_data(table, RENAME_DICT, 'test.yaml', rules)
+
+    assert (old_table, new_table) == ('medical_equipment_log', 'medical_device_log')
+    assert [column['name'] for column in converted['columns']] == ['registered_on', 'upload_at', 'hpcode']
+    assert {rename['old']: rename['rule'] for rename in stats['renames']} == {
+        'medical_equipment_log': 'MEDICAL_DEVICE.rename_tokens[0]: medical_equipment → medical_device',
+        'regdate': 'rename_dictionary',
+        'upload_datetime': 'TIMESTAMP_STYLE.rename_columns[0]: *_datetime → *_at',
+    }
@@ -0,0 +1,88 @@
+"""rename_shards.py: split / join とジャーナル（rename_journal.py）の整合"""
+
+import pytest
+
+from rename_journal import append_changes, compact, journal_path_for, load_with_journal, make_change
+from rename_shards import SHARD_INDEX, join_shards, load_shard_index, shard_dir_for, split_shards
+from yaml_rename import load_rename_dictionary
+
+
+def add_table(rename_dict_path, table, new):
+    return append_changes(journal_path_for(rename_dict_path),
+                          [make_change('add', table, None, None, {'new': new})], 'test')
+
+
+def test_split_join_round_trip(rename_dict_path):
+    """split → join で rename_dictionary.yaml と同じ内容に戻る"""
+    original = load_with_journal(rename_dict_path)
+    split_shards(rename_dict_path)
+
+    joined, index = join_shards(shard_dir_for(rename_dict_path))
+    assert joined == original
+    assert index['journal_seq'] == 0
+    assert 'journal_seq' not in joined and 'prefix_length' not in joined
+
+
+def test_split_includes_pending_journal(rename_dict_path):
+    """split は未反映のジャーナルの変更もシャードに入れ、索引に反映済みの seq を記録する"""
+    add_table(rename_dict_path, 'tblnew', 'tbl_new')
+    index, shards = split_shards(rename_dict_path)
+
+    assert index['journal_seq'] == 1
+    assert shards['tbl']['tables']['tblnew'] == {'new': 'tbl_new'}
+    assert load_rename_dictionary(rename_dict_path)['tables']['tblnew'] == {'new': 'tbl_new'}
+
+
+def test_loader_merges_journal_written_after_split(rename_dict_path):
+    """split より後のジャーナルの変更は、シャードを読み込むときに重ねる"""
+    split_shards(rename_dict_path)
+    add_table(rename_dict_path, 'rawlog', 'raw_log')
+    append_changes(journal_path_for(rename_dict_path),
+                   [make_change('modify', 'msthospital', 'hpcode', {'new': 'medical_facility_code'},
+                                {'new': 'facility_code'})], 'test')
+
+    rename_dict = load_rename_dictionary(rename_dict_path)
+    assert rename_dict['tables']['rawlog'] == {'new': 'raw_log'}
+    assert rename_dict['columns']['msthospital']['hpcode'] == {'new': 'facility_code'}
+    assert rename_dict['tables']['tblorder']['new'] == 'tbl_order'
+    assert 'rawlog' in dict(rename_dict['tables'])
+
+
+def test_resplit_keeps_changes_and_removes_stale_shards(rename_dict_path):
+    """シャードがある状態での split はシャード＋ジャーナルから作り直し、使わないシャードを消す"""
+    split_shards(rename_dict_path)
+    add_table(rename_dict_path, 'rawlog', 'raw_log')
+    shard_dir = shard_dir_for(rename_dict_path)
+    (shard_dir / 'old.yaml').write_text('tables: {}\n', encoding='utf-8')
+
+    index, _ = split_shards(rename_dict_path, prefix_length=2)
+    assert index['journal_seq'] == 1
+    assert not (shard_dir / 'old.yaml').exists()
+    assert (shard_dir / SHARD_INDEX).exists()
+    assert load_shard_index(shard_dir)['tables']['rawlog'] == 'ra'
+    assert load_rename_dictionary(rename_dict_path)['tables']['rawlog'] == {'new': 'raw_log'}
+
+
+def test_loader_fails_when_journal_was_compacted_into_yaml(rename_dict_path):
+    """シャードより後に rename_dictionary.yaml へ compact されたジャーナルは黙って捨てずにエラーにする"""
+    split_shards(rename_dict_path)
+    shard_dir = shard_dir_for(rename_dict_path)
+    index_path = shard_dir / SHARD_INDEX
+    saved_index = index_path.read_bytes()
+    index_path.unlink()
+    add_table(rename_dict_path, 'rawlog', 'raw_log')
+    compact(rename_dict_path)
+    index_path.write_bytes(saved_index)
+
+    with pytest.raises(ValueError, match='compact'):
+        load_rename_dictionary(rename_dict_path)
+
+
+def test_loader_fails_when_journal_is_older_than_index(rename_dict_path):
+    """索引の journal_seq より古いジャーナル（消した・戻した）では、新しい変更を読み飛ばさずにエラーにする"""
+    add_table(rename_dict_path, 'tblnew', 'tbl_new')
+    split_shards(rename_dict_path)
+    journal_path_for(rename_dict_path).unlink()
+
+    with pytest.raises(ValueError, match='journal_seq'):
+        load_rename_dictionary(rename_dict_path)
@@ -0,0 +1,87 @@
+"""rewrite_sources.py: ソース中の旧名の置換とパッチ出力"""
+
+import subprocess
+
+from rewrite_sources import SourceRewriter, collect_renames, iter_rewrites, rewrite_file
+
+
+def columns(**renames):
+    return {old: {'new': new} for old, new in renames.items()}
+
+
+RENAME_DICT = {
+    'tables': {'msthospital': {'new': 'mst_medical_facility'}, 'legacy.tblorder': {'new': 'sales.tbl_order'},
+               'mstuser': {'new': 'mstuser'}, 'mstpref': {'new': 'mst_prefecture'}},
+    'columns': {
+        'msthospital': columns(hpcode='medical_facility_code', regdate='created_at', name='facility_name'),
+        'legacy.tblorder': columns(regdate='created_at', mstpref='prefecture_code'),
+        'mstuser': columns(name='name'),
+    },
+}
+
+
+def rewriter(**kwargs):
+    table_renames, column_renames, _ = collect_renames(RENAME_DICT)
+    return SourceRewriter(table_renames, column_renames, **kwargs)
+
+
+def test_collect_renames_skips_ambiguous_columns():
+    """変換先が割れる・一部のテーブルで残る・旧テーブル名と同じ旧カラム名は置換しない"""
+    table_renames, column_renames, skipped = collect_renames(RENAME_DICT)
+    assert table_renames[('public', 'msthospital')] == ('public', 'mst_medical_facility')
+    assert table_renames[('legacy', 'tblorder')] == ('sales', 'tbl_order')
+    assert column_renames == {'hpcode': 'medical_facility_code', 'regdate': 'created_at'}
+    assert {item['old'] for item in skipped if item['kind'] == 'column'} == {'name', 'mstpref'}
+
+    table_only = collect_renames(RENAME_DICT, kinds=('tables',))
+    assert table_only[1] == {} and table_only[0] == table_renames
+
+
+def test_rewrite_respects_identifier_boundaries():
+    data = (b'SELECT h.hpcode, hpcode_old, msthospital.regdate\n'
+            b'FROM msthospital h JOIN legacy.tblorder o ON o.regdate = h.regdate\n'
+            b'WHERE x_hpcode = 1 AND public.tblorder IS NULL\n')
+    rewritten, changes = rewriter().rewrite(data)
+    assert rewritten == (b'SELECT h.medical_facility_code, hpcode_old, mst_medical_facility.created_at\n'
+                         b'FROM mst_medical_facility h JOIN sales.tbl_order o ON o.created_at = h.created_at\n'
+                         b'WHERE x_hpcode = 1 AND public.tblorder IS NULL\n')
+    assert changes[(b'msthospital', b'mst_medical_facility')] == 2
+    assert changes[(b'legacy.tblorder', b'sales.tbl_order')] == 1
+
+
+def test_rewrite_is_not_chained():
+    """A→B と B→C が同時にあっても A は B にしかならない"""
+    rename = SourceRewriter({}, {'a': 'b', 'b': 'c'})
+    assert rename.rewrite(b'a b')[0] == b'b c'
+
+
+def test_ignore_case():
+    assert rewriter().rewrite(b'select HPCODE')[1] == {}
+    assert rewriter(ignore_case=True).rewrite(b'select HPCODE')[0] == b'select medical_facility_code'
+
+
+def test_patch_applies_with_git(tmp_path):
+    """出力したパッチは git apply で適用でき、--in-place と同じ結果になる"""
+    source = tmp_path / 'src' / 'query.sql'
+    source.parent.mkdir()
+    text = ''.join(f'-- line {i}\n' for i in range(10)) + 'SELECT hpcode FROM msthospital'
+    source.write_text(text, encoding='utf-8')
+    (tmp_path / 'src' / 'empty.sql').write_bytes(b'')
+    (tmp_path / 'src' / 'other.sql').write_text('SELECT 1\n', encoding='utf-8')
+
+    result = rewrite_file(source, rewriter(), base_dir=tmp_path)
+    assert result['replacements'] == 2
+    assert result['patch'].startswith(b'--- a/src/query.sql\n+++ b/src/query.sql\n@@ -8,4 +8,4 @@\n')
+    assert source.read_text(encoding='utf-8') == text
+
+    (tmp_path / 'rewrite.patch').write_bytes(result['patch'])
+    subprocess.run(['git', 'apply', '--unsafe-paths', 'rewrite.patch'], cwd=tmp_path, check=True)
+    applied = source.read_bytes()
+
+    source.write_text(text, encoding='utf-8')
+    files = sorted((tmp_path / 'src').iterdir())
+    results = list(iter_rewrites(files, *collect_renames(RENAME_DICT)[:2], 'public', False, in_place=True,
+                                 jobs=2))
+    assert [r['replacements'] for r in results] == [0, 0, 2]
+    assert source.read_bytes() == applied == text.replace('hpcode', 'medical_facility_code').replace(
+        'msthospital', 'mst_medical_facility').encode('utf-8')
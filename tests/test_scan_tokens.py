@@ -0,0 +1,76 @@
+"""scan_tokens.py: 識別子のトークン分解・連結名の分割・集計"""
+
+import pytest
+
+from scan_tokens import (build_rows, expand_concatenated, load_token_flags, scan, segment_token,
+                         split_identifier)
+from yaml_io import dump_yaml
+
+
+NAMING_DICT = {
+    'terms': [
+        {'id': 'CLASSIFICATION_VOCAB', 'canonical': {'en': 'classification'}, 'forbidden': ['type', 'kind*']},
+        {'id': 'SERIAL', 'canonical': {'en': 'serial_number'}, 'synonyms': {'en': ['SerialNo']}},
+        {'id': 'MEDICAL_DEVICE', 'canonical': {'en': 'medical_device'},
+         'migration': {'rename_tokens': [{'from': 'medical_equipment', 'to': 'medical_device'}]}},
+    ],
+}
+
+
+@pytest.mark.parametrize('identifier, tokens', [
+    ('medical_facility_id', ['medical', 'facility', 'id']),
+    ('core.mst_user', ['core', 'mst', 'user']),
+    ('SerialNo', ['serial', 'no']),
+    ('hpcode', ['hpcode']),
+])
+def test_split_identifier(identifier, tokens):
+    assert split_identifier(identifier) == tokens
+
+
+def test_load_token_flags():
+    forbidden, rename_tokens, vocabulary = load_token_flags(NAMING_DICT)
+    assert forbidden == {'type': 'CLASSIFICATION_VOCAB'}
+    assert rename_tokens == {'medical_equipment': 'medical_device'}
+    assert {'classification', 'serial', 'number', 'no', 'medical', 'equipment', 'device', 'type'} <= vocabulary
+
+
+def test_segment_token():
+    """既知の語で最小個数に分割し、分割できなければ None"""
+    vocabulary = {'serial', 'number', 'num', 'ber', 'hospital', 'code'}
+    assert segment_token('serialnumber', vocabulary, 8) == ['serial', 'number']
+    assert segment_token('hospitalcode', vocabulary, 8) == ['hospital', 'code']
+    assert segment_token('serialx', vocabulary, 8) is None
+    assert segment_token('serial', vocabulary, 8) is None
+
+
+def test_expand_concatenated():
+    from collections import Counter
+    expanded, segmented = expand_concatenated(Counter({'serialnumber': 2, 'serial': 1, 'id': 3}),
+                                              {'serial', 'number'})
+    assert segmented == {'serialnumber': ['serial', 'number']}
+    assert expanded == Counter({'serial': 3, 'number': 2, 'id': 3})
+
+
+def test_scan_and_rows(tmp_path):
+    for name, columns in (('mst_device', ['device_type', 'medical_equipment_id']),
+                          ('tbl_log', ['device_type', 'created_at'])):
+        with open(tmp_path / f'{name}.yaml', 'w', encoding='utf-8') as f:
+            dump_yaml({'table_name': name, 'columns': [{'name': column} for column in columns]}, f)
+    (tmp_path / 'broken.yaml').write_text('table_name: [\n', encoding='utf-8')
+
+    forbidden, rename_tokens, _ = load_token_flags(NAMING_DICT)
+    counts, file_count = scan([tmp_path], rename_tokens)
+    assert file_count == 3
+    assert counts['identifiers'] == 6
+    assert counts['column']['device'] == 2 and counts['table']['mst'] == 1
+    assert counts['phrases'] == {'medical_equipment': 1}
+    assert [path for path, _ in counts['errors']] == [str(tmp_path / 'broken.yaml')]
+
+    rows = {row[0]: row for row in build_rows(counts['table'], counts['column'], forbidden, rename_tokens,
+                                               counts['phrases'])}
+    assert rows['type'] == ('type', 2, 0, 2, 'forbidden:CLASSIFICATION_VOCAB', '')
+    assert rows['medical_equipment'] == ('medical_equipment', 1, '', '', 'rename_token', 'medical_device')
+
+    parallel, _ = scan([tmp_path], rename_tokens, jobs=2)
+    assert {key: parallel[key] for key in ('table', 'column', 'phrases', 'identifiers')} == {
+        key: counts[key] for key in ('table', 'column', 'phrases', 'identifiers')}
@@ -0,0 +1,81 @@
+"""schema_diff.py: スナップショット間のテーブル・カラムの差分とリネームの検出"""
+
+import pytest
+
+from schema_diff import diff_trees, index_tree, summarize
+from yaml_io import dump_yaml
+
+
+def write_table(directory, table_name, columns, original_table_name=None):
+    data = {'table_name': table_name, 'columns': columns}
+    if original_table_name:
+        data['metadata'] = {'conversion_info': {'original_table_name': original_table_name}}
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f'{table_name}.yaml', 'w', encoding='utf-8') as f:
+        dump_yaml(data, f)
+
+
+def column(name, data_type='TEXT', old_name=None, nullable=True, primary_key=False):
+    return {'name': name, 'old_name': old_name or name, 'data_type': data_type, 'nullable': nullable,
+            'primary_key': primary_key}
+
+
+@pytest.fixture
+def trees(tmp_path):
+    a, b = tmp_path / '2025-09-11', tmp_path / '2025-09-12'
+    # conversion_info でリネームを検出
+    write_table(a, 'msthospital', [column('id', 'INTEGER'), column('hpname')])
+    write_table(b, 'mst_medical_facility', [column('id', 'INTEGER'), column('facility_name', old_name='hpname')],
+                original_table_name='msthospital')
+    # カラム構成（旧名）のシグネチャでリネームを検出
+    write_table(a, 'tblorder', [column('orderid'), column('regdate')])
+    write_table(b, 'tbl_order', [column('order_id', old_name='orderid'), column('created_at', old_name='regdate')])
+    # 同名テーブルのカラムの追加・削除・型の変更
+    write_table(a, 'mstuser', [column('id', 'INTEGER'), column('memo'), column('age', 'TEXT')])
+    write_table(b, 'mstuser', [column('id', 'INTEGER'), column('age', 'INTEGER', nullable=False),
+                               column('email')])
+    write_table(a, 'oldonly', [column('x')])
+    write_table(b, 'newonly', [column('y')])
+    write_table(b, 'unchanged', [column('z')])
+    write_table(a, 'unchanged', [column('z')])
+    (b / 'notes.yaml').write_text('title: not a table\n', encoding='utf-8')
+    return a, b
+
+
+def test_diff_trees(trees):
+    a, b = trees
+    diff = diff_trees(index_tree(a), index_tree(b))
+
+    assert diff['tables']['added'] == ['newonly']
+    assert diff['tables']['removed'] == ['oldonly']
+    assert diff['tables']['renamed'] == [
+        {'from': 'msthospital', 'to': 'mst_medical_facility', 'method': 'original_table_name'},
+        {'from': 'tblorder', 'to': 'tbl_order', 'method': 'column_signature'},
+    ]
+
+    changed = {table['table']: table for table in diff['changed']}
+    assert set(changed) == {'mst_medical_facility', 'mstuser', 'tbl_order'}
+    assert changed['mst_medical_facility']['renamed'] == [{'from': 'hpname', 'to': 'facility_name'}]
+    assert changed['mstuser']['added'] == ['email']
+    assert changed['mstuser']['removed'] == ['memo']
+    assert changed['mstuser']['changed'] == [
+        {'column': 'age', 'field': 'data_type', 'from': 'TEXT', 'to': 'INTEGER'},
+        {'column': 'age', 'field': 'nullable', 'from': True, 'to': False},
+    ]
+    assert summarize(diff)['columns_renamed'] == 3
+
+
+def test_ambiguous_signature_is_not_a_rename(tmp_path):
+    """同じカラム構成の削除テーブルが複数あればリネームとみなさない"""
+    a, b = tmp_path / 'a', tmp_path / 'b'
+    write_table(a, 'log1', [column('at')])
+    write_table(a, 'log2', [column('at')])
+    write_table(b, 'log_new', [column('at')])
+    diff = diff_trees(index_tree(a), index_tree(b))
+    assert diff['tables']['renamed'] == []
+    assert diff['tables']['removed'] == ['log1', 'log2']
+
+
+def test_index_tree_parallel_matches_serial(trees):
+    a, _ = trees
+    assert index_tree(a, jobs=2) == index_tree(a)
@@ -0,0 +1,98 @@
+"""suggest_names.py: 3-gram索引の prefix filtering と候補の順位付け"""
+
+import random
+import string
+
+import pytest
+
+from suggest_names import (TABLE_KINDS, SuggestionIndex, build_suggestion_index, iter_unmapped_names, ngrams,
+                           replace_tokens)
+
+
+NAMING_DICT = {
+    'terms': [
+        {'id': 'MEDICAL_DEVICE', 'canonical': {'en': 'medical_device'}, 'synonyms': {'en': ['medical_equipment']},
+         'forbidden': ['device']},
+        {'id': 'AUDIT', 'canonical': {'en': '*_at / *_on'}},
+    ],
+}
+
+RENAME_DICT = {
+    'tables': {'msthospital': {'new': 'mst_medical_facility'}, 'msthospitals': {'new': 'msthospitals'},
+               'tblorder': {'new': 'tblorder'}},
+    'columns': {
+        'msthospital': {'hpcode': {'new': 'medical_facility_code'}, 'regdate': {'new': 'regdate'}},
+        'tblorder': {'regdate': {'new': 'regdate'}, 'hpcd': {'new': 'hpcd'}},
+    },
+}
+
+
+def brute_force(index, name, threshold, kinds=None):
+    """全件と Jaccard 係数を比べたときに threshold 以上になる項目の集合"""
+    query = ngrams(name)
+    return {entry_id for entry_id, grams in enumerate(index.grams)
+            if (kinds is None or index.entries[entry_id][2] in kinds)
+            and len(query & grams) / len(query | grams) >= threshold}
+
+
+def test_ngrams():
+    assert ngrams('Ab') == {'^ab', 'ab$'}
+    assert ngrams('') == {'^$'}
+
+
+def test_replace_tokens():
+    assert replace_tokens('Medical_Equipment_ledger', 'medical_equipment', 'medical_device') == \
+        'medical_device_ledger'
+    assert replace_tokens('medical_equipments', 'medical_equipment', 'medical_device') is None
+
+
+@pytest.mark.parametrize('threshold', [0.2, 0.3, 0.5, 0.8])
+def test_prefix_filter_matches_brute_force(threshold):
+    """prefix filtering で絞っても、係数が threshold 以上の候補を取りこぼさない"""
+    rng = random.Random(threshold)
+    words = ['hospital', 'medical', 'facility', 'code', 'order', 'date', 'reg', 'mst', 'tbl', 'city']
+    index = SuggestionIndex()
+    for i in range(500):
+        name = '_'.join(rng.sample(words, rng.randint(1, 3)))
+        if rng.random() < 0.3:
+            name += rng.choice(string.ascii_lowercase)
+        index.add(name, f'target_{i}', rng.choice(['table', 'column']), 'test')
+
+    for _ in range(50):
+        name = '_'.join(rng.sample(words, rng.randint(1, 3)))
+        found = {(s['target'], s['matched']) for s in index.suggest(name, top=len(index), threshold=threshold)}
+        expected = {(index.entries[i][1], index.entries[i][0]) for i in brute_force(index, name, threshold)}
+        assert found == expected
+
+
+def test_build_index_and_suggest():
+    index = build_suggestion_index(RENAME_DICT, NAMING_DICT)
+    # 禁止語・パターン・未変換の名前は索引に入れない
+    assert sorted((name, kind) for name, _, kind, _ in index.entries) == [
+        ('hpcode', 'column'), ('medical_device', 'canonical'), ('medical_equipment', 'synonym'),
+        ('msthospital', 'table')]
+
+    suggestions = index.suggest('msthospitals', kinds=TABLE_KINDS)
+    assert [(s['target'], s['kind']) for s in suggestions] == [('mst_medical_facility', 'table')]
+    assert index.suggest('hpcd', threshold=0.2, kinds=TABLE_KINDS) == []
+    assert index.suggest('hpcd', threshold=0.2)[0]['target'] == 'medical_facility_code'
+    assert index.suggest('hpcd') == []
+
+    # 命名辞書の語は名前の一部だけを置き換える
+    suggestion = index.suggest('medical_equipment_ledger', threshold=0.4)[0]
+    assert (suggestion['target'], suggestion['kind']) == ('medical_device_ledger', 'synonym')
+
+
+def test_same_rename_counts_and_ranks_first():
+    """同点なら、同じ変換が多く登録されている候補を先にする"""
+    index = SuggestionIndex()
+    index.add('regdt', 'registered_at', 'column', 'a')
+    index.add('regdt', 'registered_at', 'column', 'b')
+    index.add('regdt', 'created_at', 'column', 'c')
+    assert [(s['target'], s['count']) for s in index.suggest('regdt')] == [('registered_at', 2), ('created_at', 1)]
+
+
+def test_iter_unmapped_names():
+    assert list(iter_unmapped_names(RENAME_DICT)) == [
+        ('msthospitals', 'table', 'msthospitals'), ('tblorder', 'table', 'tblorder'),
+        ('regdate', 'column', 'msthospital'), ('hpcd', 'column', 'tblorder')]
@@ -0,0 +1,95 @@
+"""validate_dictionaries.py: 変換辞書の整合性・行番号・baseline"""
+
+from pathlib import Path
+
+from validate_dictionaries import (DictionaryBaseline, check_rename_dictionary, compile_schema, load_with_lines,
+                                   validate_dictionaries)
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def collect():
+    problems = []
+
+    def report(path, message, rule='schema', severity='error', line=None):
+        problems.append((rule, '.'.join(map(str, path)), severity))
+    return problems, report
+
+
+def test_duplicate_new_column_and_new_table_collision():
+    problems, report = collect()
+    check_rename_dictionary({
+        'tables': {'mstuser': {'new': 'mstuser'}, 'tbluser': {'new': 'mstuser'},
+                   'tbla': {'new': 'tbl_x'}, 'tblb': {'new': 'tbl_x'}, 'tblc': {'new': 'tbl_c'}},
+        'columns': {'mstuser': {'regdate': {'new': 'created_at'}, 'insdate': {'new': 'created_at'},
+                                'upddate': {'new': 'updated_at'}},
+                    'tblc': {'regdate': {'new': 'created_at'}}},
+    }, report)
+    assert sorted(problems) == [
+        ('duplicate_new_column', 'columns.mstuser.insdate.new', 'error'),
+        ('duplicate_new_column', 'columns.mstuser.regdate.new', 'error'),
+        ('duplicate_new_table', 'tables.tbla.new', 'error'),
+        ('duplicate_new_table', 'tables.tblb.new', 'error'),
+        ('new_table_collision', 'tables.tbluser.new', 'error'),
+    ]
+
+
+def test_load_with_lines(tmp_path):
+    path = tmp_path / 'rename_dictionary.yaml'
+    path.write_text('version: "1.0"\ntables:\n  a:\n    new: b\n  a:\n    new: c\n', encoding='utf-8')
+    data, lines, duplicates = load_with_lines(path)
+    assert data['tables'] == {'a': {'new': 'c'}}
+    assert lines[('tables',)] == 2 and lines[('tables', 'a', 'new')] == 6
+    assert duplicates == [(('tables', 'a'), 5, 3)]
+
+
+def test_compile_schema():
+    problems, report = collect()
+    validate = compile_schema({'type': 'object', 'required': ['version'], 'additionalProperties': False,
+                               'properties': {'version': {'type': 'string', 'pattern': r'^\d+\.\d+$'},
+                                              'items': {'type': 'array', 'items': {'$ref': '#/$defs/item'}}},
+                               '$defs': {'item': {'type': 'integer', 'minimum': 0}}})
+    validate({'version': 'x', 'items': [1, -1, 'a'], 'extra': 1}, (), report)
+    assert sorted((rule, path) for rule, path, _ in problems) == [
+        ('schema', 'extra'), ('schema', 'items.1'), ('schema', 'items.2'), ('schema', 'version')]
+    problems.clear()
+    validate({'items': [0, 3]}, (), report)
+    assert problems == [('schema', '', 'error')]
+
+
+def test_validate_and_baseline(tmp_path):
+    """問題はファイルの行番号で報告し、baseline にあるものは数えない"""
+    rename_path = tmp_path / 'rename_dictionary.yaml'
+    rename_path.write_text(
+        'version: "1.0"\n'
+        'tables:\n'
+        '  tblorder:\n'
+        '    new: tbl_order\n'
+        'columns:\n'
+        '  tblorder:\n'
+        '    regdate:\n'
+        '      new: created_at\n'
+        '    insdate:\n'
+        '      new: created_at\n', encoding='utf-8')
+    paths = {
+        'naming': PROJECT_ROOT / 'dictionary/naming_dictionary_v0.2.1.yaml',
+        'product_fields': PROJECT_ROOT / 'dictionary/product_fields_dictionary_v0.2.1.yaml',
+        'rename': rename_path,
+        'schema': PROJECT_ROOT / 'dictionary/schema.json',
+        'config': PROJECT_ROOT / 'lint/lint_config.yaml',
+    }
+    problems = [p for p in validate_dictionaries(paths, lint=False).problems if p['file'].endswith(rename_path.name)]
+    assert [(p['rule'], p['line'], p['path']) for p in problems] == [
+        ('duplicate_new_column', 8, 'columns.tblorder.regdate.new'),
+        ('duplicate_new_column', 10, 'columns.tblorder.insdate.new')]
+
+    baseline_path = tmp_path / 'dictionary_baseline.yaml'
+    baseline = DictionaryBaseline(baseline_path, load=False)
+    for problem in problems:
+        baseline.consume_problem(problem)
+    baseline.save()
+
+    baseline = DictionaryBaseline(baseline_path)
+    assert [baseline.consume_problem(p) for p in problems] == [True, True]
+    assert baseline.consume_problem(dict(problems[0], message='別の問題')) is False
@@ -0,0 +1,94 @@
+"""xlsx_to_yaml.py: openpyxl の行ストリーミング読み込みが pandas（従来方式）と同じ結果になること"""
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('openpyxl')
+pytest.importorskip('pandas')
+
+import xlsx_to_yaml  # noqa: E402
+from xlsx_to_yaml import iter_table_sheets  # noqa: E402
+
+pytestmark = pytest.mark.filterwarnings('ignore::UserWarning')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SMDS_WORKBOOK = PROJECT_ROOT / 'tools/config/smds_poc/smds_dbdesign.xlsx'
+HEADER = ('名称', 'レコード名', 'タイプ', 'キー', 'NULL\n可', 'sqlalchemy\nタイプ', '説明')
+
+
+def read_all(excel_path, engine, jobs=1):
+    target_sheets, results = iter_table_sheets(excel_path, engine, jobs)
+    return target_sheets, list(results)
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    """ヘッダー行あり・なし、空行のあとに続く行、対象外のシートを含む小さなブック"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '病院マスタ'
+    for row in [('説明', '病院のマスタ'), ('テーブル名', 'msthospital'), HEADER,
+                ('ID', 'id', 'serial', '○', None, 'Integer', None),
+                ('名称', 'hpname', 'text', None, 'no', 'String(64)', '正式名称'),
+                ('登録日', 'regdate', 'timestamp', None, 0, 'DateTime', 'nan'),
+                (None, None, None),
+                ('空行の後', 'ignored', 'text')]:
+        sheet.append(row)
+
+    sheet = workbook.create_sheet('ヘッダーなし')
+    for row in [('説明', None), (None, None), ('コード', 'code', 'text', None, '×')]:
+        sheet.append(row)
+
+    workbook.create_sheet('空のシート')
+    workbook.create_sheet('templete').append(('説明', 'テンプレート'))
+
+    path = tmp_path / 'design.xlsx'
+    workbook.save(path)
+    return path
+
+
+def test_streaming_matches_pandas(workbook_path):
+    sheets, streamed = read_all(workbook_path, 'openpyxl')
+    assert sheets == ['病院マスタ', 'ヘッダーなし', '空のシート']
+    assert streamed == read_all(workbook_path, 'pandas')[1]
+
+    table = streamed[0][1]
+    assert table['table_name'] == 'msthospital'
+    assert [column['name'] for column in table['columns']] == ['id', 'hpname', 'regdate']
+    assert [column['nullable'] for column in table['columns']] == [True, False, False]
+    assert table['columns'][0]['primary_key'] is True
+    assert table['columns'][2]['comment'] is None
+    # テーブル名がなければシート名を使い、3行目がヘッダーでなければカラムとして読む
+    assert streamed[1][1]['table_name'] == 'ヘッダーなし'
+    assert [column['name'] for column in streamed[1][1]['columns']] == ['code']
+
+
+@pytest.mark.skipif(not SMDS_WORKBOOK.exists(), reason='smds_dbdesign.xlsx がない')
+def test_streaming_matches_pandas_on_smds_workbook():
+    sheets, streamed = read_all(SMDS_WORKBOOK, 'openpyxl')
+    pandas_sheets, by_pandas = read_all(SMDS_WORKBOOK, 'pandas')
+    assert sheets == pandas_sheets
+    assert streamed == by_pandas
+    assert all(error is None for _, _, error in streamed)
+
+
+def test_parallel_matches_serial(workbook_path, monkeypatch):
+    """ワーカーで読んでもシート順・内容はシリアル実行と同じ"""
+    monkeypatch.setattr(xlsx_to_yaml, 'MIN_SHEETS_PER_JOB', 1)
+    monkeypatch.setattr(xlsx_to_yaml.os, 'cpu_count', lambda: 2)
+    assert xlsx_to_yaml.effective_jobs(2, 3) == 2
+    assert read_all(workbook_path, 'openpyxl', jobs=2) == read_all(workbook_path, 'openpyxl')
+
+
+@pytest.mark.parametrize('jobs, sheets, cpus, expected', [
+    (4, 29, 8, 1),     # 小さなブックはシリアル実行
+    (4, 250, 8, 2),    # MIN_SHEETS_PER_JOB シートにつき1つまで
+    (4, 1000, 2, 2),   # CPU数まで
+    (1, 1000, 8, 1),
+])
+def test_effective_jobs(monkeypatch, jobs, sheets, cpus, expected):
+    monkeypatch.setattr(xlsx_to_yaml.os, 'cpu_count', lambda: cpus)
+    assert xlsx_to_yaml.effective_jobs(jobs, sheets) == expected
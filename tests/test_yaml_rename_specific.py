@@ -0,0 +1,25 @@
+"""yaml_rename_specific.py: 対象ファイルは1回だけ読み込む"""
+
+import yaml_rename_specific
+from yaml_io import dump_yaml
+
+
+def test_load_target_files_parses_each_file_once(tmp_path, monkeypatch):
+    path = tmp_path / 'msthospital.yaml'
+    with open(path, 'w', encoding='utf-8') as f:
+        dump_yaml({'table_name': 'msthospital', 'columns': []}, f)
+    (tmp_path / 'broken.yaml').write_text('table_name: [\n', encoding='utf-8')
+
+    calls = []
+    load_yaml = yaml_rename_specific.load_yaml
+
+    def counting_load_yaml(file_path):
+        calls.append(file_path)
+        return load_yaml(file_path)
+    monkeypatch.setattr(yaml_rename_specific, 'load_yaml', counting_load_yaml)
+    loaded = yaml_rename_specific.load_target_files([path, tmp_path / 'missing.yaml', tmp_path / 'broken.yaml'])
+
+    assert calls == [path, tmp_path / 'broken.yaml']
+    assert loaded[0][0] == {'table_name': 'msthospital', 'columns': []} and loaded[0][2] is None
+    assert loaded[1] == (None, None, None)
+    assert loaded[2][0] is None and loaded[2][2] is not None
@@ -2,142 +2,187 @@
 """
 config/streamedix/core,cur,raw/*.yamlファイルに監査フィールドを追加するスクリプト
 
-追加するフィールド:
-- created_by (TEXT): 作成者ID（ユーザーID・システムID）
-- updated_by (TEXT): 最終更新者ID（ユーザーID・システムID）
+追加するフィールドは命名辞書（AUDIT_COLUMNS の migration.add_columns）で宣言する:
+- created_by (TEXT): 作成者ID（ユーザーID・システムID）… created_at の直後
+- updated_by (TEXT): 最終更新者ID（ユーザーID・システムID）… updated_at の直後
 
 フィールドの並び順: created_at, created_by, updated_at, updated_by
+
+Usage: python add_audit_fields.py [--dry-run] [--jobs N] [--term TERM_ID] [dir ...]
+  --dry-run: ファイルを書き換えず、変更内容をunified diffで出力
+  --jobs N:  N個のワーカープロセスで並列処理
+
+出力内容が実際に変わるファイルだけを一時ファイル経由（atomic rename）で書き換える。
+--timings / --profile で処理時間を計測できる（instrumentation.py）。
 """
 
-import yaml
+import argparse
+import difflib
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+import instrumentation
+from yaml_io import load_yaml, load_yaml_text, render_table_yaml
+
 
-def add_audit_fields_to_columns(columns):
+def load_injection_rules(naming_dict_path, term_id='AUDIT_COLUMNS'):
     """
-    columnsリストに監査フィールド(created_by, updated_by)を追加する
-    created_at, updated_atが既にあることを前提に、適切な位置に挿入する
+    命名辞書から追加カラムの宣言（migration.add_columns）を読み込む
+    返り値: [{'name', 'after', 'column'}, ...]（columnは挿入するカラム定義）
+    """
+    naming_dict = load_yaml(naming_dict_path) or {}
+
+    for term in naming_dict.get('terms', []):
+        if term.get('id') != term_id:
+            continue
+
+        rules = []
+        for spec in (term.get('migration') or {}).get('add_columns') or []:
+            column = {key: value for key, value in spec.items() if key != 'after'}
+            rules.append({'name': spec['name'], 'after': spec['after'], 'column': column})
+        return rules
+
+    raise KeyError(f"命名辞書に {term_id} が見つかりません")
+
+
+def inject_columns(columns, rules):
+    """
+    columnsリストに宣言されたカラムを追加する（1回の走査）
+    「Yの直後にXを挿入。ただしXが既にある場合・Yがない場合は何もしない」
+    返り値: (新しいcolumnsリスト, 追加したカラム名リスト)
     """
     if not columns:
-        return columns
-
-    # 既存の監査フィールドのインデックスを探す
-    created_at_idx = None
-    updated_at_idx = None
-    created_by_exists = False
-    updated_by_exists = False
-
-    for i, col in enumerate(columns):
-        name = col.get('name', '')
-        if name == 'created_at':
-            created_at_idx = i
-        elif name == 'updated_at':
-            updated_at_idx = i
-        elif name == 'created_by':
-            created_by_exists = True
-        elif name == 'updated_by':
-            updated_by_exists = True
-
-    # 既に存在する場合はスキップ
-    if created_by_exists and updated_by_exists:
-        print("    監査フィールドは既に存在します")
-        return columns
-
-    # created_byフィールドの定義
-    created_by_field = {
-        'name': 'created_by',
-        'data_type': 'TEXT',
-        'nullable': False,
-        'description': '作成者ID（ユーザーID・システムID）'
-    }
-
-    # updated_byフィールドの定義
-    updated_by_field = {
-        'name': 'updated_by',
-        'data_type': 'TEXT',
-        'nullable': False,
-        'description': '最終更新者ID（ユーザーID・システムID）'
-    }
-
-    # 新しいcolumnsリストを作成
-    new_columns = []
+        return columns, []
+
+    existing_names = {col.get('name', '') for col in columns}
+
+    # 挿入位置（直前のカラム名）ごとに追加するカラムをまとめる
+    pending = {}
+    for rule in rules:
+        if rule['name'] not in existing_names:
+            pending.setdefault(rule['after'], []).append(rule)
+
+    if not pending:
+        return columns, []
 
-    for i, col in enumerate(columns):
+    new_columns = []
+    added = []
+    for col in columns:
         new_columns.append(col)
 
-        # created_atの直後にcreated_byを挿入
-        if i == created_at_idx and not created_by_exists:
-            new_columns.append(created_by_field)
-            print("    created_byフィールドを追加")
+        for rule in pending.pop(col.get('name', ''), ()):
+            new_columns.append(dict(rule['column']))
+            added.append(rule['name'])
 
-        # updated_atの直後にupdated_byを挿入
-        if i == updated_at_idx and not updated_by_exists:
-            new_columns.append(updated_by_field)
-            print("    updated_byフィールドを追加")
+    return new_columns, added
 
-    return new_columns
 
+def _default_file_mode():
+    """新しく作るファイルの権限（0666 から umask を除いたもの）"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
 
-def process_yaml_file(file_path):
-    """YAMLファイルを処理して監査フィールドを追加"""
-    print(f"\n処理中: {file_path.name}")
+
+def write_text_atomic(text, file_path):
+    """
+    同じディレクトリの一時ファイルに書いてからrenameで置き換える
+    mkstemp の一時ファイルは 0600 で作られるため、元のファイルの権限（なければ umask に従った権限）に合わせる
+    """
+    with instrumentation.phase('write'):
+        fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f'.{file_path.name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            if file_path.exists():
+                shutil.copymode(file_path, tmp_path)
+            else:
+                os.chmod(tmp_path, _default_file_mode())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def process_yaml_file(file_path, rules, dry_run=False):
+    """
+    YAMLファイルを処理して監査フィールドを追加
+    返り値: {'file', 'status', 'added', 'message', 'diff', 'timings'}
+      status: updated / unchanged / skipped / error
+    """
+    with instrumentation.collect_phases() as timings:
+        result = _process_yaml_file(file_path, rules, dry_run)
+    result['timings'] = timings
+    return result
+
+
+def _process_yaml_file(file_path, rules, dry_run):
+    result = {'file': file_path, 'status': 'unchanged', 'added': [], 'message': '', 'diff': ''}
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        with instrumentation.phase('read'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                original_text = f.read()
+        yaml_data = load_yaml_text(original_text)
 
         if not yaml_data:
-            print("    YAMLデータが空です")
-            return False
+            result.update(status='skipped', message='YAMLデータが空です')
+            return result
 
         # columnsが存在するかチェック
         if 'columns' not in yaml_data or not yaml_data['columns']:
-            print("    columnsセクションが見つかりません")
-            return False
-
-        # 監査フィールドを追加
-        original_count = len(yaml_data['columns'])
-        yaml_data['columns'] = add_audit_fields_to_columns(yaml_data['columns'])
-        new_count = len(yaml_data['columns'])
-
-        if new_count > original_count:
-            # ファイルを更新
-            with open(file_path, 'w', encoding='utf-8') as f:
-                # ヘッダーコメント
-                f.write('#- metadata -----------------------------------------------\n')
-
-                # YAMLデータを整形して出力
-                yaml_str = yaml.dump(yaml_data,
-                                   default_flow_style=False,
-                                   allow_unicode=True,
-                                   sort_keys=False,
-                                   indent=2)
-
-                # セクション区切りを追加
-                lines = yaml_str.split('\n')
-                result_lines = []
-
-                for i, line in enumerate(lines):
-                    if line.startswith('table_name:'):
-                        result_lines.append('\n#- tableinfo ----------------------------------------------')
-                    elif line.startswith('columns:'):
-                        result_lines.append('\n#- columns info -------------------------------------------')
-
-                    result_lines.append(line)
-
-                f.write('\n'.join(result_lines))
-
-            print(f"    ファイルを更新しました ({original_count} → {new_count} columns)")
-            return True
+            result.update(status='skipped', message='columnsセクションが見つかりません')
+            return result
+
+        with instrumentation.phase('inject'):
+            yaml_data['columns'], added = inject_columns(yaml_data['columns'], rules)
+        result['added'] = added
+        if not added:
+            result['message'] = '追加対象のフィールドは既に存在します'
+            return result
+
+        new_text = render_table_yaml(yaml_data)
+        if new_text == original_text:
+            return result
+
+        if dry_run:
+            with instrumentation.phase('diff'):
+                result['diff'] = ''.join(difflib.unified_diff(
+                    original_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                    fromfile=f'a/{file_path.name}', tofile=f'b/{file_path.name}'))
         else:
-            print("    変更はありませんでした")
-            return False
+            write_text_atomic(new_text, file_path)
+
+        result['status'] = 'updated'
+        return result
 
     except Exception as e:
-        print(f"    エラー: {e}")
-        return False
+        result.update(status='error', message=str(e))
+        return result
+
+
+def _process_in_worker(args):
+    """ワーカー側の処理（引数はタプルで受け取る）"""
+    return process_yaml_file(*args)
+
+
+def process_files(yaml_files, rules, dry_run=False, jobs=1):
+    """ファイル群を処理し、入力順に結果を返す"""
+    tasks = [(yaml_file, rules, dry_run) for yaml_file in yaml_files]
+
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield process_yaml_file(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=instrumentation.enable_in_worker,
+                             initargs=(instrumentation.enabled(),)) as executor:
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        yield from executor.map(_process_in_worker, tasks, chunksize=chunksize)
 
 
 def main():
@@ -145,47 +190,67 @@ def main():
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
 
-    # 対象ディレクトリ
-    target_dirs = [
+    parser = argparse.ArgumentParser(description='命名辞書で宣言されたカラムをテーブル定義に追加')
+    parser.add_argument('dirs', nargs='*', type=Path, default=[
         project_root / 'tools/config/streamedix/core',
         project_root / 'tools/config/streamedix/cur',
         project_root / 'tools/config/streamedix/raw'
-    ]
-
-    total_files = 0
-    updated_files = 0
+    ], help='対象ディレクトリ（既定: tools/config/streamedix/{core,cur,raw}）')
+    parser.add_argument('--dictionary', default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='命名辞書ファイル')
+    parser.add_argument('--term', default='AUDIT_COLUMNS', help='追加カラムを宣言している辞書のterm id')
+    parser.add_argument('--dry-run', action='store_true', help='書き換えずにunified diffを出力')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='並列ワーカー数')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('add_audit_fields', args)
+
+    rules = load_injection_rules(args.dictionary, args.term)
 
     print("監査フィールド追加処理を開始します")
-    print("追加フィールド: created_by (TEXT), updated_by (TEXT)")
+    print("追加フィールド: " + ", ".join(
+        f"{rule['name']} ({rule['column'].get('data_type', '')}) ← {rule['after']}の直後" for rule in rules))
+    if args.dry_run:
+        print("(dry-run: ファイルは書き換えません)")
     print("="*60)
 
-    for target_dir in target_dirs:
+    yaml_files = []
+    for target_dir in args.dirs:
         if not target_dir.exists():
             print(f"\nディレクトリが見つかりません: {target_dir}")
             continue
 
-        print(f"\n処理ディレクトリ: {target_dir}")
-
         # YAMLファイルを取得
-        yaml_files = list(target_dir.glob('*.yaml'))
+        dir_files = sorted(target_dir.glob('*.yaml'))
+        print(f"\n処理ディレクトリ: {target_dir} ({len(dir_files)}ファイル)")
+        yaml_files.extend(dir_files)
 
-        if not yaml_files:
-            print("  YAMLファイルが見つかりません")
-            continue
-
-        print(f"  対象ファイル数: {len(yaml_files)}個")
-
-        for yaml_file in yaml_files:
-            total_files += 1
-            if process_yaml_file(yaml_file):
-                updated_files += 1
+    total_files = len(yaml_files)
+    updated_files = 0
+    error_files = 0
+
+    for result in process_files(yaml_files, rules, dry_run=args.dry_run, jobs=args.jobs):
+        instrumentation.record_file(result['file'], result['timings'])
+        status = result['status']
+        if status == 'updated':
+            updated_files += 1
+            print(f"\n更新: {result['file']} (+{', '.join(result['added'])})")
+            if result['diff']:
+                print(result['diff'], end='')
+        elif status == 'error':
+            error_files += 1
+            print(f"\nエラー: {result['file']}: {result['message']}")
+        elif status == 'skipped':
+            print(f"\nスキップ: {result['file']}: {result['message']}")
 
     print("\n" + "="*60)
     print(f"処理完了")
     print(f"処理対象ファイル数: {total_files}個")
-    print(f"更新されたファイル数: {updated_files}個")
+    print(f"{'更新対象' if args.dry_run else '更新された'}ファイル数: {updated_files}個")
+    print(f"エラー: {error_files}個")
     print(f"処理日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    session.finish(extra={'updated_files': updated_files, 'error_files': error_files})
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
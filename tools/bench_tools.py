@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+各ツールの処理時間・メモリ使用量を計測するベンチマーク
+
+Usage: python bench_tools.py [--sizes 100,1000] [--tools yaml_rename,...] [--jobs N]
+                             [--output PATH] [--compare BASELINE.json] [--threshold 1.2]
+
+gen_synthetic_schema.py で生成したデータ（schema/derived/bench/data/<テーブル数>）に対して
+各ツールを別プロセスとして実行し、以下を記録する。
+- wall_seconds:  起動から終了までの経過時間（Python起動・辞書読み込みを含む）
+- peak_rss_mb:   最大常駐メモリ（子プロセスのrusage。--jobs のワーカーのうち最大のもの）
+- files_per_second
+
+Output: schema/derived/bench/results/YYYY-MM-DD_HHMMSS.json
+--compare を指定すると、同じツール・テーブル数の結果と比べて
+wall_seconds / peak_rss_mb が threshold 倍を超えたものを回帰として報告し、終了コード1で終わる。
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from gen_synthetic_schema import GENERATOR_VERSION, generate_dataset
+
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+
+# 終了コード1を正常とみなすツール（違反ありで1を返すlintなど）
+ALLOWED_RETURNCODES = {'lint_names': (0, 1)}
+COMPARED_METRICS = ('wall_seconds', 'peak_rss_mb')
+
+
+def tool_commands(data_dir, work_dir, jobs):
+    """
+    計測するツールのコマンド
+    返り値: [(ツール名, 準備処理, コマンド, 処理ファイル数のキー)]
+      準備処理はコマンド実行前に呼ぶ（入力ファイルのコピーなど、計測時間に含めない）
+    """
+    python = sys.executable
+    legacy_dir = data_dir / 'legacy'
+    renamed_dir = data_dir / 'renamed'
+
+    def copy_tree(source, target):
+        def prepare():
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.copytree(source, target)
+        return prepare
+
+    def copy_file(source, target):
+        def prepare():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            for stale in target.parent.glob(f'{target.name}.backup_*'):
+                stale.unlink()
+            shutil.copyfile(source, target)
+        return prepare
+
+    def clean(target):
+        return lambda: shutil.rmtree(target, ignore_errors=True)
+
+    return [
+        ('yaml_rename', clean(work_dir / 'yaml_rename'),
+         [python, 'yaml_rename.py', '--input-dir', legacy_dir, '--output-dir', work_dir / 'yaml_rename',
+          '--dictionary', data_dir / 'rename_dictionary.yaml', '--jobs', jobs], 'tables'),
+        ('add_audit_fields', copy_tree(renamed_dir, work_dir / 'add_audit_fields'),
+         [python, 'add_audit_fields.py', work_dir / 'add_audit_fields', '--jobs', jobs], 'tables'),
+        ('update_rename_dictionary',
+         copy_file(data_dir / 'rename_dictionary.yaml', work_dir / 'update_rename_dictionary/rename_dictionary.yaml'),
+         [python, 'update_rename_dictionary.py', '--input-dir', legacy_dir,
+          '--dictionary', work_dir / 'update_rename_dictionary/rename_dictionary.yaml'], 'tables'),
+        ('xlsx_to_yaml', clean(work_dir / 'xlsx_to_yaml'),
+         [python, 'xlsx_to_yaml.py', '--excel', data_dir / 'dbdesign.xlsx',
+          '--output-dir', work_dir / 'xlsx_to_yaml', '--jobs', jobs], 'workbook_sheets'),
+        ('lint_names', lambda: None,
+         [python, 'lint_names.py', renamed_dir, '--no-cache', '--no-daemon'], 'tables'),
+    ]
+
+
+# 計測用の小さな中継プロセス。ベンチマーク本体（生成データを抱えて大きい）から直接
+# fork すると最大RSSが親の値を引き継ぐため、中継プロセスの子として実行し
+# RUSAGE_CHILDREN の値を結果ファイルに書き出す
+_RUSAGE_WRAPPER = (
+    'import json, resource, subprocess, sys\n'
+    'returncode = subprocess.call(sys.argv[2:], stdout=subprocess.DEVNULL)\n'
+    'usage = resource.getrusage(resource.RUSAGE_CHILDREN)\n'
+    'json.dump({"returncode": returncode, "maxrss": usage.ru_maxrss}, open(sys.argv[1], "w"))\n'
+)
+
+
+def run_measured(command, cwd):
+    """
+    コマンドを実行して (終了コード, 経過秒, 最大RSS[MB], 標準エラー出力) を返す
+    最大RSSはコマンドとその子孫（--jobs のワーカー）のうち最大のもの
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        usage_path = Path(tmp_dir) / 'usage.json'
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, '-c', _RUSAGE_WRAPPER, *map(str, [usage_path, *command])],
+                                 cwd=cwd, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - started
+        with open(usage_path, 'r', encoding='utf-8') as f:
+            usage = json.load(f)
+
+    # ru_maxrss はLinuxではKB、macOSではバイト
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return usage['returncode'], elapsed, usage['maxrss'] / divisor, process.stderr.decode('utf-8', 'replace')
+
+
+def ensure_dataset(data_root, size, seed, workbook):
+    """データが無いか生成条件が違う場合は生成する"""
+    data_dir = data_root / str(size)
+    try:
+        with open(data_dir / 'dataset.json', 'r', encoding='utf-8') as f:
+            dataset = json.load(f)
+        if (dataset.get('generator_version') == GENERATOR_VERSION and dataset.get('seed') == seed
+                and (dataset.get('workbook_sheets') or not workbook)):
+            return data_dir, dataset
+    except (OSError, ValueError):
+        pass
+
+    print(f"データ生成中: {size}テーブル → {data_dir}")
+    shutil.rmtree(data_dir, ignore_errors=True)
+    return data_dir, generate_dataset(data_dir, size, seed=seed, workbook=workbook)
+
+
+def git_revision():
+    """計測対象のコミット（取得できなければNone）"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(results, baseline, threshold):
+    """
+    ベースラインと比較して回帰を検出
+    返り値: (比較行のリスト, 回帰のリスト)
+    """
+    baseline_index = {(r['tool'], r['size']): r for r in baseline.get('results', [])}
+    rows = []
+    regressions = []
+    for result in results:
+        base = baseline_index.get((result['tool'], result['size']))
+        if base is None or result.get('error') or base.get('error'):
+            continue
+        for metric in COMPARED_METRICS:
+            if not base[metric]:
+                continue
+            ratio = result[metric] / base[metric]
+            row = {'tool': result['tool'], 'size': result['size'], 'metric': metric,
+                   'baseline': base[metric], 'current': result[metric], 'ratio': round(ratio, 3)}
+            rows.append(row)
+            if ratio > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='ツールのベンチマーク')
+    parser.add_argument('--sizes', default='100,1000', help='テーブル数（カンマ区切り。例: 100,1000,10000,50000）')
+    parser.add_argument('--tools', help='計測するツール（カンマ区切り。既定: すべて）')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='--jobs 対応ツールのワーカー数')
+    parser.add_argument('--seed', type=int, default=0, help='データ生成の乱数シード')
+    parser.add_argument('--no-workbook', action='store_true', help='xlsx_to_yaml を計測しない（ブックを生成しない）')
+    parser.add_argument('--data-dir', type=Path, default=PROJECT_ROOT / 'schema/derived/bench/data',
+                        help='生成データの置き場所')
+    parser.add_argument('--output', type=Path,
+                        default=PROJECT_ROOT / 'schema/derived/bench/results'
+                        / f"{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json",
+                        help='結果JSONの出力先')
+    parser.add_argument('--compare', type=Path, help='比較するベースラインの結果JSON')
+    parser.add_argument('--threshold', type=float, default=1.2, help='回帰とみなす倍率')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    selected = set(args.tools.split(',')) if args.tools else None
+    if args.no_workbook:
+        selected = (selected or {name for name, *_ in tool_commands(Path(), Path(), 1)}) - {'xlsx_to_yaml'}
+
+    results = []
+    for size in sizes:
+        data_dir, dataset = ensure_dataset(args.data_dir, size, args.seed, workbook=not args.no_workbook)
+        work_dir = args.data_dir / f'{size}_work'
+
+        for tool, prepare, command, count_key in tool_commands(data_dir, work_dir, args.jobs):
+            if selected is not None and tool not in selected:
+                continue
+
+            prepare()
+            returncode, elapsed, peak_rss, stderr = run_measured(command, SCRIPT_DIR)
+            files = dataset[count_key]
+            result = {
+                'tool': tool,
+                'size': size,
+                'files': files,
+                'wall_seconds': round(elapsed, 3),
+                'peak_rss_mb': round(peak_rss, 1),
+                'files_per_second': round(files / elapsed, 1) if elapsed else None,
+                'returncode': returncode,
+            }
+            if returncode not in ALLOWED_RETURNCODES.get(tool, (0,)):
+                result['error'] = stderr.strip().splitlines()[-1] if stderr.strip() else f'exit {returncode}'
+            results.append(result)
+
+            status = f"  エラー: {result['error']}" if result.get('error') else ''
+            print(f"{tool:26s} {size:>6d}テーブル {elapsed:8.2f}s {peak_rss:8.1f}MB"
+                  f" {result['files_per_second'] or 0:10.1f}ファイル/s{status}")
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'jobs': args.jobs,
+        'seed': args.seed,
+        'results': results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果: {args.output}")
+
+    failed = [r for r in results if r.get('error')]
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare_results(results, baseline, args.threshold)
+        print(f"\nベースラインとの比較: {args.compare} (revision {baseline.get('revision')})")
+        for row in rows:
+            mark = '  ← 回帰' if row in regressions else ''
+            print(f"  {row['tool']:26s} {row['size']:>6d} {row['metric']:13s}"
+                  f" {row['baseline']:>9} → {row['current']:>9} (x{row['ratio']:.2f}){mark}")
+        print(f"回帰: {len(regressions)}件（閾値 x{args.threshold}）")
+
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+xlsx_to_yaml.py の読み込み方式（pandas / openpyxlストリーミング）の比較
+
+生成したテーブル設計ブック（smds_dbdesign.xlsx と同じレイアウト）を
+両方式で読み込み、テーブル定義が完全に一致することと所要時間を確認する。
+
+Usage: python bench_xlsx_to_yaml.py [--sheets N] [--columns N] [--jobs N] [--keep PATH]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from openpyxl import Workbook
+
+from xlsx_to_yaml import iter_table_sheets
+
+
+DATA_TYPES = ['text', 'integer', 'bigint', 'serial', 'timestamp', 'date', 'boolean', 'numeric(8,3)']
+NULLABLE_VALUES = [None, True, False, 'true', 'false', 'no', '×', 'x', 'yes']
+
+
+def generate_workbook(output_path, sheet_count, column_count, seed=0):
+    """テーブル設計ブックを生成（ヘッダー行の有無・空行以降のゴミ行も混ぜる）"""
+    rng = random.Random(seed)
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+
+    for name in ['templete', '入力シート']:
+        workbook.create_sheet(name).append(['対象外シート'])
+
+    for i in range(sheet_count):
+        worksheet = workbook.create_sheet(f'tbl{i:05d}')
+        worksheet.append([None, f'テーブル{i}の説明'])
+        # テーブル名が空のシートはシート名が使われる
+        worksheet.append([None, f'table_{i:05d}' if i % 10 else None])
+        if i % 7:
+            worksheet.append(['項目名', 'レコード名', 'タイプ', 'PK', 'NULL', None, '備考'])
+
+        for j in range(rng.randint(1, column_count)):
+            worksheet.append([
+                f'カラム{j}' if j % 5 else None,
+                f'col_{j}' if j % 11 != 3 else f'  col_{j}  ',
+                rng.choice(DATA_TYPES),
+                '○' if j == 0 else rng.choice([None, '', '-']),
+                rng.choice(NULLABLE_VALUES),
+                None,
+                rng.choice([None, f'備考{j}', 'nan']),
+            ])
+
+        # B列が空の行で終了し、それ以降は読まれない
+        worksheet.append(['メモ', None, None])
+        worksheet.append(['無視される行', 'ignored', 'text'])
+
+    workbook.save(output_path)
+
+
+def parse_all(excel_path, engine, jobs=1):
+    """全シートを読み込み、所要時間と結果を返す"""
+    started = time.perf_counter()
+    _, parsed_sheets = iter_table_sheets(excel_path, engine=engine, jobs=jobs)
+    results = {sheet_name: (table_info, error) for sheet_name, table_info, error in parsed_sheets}
+    return time.perf_counter() - started, results
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='xlsx_to_yaml.py の読み込み方式の比較')
+    parser.add_argument('--sheets', type=int, default=200, help='生成するシート数')
+    parser.add_argument('--columns', type=int, default=40, help='1シートあたりの最大カラム数')
+    parser.add_argument('--jobs', type=int, default=4, help='並列読み込みのワーカー数')
+    parser.add_argument('--keep', help='生成したブックの保存先（省略時は一時ファイル）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        excel_path = Path(args.keep) if args.keep else Path(tmp_dir) / 'generated_dbdesign.xlsx'
+        print(f"ブックを生成中: {args.sheets}シート → {excel_path}")
+        generate_workbook(excel_path, args.sheets, args.columns)
+
+        pandas_time, pandas_results = parse_all(excel_path, 'pandas')
+        stream_time, stream_results = parse_all(excel_path, 'openpyxl')
+        parallel_time, parallel_results = parse_all(excel_path, 'openpyxl', jobs=args.jobs)
+
+    print(f"  pandas            : {pandas_time:7.2f}s")
+    print(f"  openpyxl          : {stream_time:7.2f}s  (x{pandas_time / stream_time:.1f})")
+    print(f"  openpyxl --jobs {args.jobs}: {parallel_time:7.2f}s  (x{pandas_time / parallel_time:.1f})")
+
+    mismatches = [sheet for sheet in pandas_results
+                  if not (pandas_results[sheet] == stream_results.get(sheet) == parallel_results.get(sheet))]
+    print(f"  結果の不一致: {len(mismatches)}シート {mismatches[:5]}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+yaml_io.py のC実装（libyaml）と純Python実装の速度比較
+
+Input: schema/tables/renamed/*.yaml（既定）と dictionary/rename_dictionary.yaml
+Output: 読み込み・書き出しそれぞれの所要時間と速度比（標準出力）
+
+Usage: python bench_yaml_io.py [--repeat N] [path ...]
+
+C実装と純Python実装の出力（セクション区切り付きYAML）がバイト単位で
+一致することも合わせて確認する。
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+import yaml_io
+
+
+def _time_it(func, repeat):
+    """funcをrepeat回実行し、最短時間を返す"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_files(label, texts, repeat, render=yaml_io.render_table_yaml):
+    """テキスト群の読み込み・書き出し時間を両実装で計測"""
+    load_py = _time_it(lambda: [yaml_io.load_yaml_text(t, loader=yaml.SafeLoader) for t in texts], repeat)
+    load_c = _time_it(lambda: [yaml_io.load_yaml_text(t, loader=yaml_io.SafeLoader) for t in texts], repeat)
+
+    docs = [yaml_io.load_yaml_text(t) for t in texts]
+    dump_py = _time_it(lambda: [render(d, dumper=yaml.SafeDumper) for d in docs], repeat)
+    dump_c = _time_it(lambda: [render(d, dumper=yaml_io.SafeDumper) for d in docs], repeat)
+
+    mismatches = sum(1 for d in docs
+                     if render(d, dumper=yaml.SafeDumper)
+                     != render(d, dumper=yaml_io.SafeDumper))
+
+    print(f"\n[{label}] {len(texts)}ファイル / {sum(len(t) for t in texts):,}文字")
+    print(f"  load: python {load_py * 1000:8.1f}ms / libyaml {load_c * 1000:8.1f}ms"
+          f"  (x{load_py / load_c:.1f})")
+    print(f"  dump: python {dump_py * 1000:8.1f}ms / libyaml {dump_c * 1000:8.1f}ms"
+          f"  (x{dump_py / dump_c:.1f})")
+    print(f"  出力の不一致: {mismatches}件")
+    return mismatches
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='yaml_io.py のlibyaml高速化の計測')
+    parser.add_argument('paths', nargs='*', default=[project_root / 'schema/tables/renamed'],
+                        help='計測対象のYAMLファイルまたはディレクトリ')
+    parser.add_argument('--repeat', type=int, default=5, help='各計測の繰り返し回数（最短値を採用）')
+    args = parser.parse_args()
+
+    if not yaml_io.HAS_LIBYAML:
+        print("Error: このPyYAMLはlibyamlなしでビルドされています（比較対象がありません）")
+        sys.exit(1)
+
+    files = []
+    for path in map(Path, args.paths):
+        files.extend(sorted(path.glob('*.yaml')) if path.is_dir() else [path])
+    texts = [f.read_text(encoding='utf-8') for f in files]
+
+    mismatches = bench_files('テーブル定義', texts, args.repeat)
+
+    rename_dict_path = project_root / 'dictionary/rename_dictionary.yaml'
+    if rename_dict_path.exists():
+        mismatches += bench_files('rename_dictionary.yaml',
+                                  [rename_dict_path.read_text(encoding='utf-8')], args.repeat,
+                                  render=lambda d, dumper: yaml_io.dump_yaml(d, dumper=dumper))
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
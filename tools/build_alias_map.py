@@ -1,2 +1,250 @@
 #!/usr/bin/env python3
-print('build_alias_map.py (stub)')
+"""
+命名辞書から識別子の置換候補（alias map）を作るスクリプト
+
+Input: schema/tables/**/*.yaml（既定。ファイル/ディレクトリを複数指定可）
+Dictionary: dictionary/naming_dictionary_v0.2.1.yaml
+  - synonyms.en           → canonical.en に置換（例: medical_equipment → medical_device）
+  - migration.rename_tokens → to に置換（例: medical_entity → medical_device）
+  - forbidden             → 置換はせず要確認としてフラグ（例: device, type）
+Output: schema/derived/alias_map/YYYY-MM-DD/alias_map.csv
+        schema/derived/alias_map/YYYY-MM-DD/alias_report.json
+
+Usage: python build_alias_map.py [--output-dir DIR] [path ...]
+
+辞書の語句をトークン単位のトライ木にまとめ、識別子ごとに1回の走査で
+最長一致の置換を行う。正規語（canonical）も恒等置換としてトライ木に入れるため、
+medical_device_classification の中の device が禁止語として拾われることはない。
+CSVは識別子を処理するたびに1行ずつ書き出す。
+"""
+
+import argparse
+import csv
+import json
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from yaml_io import load_yaml
+
+
+# トライ木の終端に置く値のキー
+_LEAF = None
+
+_IDENTIFIER_RE = re.compile(r'[A-Za-z0-9_]+')
+
+
+def _identifier_tokens(phrase):
+    """語句をトークン列にする（識別子として使えない語句はNone）"""
+    phrase = str(phrase)
+    if not _IDENTIFIER_RE.fullmatch(phrase):
+        return None
+    return tuple(phrase.lower().split('_'))
+
+
+def _insert(trie, tokens, entry):
+    """トライ木に語句を登録（先に登録されたものを優先）"""
+    node = trie
+    for token in tokens:
+        node = node.setdefault(token, {})
+    node.setdefault(_LEAF, entry)
+
+
+def build_alias_trie(naming_dict):
+    """
+    命名辞書からトークン単位のトライ木を作る
+    終端の値: {'kind': canonical|synonym|rename_token|forbidden, 'to': 置換後トークン列, 'term': term id}
+    """
+    trie = {}
+
+    # 置換ルール → 正規語（恒等）→ 禁止語 の順に登録し、同じ語句では前者を優先する
+    entries = {'rename_token': [], 'synonym': [], 'canonical': [], 'forbidden': []}
+    for term in (naming_dict or {}).get('terms', []):
+        term_id = term.get('id', '')
+        canonical = _identifier_tokens((term.get('canonical') or {}).get('en', ''))
+
+        for rule in (term.get('migration') or {}).get('rename_tokens') or []:
+            source, target = _identifier_tokens(rule['from']), _identifier_tokens(rule['to'])
+            if source and target:
+                entries['rename_token'].append((source, target, term_id))
+
+        synonyms = term.get('synonyms') or {}
+        if canonical and isinstance(synonyms, dict):
+            for synonym in synonyms.get('en') or []:
+                source = _identifier_tokens(synonym)
+                if source and source != canonical:
+                    entries['synonym'].append((source, canonical, term_id))
+
+        if canonical:
+            entries['canonical'].append((canonical, canonical, term_id))
+
+        forbidden = term.get('forbidden') or []
+        if isinstance(forbidden, dict):
+            forbidden = [token for tokens in forbidden.values() for token in tokens]
+        for token in forbidden:
+            source = _identifier_tokens(token)
+            if source:
+                entries['forbidden'].append((source, source, term_id))
+
+    for kind, items in entries.items():
+        for source, target, term_id in items:
+            _insert(trie, source, {'kind': kind, 'to': target, 'term': term_id})
+
+    return trie
+
+
+def rewrite_identifier(identifier, trie):
+    """
+    識別子をトライ木で最長一致置換する（識別子ごとに先頭から1回走査）
+    返り値: (新しい識別子, 適用したルールのリスト)
+    """
+    # スキーマ修飾（core.xxx）はテーブル部分のみを対象とする
+    schema, dot, name = str(identifier).rpartition('.')
+    tokens = name.split('_')
+    lowered = [token.lower() for token in tokens]
+
+    result = []
+    applied = []
+    i = 0
+    while i < len(tokens):
+        node = trie
+        match_end = None
+        match = None
+        j = i
+        while j < len(tokens) and lowered[j] in node:
+            node = node[lowered[j]]
+            j += 1
+            if _LEAF in node:
+                match_end, match = j, node[_LEAF]
+
+        if match is None:
+            result.append(tokens[i])
+            i += 1
+            continue
+
+        source = '_'.join(tokens[i:match_end])
+        if match['kind'] in ('synonym', 'rename_token'):
+            result.extend(match['to'])
+            applied.append({'kind': match['kind'], 'from': source,
+                            'to': '_'.join(match['to']), 'term': match['term']})
+        else:
+            result.extend(tokens[i:match_end])
+            if match['kind'] == 'forbidden':
+                applied.append({'kind': 'forbidden', 'from': source, 'to': '', 'term': match['term']})
+        i = match_end
+
+    return schema + dot + '_'.join(result), applied
+
+
+def iter_table_files(paths):
+    """対象パスからYAMLファイルを列挙"""
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(path.rglob('*.yaml'))
+        elif path.suffix == '.yaml' and path.exists():
+            yield path
+
+
+def iter_identifiers(yaml_files):
+    """(ファイル, テーブル名, カラム名 or None) を順に返す"""
+    for yaml_file in yaml_files:
+        yaml_data = load_yaml(yaml_file)
+        if not isinstance(yaml_data, dict) or 'table_name' not in yaml_data:
+            continue
+        table_name = str(yaml_data['table_name'])
+        yield yaml_file, table_name, None
+        for col in yaml_data.get('columns') or []:
+            if isinstance(col, dict) and col.get('name'):
+                yield yaml_file, table_name, str(col['name'])
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='命名辞書による置換候補（alias map）の作成')
+    parser.add_argument('paths', nargs='*', default=[project_root / 'schema/tables'],
+                        help='対象のYAMLファイルまたはディレクトリ（既定: schema/tables）')
+    parser.add_argument('--dictionary', default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='命名辞書ファイル')
+    parser.add_argument('--output-dir', type=Path,
+                        default=project_root / 'schema/derived/alias_map' / datetime.now().strftime('%Y-%m-%d'),
+                        help='出力先（既定: schema/derived/alias_map/YYYY-MM-DD）')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('build_alias_map', args)
+
+    trie = build_alias_trie(load_yaml(args.dictionary))
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = args.output_dir / 'alias_map.csv'
+    report_path = args.output_dir / 'alias_report.json'
+
+    started = time.perf_counter()
+    stats = Counter()
+    rule_counts = Counter()
+    files = set()
+
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['kind', 'table', 'old', 'new', 'rules', 'flags', 'source_file'])
+
+        for yaml_file, table_name, column_name in iter_identifiers(iter_table_files(args.paths)):
+            files.add(yaml_file)
+            kind = 'table' if column_name is None else 'column'
+            old = table_name if column_name is None else column_name
+            with instrumentation.phase('rewrite'):
+                new, applied = rewrite_identifier(old, trie)
+
+            stats[f'{kind}s'] += 1
+            replaced = [a for a in applied if a['kind'] != 'forbidden']
+            flagged = [a for a in applied if a['kind'] == 'forbidden']
+            for a in applied:
+                rule_counts[f"{a['kind']}:{a['from']}→{a['to']}" if a['to'] else f"{a['kind']}:{a['from']}"] += 1
+
+            if not applied:
+                continue
+
+            stats[f'{kind}s_renamed'] += 1 if new != old else 0
+            stats[f'{kind}s_flagged'] += 1 if flagged else 0
+            writer.writerow([
+                kind, table_name, old, new,
+                ';'.join(f"{a['from']}→{a['to']} ({a['term']})" for a in replaced),
+                ';'.join(f"{a['from']} ({a['term']})" for a in flagged),
+                str(yaml_file),
+            ])
+
+    elapsed = time.perf_counter() - started
+    identifiers = stats['tables'] + stats['columns']
+
+    report = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'dictionary': str(args.dictionary),
+        'files': len(files),
+        'identifiers': identifiers,
+        'tables': stats['tables'],
+        'columns': stats['columns'],
+        'tables_renamed': stats['tables_renamed'],
+        'columns_renamed': stats['columns_renamed'],
+        'tables_flagged': stats['tables_flagged'],
+        'columns_flagged': stats['columns_flagged'],
+        'rules': dict(rule_counts.most_common()),
+        'elapsed_seconds': round(elapsed, 3),
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"alias map作成: {len(files)}ファイル / {identifiers}識別子 ({elapsed:.3f}s)")
+    print(f"  置換: テーブル {stats['tables_renamed']} / カラム {stats['columns_renamed']}")
+    print(f"  要確認（禁止語）: テーブル {stats['tables_flagged']} / カラム {stats['columns_flagged']}")
+    print(f"CSV: {csv_path}")
+    print(f"レポート: {report_path}")
+    session.finish(extra={'identifiers': identifiers})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+稼働中のDBのカタログを読み込み、命名規約のチェックとリネーム案の作成を行うスクリプト
+
+Input: SQLiteのDBファイル（--sqlite）または PostgreSQL の接続文字列（--postgresql）
+Rules: lint/lint_config.yaml, dictionary/naming_dictionary_v0.2.1.yaml（lint_names.py と同じ）
+Dictionary: dictionary/rename_dictionary.yaml
+Output: schema/derived/catalog/YYYY-MM-DD/catalog_report.json   違反・リネーム案の一覧
+        schema/derived/catalog/YYYY-MM-DD/proposed_renames.csv  リネーム案（kind, table, old, new）
+        schema/tables/YYYY-MM-DD/<table>.yaml                   --dump 指定時（--renamed で変換後の定義）
+
+Usage: python catalog_introspect.py --sqlite DB_PATH [--dump [DIR]] [--renamed]
+       python catalog_introspect.py --postgresql DSN [--schemas public,core] [--dump [DIR]] [--renamed]
+  PostgreSQL には psycopg（または psycopg2）が必要（requirements.txt には含めていない）。
+
+カタログはテーブル一覧とカラム一覧の2回のクエリでまとめて読み込み、テーブルごとの問い合わせはしない。
+読み込んだ結果は xlsx_to_yaml.py の出力と同じ構造のテーブル定義（dict）にして、
+lint_names.lint_table でチェックし、yaml_rename.process_table_data でリネーム案を作る
+（yaml_rename.py と同じく、変換辞書で決まらない名前には命名辞書の migration ルールを適用する）。
+スキーマが --default-schema（既定: public）以外のテーブルは schema.table の名前で扱う。
+"""
+
+import argparse
+import copy
+import csv
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from lint_names import lint_table, load_rules
+from rename_rules import load_rename_rules
+from yaml_io import write_table_yaml
+from yaml_rename import load_rename_dictionary, process_table_data
+
+
+SQLITE_TABLES_QUERY = """
+SELECT name FROM sqlite_master
+WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+ORDER BY name
+"""
+
+SQLITE_COLUMNS_QUERY = """
+SELECT m.name, p.cid, p.name, p.type, p."notnull", p.pk
+FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p
+WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+ORDER BY m.name, p.cid
+"""
+
+POSTGRESQL_TABLES_QUERY = """
+SELECT n.nspname, c.relname, obj_description(c.oid, 'pg_class')
+FROM pg_class AS c JOIN pg_namespace AS n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'
+ORDER BY n.nspname, c.relname
+"""
+
+POSTGRESQL_COLUMNS_QUERY = """
+SELECT n.nspname, c.relname, a.attnum, a.attname, format_type(a.atttypid, a.atttypmod),
+       a.attnotnull, col_description(c.oid, a.attnum),
+       EXISTS (SELECT 1 FROM pg_index AS i
+               WHERE i.indrelid = c.oid AND i.indisprimary AND a.attnum = ANY (i.indkey))
+FROM pg_attribute AS a
+  JOIN pg_class AS c ON c.oid = a.attrelid
+  JOIN pg_namespace AS n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition AND a.attnum > 0 AND NOT a.attisdropped
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'
+ORDER BY n.nspname, c.relname, a.attnum
+"""
+
+
+def read_sqlite_catalog(db_path):
+    """
+    SQLiteのカタログを読み込む（読み取り専用で開く）
+    返り値: (テーブル行 [(スキーマ, テーブル, 説明)],
+             カラム行 [(スキーマ, テーブル, 位置, カラム, 型, NOT NULL, 説明, 主キー)])
+    SQLiteにはスキーマ・コメントがないため、スキーマは None、説明は None になる
+    """
+    connection = sqlite3.connect(f'file:{Path(db_path).resolve()}?mode=ro', uri=True)
+    try:
+        tables = [(None, name, None) for (name,) in connection.execute(SQLITE_TABLES_QUERY)]
+        columns = [(None, table, position, name, data_type, bool(not_null), None, pk > 0)
+                   for table, position, name, data_type, not_null, pk in connection.execute(SQLITE_COLUMNS_QUERY)]
+    finally:
+        connection.close()
+    return tables, columns
+
+
+def _connect_postgresql(dsn):
+    try:
+        import psycopg
+    except ImportError:
+        try:
+            import psycopg2 as psycopg
+        except ImportError:
+            print("Error: PostgreSQLの読み込みには psycopg（または psycopg2）が必要です")
+            sys.exit(1)
+    return psycopg.connect(dsn)
+
+
+def read_postgresql_catalog(dsn, schemas=None):
+    """PostgreSQLのカタログを読み込む（返り値は read_sqlite_catalog と同じ形）"""
+    connection = _connect_postgresql(dsn)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRESQL_TABLES_QUERY)
+            tables = cursor.fetchall()
+            cursor.execute(POSTGRESQL_COLUMNS_QUERY)
+            columns = cursor.fetchall()
+    finally:
+        connection.close()
+
+    if schemas:
+        tables = [row for row in tables if row[0] in schemas]
+        columns = [row for row in columns if row[0] in schemas]
+    return tables, columns
+
+
+def build_table_models(table_rows, column_rows, source, default_schema='public'):
+    """
+    カタログの行をテーブル定義（YAMLと同じ構造のdict）にする
+    返り値: テーブル定義のリスト（テーブル行の順）
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    models = {}
+    for schema, table, description in table_rows:
+        table_name = table if schema in (None, default_schema) else f'{schema}.{table}'
+        models[(schema, table)] = {
+            'metadata': {
+                'description': 'テーブル定義書',
+                'author': 'catalog_introspect',
+                'history': [
+                    {
+                        'version': '1.0.0',
+                        'date': today,
+                        'author': 'catalog_introspect',
+                        'comment': f'DBカタログ（{source}）から作成'
+                    }
+                ]
+            },
+            'table_name': table_name,
+            'description': description or '',
+            'columns': [],
+        }
+
+    for schema, table, _, name, data_type, not_null, description, primary_key in column_rows:
+        model = models.get((schema, table))
+        if model is None:
+            continue
+        model['columns'].append({
+            'name': name,
+            'description': description or '',
+            'data_type': (data_type or '').lower(),
+            'primary_key': bool(primary_key),
+            'nullable': not not_null and not primary_key,
+            'comment': None,
+        })
+
+    return list(models.values())
+
+
+def propose_renames(model, renamed):
+    """変換前後のテーブル定義からリネーム案の行を作る"""
+    rows = []
+    if model['table_name'] != renamed['table_name']:
+        rows.append(('table', model['table_name'], model['table_name'], renamed['table_name']))
+    for before, after in zip(model['columns'], renamed['columns']):
+        if before['name'] != after['name']:
+            rows.append(('column', model['table_name'], before['name'], after['name']))
+    return rows
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    parser = argparse.ArgumentParser(description='DBカタログの命名規約チェックとリネーム案の作成')
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument('--sqlite', type=Path, metavar='DB_PATH', help='SQLiteのDBファイル')
+    backend.add_argument('--postgresql', metavar='DSN', help='PostgreSQLの接続文字列')
+    parser.add_argument('--schemas', help='対象スキーマ（カンマ区切り。PostgreSQLのみ。既定: すべて）')
+    parser.add_argument('--default-schema', default='public', help='テーブル名にスキーマを付けないスキーマ')
+    parser.add_argument('--config', default=project_root / 'lint/lint_config.yaml', help='lint設定ファイル')
+    parser.add_argument('--naming-dictionary', default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='命名辞書ファイル')
+    parser.add_argument('--dictionary', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書ファイル')
+    parser.add_argument('--output-dir', type=Path, default=project_root / 'schema/derived/catalog' / today,
+                        help='レポートの出力先（既定: schema/derived/catalog/YYYY-MM-DD）')
+    parser.add_argument('--dump', nargs='?', type=Path, const=project_root / 'schema/tables' / today,
+                        metavar='DIR', help='テーブル定義YAMLを書き出す（既定: schema/tables/YYYY-MM-DD）')
+    parser.add_argument('--renamed', action='store_true', help='--dump で変換辞書を適用した定義を書き出す')
+    parser.add_argument('--no-migration-rules', action='store_true', help='命名辞書の migration ルールを適用しない')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('catalog_introspect', args)
+
+    started = time.perf_counter()
+    with instrumentation.phase('catalog'):
+        if args.sqlite:
+            if not args.sqlite.exists():
+                print(f"Error: {args.sqlite} が見つかりません")
+                sys.exit(1)
+            source = f'sqlite:{args.sqlite.name}'
+            table_rows, column_rows = read_sqlite_catalog(args.sqlite)
+        else:
+            source = 'postgresql'
+            schemas = set(args.schemas.split(',')) if args.schemas else None
+            table_rows, column_rows = read_postgresql_catalog(args.postgresql, schemas)
+        models = build_table_models(table_rows, column_rows, source, args.default_schema)
+    print(f"カタログ: {source} / テーブル {len(table_rows)} / カラム {len(column_rows)}"
+          f" ({time.perf_counter() - started:.3f}s)")
+
+    with instrumentation.phase('load_rules'):
+        rules = load_rules(args.config, args.naming_dictionary)
+        rename_rules = None if args.no_migration_rules else load_rename_rules(args.naming_dictionary)
+    with instrumentation.phase('load_dictionary'):
+        rename_dict = load_rename_dictionary(args.dictionary)
+
+    violations = []
+    remaining = []
+    proposals = []
+    renamed_models = []
+    for model in models:
+        with instrumentation.phase('lint'):
+            violations.extend(lint_table(model, rules))
+        with instrumentation.phase('rename'):
+            renamed, _, _, _ = process_table_data(copy.deepcopy(model), rename_dict, source, rename_rules)
+        renamed_models.append(renamed)
+        proposals.extend(propose_renames(model, renamed))
+        with instrumentation.phase('lint'):
+            remaining.extend(lint_table(renamed, rules))
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    with open(args.output_dir / 'proposed_renames.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['kind', 'table', 'old', 'new'])
+        writer.writerows(proposals)
+
+    report = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'source': source,
+        'tables': len(table_rows),
+        'columns': len(column_rows),
+        'violations': violations,
+        'proposed_renames': len(proposals),
+        'violations_after_rename': remaining,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(args.output_dir / 'catalog_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.dump:
+        for model in (renamed_models if args.renamed else models):
+            write_table_yaml(model, args.dump / f"{model['table_name']}.yaml")
+
+    for violation in violations:
+        target = violation['table'] if violation['column'] is None else f"{violation['table']}.{violation['column']}"
+        print(f"{source}: {target}: [{violation['rule']}] {violation['message']}")
+
+    print(f"\n=== カタログのチェック結果 ===")
+    print(f"違反: {len(violations)}件 / リネーム案: {len(proposals)}件 / 変換後も残る違反: {len(remaining)}件")
+    print(f"レポート: {args.output_dir / 'catalog_report.json'}")
+    print(f"リネーム案: {args.output_dir / 'proposed_renames.csv'}")
+    if args.dump:
+        print(f"テーブル定義: {args.dump}（{'変換後' if args.renamed else 'カタログのまま'} {len(models)}件）")
+
+    session.finish(extra={'tables': len(table_rows), 'violations': len(violations)})
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,479 @@
 #!/usr/bin/env python3
-print('dictionary_flat.py (stub)')
+"""
+辞書ファイルをフラットなスナップショットにコンパイルするスクリプト
+
+Input: dictionary/rename_dictionary.yaml
+       dictionary/naming_dictionary_v0.2.1.yaml
+       dictionary/product_fields_dictionary_v0.2.1.yaml
+Output: schema/derived/dictionary_flat/dictionary_flat.bin（mmapで読む変換辞書のバイナリスナップショット）
+        schema/derived/dictionary_flat/dictionary_flat.csv（人間レビュー用の一覧: 語と変換ルールのすべて）
+
+Usage: python dictionary_flat.py [--output-dir DIR] [--check]
+  --check: スナップショットが rename_dictionary.yaml に対して最新かどうかだけを確認する
+
+スナップショットは文字列表（重複を除いた文字列）とハッシュ索引で構成する。
+- tables:        旧テーブル名 → 新テーブル名
+- columns:       旧テーブル名 + 旧カラム名 → 新カラム名
+- column_tables: カラム定義を持つ旧テーブル名の一覧
+読み込み時はファイルをmmapしてその場で索引を引くため、YAMLの解析は発生しない。
+rename_dictionary.yaml のサイズ・更新時刻が作成時と異なる場合は「古い」と判定し、
+yaml_rename.py はYAMLからの読み込みに戻る。
+命名辞書・商品項目辞書は小さく、lint_names.py などは禁止語・正規語・migration ルールを
+辞書の構造のまま使うため、スナップショットには入れずYAMLから読む（CSVには含める）。
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+
+import instrumentation
+from yaml_io import load_yaml
+
+
+SNAPSHOT_MAGIC = b'SNDF'
+# 形式を変えたら上げる（古い形式のスナップショットは読み込まない）
+SNAPSHOT_VERSION = 2
+
+_HEADER = struct.Struct('<4sII')        # magic, version, メタ情報(JSON)の長さ
+_U32 = struct.Struct('<I')
+_SLOT = struct.Struct('<III')           # key hash, key string id, value string id
+_EMPTY = 0xFFFFFFFF
+
+# 列区切り（カラム索引のキーに使う）
+KEY_SEPARATOR = '\x1f'
+
+INDEX_NAMES = ('tables', 'columns', 'column_tables')
+
+
+def default_paths(project_root):
+    """既定の辞書ファイルとスナップショットの場所"""
+    return {
+        'rename': project_root / 'dictionary/rename_dictionary.yaml',
+        'naming': project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+        'product_fields': project_root / 'dictionary/product_fields_dictionary_v0.2.1.yaml',
+        'output_dir': project_root / 'schema/derived/dictionary_flat',
+    }
+
+
+def _key_hash(key):
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def source_stamp(path):
+    """辞書ファイルの鮮度判定用の情報（サイズと更新時刻）"""
+    stat = os.stat(path)
+    return {'path': str(Path(path).resolve()), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _as_list(value):
+    """forbidden / synonyms の list・dict どちらの書き方も平らなリストにする"""
+    if isinstance(value, dict):
+        return [item for items in value.values() for item in (items or [])]
+    return list(value or [])
+
+
+def iter_term_entries(naming_dict, product_fields_dict):
+    """
+    命名辞書・商品項目辞書の語を列挙する
+    返り値: (語, 種別, 正規語, term id) のイテレータ
+    """
+    product_fields_dict = product_fields_dict or {}
+    terms = [(term, 'naming') for term in (naming_dict or {}).get('terms', [])]
+    terms += [(term, 'product_fields') for section in ('entities', 'fields')
+              for term in product_fields_dict.get(section) or []]
+
+    for term, _ in terms:
+        term_id = term.get('id', '')
+        canonical = str((term.get('canonical') or {}).get('en', ''))
+        synonyms = term.get('synonyms') or {}
+
+        if canonical:
+            yield canonical, 'canonical', canonical, term_id
+        for synonym in (synonyms.get('en') or []) if isinstance(synonyms, dict) else _as_list(synonyms):
+            yield str(synonym), 'synonym', canonical, term_id
+        for token in _as_list(term.get('forbidden')):
+            yield str(token), 'forbidden', canonical, term_id
+        for rule in (term.get('migration') or {}).get('rename_tokens') or []:
+            yield str(rule['from']), 'rename_token', str(rule['to']), term_id
+
+    for token in _as_list(product_fields_dict.get('forbidden')):
+        yield str(token), 'forbidden', '', 'PRODUCT_FIELDS'
+
+
+class _StringTable:
+    """文字列を重複なく登録して番号を振る"""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def _build_index(entries, strings):
+    """(key, value) のリストからオープンアドレス法のハッシュ表（バイト列）を作る"""
+    capacity = 8
+    while capacity < len(entries) * 2:
+        capacity *= 2
+
+    slots = [None] * capacity
+    mask = capacity - 1
+    for key, value in entries:
+        key_hash = _key_hash(key)
+        slot = key_hash & mask
+        while slots[slot] is not None:
+            if strings.strings[slots[slot][1]] == key:
+                break  # 同じキーは先勝ち
+            slot = (slot + 1) & mask
+        else:
+            slots[slot] = (key_hash, strings.intern(key), strings.intern(value))
+
+    return b''.join(_SLOT.pack(*(s or (0, _EMPTY, _EMPTY))) for s in slots), capacity
+
+
+def compile_snapshot(rename_dict, sources):
+    """変換辞書の内容をスナップショットのバイト列にする"""
+    strings = _StringTable()
+    index_entries = {name: [] for name in INDEX_NAMES}
+
+    for table_name, info in ((rename_dict or {}).get('tables') or {}).items():
+        if isinstance(info, dict) and info.get('new') is not None:
+            index_entries['tables'].append((str(table_name), str(info['new'])))
+
+    for table_name, table_columns in ((rename_dict or {}).get('columns') or {}).items():
+        index_entries['column_tables'].append((str(table_name), str(table_name)))
+        for column_name, info in (table_columns or {}).items():
+            if isinstance(info, dict) and info.get('new') is not None:
+                index_entries['columns'].append(
+                    (f'{table_name}{KEY_SEPARATOR}{column_name}', str(info['new'])))
+
+    # 索引を先に組み立てて文字列表を確定させる
+    index_blobs = {}
+    indexes_meta = {}
+    for name in INDEX_NAMES:
+        blob, capacity = _build_index(index_entries[name], strings)
+        index_blobs[name] = blob
+        indexes_meta[name] = {'capacity': capacity, 'count': len(index_entries[name])}
+
+    encoded = [s.encode('utf-8') for s in strings.strings]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    string_offsets = b''.join(_U32.pack(o) for o in offsets)
+    string_blob = b''.join(encoded)
+
+    # メタ情報の長さが決まらないとオフセットが決まらないため、相対オフセットで記録する
+    sections = [('string_offsets', string_offsets), ('string_blob', string_blob)]
+    sections += [(f'index:{name}', index_blobs[name]) for name in INDEX_NAMES]
+
+    layout = {}
+    position = 0
+    for name, blob in sections:
+        layout[name] = position
+        position += len(blob)
+
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'sources': sources,
+        'rename_version': (rename_dict or {}).get('version'),
+        'string_count': len(strings.strings),
+        'layout': layout,
+        'indexes': indexes_meta,
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(meta_bytes))
+    return header + meta_bytes + b''.join(blob for _, blob in sections)
+
+
+def build_snapshot(rename_path, output_path, rename_dict=None):
+    """rename_dictionary.yaml を読み込んでスナップショットを書き出す"""
+    sources = {'rename': source_stamp(rename_path)}
+    if rename_dict is None:
+        rename_dict = load_yaml(rename_path)
+    data = compile_snapshot(rename_dict, sources)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f'{output_path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+    return len(data)
+
+
+class FlatDictionary:
+    """mmapしたスナップショットの索引を引く"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, meta_length = _HEADER.unpack_from(self._buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.path} は対応していないスナップショット形式です")
+
+        self.meta = json.loads(self._buffer[_HEADER.size:_HEADER.size + meta_length].decode('utf-8'))
+        base = _HEADER.size + meta_length
+        layout = self.meta['layout']
+        self._string_offsets = base + layout['string_offsets']
+        self._string_blob = base + layout['string_blob']
+        self._indexes = {name: (base + layout[f'index:{name}'], info['capacity'], info['count'])
+                         for name, info in self.meta['indexes'].items()}
+
+    def __reduce__(self):
+        # mmapはpickleできないため、ワーカー側では同じファイルを開き直す
+        return (FlatDictionary, (self.path,))
+
+    def close(self):
+        self._buffer.close()
+
+    def is_fresh(self, **paths):
+        """辞書ファイルがスナップショット作成時から変わっていないか"""
+        sources = self.meta['sources']
+        for name, path in paths.items():
+            recorded = sources.get(name)
+            try:
+                current = source_stamp(path)
+            except OSError:
+                return False
+            if recorded != current:
+                return False
+        return True
+
+    def string(self, string_id):
+        """文字列表から1件取り出す"""
+        start, end = struct.unpack_from('<II', self._buffer, self._string_offsets + string_id * 4)
+        return self._buffer[self._string_blob + start:self._string_blob + end].decode('utf-8')
+
+    def lookup(self, index_name, key):
+        """索引を引く（見つからなければNone）"""
+        offset, capacity, _ = self._indexes[index_name]
+        key_hash = _key_hash(key)
+        mask = capacity - 1
+        slot = key_hash & mask
+        while True:
+            slot_hash, key_id, value_id = _SLOT.unpack_from(self._buffer, offset + slot * _SLOT.size)
+            if key_id == _EMPTY:
+                return None
+            if slot_hash == key_hash and self.string(key_id) == key:
+                return self.string(value_id)
+            slot = (slot + 1) & mask
+
+    def iter_keys(self, index_name):
+        """索引のキーを列挙（格納順ではない）"""
+        offset, capacity, _ = self._indexes[index_name]
+        for slot in range(capacity):
+            _, key_id, _ = _SLOT.unpack_from(self._buffer, offset + slot * _SLOT.size)
+            if key_id != _EMPTY:
+                yield self.string(key_id)
+
+    def count(self, index_name):
+        return self._indexes[index_name][2]
+
+    def table_new(self, table_name):
+        return self.lookup('tables', table_name)
+
+    def column_new(self, table_name, column_name):
+        return self.lookup('columns', f'{table_name}{KEY_SEPARATOR}{column_name}')
+
+    def as_rename_dict(self):
+        """yaml_rename.rename_table_name / rename_column_name にそのまま渡せる形にする"""
+        return {'tables': _TablesView(self), 'columns': _ColumnsView(self)}
+
+
+class _TablesView(Mapping):
+    """rename_dict['tables'] 相当（値は {'new': ...}）"""
+
+    def __init__(self, flat):
+        self.flat = flat
+
+    def __getitem__(self, table_name):
+        new_name = self.flat.table_new(table_name)
+        if new_name is None:
+            raise KeyError(table_name)
+        return {'new': new_name}
+
+    def __contains__(self, table_name):
+        return self.flat.table_new(table_name) is not None
+
+    def __iter__(self):
+        return self.flat.iter_keys('tables')
+
+    def __len__(self):
+        return self.flat.count('tables')
+
+
+class _ColumnsView(Mapping):
+    """rename_dict['columns'] 相当（値はテーブルごとのカラムビュー）"""
+
+    def __init__(self, flat):
+        self.flat = flat
+
+    def __getitem__(self, table_name):
+        if self.flat.lookup('column_tables', table_name) is None:
+            raise KeyError(table_name)
+        return _TableColumnsView(self.flat, table_name)
+
+    def __contains__(self, table_name):
+        return self.flat.lookup('column_tables', table_name) is not None
+
+    def __iter__(self):
+        return self.flat.iter_keys('column_tables')
+
+    def __len__(self):
+        return self.flat.count('column_tables')
+
+
+class _TableColumnsView(Mapping):
+    """rename_dict['columns'][table] 相当（値は {'new': ...}）"""
+
+    def __init__(self, flat, table_name):
+        self.flat = flat
+        self.table_name = table_name
+
+    def __getitem__(self, column_name):
+        new_name = self.flat.column_new(self.table_name, column_name)
+        if new_name is None:
+            raise KeyError(column_name)
+        return {'new': new_name}
+
+    def __contains__(self, column_name):
+        return self.flat.column_new(self.table_name, column_name) is not None
+
+    def __iter__(self):
+        prefix = f'{self.table_name}{KEY_SEPARATOR}'
+        return (key[len(prefix):] for key in self.flat.iter_keys('columns') if key.startswith(prefix))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def load_fresh_snapshot(snapshot_path, **paths):
+    """スナップショットが存在し、指定した辞書ファイルに対して最新ならそれを返す（それ以外はNone）"""
+    try:
+        flat = FlatDictionary(snapshot_path)
+    except (OSError, ValueError):
+        return None
+    if not flat.is_fresh(**paths):
+        flat.close()
+        return None
+    return flat
+
+
+def _csv_value(value):
+    return '' if value is None else str(value)
+
+
+def export_csv(rename_dict, naming_dict, product_fields_dict, csv_path):
+    """
+    語と変換ルールの一覧をCSVに書き出す
+    命名辞書・商品項目辞書の語（source が naming / product_fields.*）と、
+    変換辞書のテーブル・カラムの変換ルール（source が rename.tables / rename.columns）を同じ列で並べる
+    """
+    product_fields_dict = product_fields_dict or {}
+    rename_dict = rename_dict or {}
+    rows = []
+    sections = [('naming', (naming_dict or {}).get('terms', []))]
+    sections += [(f'product_fields.{section}', product_fields_dict.get(section) or [])
+                 for section in ('entities', 'fields')]
+
+    for source, terms in sections:
+        for term in terms:
+            canonical = term.get('canonical') or {}
+            synonyms = term.get('synonyms') or {}
+            notes = term.get('notes') or {}
+            rows.append([
+                source,
+                term.get('id', ''),
+                term.get('kind', ''),
+                canonical.get('en', ''),
+                canonical.get('ja', ''),
+                ';'.join(map(str, synonyms.get('en') or [])) if isinstance(synonyms, dict) else '',
+                ';'.join(map(str, synonyms.get('ja') or [])) if isinstance(synonyms, dict) else '',
+                ';'.join(map(str, _as_list(term.get('forbidden')))),
+                ';'.join(f"{rule['from']}→{rule['to']}"
+                         for rule in (term.get('migration') or {}).get('rename_tokens') or []),
+                '', '', '',
+                (notes.get('ja') or notes.get('en') or '') if isinstance(notes, dict) else str(notes),
+            ])
+
+    forbidden = _as_list(product_fields_dict.get('forbidden'))
+    if forbidden:
+        rows.append(['product_fields', 'PRODUCT_FIELDS', 'forbidden', '', '', '', '',
+                     ';'.join(map(str, forbidden)), '', '', '', '', ''])
+
+    # 変換ルール（table / column に旧名、new に新名）
+    for table_name, info in (rename_dict.get('tables') or {}).items():
+        info = info if isinstance(info, dict) else {}
+        rows.append(['rename.tables', '', 'table', '', '', '', '', '', '',
+                     table_name, '', _csv_value(info.get('new')), _csv_value(info.get('description'))])
+    for table_name, table_columns in (rename_dict.get('columns') or {}).items():
+        for column_name, info in (table_columns or {}).items():
+            info = info if isinstance(info, dict) else {}
+            rows.append(['rename.columns', '', 'column', '', '', '', '', '', '',
+                         table_name, column_name, _csv_value(info.get('new')), _csv_value(info.get('description'))])
+
+    Path(csv_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['source', 'id', 'kind', 'canonical_en', 'canonical_ja', 'synonyms_en',
+                         'synonyms_ja', 'forbidden', 'rename_tokens', 'table', 'column', 'new', 'notes'])
+        writer.writerows(rows)
+    return len(rows)
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+    paths = default_paths(project_root)
+
+    parser = argparse.ArgumentParser(description='辞書ファイルのフラットなスナップショットを作成')
+    parser.add_argument('--output-dir', type=Path, default=paths['output_dir'],
+                        help='出力先（既定: schema/derived/dictionary_flat）')
+    parser.add_argument('--check', action='store_true', help='スナップショットが最新かどうかだけを確認')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('dictionary_flat', args)
+
+    snapshot_path = args.output_dir / 'dictionary_flat.bin'
+    csv_path = args.output_dir / 'dictionary_flat.csv'
+    if args.check:
+        flat = load_fresh_snapshot(snapshot_path, rename=paths['rename'])
+        if flat is None:
+            print(f"スナップショットは古いか存在しません: {snapshot_path}")
+            sys.exit(1)
+        print(f"スナップショットは最新です: {snapshot_path}")
+        return
+
+    with instrumentation.phase('load'):
+        rename_dict = load_yaml(paths['rename'])
+    with instrumentation.phase('compile'):
+        size = build_snapshot(paths['rename'], snapshot_path, rename_dict)
+    with instrumentation.phase('export_csv'):
+        row_count = export_csv(rename_dict, load_yaml(paths['naming']), load_yaml(paths['product_fields']), csv_path)
+
+    flat = FlatDictionary(snapshot_path)
+    print(f"スナップショット: {snapshot_path} ({size:,} bytes)")
+    print(f"  tables: {flat.count('tables')} / columns: {flat.count('columns')}"
+          f" / 文字列: {flat.meta['string_count']}")
+    print(f"CSV: {csv_path} ({row_count}行)")
+    session.finish()
+
+
+if __name__ == '__main__':
+    main()
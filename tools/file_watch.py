@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+ファイルの変更監視（各ツールの --watch 用）
+
+Linux では inotify（ctypes で libc を直接呼ぶ。追加の依存なし）を使い、
+使えない環境（Linux 以外・inotify の上限到達など）ではファイルの更新時刻とサイズを
+一定間隔で比べるポーリングに切り替える。
+エディタの保存は「一時ファイルに書いてから rename」のことが多いため、ファイルではなく
+その親ディレクトリを監視し、ディレクトリ内の変更をパスで絞り込む。
+iter_changes は変更を検知したあと debounce 秒だけ続きの変更を待ち、保存の連続
+（同じファイルへの複数回の書き込み、複数ファイルの一括保存）を1回の変更としてまとめて返す。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _is_excluded(path, exclude):
+    return any(path == excluded or excluded in path.parents for excluded in exclude)
+
+
+def _watch_dirs(paths, exclude=()):
+    """
+    監視するディレクトリ（ディレクトリはサブディレクトリも含め、ファイルは親ディレクトリ）
+    exclude の下のディレクトリは監視しない（監視対象の中に出力先がある場合など）
+    """
+    exclude = [Path(path).resolve() for path in exclude]
+    dirs = []
+    for path in paths:
+        path = Path(path).resolve()
+        if path.is_dir():
+            dirs.append(path)
+            dirs.extend(sorted(p for p in path.rglob('*') if p.is_dir()))
+        else:
+            dirs.append(path.parent)
+    return [directory for directory in dict.fromkeys(dirs) if not _is_excluded(directory, exclude)]
+
+
+class InotifyWatcher:
+    """inotify による監視"""
+
+    kind = 'inotify'
+
+    def __init__(self, paths, exclude=()):
+        self._exclude = list(exclude)
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('inotify が使えません')
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 に失敗しました')
+        self._dirs = {}
+        for directory in _watch_dirs(paths, self._exclude):
+            self._add_watch(directory)
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            self.close()
+            raise OSError(errno, f'inotify_add_watch に失敗しました: {directory}')
+        self._dirs[wd] = Path(directory)
+
+    def wait(self, timeout=None):
+        """変更のあったパスの集合を返す（timeout 秒待っても変更がなければ空）"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                del self._dirs[wd]
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新しいサブディレクトリも監視し、中にすでにあるファイルを変更として返す
+                    subdirectories = _watch_dirs([path], self._exclude)
+                    for subdirectory in subdirectories:
+                        self._add_watch(subdirectory)
+                    changed.update(p for subdirectory in subdirectories for p in subdirectory.iterdir()
+                                   if p.is_file())
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """更新時刻・サイズの比較による監視（inotify が使えない場合）"""
+
+    kind = 'polling'
+
+    def __init__(self, paths, interval=0.5, exclude=()):
+        self.paths = [Path(path).resolve() for path in paths]
+        self.exclude = list(exclude)
+        self.interval = interval
+        self._stamps = self._scan()
+
+    def _scan(self):
+        stamps = {}
+        for directory in _watch_dirs(self.paths, self.exclude):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    stamps[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def wait(self, timeout=None):
+        """変更のあったパスの集合を返す（timeout 秒待っても変更がなければ空）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            stamps = self._scan()
+            changed = {path for path in stamps.keys() | self._stamps.keys()
+                       if stamps.get(path) != self._stamps.get(path)}
+            self._stamps = stamps
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else
+                       max(0.0, min(self.interval, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+def open_watcher(paths, polling=False, poll_interval=0.5, exclude=()):
+    """inotify の監視を作る（使えなければポーリング）。exclude の下は監視しない"""
+    if not polling:
+        try:
+            return InotifyWatcher(paths, exclude)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths, poll_interval, exclude)
+
+
+def iter_changes(watcher, debounce=0.03):
+    """
+    変更のあったパスの集合を、保存の連続をまとめてから返し続ける
+    debounce 秒のあいだ新しい変更がなければ、それまでの変更を1回分として返す
+    """
+    while True:
+        changed = watcher.wait()
+        while True:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            changed |= more
+        yield changed
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用の大規模スキーマを生成するスクリプト
+
+Usage: python gen_synthetic_schema.py [--tables N] [--seed N] [--no-workbook] [--output-dir DIR]
+  例: python gen_synthetic_schema.py --tables 10000
+
+Output: DIR（既定: schema/derived/bench/data/<N>）
+  legacy/*.yaml            旧命名のテーブル定義（tools/config/optiserve と同じ形）
+  renamed/*.yaml           新命名のテーブル定義（schema/tables/renamed と同じ形）
+  rename_dictionary.yaml   legacy → renamed の変換辞書（約8割のテーブルに変換ルール）
+  dbdesign.xlsx            テーブル設計ブック（smds_dbdesign.xlsx と同じレイアウト）
+  dataset.json             生成条件と件数
+
+旧命名は mstequipmentrental00042 / rentalid のような連結名、新命名は
+core.equipment_rental_00042 / rental_id のようなsnake_caseにする。
+同じ --tables / --seed からは常に同じ内容が生成される。
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bench_xlsx_to_yaml import generate_workbook
+from yaml_io import dump_yaml, write_table_yaml
+
+
+# 生成内容を変えたら上げる（bench_tools.py が既存データの再利用可否の判定に使う）
+GENERATOR_VERSION = 1
+
+LEGACY_PREFIXES = ['mst', 'tbl', 'trn', 'raw']
+SCHEMAS = ['core', 'cur', 'raw']
+TABLE_WORDS = [
+    'hospital', 'equipment', 'rental', 'repair', 'maker', 'product', 'user', 'facility',
+    'classification', 'contract', 'invoice', 'stock', 'area', 'city', 'pref', 'order',
+    'shipment', 'inspection', 'lease', 'dealer', 'report', 'upload', 'publication', 'usage',
+]
+COLUMN_WORDS = [
+    'hp', 'me', 'rental', 'repair', 'maker', 'product', 'user', 'dealer', 'contract',
+    'stock', 'order', 'ship', 'inspect', 'lease', 'report', 'area', 'city', 'pref',
+]
+COLUMN_SUFFIXES = [
+    ('code', 'code', 'integer', 'コード'),
+    ('name', 'name', 'text', '名称'),
+    ('seq', 'seq', 'integer', '連番'),
+    ('number', 'number', 'text', '番号'),
+    ('id', 'id', 'text', 'ID'),
+    ('status', 'status', 'integer', '状態'),
+    ('kind', 'type_code', 'integer', '種別'),
+    ('price', 'price', 'numeric(12,2)', '価格'),
+    ('qty', 'quantity', 'integer', '数量'),
+    ('note', 'note', 'text', '備考'),
+    ('date', 'on', 'date', '日付'),
+    ('flg', 'flag', 'boolean', 'フラグ'),
+]
+AUDIT_COLUMNS = [
+    ('regdate', 'created_at', '登録日時'),
+    ('lastupdate', 'updated_at', '更新日時'),
+]
+MAX_COLUMNS = 40
+# 変換ルールを持つテーブルの割合（残りは辞書に載っていない新規テーブル扱い）
+RENAME_RATIO = 0.8
+
+
+def _column_new_name(word, suffix):
+    """新命名のカラム名（date → xxx_on、flg → is_xxx など）"""
+    if suffix == 'on':
+        return f'{word}_on'
+    if suffix == 'flag':
+        return f'is_{word}'
+    return f'{word}_{suffix}'
+
+
+def generate_table(rng, index):
+    """
+    テーブル1件分を生成
+    返り値: (旧定義, 新定義, 変換辞書のtables項目, 変換辞書のcolumns項目)
+    """
+    words = rng.sample(TABLE_WORDS, 2)
+    legacy_table = f'{rng.choice(LEGACY_PREFIXES)}{words[0]}{words[1]}{index:05d}'
+    new_table = f'{rng.choice(SCHEMAS)}.{words[0]}_{words[1]}_{index:05d}'
+    description = f'{words[0]} {words[1]} テーブル{index}'
+
+    legacy_columns = []
+    renamed_columns = []
+    column_rules = {}
+    used = set()
+
+    for position in range(rng.randint(3, MAX_COLUMNS)):
+        word = rng.choice(COLUMN_WORDS)
+        old_suffix, new_suffix, data_type, label = COLUMN_SUFFIXES[0 if position == 0 else
+                                                                   rng.randrange(len(COLUMN_SUFFIXES))]
+        old_name = f'{word}{old_suffix}'
+        if old_name in used:
+            continue
+        used.add(old_name)
+        new_name = _column_new_name(word, new_suffix)
+
+        column = {
+            'name': old_name,
+            'description': f'{word}{label}',
+            'data_type': data_type,
+            'primary_key': position == 0,
+            'nullable': position != 0 and rng.random() < 0.6,
+            'comment': None,
+        }
+        legacy_columns.append(column)
+        renamed_columns.append({'name': new_name, 'old_name': old_name, **{k: v for k, v in column.items()
+                                                                          if k != 'name'}})
+        column_rules[old_name] = {'new': new_name, 'description': column['description']}
+
+    for old_name, new_name, label in AUDIT_COLUMNS:
+        column = {'name': old_name, 'description': label, 'data_type': 'timestamp',
+                  'primary_key': False, 'nullable': False, 'comment': None}
+        legacy_columns.append(column)
+        renamed_columns.append({'name': new_name, 'old_name': old_name, **{k: v for k, v in column.items()
+                                                                          if k != 'name'}})
+        column_rules[old_name] = {'new': new_name, 'description': label}
+
+    legacy = {
+        'metadata': {
+            'description': 'テーブル定義書',
+            'author': 'gen_synthetic_schema',
+            'history': [{'version': '1.0.0', 'date': '2025-09-01', 'author': 'gen_synthetic_schema',
+                         'comment': '生成データ'}],
+        },
+        'table_name': legacy_table,
+        'description': description,
+        'columns': legacy_columns,
+    }
+    renamed = {
+        'metadata': {
+            'description': 'テーブル定義書（新命名規約適用済み）',
+            'author': 'gen_synthetic_schema',
+            'conversion_info': {
+                'source_file': f'{legacy_table}.yaml',
+                'original_table_name': legacy_table,
+                'conversion_date': '2025-09-01',
+                'applied_rules': 'rename_dictionary.yaml v1',
+            },
+        },
+        'table_name': new_table,
+        'description': description,
+        'columns': renamed_columns,
+    }
+    table_rule = {'new': new_table, 'description': description}
+    return legacy, renamed, table_rule, column_rules
+
+
+def generate_dataset(output_dir, table_count, seed=0, workbook=True):
+    """データ一式を生成して件数を返す"""
+    output_dir = Path(output_dir)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    rename_dict = {
+        'version': 1,
+        'notes': f'gen_synthetic_schema.py --tables {table_count} --seed {seed}',
+        'tables': {},
+        'columns': {},
+    }
+    column_count = 0
+
+    for index in range(table_count):
+        legacy, renamed, table_rule, column_rules = generate_table(rng, index)
+        write_table_yaml(legacy, output_dir / 'legacy' / f"{legacy['table_name']}.yaml")
+        write_table_yaml(renamed, output_dir / 'renamed' / f"{renamed['table_name']}.yaml")
+        column_count += len(legacy['columns'])
+
+        if rng.random() < RENAME_RATIO:
+            rename_dict['tables'][legacy['table_name']] = table_rule
+            rename_dict['columns'][legacy['table_name']] = column_rules
+
+    with open(output_dir / 'rename_dictionary.yaml', 'w', encoding='utf-8') as f:
+        dump_yaml(rename_dict, f)
+
+    sheet_count = 0
+    if workbook:
+        generate_workbook(output_dir / 'dbdesign.xlsx', table_count, MAX_COLUMNS, seed=seed)
+        sheet_count = table_count
+
+    dataset = {
+        'generator_version': GENERATOR_VERSION,
+        'tables': table_count,
+        'columns': column_count,
+        'seed': seed,
+        'rename_tables': len(rename_dict['tables']),
+        'workbook_sheets': sheet_count,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(output_dir / 'dataset.json', 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, ensure_ascii=False, indent=2)
+    return dataset
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='ベンチマーク用の大規模スキーマを生成')
+    parser.add_argument('--tables', type=int, default=1000, help='テーブル数（100 / 1000 / 10000 / 50000 など）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    parser.add_argument('--no-workbook', action='store_true', help='テーブル設計ブックを生成しない')
+    parser.add_argument('--output-dir', type=Path, help='出力先（既定: schema/derived/bench/data/<テーブル数>）')
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or project_root / 'schema/derived/bench/data' / str(args.tables)
+    print(f"生成中: {args.tables}テーブル → {output_dir}")
+    dataset = generate_dataset(output_dir, args.tables, seed=args.seed, workbook=not args.no_workbook)
+
+    print(f"  テーブル: {dataset['tables']} / カラム: {dataset['columns']}"
+          f" / 変換ルール: {dataset['rename_tables']}テーブル / シート: {dataset['workbook_sheets']}")
+    print(f"  所要時間: {dataset['elapsed_seconds']:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
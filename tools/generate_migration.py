@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+rename_dictionary.yaml からDBのリネーム用マイグレーション（DDL）を生成するスクリプト
+
+Input: dictionary/rename_dictionary.yaml
+       dictionary/naming_dictionary_v0.2.1.yaml（migration ルール。--no-migration-rules で使わない）
+Output: schema/derived/migrations/YYYY-MM-DD/up.sql                 適用（旧名 → 新名）
+        schema/derived/migrations/YYYY-MM-DD/down.sql               ロールバック（新名 → 旧名）
+        schema/derived/migrations/YYYY-MM-DD/migration_report.json  件数・競合・一時名の一覧
+
+Usage: python generate_migration.py [--dictionary PATH] [--output-dir DIR]
+                                    [--dialect postgresql|sqlite] [--default-schema public]
+                                    [--verify-sqlite] [--naming-dictionary PATH] [--no-migration-rules]
+  --verify-sqlite: 辞書の旧テーブル・旧カラムをSQLite（メモリ上）に作り、
+                   up → down を実行して期待どおりの名前になるかを確認する
+  PostgreSQLでの確認は検証用DBに旧名のテーブルを用意して
+  `psql -v ON_ERROR_STOP=1 -f up.sql`（戻すときは down.sql）で行う。
+
+リネームでつながるテーブル（A→B と B→C、A→B と B→A など）を1つのグループにまとめ、
+グループごとに1トランザクション（BEGIN〜COMMIT）で出力する。
+グループ内では カラム名の変更（旧テーブル名のまま）→ テーブル名の変更 の順に実行し、
+down.sql はグループを逆順に テーブル名 → カラム名 の順で元に戻す。
+変更先の名前がまだ別のテーブル（カラム）に使われている場合は、先にそちらを動かすよう並べ、
+循環（A→B, B→A）は一時名（_mig_tmp_N）を経由して解消する。
+変換辞書で new が旧名のままの項目には、yaml_rename.py と同じく migration ルール（rename_rules.py）を
+適用した名前を使う（yaml_rename.apply_rules_to_dictionary）。
+辞書全体を1回走査して計画を作るため、テーブル数に比例した時間で生成できる。
+
+変更先が「名前を変えずに残るテーブル（カラム）」や、複数の変更元から同じ名前への
+変更は競合として出力せずにレポートに記録する（終了コード1）。
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from rename_rules import load_rename_rules
+from yaml_rename import apply_rules_to_dictionary, load_rename_dictionary
+
+
+DIALECTS = ('postgresql', 'sqlite')
+TEMP_PREFIX = '_mig_tmp_'
+
+# PostgreSQLの予約語（識別子として使うときは引用符が必要なもの）
+RESERVED_WORDS = frozenset('''
+    all analyse analyze and any array as asc asymmetric both case cast check collate column
+    constraint create current_catalog current_date current_role current_time current_timestamp
+    current_user default deferrable desc distinct do else end except false fetch for foreign from
+    grant group having in initially intersect into lateral leading limit localtime localtimestamp
+    not null offset on only or order placing primary references returning select session_user
+    some symmetric table then to trailing true union unique user using variadic when where window
+    with
+'''.split())
+
+_PLAIN_IDENTIFIER_RE = re.compile(r'[a-z_][a-z0-9_]*')
+
+
+def quote_ident(name):
+    """識別子を必要なときだけダブルクォートで囲む"""
+    if _PLAIN_IDENTIFIER_RE.fullmatch(name) and name not in RESERVED_WORDS:
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def qualify(table_name, default_schema):
+    """テーブル名を (スキーマ, 名前) にする（スキーマなしは default_schema）"""
+    schema, dot, name = table_name.rpartition('.')
+    return (schema if dot else default_schema), name
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def order_moves(moves, temp_name):
+    """
+    名前の変更 {変更元: 変更先} を、実行時に変更先が空いている順に並べる
+    変更先が別の変更の変更元になっている場合はそちらを先に実行し、
+    循環している場合は1件を一時名へ退避して解消する
+    返り値: [(変更元, 変更先)]（一時名への退避・一時名からの変更を含む）
+    """
+    pending = dict(moves)
+    # 変更先 → その名前を待っている変更元（変更先の重複は事前に除いてある）
+    waiting = {dst: src for src, dst in pending.items()}
+    ready = deque(src for src, dst in pending.items() if dst not in pending)
+    ordered = []
+
+    def release(name):
+        """name が空いたので、name を変更先とする変更を実行可能にする"""
+        waiter = waiting.get(name)
+        if waiter is not None and waiter in pending:
+            ready.append(waiter)
+
+    while pending:
+        while ready:
+            src = ready.popleft()
+            ordered.append((src, pending.pop(src)))
+            release(src)
+
+        if pending:
+            # 残りはすべて循環の一部。先頭の1件を一時名へ退避して循環を切る
+            src = next(iter(pending))
+            dst = pending.pop(src)
+            temp = temp_name(src)
+            ordered.append((src, temp))
+            pending[temp] = dst
+            waiting[dst] = temp
+            release(src)
+
+    return ordered
+
+
+def _accepted_moves(candidates, staying, kind, owner, conflicts):
+    """
+    変更先の重複や、残る名前への変更を競合として除く
+    candidates: {変更元: 変更先}（恒等変換は含まない）
+    競合で除いた変更の変更元も名前が残るため、そこへの変更も順に除く
+    """
+    targets = {}
+    for src, dst in candidates.items():
+        targets.setdefault(dst, []).append(src)
+
+    accepted = dict(candidates)
+    rejected = deque()
+
+    def reject(src, reason):
+        conflicts.append({'kind': kind, 'table': owner, 'old': _display_name(src),
+                          'new': _display_name(accepted.pop(src)), 'reason': reason})
+        rejected.append(src)
+
+    for src, dst in candidates.items():
+        if len(targets[dst]) > 1:
+            reject(src, f"複数の変更元が同じ名前に変更される: {', '.join(map(_display_name, targets[dst]))}")
+        elif dst in staying:
+            reject(src, '変更先の名前は変更されずに残る')
+
+    while rejected:
+        for waiter in targets.get(rejected.popleft(), []):
+            if waiter in accepted:
+                reject(waiter, '変更先の名前の変更が競合のため出力されない')
+    return accepted
+
+
+def _display_name(name):
+    return '.'.join(name) if isinstance(name, tuple) else name
+
+
+def _via_temporary_on_schema_change(ordered, occupied, temp_name):
+    """
+    スキーマをまたぐ変更（SET SCHEMA → RENAME の2文になる）で、
+    移動先スキーマに同じ名前のテーブルがありうる場合は一時名を経由させる
+    """
+    result = []
+    for src, dst in ordered:
+        if src[0] != dst[0] and (dst[0], src[1]) in occupied:
+            temp = temp_name(src)
+            result.extend([(src, temp), (temp, dst)])
+        else:
+            result.append((src, dst))
+    return result
+
+
+def build_plan(rename_dict, default_schema='public'):
+    """
+    リネームの実行計画を作る
+    返り値: {
+      'groups': [{'tables': [旧テーブル名], 'up': [操作], 'down': [操作]}],
+      'table_moves': {旧テーブル: 新テーブル}, 'column_moves': {旧テーブル: {旧カラム: 新カラム}},
+      'conflicts': [...], 'temporaries': 一時名の数,
+    }
+    テーブル名は (スキーマ, 名前)、操作は ('table', 変更元, 変更先) /
+    ('column', テーブル, 変更元, 変更先)
+    """
+    tables = rename_dict.get('tables') or {}
+    columns = rename_dict.get('columns') or {}
+    conflicts = []
+
+    # 辞書に現れる旧テーブル名。変換ルールがない・恒等変換のものは名前が変わらずに残る
+    candidates = {}
+    existing = {}
+    for table_name in list(tables) + [t for t in columns if t not in tables]:
+        old = qualify(table_name, default_schema)
+        existing[old] = table_name
+        rule = tables.get(table_name)
+        new = qualify(rule['new'], default_schema) if rule and rule.get('new') else old
+        if new != old:
+            candidates[old] = new
+    staying = {name for name in existing if name not in candidates}
+    table_moves = _accepted_moves(candidates, staying, 'table', None, conflicts)
+
+    column_moves = {}
+    for table_name, column_rules in columns.items():
+        column_candidates = {}
+        column_staying = set()
+        for column_name, rule in (column_rules or {}).items():
+            new = (rule or {}).get('new') or column_name
+            if new != column_name:
+                column_candidates[column_name] = new
+            else:
+                column_staying.add(column_name)
+        accepted = _accepted_moves(column_candidates, column_staying, 'column', table_name, conflicts)
+        if accepted:
+            column_moves[qualify(table_name, default_schema)] = accepted
+
+    # 一時名は辞書に現れるどの名前とも重ならないものを使う
+    used_names = {name for _, name in existing} | {name for _, name in table_moves.values()}
+    for accepted in column_moves.values():
+        used_names.update(accepted)
+        used_names.update(accepted.values())
+    temp_counter = 0
+
+    def temp_name(item):
+        nonlocal temp_counter
+        while True:
+            temp_counter += 1
+            name = f'{TEMP_PREFIX}{temp_counter}'
+            if name not in used_names:
+                break
+        return (item[0], name) if isinstance(item, tuple) else name
+
+    occupied = set(existing) | set(table_moves.values())
+
+    # リネームでつながるテーブルを1グループにする
+    union_find = _UnionFind()
+    for old, new in table_moves.items():
+        union_find.union(old, new)
+    group_tables = {}
+    for old in existing:
+        if old in table_moves or old in column_moves:
+            group_tables.setdefault(union_find.find(old), []).append(old)
+
+    groups = []
+    for members in group_tables.values():
+        up_tables = {old: table_moves[old] for old in members if old in table_moves}
+        down_tables = {new: old for old, new in up_tables.items()}
+
+        up = []
+        down = []
+        for old in members:
+            for src, dst in order_moves(column_moves.get(old, {}), temp_name):
+                up.append(('column', old, src, dst))
+        for src, dst in _via_temporary_on_schema_change(order_moves(up_tables, temp_name), occupied, temp_name):
+            up.append(('table', src, dst))
+
+        for src, dst in _via_temporary_on_schema_change(order_moves(down_tables, temp_name), occupied, temp_name):
+            down.append(('table', src, dst))
+        for old in members:
+            inverse = {dst: src for src, dst in column_moves.get(old, {}).items()}
+            for src, dst in order_moves(inverse, temp_name):
+                down.append(('column', old, src, dst))
+
+        groups.append({'tables': [existing[old] for old in members],
+                       'up': up, 'down': down})
+
+    return {
+        'groups': groups,
+        'existing': existing,
+        'table_moves': table_moves,
+        'column_moves': column_moves,
+        'conflicts': conflicts,
+        'temporaries': temp_counter,
+    }
+
+
+def _table_ref(table, dialect, default_schema):
+    schema, name = table
+    if dialect == 'sqlite':
+        # SQLiteにはスキーマがないため、既定以外のスキーマは "schema.name" という1つの名前で代用する
+        return quote_ident(name if schema == default_schema else f'{schema}.{name}')
+    return f'{quote_ident(schema)}.{quote_ident(name)}'
+
+
+def render_statements(operations, dialect, default_schema):
+    """操作を ALTER TABLE 文にする"""
+    statements = []
+    for operation in operations:
+        if operation[0] == 'column':
+            _, table, src, dst = operation
+            statements.append(f'ALTER TABLE {_table_ref(table, dialect, default_schema)}'
+                              f' RENAME COLUMN {quote_ident(src)} TO {quote_ident(dst)};')
+            continue
+
+        _, (src_schema, src_name), (dst_schema, dst_name) = operation
+        source = _table_ref((src_schema, src_name), dialect, default_schema)
+        if dialect == 'sqlite':
+            target = _table_ref((dst_schema, dst_name), dialect, default_schema)
+            statements.append(f'ALTER TABLE {source} RENAME TO {target};')
+            continue
+
+        if src_schema != dst_schema:
+            statements.append(f'ALTER TABLE {source} SET SCHEMA {quote_ident(dst_schema)};')
+            source = _table_ref((dst_schema, src_name), dialect, default_schema)
+        if src_name != dst_name:
+            statements.append(f'ALTER TABLE {source} RENAME TO {quote_ident(dst_name)};')
+    return statements
+
+
+def render_script(plan, direction, dialect, default_schema, header):
+    """up.sql / down.sql の内容（グループごとに BEGIN〜COMMIT）"""
+    numbered = list(enumerate(plan['groups'], 1))
+    if direction == 'down':
+        numbered.reverse()
+    lines = [f'-- {line}' for line in header]
+    for number, group in numbered:
+        statements = render_statements(group[direction], dialect, default_schema)
+        if not statements:
+            continue
+        lines.append('')
+        lines.append(f"-- group {number}: {', '.join(group['tables'])}")
+        lines.append('BEGIN;')
+        lines.extend(statements)
+        lines.append('COMMIT;')
+    return '\n'.join(lines) + '\n'
+
+
+def _schema_state(connection):
+    """SQLite上のテーブル名 → カラム名のリスト"""
+    state = {}
+    rows = connection.execute(
+        "SELECT m.name, p.name FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p"
+        " WHERE m.type = 'table' ORDER BY m.name, p.cid")
+    for table, column in rows:
+        state.setdefault(table, []).append(column)
+    return state
+
+
+def _diff_state(expected, actual):
+    problems = []
+    for table in sorted(set(expected) | set(actual)):
+        if table not in actual:
+            problems.append(f'テーブルがない: {table}')
+        elif table not in expected:
+            problems.append(f'想定外のテーブル: {table}')
+        elif expected[table] != actual[table]:
+            problems.append(f'カラムが異なる: {table}: {actual[table]} (期待: {expected[table]})')
+    return problems
+
+
+def verify_sqlite(plan, rename_dict, default_schema):
+    """
+    SQLite（メモリ上）で up → down を実行して確認する
+    返り値: 問題のリスト（空なら成功）
+    """
+    columns = rename_dict.get('columns') or {}
+
+    def name_of(table):
+        schema, name = table
+        return name if schema == default_schema else f'{schema}.{name}'
+
+    initial = {}
+    for table, table_name in plan['existing'].items():
+        initial[name_of(table)] = list(columns.get(table_name) or {}) or ['_placeholder']
+
+    expected = {}
+    for table, table_name in plan['existing'].items():
+        moves = plan['column_moves'].get(table, {})
+        expected[name_of(plan['table_moves'].get(table, table))] = [
+            moves.get(column, column) for column in initial[name_of(table)]]
+
+    connection = sqlite3.connect(':memory:', isolation_level=None)
+    try:
+        for table, table_columns in initial.items():
+            connection.execute(f'CREATE TABLE {quote_ident(table)} '
+                               f"({', '.join(quote_ident(column) for column in table_columns)})")
+
+        problems = []
+        for direction, wanted in (('up', expected), ('down', initial)):
+            try:
+                connection.executescript(render_script(plan, direction, 'sqlite', default_schema, []))
+            except sqlite3.Error as e:
+                return problems + [f'{direction}: SQLの実行に失敗: {e}']
+            problems.extend(f'{direction}: {problem}' for problem in _diff_state(wanted, _schema_state(connection)))
+        return problems
+    finally:
+        connection.close()
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='変換辞書からリネーム用マイグレーションを生成')
+    parser.add_argument('--dictionary', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書ファイル')
+    parser.add_argument('--naming-dictionary', type=Path,
+                        default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='migration ルールを読む命名辞書')
+    parser.add_argument('--no-migration-rules', action='store_true', help='命名辞書の migration ルールを適用しない')
+    parser.add_argument('--output-dir', type=Path,
+                        default=project_root / 'schema/derived/migrations' / datetime.now().strftime('%Y-%m-%d'),
+                        help='出力先（既定: schema/derived/migrations/YYYY-MM-DD）')
+    parser.add_argument('--dialect', choices=DIALECTS, default='postgresql', help='出力するSQLの方言')
+    parser.add_argument('--default-schema', default='public', help='スキーマ名のないテーブルのスキーマ')
+    parser.add_argument('--verify-sqlite', action='store_true', help='SQLiteで up → down を実行して確認する')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('generate_migration', args)
+
+    started = time.perf_counter()
+    rename_dict = load_rename_dictionary(args.dictionary, use_snapshot=False)
+    if not args.no_migration_rules:
+        rename_dict = apply_rules_to_dictionary(rename_dict, load_rename_rules(args.naming_dictionary))
+    with instrumentation.phase('plan'):
+        plan = build_plan(rename_dict, args.default_schema)
+
+    table_renames = len(plan['table_moves'])
+    column_renames = sum(len(moves) for moves in plan['column_moves'].values())
+    header = [
+        f"generate_migration.py: {args.dictionary.name} (version {rename_dict.get('version')})"
+        f" → {args.dialect}",
+        f"生成日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"グループ: {len(plan['groups'])} / テーブル名の変更: {table_renames}"
+        f" / カラム名の変更: {column_renames} / 一時名: {plan['temporaries']}",
+    ]
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    with instrumentation.phase('render'):
+        for direction in ('up', 'down'):
+            script = render_script(plan, direction, args.dialect, args.default_schema, header)
+            with open(args.output_dir / f'{direction}.sql', 'w', encoding='utf-8') as f:
+                f.write(script)
+
+    problems = None
+    if args.verify_sqlite:
+        with instrumentation.phase('verify'):
+            problems = verify_sqlite(plan, rename_dict, args.default_schema)
+
+    report = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'dictionary': str(args.dictionary),
+        'dictionary_version': rename_dict.get('version'),
+        'migration_rules': not args.no_migration_rules,
+        'dialect': args.dialect,
+        'groups': len(plan['groups']),
+        'chained_groups': [group['tables'] for group in plan['groups'] if len(group['tables']) > 1],
+        'table_renames': table_renames,
+        'column_renames': column_renames,
+        'temporaries': plan['temporaries'],
+        'conflicts': plan['conflicts'],
+        'verify_sqlite': problems,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(args.output_dir / 'migration_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"=== マイグレーション生成結果 ===")
+    print(f"グループ: {report['groups']}（連鎖・循環を含むもの: {len(report['chained_groups'])}）")
+    print(f"テーブル名の変更: {table_renames} / カラム名の変更: {column_renames} / 一時名: {plan['temporaries']}")
+    print(f"出力: {args.output_dir}/up.sql, down.sql")
+
+    if plan['conflicts']:
+        print(f"\n⚠️  競合のため出力しなかった変更: {len(plan['conflicts'])}件")
+        for conflict in plan['conflicts']:
+            owner = f"{conflict['table']}." if conflict['table'] else ''
+            print(f"  {conflict['kind']}: {owner}{conflict['old']} → {conflict['new']}（{conflict['reason']}）")
+
+    if problems is not None:
+        if problems:
+            print(f"\n❌ SQLiteでの確認に失敗: {len(problems)}件")
+            for problem in problems[:20]:
+                print(f"  {problem}")
+        else:
+            print("\n✅ SQLiteでの確認: up → down で期待どおりの名前になりました")
+
+    print(f"レポート: {args.output_dir / 'migration_report.json'}")
+    session.finish(extra={'table_renames': table_renames, 'column_renames': column_renames})
+    sys.exit(1 if plan['conflicts'] or problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+各ツール共通の計測（プロファイル・処理フェーズごとの時間）
+
+各ツールの main で add_arguments(parser) を呼ぶと以下のオプションが使える。
+  --profile [PATH]  cProfileで計測し、.profを保存して上位の関数を表示
+                    （既定: schema/derived/profiles/<tool>/YYYYmmdd_HHMMSS.prof。
+                     --jobs のワーカー内は計測されないため --jobs 1 で使う）
+  --timings         フェーズ（read / parse / lookup / dump / headers / write など）ごとの
+                    回数・合計・分布と、時間のかかったファイルの一覧を表示
+  --slowest N       --timings で表示する遅いファイルの件数（既定: 10）
+  --metrics PATH    --timings の結果JSONの出力先
+                    （既定: ツールが指定した場所、なければ schema/derived/metrics/<tool>/）
+
+計測したい箇所は `with phase('parse'):` で囲む。計測が無効なときは何もしない
+コンテキストを返すだけなので、通常実行時の負荷はほぼない。
+ファイル単位の内訳は `with collect_phases() as phases:`（ワーカー側でも使える）で集め、
+`with track_file(name, phases):`（親側の処理も含めて計測）または record_file(name, phases) で
+親プロセスの集計に登録する。collect_phases / track_file の記録先はスレッドごとに持つため、
+複数のスレッドで別々のファイルを処理しても（pipeline.py）内訳が混ざらない。
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+# 分布の区切り（ミリ秒）
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+PROFILE_TOP_N = 25
+
+# 有効なときだけ設定される（プロセスごと。スレッド間で共有し、Timings の中でロックする）
+_timings = None
+# collect_phases / track_file の中で、フェーズ時間の記録先になるdict（スレッドごとの current 属性）
+_local = threading.local()
+
+
+class Timings:
+    """フェーズごとの時間とファイルごとの内訳"""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.files = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.phases.setdefault(name, []).append(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_file(self, file_name, phases):
+        """ファイル1件分の内訳を登録"""
+        with self._lock:
+            self.files[str(file_name)] = dict(phases, total=sum(phases.values()))
+            for name, seconds in phases.items():
+                self.phases.setdefault(name, []).append(seconds)
+
+    def phase_summary(self):
+        """フェーズごとの回数・合計・平均・p50・p95・最大・分布"""
+        summary = {}
+        for name, samples in self.phases.items():
+            ordered = sorted(samples)
+            histogram = {}
+            for seconds in ordered:
+                label = _histogram_label(seconds * 1000)
+                histogram[label] = histogram.get(label, 0) + 1
+            summary[name] = {
+                'count': len(ordered),
+                'total_seconds': round(sum(ordered), 6),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+                'p50_ms': round(_percentile(ordered, 0.50) * 1000, 3),
+                'p95_ms': round(_percentile(ordered, 0.95) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3),
+                'histogram': histogram,
+            }
+        return summary
+
+    def slowest_files(self, n):
+        ranked = sorted(self.files.items(), key=lambda item: -item[1]['total'])
+        return [{'file': name, **{k: round(v, 6) for k, v in phases.items()}} for name, phases in ranked[:n]]
+
+    def to_dict(self, slowest=10, extra=None):
+        return {
+            'tool': self.tool,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total_seconds': round(time.perf_counter() - self.started, 6),
+            'files': len(self.files),
+            'counters': self.counters,
+            'phases': self.phase_summary(),
+            'slowest_files': self.slowest_files(slowest),
+            **(extra or {}),
+        }
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _histogram_label(milliseconds):
+    lower = 0
+    for bound in HISTOGRAM_BOUNDS_MS:
+        if milliseconds < bound:
+            return f'{lower}-{bound}ms'
+        lower = bound
+    return f'>={lower}ms'
+
+
+class _Phase:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        current = getattr(_local, 'current', None)
+        if current is not None:
+            current[self.name] = current.get(self.name, 0.0) + elapsed
+        elif _timings is not None:
+            _timings.add(self.name, elapsed)
+        return False
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL = _NullContext()
+
+
+def enabled():
+    return _timings is not None
+
+
+def enable(tool):
+    """このプロセスでの計測を有効にする"""
+    global _timings
+    _timings = Timings(tool)
+    return _timings
+
+
+def enable_in_worker(flag):
+    """ProcessPoolExecutor の initializer 用（親で有効ならワーカーでも有効にする）"""
+    if flag:
+        enable('worker')
+
+
+def phase(name):
+    """処理フェーズの計測（無効時は何もしない）"""
+    if _timings is None:
+        return _NULL
+    return _Phase(name)
+
+
+def count(name, n=1):
+    """件数カウンタ（無効時は何もしない）"""
+    if _timings is not None:
+        _timings.count(name, n)
+
+
+class collect_phases:
+    """
+    この中で計測したフェーズ時間をdictに集める（無効時はNoneを返す）
+    ワーカー側で集めたdictは結果と一緒に親プロセスへ返し、track_file で登録する
+    """
+
+    def __enter__(self):
+        if _timings is None:
+            return None
+        self.previous = getattr(_local, 'current', None)
+        _local.current = {}
+        return _local.current
+
+    def __exit__(self, *exc_info):
+        if _timings is not None:
+            _local.current = self.previous
+        return False
+
+
+class track_file(collect_phases):
+    """ファイル1件分の処理を計測し、集計に登録する（phasesはワーカー側で集めた内訳）"""
+
+    def __init__(self, file_name, phases=None):
+        self.file_name = file_name
+        self.phases = phases
+
+    def __enter__(self):
+        collected = super().__enter__()
+        if collected is not None and self.phases:
+            collected.update(self.phases)
+        return collected
+
+    def __exit__(self, *exc_info):
+        if _timings is not None:
+            _timings.add_file(self.file_name, _local.current)
+        return super().__exit__(*exc_info)
+
+
+def record_file(file_name, phases):
+    """ワーカー側で集めたファイル1件分の内訳を登録（無効時は何もしない）"""
+    if _timings is not None:
+        _timings.add_file(file_name, phases or {})
+
+
+def add_arguments(parser):
+    """--profile / --timings / --slowest / --metrics を追加"""
+    group = parser.add_argument_group('計測')
+    group.add_argument('--profile', nargs='?', const='', default=None, metavar='PATH',
+                       help='cProfileで計測して.profを保存（--jobs 1 で使う）')
+    group.add_argument('--timings', action='store_true', help='フェーズごとの処理時間を表示')
+    group.add_argument('--slowest', type=int, default=10, metavar='N', help='表示する遅いファイルの件数')
+    group.add_argument('--metrics', type=Path, metavar='PATH', help='--timings の結果JSONの出力先')
+
+
+def _default_output(kind, tool, suffix):
+    project_root = Path(__file__).parent.parent
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return project_root / 'schema/derived' / kind / tool / f'{stamp}{suffix}'
+
+
+class Session:
+    """コマンドライン引数に従って計測を開始・終了する"""
+
+    def __init__(self, tool, args):
+        self.tool = tool
+        self.args = args
+        self.timings = enable(tool) if getattr(args, 'timings', False) else None
+        self.profiler = None
+        if getattr(args, 'profile', None) is not None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def finish(self, metrics_path=None, extra=None):
+        """計測結果を表示・保存する（終了直前に1回呼ぶ）"""
+        if self.profiler is not None:
+            self.profiler.disable()
+            profile_path = Path(self.args.profile or _default_output('profiles', self.tool, '.prof'))
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            self.profiler.dump_stats(profile_path)
+
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+            print(f"\n=== プロファイル（累積時間の上位{PROFILE_TOP_N}件） ===")
+            print(stream.getvalue().strip())
+            print(f"プロファイル: {profile_path}")
+            self.profiler = None
+
+        if self.timings is not None:
+            report = self.timings.to_dict(slowest=self.args.slowest, extra=extra)
+            print_report(report)
+
+            metrics_path = Path(self.args.metrics or metrics_path
+                                or _default_output('metrics', self.tool, '.json'))
+            metrics_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(metrics_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"メトリクス: {metrics_path}")
+            self.timings = None
+
+
+def start(tool, args):
+    """計測を開始（args は add_arguments を追加したパーサーの結果）"""
+    return Session(tool, args)
+
+
+def print_report(report):
+    """--timings の結果を表示"""
+    print(f"\n=== フェーズ別の処理時間（合計 {report['total_seconds']:.3f}s / {report['files']}ファイル） ===")
+    print(f"  {'phase':16s} {'count':>7s} {'total(s)':>9s} {'mean(ms)':>9s}"
+          f" {'p50(ms)':>9s} {'p95(ms)':>9s} {'max(ms)':>9s}")
+    phases = sorted(report['phases'].items(), key=lambda item: -item[1]['total_seconds'])
+    for name, stats in phases:
+        print(f"  {name:16s} {stats['count']:7d} {stats['total_seconds']:9.3f} {stats['mean_ms']:9.3f}"
+              f" {stats['p50_ms']:9.3f} {stats['p95_ms']:9.3f} {stats['max_ms']:9.3f}")
+        print('  ' + ' ' * 17 + ' '.join(f'{label}:{n}' for label, n in stats['histogram'].items()))
+
+    for name, value in report['counters'].items():
+        print(f"  {name}: {value}")
+
+    if report['slowest_files']:
+        print(f"\n遅いファイル（上位{len(report['slowest_files'])}件）:")
+        for entry in report['slowest_files']:
+            detail = ', '.join(f'{k} {v * 1000:.1f}ms' for k, v in entry.items() if k not in ('file', 'total'))
+            print(f"  {entry['total'] * 1000:8.1f}ms  {entry['file']}  ({detail})")
@@ -1,2 +1,723 @@
 #!/usr/bin/env python3
-print('lint_names.py (stub)')
+"""
+テーブル定義YAMLの識別子を命名規約でチェックするスクリプト
+
+Input: schema/tables/**/*.yaml（テーブル定義。日付のスナップショット schema/tables/YYYY-MM-DD/ は除く）
+Rules: lint/lint_config.yaml（nn_table_regex / pk_suffix / timestamp_suffixes / boolean_prefixes）
+       dictionary/naming_dictionary_v0.2.1.yaml（各termのforbidden）
+Baseline: lint/lint_baseline.yaml（既知の違反。--update-baseline で作り直す。
+          対象パスを指定した場合、その外のファイルの項目は残す）
+Cache: schema/derived/lint_cache/lint_cache.json（ファイル内容ハッシュ単位の結果キャッシュ）
+Output: 違反一覧（標準出力）。baseline にない違反がある場合は終了コード1
+
+ルールは起動時に一度だけコンパイルし、禁止語は1本の結合正規表現にまとめて
+識別子ごとに1回の走査で判定する。
+内容が変わっていないファイルはキャッシュの結果を再利用し、lint設定または
+命名辞書が変わった場合はキャッシュ全体を破棄する。
+
+naming_daemon.py が起動していれば、ルールの読み込みとlintをサーバーに任せる
+（--no-daemon で無効化）。--timings / --profile で処理時間を計測できる（instrumentation.py）。
+
+--watch: 対象パスを監視し（file_watch.py。inotify、使えなければポーリング）、保存されたファイルだけを
+チェックし直す。ルール・辞書はメモリに保持したまま、保存の連続は --debounce 秒でまとめる。
+--rename-output DIR を指定すると、保存されたファイルを yaml_rename.py と同じ処理
+（変換辞書＋migration ルール）で変換して DIR に書き出す（DIR は監視せず、内容が同じなら書き直さない）。
+lint設定・命名辞書が変わったら全ファイルをチェックし直し、変換辞書（ジャーナル・シャードを含む）が
+変わったら全ファイルを変換し直す（結果が変わったファイルだけを表示する）。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import instrumentation
+from yaml_io import dump_yaml, load_yaml, load_yaml_text
+
+
+TIMESTAMP_TYPE_PREFIXES = ('timestamp', 'date')
+BOOLEAN_TYPES = ('boolean', 'bool')
+
+# 日付のスナップショットのディレクトリ名（schema/tables/2025-09-11 など）
+SNAPSHOT_DIR_REGEX = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# キャッシュ形式を変えたら上げる（既存キャッシュは自動的に破棄される）
+LINT_CACHE_VERSION = 2
+
+# キャッシュに残すキャッシュなし実行の記録（対象ファイルの組み合わせごと）の最大数
+COLD_RUN_LIMIT = 16
+
+
+def _glob_to_regex(pattern):
+    """'*_link' 形式のワイルドカードを正規表現に変換"""
+    return '.*'.join(re.escape(part) for part in pattern.split('*'))
+
+
+def compile_rules(lint_config, naming_dict):
+    """
+    lint設定と命名辞書からチェック用のルールを一度だけ組み立てる
+
+    禁止語は「正規語（例: medical_device）→ 許可」「禁止語（例: device）→ 違反」の
+    順に並べた1本の正規表現にまとめる。正規語に含まれる禁止語は正規語側で
+    先に消費されるため、識別子1回の走査で判定できる。
+    """
+    rules = (lint_config or {}).get('rules', {})
+    terms = (naming_dict or {}).get('terms', [])
+
+    forbidden_tokens = {}
+    forbidden_globs = {}
+    allowed_phrases = set()
+    nn_exceptions = set()
+
+    for term in terms:
+        term_id = term.get('id', '')
+        canonical_en = (term.get('canonical') or {}).get('en', '')
+
+        forbidden = term.get('forbidden') or []
+        if isinstance(forbidden, dict):
+            forbidden = [token for tokens in forbidden.values() for token in tokens]
+
+        for token in forbidden:
+            token = str(token)
+            if '*' in token:
+                forbidden_globs.setdefault(token, term_id)
+            else:
+                forbidden_tokens.setdefault(token.lower(), term_id)
+
+        # 正規語そのもの（識別子として使えるもの）は禁止語判定から除外する
+        if re.fullmatch(r'[a-z0-9_]+', str(canonical_en)):
+            allowed_phrases.add(canonical_en)
+            if term.get('kind') == 'exception':
+                nn_exceptions.add(canonical_en)
+
+    allowed_phrases = {phrase for phrase in allowed_phrases
+                       if any(re.search(rf'(?:^|_){re.escape(token)}(?:_|$)', phrase)
+                              for token in forbidden_tokens)}
+
+    token_regex = None
+    if forbidden_tokens:
+        # 長い語を先に並べて最長一致させる
+        allowed_alt = '|'.join(re.escape(p) for p in sorted(allowed_phrases, key=len, reverse=True))
+        forbidden_alt = '|'.join(re.escape(t) for t in sorted(forbidden_tokens, key=len, reverse=True))
+        alternatives = f'(?P<forbidden>{forbidden_alt})'
+        if allowed_alt:
+            alternatives = f'(?P<allowed>{allowed_alt})|{alternatives}'
+        token_regex = re.compile(rf'(?:^|(?<=_))(?:{alternatives})(?=_|$)', re.IGNORECASE)
+
+    glob_regex = None
+    glob_patterns = list(forbidden_globs)
+    if glob_patterns:
+        glob_regex = re.compile('|'.join(f'(?P<g{i}>{_glob_to_regex(p)})'
+                                         for i, p in enumerate(glob_patterns)) + r'\Z')
+
+    return {
+        'nn_table_regex': re.compile(rules['nn_table_regex']) if rules.get('nn_table_regex') else None,
+        'nn_exceptions': frozenset(nn_exceptions),
+        'pk_suffix': rules.get('pk_suffix') or None,
+        'timestamp_suffixes': tuple(rules.get('timestamp_suffixes') or ()),
+        'boolean_prefixes': tuple(rules.get('boolean_prefixes') or ()),
+        'forbidden_regex': token_regex,
+        'forbidden_tokens': forbidden_tokens,
+        'forbidden_glob_regex': glob_regex,
+        'forbidden_globs': glob_patterns,
+        'forbidden_glob_terms': forbidden_globs,
+    }
+
+
+def load_rules(lint_config_path, naming_dict_path):
+    """設定ファイルを読み込んでルールをコンパイル"""
+    return compile_rules(load_yaml(lint_config_path), load_yaml(naming_dict_path))
+
+
+def _forbidden_hits(identifier, rules):
+    """識別子に含まれる禁止語を1回の走査で列挙"""
+    regex = rules['forbidden_regex']
+    if regex is None:
+        return []
+    return [m.group('forbidden') for m in regex.finditer(identifier) if m.lastgroup == 'forbidden']
+
+
+def lint_table_name(table_name, rules):
+    """テーブル名をチェックして違反 (rule, message) のリストを返す"""
+    violations = []
+    # スキーマ修飾（core.xxx）はテーブル部分のみを対象とする
+    short_name = table_name.rsplit('.', 1)[-1]
+
+    nn_regex = rules['nn_table_regex']
+    if (nn_regex is not None and short_name.startswith('map_')
+            and short_name not in rules['nn_exceptions'] and not nn_regex.match(short_name)):
+        violations.append(('nn_table', f"n:nテーブル名が {nn_regex.pattern} に一致しません"))
+
+    glob_regex = rules['forbidden_glob_regex']
+    if glob_regex is not None:
+        m = glob_regex.match(short_name)
+        if m:
+            pattern = rules['forbidden_globs'][int(m.lastgroup[1:])]
+            violations.append(('forbidden_pattern', f"禁止パターン '{pattern}' に一致します"
+                                                    f" ({rules['forbidden_glob_terms'][pattern]})"))
+
+    for token in _forbidden_hits(short_name, rules):
+        violations.append(('forbidden_token', f"禁止語 '{token}' を含みます"
+                                              f" ({rules['forbidden_tokens'][token.lower()]})"))
+
+    return violations
+
+
+def lint_column(column, rules):
+    """カラム定義をチェックして違反 (rule, message) のリストを返す"""
+    violations = []
+    name = str(column.get('name') or '')
+    data_type = str(column.get('data_type') or '').strip().lower()
+
+    pk_suffix = rules['pk_suffix']
+    if pk_suffix and column.get('primary_key') and not name.endswith(pk_suffix):
+        violations.append(('pk_suffix', f"主キーは '{pk_suffix}' で終わる必要があります"))
+
+    timestamp_suffixes = rules['timestamp_suffixes']
+    if (timestamp_suffixes and data_type.startswith(TIMESTAMP_TYPE_PREFIXES)
+            and not name.endswith(timestamp_suffixes)):
+        violations.append(('timestamp_suffix',
+                           f"日時カラムは {'/'.join(timestamp_suffixes)} で終わる必要があります"))
+
+    boolean_prefixes = rules['boolean_prefixes']
+    if boolean_prefixes and data_type in BOOLEAN_TYPES and not name.startswith(boolean_prefixes):
+        violations.append(('boolean_prefix',
+                           f"真偽値カラムは {'/'.join(boolean_prefixes)} で始まる必要があります"))
+
+    for token in _forbidden_hits(name, rules):
+        violations.append(('forbidden_token', f"禁止語 '{token}' を含みます"
+                                              f" ({rules['forbidden_tokens'][token.lower()]})"))
+
+    return violations
+
+
+def lint_table(table_data, rules):
+    """
+    テーブル定義（YAMLと同じ構造のdict）をチェック
+    返り値: [{'table', 'column', 'rule', 'message'}, ...]
+    """
+    results = []
+    table_name = str(table_data.get('table_name') or '')
+
+    for rule, message in lint_table_name(table_name, rules):
+        results.append({'table': table_name, 'column': None, 'rule': rule, 'message': message})
+
+    for column in table_data.get('columns') or []:
+        if not isinstance(column, dict):
+            continue
+        for rule, message in lint_column(column, rules):
+            results.append({'table': table_name, 'column': column.get('name'),
+                            'rule': rule, 'message': message})
+
+    return results
+
+
+def lint_text(text, rules):
+    """
+    YAML文字列1件をチェック
+    返り値: (識別子数, 違反リスト)。テーブル定義でないものは (0, [])
+    """
+    yaml_data = load_yaml_text(text)
+    if not isinstance(yaml_data, dict) or 'table_name' not in yaml_data:
+        return 0, []
+    identifier_count = 1 + len(yaml_data.get('columns') or [])
+    with instrumentation.phase('lint'):
+        return identifier_count, lint_table(yaml_data, rules)
+
+
+def lint_file(file_path, rules):
+    """YAMLファイル1件をチェック（返り値は lint_text と同じ）"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return lint_text(f.read(), rules)
+
+
+def rules_digest(*paths):
+    """lint設定・命名辞書の内容ハッシュ（キャッシュの有効性判定に使う）"""
+    digest = hashlib.sha256(f'lint_cache_v{LINT_CACHE_VERSION}'.encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def file_set_digest(cache_keys):
+    """対象ファイルの組み合わせのハッシュ（キャッシュなし実行の時間を同じ組み合わせの実行とだけ比べる）"""
+    return hashlib.sha256('\n'.join(sorted(cache_keys)).encode('utf-8')).hexdigest()
+
+
+def load_lint_cache(cache_path, rules_key):
+    """キャッシュを読み込む（ルールが変わっていれば空のキャッシュを返す）"""
+    cache = {'rules_digest': rules_key, 'files': {}}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return cache
+
+    if stored.get('rules_digest') == rules_key:
+        cache['files'] = stored.get('files', {})
+        cache['cold_runs'] = stored.get('cold_runs', {})
+    return cache
+
+
+def save_lint_cache(cache_path, cache):
+    """キャッシュを一時ファイル経由で書き込む"""
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def prune_lint_cache(cached_files, fresh_files, paths):
+    """
+    保存するキャッシュのエントリ（今回チェックしたファイル＋対象外のファイルの前回の結果）
+    対象のディレクトリの下で今回チェックしなかったファイル（削除・リネームされたもの）と、
+    存在しなくなったファイルのエントリは捨てる
+    """
+    scanned_dirs = [Path(path).resolve() for path in paths if Path(path).is_dir()]
+    kept = {}
+    for cache_key, entry in cached_files.items():
+        if cache_key in fresh_files:
+            continue
+        file_path = Path(cache_key)
+        if any(directory in file_path.parents for directory in scanned_dirs) or not file_path.exists():
+            continue
+        kept[cache_key] = entry
+    kept.update(fresh_files)
+    return kept
+
+
+def iter_table_files(paths):
+    """
+    対象パス（ファイルまたはディレクトリ）からYAMLファイルを列挙
+    ディレクトリの下の日付のスナップショット（schema/tables/2025-09-11 など）は過去の記録のため飛ばす
+    （スナップショットのディレクトリを直接指定した場合はチェックする）
+    """
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from sorted(f for f in path.rglob('*.yaml')
+                              if not any(SNAPSHOT_DIR_REGEX.match(part) for part in f.relative_to(path).parts[:-1]))
+        elif path.suffix == '.yaml' and path.exists():
+            yield path
+
+
+def project_relative(file_path):
+    """baseline に記録するファイル名（プロジェクトルートからの相対パス）"""
+    file_path = Path(file_path).resolve()
+    project_root = Path(__file__).resolve().parent.parent
+    if project_root in file_path.parents:
+        file_path = file_path.relative_to(project_root)
+    return file_path.as_posix()
+
+
+def baseline_key(file_path, violation):
+    """違反を baseline と照合するキー（ファイルはプロジェクトルートからの相対パス）"""
+    return (project_relative(file_path), violation['table'], violation['column'], violation['rule'],
+            violation['message'])
+
+
+class Baseline:
+    """既知の違反（lint_baseline.yaml）。baseline にある違反は報告せず、終了コードにも数えない"""
+
+    FIELDS = ('file', 'table', 'column', 'rule', 'message')
+    HEADER = ('# 既知の命名規約違反（lint_names.py --update-baseline で作成）\n'
+              '# ここにある違反は報告せず、新しい違反だけで終了コード1にする\n')
+
+    def __init__(self, path=None, load=True):
+        """load=False でも既存の項目は読み込み、save で対象外のファイルの分を残すために使う"""
+        self.path = Path(path) if path else None
+        self.known = Counter()
+        self.entries = []
+        if self.path is not None and self.path.exists():
+            for entry in (load_yaml(self.path) or {}).get('violations') or []:
+                self.entries.append(tuple(entry.get(field) for field in self.FIELDS))
+        if load:
+            self.known.update(self.entries)
+        self.matched = 0
+        self.seen = []
+
+    def match(self, key):
+        """キーが baseline にあれば True（同じキーは baseline にある件数まで）"""
+        self.seen.append(key)
+        if self.known[key] > 0:
+            self.known[key] -= 1
+            self.matched += 1
+            return True
+        return False
+
+    def consume(self, file_path, violation):
+        """違反が baseline にあれば True"""
+        return self.match(baseline_key(file_path, violation))
+
+    def save(self, paths=None):
+        """
+        今回見つかった違反を baseline として書き出す
+        paths: 今回チェックした対象パス。指定すると、その外にあるファイルの既存の項目は残す
+        （一部のファイルだけをチェックして baseline を書き直しても、ほかのファイルの項目を消さない）
+        返り値: 書き出した件数
+        """
+        keys = list(self.seen)
+        if paths is not None:
+            targets = [Path(path).resolve() for path in paths]
+            project_root = Path(__file__).resolve().parent.parent
+            for key in self.entries:
+                file_path = (project_root / key[0]).resolve()
+                if not any(file_path == target or target in file_path.parents for target in targets):
+                    keys.append(key)
+
+        violations = [dict(zip(self.FIELDS, key)) for key in sorted(keys, key=lambda key: tuple(map(str, key)))]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(self.HEADER)
+            dump_yaml({'violations': violations}, f)
+        return len(violations)
+
+
+def format_violation(file_path, violation):
+    """違反1件を表示用の文字列にする"""
+    target = violation['table']
+    if violation['column'] is not None:
+        target = f"{target}.{violation['column']}"
+    return f"{file_path}: {target}: [{violation['rule']}] {violation['message']}"
+
+
+def lint_with_daemon(client, paths, started, baseline):
+    """naming daemon にlintを依頼して結果を表示（返り値は終了コード）"""
+    yaml_files = list(iter_table_files(paths))
+    response = client.call('lint_files', files=[str(Path(f).resolve()) for f in yaml_files])
+    client.close()
+
+    identifier_count = 0
+    violation_count = 0
+    for yaml_file, result in zip(yaml_files, response['results']):
+        if 'error' in result:
+            print(f"{yaml_file}: 読み込みエラー: {result['error']}")
+            violation_count += 1
+            continue
+        identifier_count += result['identifiers']
+        for violation in result['violations']:
+            if baseline.consume(yaml_file, violation):
+                continue
+            print(format_violation(yaml_file, violation))
+            violation_count += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"\nlint完了: {len(yaml_files)}ファイル / {identifier_count}識別子 / 違反 {violation_count}件"
+          f" ({elapsed:.3f}s, naming daemon)")
+    print_baseline_summary(baseline)
+    return 1 if violation_count else 0
+
+
+def print_baseline_summary(baseline):
+    if baseline.matched:
+        print(f"既知の違反（{baseline.path.name}）: {baseline.matched}件")
+
+
+class TableWatcher:
+    """--watch の状態（ルール・辞書とファイルごとの結果をメモリに保持）"""
+
+    def __init__(self, paths, config, dictionary, rename_dictionary=None, rename_output=None):
+        self.paths = [Path(path).resolve() for path in paths]
+        self.config = Path(config).resolve()
+        self.dictionary = Path(dictionary).resolve()
+        self.rename_dictionary = Path(rename_dictionary).resolve() if rename_output else None
+        self.rename_output = Path(rename_output).resolve() if rename_output else None
+        self.results = {}     # パス → 違反リスト
+        self.outputs = {}     # パス → 変換後のファイル
+        self.load_rules()
+        self.load_rename_dictionary()
+
+    def load_rules(self):
+        self.rules = load_rules(self.config, self.dictionary)
+        self.rename_rules = None
+        if self.rename_output is not None:
+            from rename_rules import load_rename_rules
+            self.rename_rules = load_rename_rules(self.dictionary)
+
+    def load_rename_dictionary(self):
+        self.rename_dict = None
+        if self.rename_dictionary is not None:
+            from yaml_rename import load_rename_dictionary
+            self.rename_dict = load_rename_dictionary(self.rename_dictionary)
+
+    def rename_paths(self):
+        """変換辞書として監視するパス（本体・ジャーナル・シャード）"""
+        if self.rename_dictionary is None:
+            return []
+        from rename_journal import journal_path_for
+        from rename_shards import shard_dir_for
+        paths = [self.rename_dictionary, journal_path_for(self.rename_dictionary)]
+        if shard_dir_for(self.rename_dictionary).is_dir():
+            paths.append(shard_dir_for(self.rename_dictionary))
+        return paths
+
+    def watch_paths(self):
+        return self.paths + [self.config, self.dictionary] + self.rename_paths()
+
+    def exclude_paths(self):
+        """監視しないパス（変換の出力先が監視対象の中にあっても、書き出しを変更として拾わない）"""
+        return [self.rename_output] if self.rename_output is not None else []
+
+    def is_rename_output(self, path):
+        return self.rename_output is not None and (path == self.rename_output or self.rename_output in path.parents)
+
+    def is_table_file(self, path):
+        if path.suffix != '.yaml' or self.is_rename_output(path):
+            return False
+        return any(path == root or (root.is_dir() and root in path.parents) for root in self.paths)
+
+    def is_rename_file(self, path):
+        return any(path == root or root in path.parents for root in self.rename_paths())
+
+    def process(self, path, lint=True, rename=True):
+        """
+        1ファイルをチェック・変換する
+        返り値: 表示する行のリスト（結果が前回と同じなら空）
+        """
+        if not path.exists():
+            self.results.pop(path, None)
+            self.outputs.pop(path, None)
+            return [f"{path}: 削除されました"]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            yaml_data = load_yaml_text(f.read())
+        if not isinstance(yaml_data, dict) or 'table_name' not in yaml_data:
+            return []
+
+        lines = []
+        if lint:
+            violations = lint_table(yaml_data, self.rules)
+            if violations != self.results.get(path):
+                self.results[path] = violations
+                lines.append(f"{path}: 違反 {len(violations)}件")
+                lines.extend(f"  {format_violation(path, violation)}" for violation in violations)
+
+        if rename and self.rename_dict is not None:
+            from yaml_rename import process_table_data, render_converted_yaml, write_converted_text
+            converted, _, _, new_table = process_table_data(yaml_data, self.rename_dict, path.name,
+                                                            self.rename_rules)
+            output_file = self.rename_output / f"{new_table}.yaml"
+            text = render_converted_yaml(converted)
+            # 内容が同じなら書き込まない（出力先を監視している別のツールに変更を通知しない）
+            if not output_file.exists() or output_file.read_text(encoding='utf-8') != text:
+                write_converted_text(text, output_file)
+            if output_file != self.outputs.get(path):
+                self.outputs[path] = output_file
+                lines.append(f"{path}: → 変換: {output_file}")
+        return lines
+
+    def process_all(self, lint=True, rename=True):
+        lines = []
+        for yaml_file in iter_table_files(self.paths):
+            yaml_file = Path(yaml_file).resolve()
+            if self.is_rename_output(yaml_file):
+                continue
+            try:
+                lines.extend(self.process(yaml_file, lint, rename))
+            except Exception as e:
+                lines.append(f"{yaml_file}: 読み込みエラー: {e}")
+        return lines
+
+    def handle(self, changed):
+        """変更のあったパスを処理して、表示する行のリストを返す"""
+        lines = []
+        rules_changed = bool({self.config, self.dictionary} & changed)
+        rename_changed = any(self.is_rename_file(path) for path in changed)
+
+        if rules_changed:
+            self.load_rules()
+            lines.append("lint設定・命名辞書が変わりました: 全ファイルをチェックし直します")
+        if rename_changed:
+            self.load_rename_dictionary()
+            lines.append("変換辞書が変わりました: 全ファイルを変換し直します")
+        if rules_changed or rename_changed:
+            lines.extend(self.process_all(lint=rules_changed, rename=rules_changed or rename_changed))
+
+        for path in sorted(changed):
+            if self.is_table_file(path) and not (rules_changed and path.exists()):
+                try:
+                    lines.extend(self.process(path))
+                except Exception as e:
+                    lines.append(f"{path}: 読み込みエラー: {e}")
+        return lines
+
+    def violation_count(self):
+        return sum(len(violations) for violations in self.results.values())
+
+
+def watch(args):
+    """--watch: 保存されたファイルだけをチェックし直し続ける"""
+    from file_watch import iter_changes, open_watcher
+
+    started = time.perf_counter()
+    state = TableWatcher(args.paths, args.config, args.dictionary,
+                         rename_dictionary=args.rename_dictionary, rename_output=args.rename_output)
+    for line in state.process_all():
+        print(line)
+    print(f"\nlint完了: {len(state.results)}ファイル / 違反 {state.violation_count()}件"
+          f" ({time.perf_counter() - started:.3f}s)")
+
+    watcher = open_watcher(state.watch_paths(), polling=args.poll, exclude=state.exclude_paths())
+    print(f"監視中（{watcher.kind}）: {', '.join(str(path) for path in state.paths)}  Ctrl-C で終了", flush=True)
+    try:
+        for changed in iter_changes(watcher, debounce=args.debounce):
+            started = time.perf_counter()
+            lines = state.handle(changed)
+            if not lines:
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"\n[{time.strftime('%H:%M:%S')}] {len(changed)}件の変更 ({elapsed_ms:.1f}ms)"
+                  f" / 違反 合計 {state.violation_count()}件")
+            for line in lines:
+                print(line)
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("\n監視を終了しました")
+    finally:
+        watcher.close()
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='テーブル定義YAMLの命名規約チェック')
+    parser.add_argument('paths', nargs='*', default=[project_root / 'schema/tables'],
+                        help='チェック対象のYAMLファイルまたはディレクトリ（既定: schema/tables）')
+    parser.add_argument('--config', default=project_root / 'lint/lint_config.yaml',
+                        help='lint設定ファイル')
+    parser.add_argument('--dictionary', default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='命名辞書ファイル')
+    parser.add_argument('--cache', default=project_root / 'schema/derived/lint_cache/lint_cache.json',
+                        help='結果キャッシュのパス')
+    parser.add_argument('--no-cache', action='store_true', help='キャッシュを使わずに全件チェックする')
+    parser.add_argument('--baseline', default=project_root / 'lint/lint_baseline.yaml',
+                        help='既知の違反の一覧（ここにある違反では失敗しない）')
+    parser.add_argument('--no-baseline', action='store_true', help='baseline を使わずにすべての違反を報告する')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='今回見つかった違反で baseline を書き直す（終了コードは0）')
+    parser.add_argument('--no-daemon', action='store_true', help='naming daemon を使わずにチェックする')
+    parser.add_argument('--watch', action='store_true', help='対象パスを監視し、保存されたファイルをチェックし直す')
+    parser.add_argument('--debounce', type=float, default=0.03, help='--watch で保存の連続をまとめる秒数')
+    parser.add_argument('--poll', action='store_true', help='--watch で inotify を使わずポーリングする')
+    parser.add_argument('--rename-output', type=Path, metavar='DIR',
+                        help='--watch で保存されたファイルを変換して書き出すディレクトリ')
+    parser.add_argument('--rename-dictionary', default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='--rename-output で使う変換辞書')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(args)
+        return
+
+    started = time.perf_counter()
+    session = instrumentation.start('lint_names', args)
+    baseline = Baseline(None if args.no_baseline else args.baseline, load=not args.update_baseline)
+
+    # 計測時はこのプロセス内の処理を測るためサーバーを使わない
+    if not args.no_daemon and not instrumentation.enabled():
+        from naming_daemon import connect
+        client = connect(config=args.config, dictionary=args.dictionary)
+        if client is not None:
+            exit_code = lint_with_daemon(client, args.paths, started, baseline)
+            if args.update_baseline:
+                saved = baseline.save(args.paths)
+                print(f"baseline を更新しました: {saved}件 → {args.baseline}")
+                exit_code = 0
+            sys.exit(exit_code)
+
+    with instrumentation.phase('load_rules'):
+        rules = load_rules(args.config, args.dictionary)
+
+    rules_key = rules_digest(args.config, args.dictionary)
+    cache = {'rules_digest': rules_key, 'files': {}}
+    if not args.no_cache:
+        cache = load_lint_cache(args.cache, rules_key)
+    cached_files = cache['files']
+    fresh_files = {}
+
+    file_count = 0
+    identifier_count = 0
+    violation_count = 0
+    cache_hits = 0
+
+    scanned_files = []
+    for yaml_file in iter_table_files(args.paths):
+        file_count += 1
+        cache_key = str(Path(yaml_file).resolve())
+        scanned_files.append(cache_key)
+        try:
+            with instrumentation.track_file(yaml_file):
+                with instrumentation.phase('read'):
+                    with open(yaml_file, 'rb') as f:
+                        content = f.read()
+                content_digest = hashlib.sha256(content).hexdigest()
+
+                entry = cached_files.get(cache_key)
+                if entry is not None and entry['sha256'] == content_digest:
+                    cache_hits += 1
+                else:
+                    file_identifiers, violations = lint_text(content.decode('utf-8'), rules)
+                    entry = {'sha256': content_digest, 'identifiers': file_identifiers,
+                             'violations': violations}
+                fresh_files[cache_key] = entry
+        except Exception as e:
+            print(f"{yaml_file}: 読み込みエラー: {e}")
+            violation_count += 1
+            continue
+
+        identifier_count += entry['identifiers']
+        for violation in entry['violations']:
+            if baseline.consume(yaml_file, violation):
+                continue
+            print(format_violation(yaml_file, violation))
+            violation_count += 1
+
+    elapsed = time.perf_counter() - started
+
+    # 同じ対象ファイルでキャッシュなしで走った直近の実行時間（ウォーム実行との比較用）
+    cold_runs = cache.get('cold_runs', {})
+    file_set = file_set_digest(scanned_files)
+    cold_run = cold_runs.pop(file_set, None)
+    if cache_hits == 0 and file_count:
+        cold_run = {'seconds': elapsed, 'files': file_count}
+    if cold_run is not None:
+        cold_runs[file_set] = cold_run
+    cold_runs = dict(list(cold_runs.items())[-COLD_RUN_LIMIT:])
+
+    if not args.no_cache:
+        save_lint_cache(args.cache, {'rules_digest': rules_key, 'cold_runs': cold_runs,
+                                     'files': prune_lint_cache(cached_files, fresh_files, args.paths)})
+
+    print(f"\nlint完了: {file_count}ファイル / {identifier_count}識別子 / 違反 {violation_count}件"
+          f" ({elapsed:.3f}s)")
+    print_baseline_summary(baseline)
+    if not args.no_cache:
+        print(f"キャッシュ: ヒット {cache_hits} / 再チェック {file_count - cache_hits}")
+        if cold_run:
+            print(f"実行時間: 今回 {elapsed:.3f}s / キャッシュなし時 {cold_run['seconds']:.3f}s"
+                  f" ({cold_run['files']}ファイル)")
+
+    if args.update_baseline:
+        saved = baseline.save(args.paths)
+        print(f"baseline を更新しました: {saved}件 → {args.baseline}")
+        violation_count = 0
+
+    instrumentation.count('cache_hits', cache_hits)
+    session.finish(extra={'identifiers': identifier_count, 'violations': violation_count,
+                          'baseline_matched': baseline.matched})
+    sys.exit(1 if violation_count else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+命名辞書・lint設定・変換辞書をメモリに保持して問い合わせに答える常駐サーバー
+
+Usage: python naming_daemon.py serve [--socket PATH]   # 起動（フォアグラウンド）
+       python naming_daemon.py status [--socket PATH]  # 起動状態の確認
+       python naming_daemon.py stop [--socket PATH]    # 停止
+
+Socket: schema/derived/naming_daemon/naming_daemon.sock（環境変数 NAMING_DAEMON_SOCKET で変更可）
+
+プロトコル: Unixソケット上で1行1件のJSON（リクエスト/レスポンスとも）。1接続で複数件送ってよい。
+  {"op": "ping"}
+  {"op": "lint", "tables": [{"table_name": ..., "columns": [...]}]}
+  {"op": "lint_files", "files": ["/abs/path.yaml", ...]}
+  {"op": "rename", "table": "old_table", "columns": ["old_col", ...]}
+  {"op": "rename_dict_subset", "tables": ["old_table", ...]}
+rename は変換辞書 → 命名辞書の migration ルール（rename_rules.py）の順に変換した名前を返す。
+rename_dict_subset は対象テーブル分の変換辞書と、ルール（migration_rules。RenameRules(**spec) で戻す）を返す。
+  {"op": "shutdown"}
+レスポンスは {"ok": true, ...} または {"ok": false, "error": "..."}。
+
+辞書ファイルの更新時刻・サイズをリクエストごとに確認し、変わっていれば読み込み直す。
+lint_names.py / yaml_rename_specific.py はサーバーが起動していれば自動的にこれを使う。
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+from lint_names import lint_table, lint_text, load_rules
+from rename_journal import journal_path_for
+from rename_rules import load_rename_rules
+from rename_shards import shard_dir_for
+from yaml_rename import load_rename_dictionary, resolve_column_name, resolve_table_name
+
+
+SOCKET_ENV = 'NAMING_DAEMON_SOCKET'
+CLIENT_TIMEOUT = 5.0
+
+
+def default_socket_path():
+    """既定のソケットの場所"""
+    if os.environ.get(SOCKET_ENV):
+        return Path(os.environ[SOCKET_ENV])
+    project_root = Path(__file__).parent.parent
+    return project_root / 'schema/derived/naming_daemon/naming_daemon.sock'
+
+
+def default_paths():
+    """サーバーが読み込む設定ファイル（lint_names.py / yaml_rename.py の既定と同じ）"""
+    project_root = Path(__file__).parent.parent
+    return {
+        'config': project_root / 'lint/lint_config.yaml',
+        'dictionary': project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+        'rename_dictionary': project_root / 'dictionary/rename_dictionary.yaml',
+    }
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stamp_if_exists(path):
+    try:
+        return _stamp(path)
+    except FileNotFoundError:
+        return None
+
+
+def _stamp_dir(directory):
+    """ディレクトリ内の全ファイルの更新時刻・サイズ（ディレクトリがなければNone）"""
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return None
+    return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                        for entry in entries if entry.is_file()))
+
+
+class NamingState:
+    """読み込み済みのルール・辞書（ファイルが変わったら読み込み直す）"""
+
+    def __init__(self, config, dictionary, rename_dictionary):
+        self.paths = {
+            'config': Path(config).resolve(),
+            'dictionary': Path(dictionary).resolve(),
+            'rename_dictionary': Path(rename_dictionary).resolve(),
+        }
+        self.lock = threading.Lock()
+        self.stamps = None
+        self.rules = None
+        self.rename_rules = None
+        self.rename_dict = None
+        self.loaded_at = None
+        self.reload_count = 0
+        # lint_files の結果キャッシュ {path: ((mtime_ns, size), 識別子数, 違反)}
+        self.file_results = {}
+        self.refresh()
+
+    def refresh(self):
+        """ファイルの更新を確認し、必要なら読み込み直す"""
+        rename_dictionary = self.paths['rename_dictionary']
+        stamps = {
+            'config': _stamp(self.paths['config']),
+            'dictionary': _stamp(self.paths['dictionary']),
+            # シャードだけの構成では rename_dictionary.yaml がないことがある
+            'rename_dictionary': _stamp_if_exists(rename_dictionary),
+            # 変更ジャーナル（rename_journal.py）への追記と、シャード（rename_shards.py の
+            # 索引・各シャード）の書き換えでも読み込み直す
+            'rename_journal': _stamp_if_exists(journal_path_for(rename_dictionary)),
+            'rename_shards': _stamp_dir(shard_dir_for(rename_dictionary)),
+        }
+        if stamps == self.stamps:
+            return False
+
+        with self.lock:
+            if stamps == self.stamps:
+                return False
+            rules = load_rules(self.paths['config'], self.paths['dictionary'])
+            rename_rules = load_rename_rules(self.paths['dictionary'])
+            rename_dict = load_rename_dictionary(self.paths['rename_dictionary'])
+            self.rules, self.rename_rules, self.rename_dict = rules, rename_rules, rename_dict
+            self.file_results = {}
+            self.stamps = stamps
+            self.loaded_at = time.time()
+            self.reload_count += 1
+            print(f"辞書を読み込みました（{self.reload_count}回目）", flush=True)
+            return True
+
+    def lint_files(self, files):
+        """ファイル群をlintする（内容が変わっていないファイルは前回の結果を返す）"""
+        results = []
+        for file_name in files:
+            path = str(Path(file_name).resolve())
+            try:
+                stamp = _stamp(path)
+                cached = self.file_results.get(path)
+                if cached is not None and cached[0] == stamp:
+                    identifiers, violations = cached[1], cached[2]
+                else:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        identifiers, violations = lint_text(f.read(), self.rules)
+                    self.file_results[path] = (stamp, identifiers, violations)
+                results.append({'file': file_name, 'identifiers': identifiers, 'violations': violations})
+            except Exception as e:
+                results.append({'file': file_name, 'error': str(e)})
+        return results
+
+    def rename_dict_subset(self, table_names):
+        """指定テーブルに関係する変換ルールだけを取り出す（yaml_rename の rename_dict と同じ形）"""
+        tables = self.rename_dict.get('tables', {})
+        columns = self.rename_dict.get('columns', {})
+        subset = {'tables': {}, 'columns': {}}
+        for table_name in table_names:
+            if table_name in tables:
+                subset['tables'][table_name] = {'new': tables[table_name]['new']}
+            if table_name in columns:
+                subset['columns'][table_name] = {
+                    column_name: {'new': columns[table_name][column_name]['new']}
+                    for column_name in columns[table_name]
+                }
+        return subset
+
+
+def handle_request(state, request):
+    """リクエスト1件を処理してレスポンスを返す"""
+    op = request.get('op')
+    state.refresh()
+
+    if op == 'ping':
+        return {'ok': True, 'pid': os.getpid(), 'loaded_at': state.loaded_at,
+                'reload_count': state.reload_count,
+                'paths': {name: str(path) for name, path in state.paths.items()}}
+
+    if op == 'lint':
+        return {'ok': True, 'results': [lint_table(table, state.rules) for table in request.get('tables') or []]}
+
+    if op == 'lint_files':
+        return {'ok': True, 'results': state.lint_files(request.get('files') or [])}
+
+    if op == 'rename':
+        table_name = request.get('table', '')
+        return {'ok': True,
+                'table': resolve_table_name(table_name, state.rename_dict, state.rename_rules)[0],
+                'columns': {column_name: resolve_column_name(table_name, column_name, state.rename_dict,
+                                                             state.rename_rules)[0]
+                            for column_name in request.get('columns') or []}}
+
+    if op == 'rename_dict_subset':
+        return {'ok': True, 'rename_dict': state.rename_dict_subset(request.get('tables') or []),
+                'migration_rules': state.rename_rules.as_spec()}
+
+    return {'ok': False, 'error': f"不明な操作です: {op}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """1行1件のJSONを読み、1行1件のJSONを返す"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if request.get('op') == 'shutdown':
+                    self._send({'ok': True})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                response = handle_request(self.server.state, request)
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            self._send(response)
+
+    def _send(self, response):
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+class NamingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, state):
+        self.state = state
+        super().__init__(str(socket_path), _RequestHandler)
+
+
+class DaemonClient:
+    """サーバーへの接続（1接続で複数回問い合わせできる）"""
+
+    def __init__(self, socket_path=None, timeout=CLIENT_TIMEOUT):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(str(socket_path or default_socket_path()))
+        self.reader = self.sock.makefile('rb')
+
+    def call(self, op, **params):
+        """問い合わせてレスポンスを返す（エラー応答は RuntimeError）"""
+        self.sock.sendall(json.dumps({'op': op, **params}, ensure_ascii=False).encode('utf-8') + b'\n')
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('サーバーが接続を閉じました')
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', '不明なエラー'))
+        return response
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def connect(socket_path=None, **expected_paths):
+    """
+    サーバーが起動していれば接続を返す（起動していなければNone）
+    expected_paths（config / dictionary / rename_dictionary）を指定した場合、
+    サーバーが別のファイルを読み込んでいるときもNoneを返す
+    """
+    try:
+        client = DaemonClient(socket_path)
+        pong = client.call('ping')
+    except (OSError, ValueError, RuntimeError):
+        return None
+
+    for name, path in expected_paths.items():
+        if pong['paths'].get(name) != str(Path(path).resolve()):
+            client.close()
+            return None
+    return client
+
+
+def serve(socket_path, state):
+    """サーバーを起動（停止されるまで戻らない）"""
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if socket_path.exists():
+        client = connect(socket_path)
+        if client is not None:
+            client.close()
+            print(f"Error: 既に起動しています: {socket_path}")
+            sys.exit(1)
+        socket_path.unlink()  # 前回異常終了したときのソケットファイル
+
+    server = NamingServer(socket_path, state)
+    os.chmod(socket_path, 0o600)
+    print(f"naming daemon 起動: {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path.exists():
+            socket_path.unlink()
+        print("naming daemon 停止", flush=True)
+
+
+def main():
+    """メイン処理"""
+    paths = default_paths()
+
+    parser = argparse.ArgumentParser(description='命名ツールの常駐サーバー')
+    parser.add_argument('command', choices=['serve', 'status', 'stop'])
+    parser.add_argument('--socket', type=Path, default=default_socket_path(), help='ソケットのパス')
+    parser.add_argument('--config', default=paths['config'], help='lint設定ファイル')
+    parser.add_argument('--dictionary', default=paths['dictionary'], help='命名辞書ファイル')
+    parser.add_argument('--rename-dictionary', default=paths['rename_dictionary'], help='変換辞書ファイル')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.socket, NamingState(args.config, args.dictionary, args.rename_dictionary))
+        return
+
+    client = connect(args.socket)
+    if client is None:
+        print(f"naming daemon は起動していません: {args.socket}")
+        sys.exit(1)
+
+    if args.command == 'status':
+        started = time.perf_counter()
+        pong = client.call('ping')
+        latency = (time.perf_counter() - started) * 1000
+        print(f"naming daemon 起動中: pid {pong['pid']} / 読み込み {pong['reload_count']}回"
+              f" / 応答 {latency:.3f}ms")
+        for name, path in pong['paths'].items():
+            print(f"  {name}: {path}")
+    else:
+        client.call('shutdown')
+        print("naming daemon を停止しました")
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Excel のテーブル設計から変換後のYAMLまでを、中間ファイルを書かずに一度に作るスクリプト
+
+Input: tools/config/smds_poc/smds_dbdesign.xlsx
+Process: xlsx_to_yaml → yaml_rename（変換辞書＋migration ルール）→ add_audit_fields → lint_names
+Output: tools/config/streamedix/[新テーブル名].yaml
+
+Usage: python pipeline.py [--excel PATH] [--output-dir DIR] [--jobs N] [--queue-size N]
+                          [--dictionary PATH] [--naming-dictionary PATH] [--config PATH]
+                          [--no-migration-rules] [--no-audit] [--no-lint] [--debug-dump DIR]
+  --jobs N:        N個のワーカープロセスでシートを並列に読み込む（xlsx_to_yaml.py の --jobs と同じ）
+  --queue-size N:  ステージ間のキューに溜める最大テーブル数（既定: 8）
+  --no-audit:      監査フィールドを追加しない
+  --no-lint:       命名規約のチェックをしない
+  --debug-dump DIR: 途中の結果も書き出す
+                   DIR/structure/[テーブル名].yaml    xlsx_to_yaml.py の出力と同じもの
+                   DIR/rename/[新テーブル名].yaml     yaml_rename.py の出力と同じもの
+  --timings / --profile: 処理時間の計測（instrumentation.py）。フェーズ名はステージ名
+
+xlsx_to_yaml.py → yaml_rename.py → add_audit_fields.py を順に実行すると、テーブルごとに
+YAMLの書き出しと読み直しを3回繰り返す。ここではテーブル定義をdictのままステージに流し、
+書き出すのは最後の整形結果だけにする。ステージはそれぞれ1つのスレッドで動き、
+大きさに上限のあるキューでつながる（シートの読み込み中に前のテーブルの変換・書き出しが進み、
+遅いステージがあっても溜まるのはキューの分だけ）。テーブルは読み込んだ順に書き出す。
+出力は3つのツールを順に実行した結果と同じ（conversion_info.source_file も xlsx_to_yaml.py が
+書き出すファイル名にする）。あるステージで失敗したテーブルは以降のステージを飛ばしてエラーとして報告する。
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+import instrumentation
+from add_audit_fields import inject_columns, load_injection_rules
+from lint_names import load_rules as load_lint_rules, lint_table
+from rename_rules import load_rename_rules
+from rename_shards import has_shards
+from xlsx_to_yaml import create_yaml_structure, iter_table_sheets, save_yaml
+from yaml_rename import (load_rename_dictionary, process_table_data, render_converted_yaml,
+                         save_converted_yaml, write_converted_text)
+
+
+DEFAULT_QUEUE_SIZE = 8
+
+# ステージの終わりを次のステージに伝える印
+_END = object()
+
+
+def structure_stage(debug_dir=None):
+    """シートの内容をテーブル定義（xlsx_to_yaml.py が書き出すYAMLと同じ構造）にする"""
+    def structure(item):
+        item['data'] = create_yaml_structure(item.pop('table_info'))
+        item['yaml_name'] = f"{item['data']['table_name']}.yaml"
+        if debug_dir is not None:
+            save_yaml(item['data'], debug_dir / 'structure' / item['yaml_name'])
+    return structure
+
+
+def rename_stage(rename_dict, rules=None, debug_dir=None):
+    """変換辞書と migration ルールで新命名にする（yaml_rename.py と同じ処理）"""
+    def rename(item):
+        data, stats, original_table, new_table = process_table_data(item['data'], rename_dict,
+                                                                    item['yaml_name'], rules)
+        item.update(data=data, original_table=original_table, new_table=new_table,
+                    columns_converted=stats['columns_converted'])
+        if debug_dir is not None:
+            save_converted_yaml(data, debug_dir / 'rename' / f"{new_table}.yaml")
+    return rename
+
+
+def audit_stage(injection_rules):
+    """命名辞書で宣言されたカラムを追加する（add_audit_fields.py と同じ処理）"""
+    def audit(item):
+        columns = item['data'].get('columns')
+        if columns:
+            item['data']['columns'], item['added'] = inject_columns(columns, injection_rules)
+    return audit
+
+
+def lint_stage(lint_rules):
+    """命名規約でチェックする（lint_names.py と同じ処理）"""
+    def lint(item):
+        item['violations'] = lint_table(item['data'], lint_rules)
+    return lint
+
+
+def render_stage(output_dir):
+    """出力するYAMLの文字列にする"""
+    def render(item):
+        item['text'] = render_converted_yaml(item['data'])
+        item['output_file'] = output_dir / f"{item['new_table']}.yaml"
+    return render
+
+
+def _run_source(parsed_sheets, outbox, stats, failures):
+    """シートを読み込んで最初のキューに入れる"""
+    try:
+        iterator = iter(parsed_sheets)
+        while True:
+            started = time.perf_counter()
+            with instrumentation.phase('read'):
+                parsed = next(iterator, None)
+            if parsed is None:
+                break
+            stats['busy'] += time.perf_counter() - started
+            stats['items'] += 1
+            sheet_name, table_info, error = parsed
+            outbox.put({'sheet': sheet_name, 'table_info': table_info, 'error': error})
+    except BaseException as e:
+        failures.append(e)
+    finally:
+        outbox.put(_END)
+
+
+def _run_stage(name, func, inbox, outbox, stats):
+    """前のキューから取り出した項目を処理して次のキューに入れる（失敗した項目はそのまま流す）"""
+    while True:
+        item = inbox.get()
+        if item is _END:
+            outbox.put(_END)
+            return
+        if item.get('error') is None:
+            started = time.perf_counter()
+            try:
+                with instrumentation.phase(name):
+                    func(item)
+            except Exception as e:
+                item['error'] = f"{name}: {e}"
+            stats['busy'] += time.perf_counter() - started
+            stats['items'] += 1
+        outbox.put(item)
+
+
+def iter_pipeline(parsed_sheets, stages, queue_size=DEFAULT_QUEUE_SIZE, stage_stats=None):
+    """
+    iter_table_sheets の結果を stages（[(ステージ名, 関数)]）に順に流し、
+    最後のステージを出た項目を読み込み順に返す
+    項目はdict（sheet / data / error と各ステージが追加した値）。関数は項目を直接変更する
+    stage_stats を渡すと、ステージ名ごとの {'items', 'busy'}（処理時間の合計秒）を記録する
+    """
+    if stage_stats is None:
+        stage_stats = {}
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    failures = []
+
+    stage_stats['read'] = {'items': 0, 'busy': 0.0}
+    threads = [threading.Thread(target=_run_source, name='read', daemon=True,
+                                args=(parsed_sheets, queues[0], stage_stats['read'], failures))]
+    for index, (name, func) in enumerate(stages):
+        stage_stats[name] = {'items': 0, 'busy': 0.0}
+        threads.append(threading.Thread(target=_run_stage, name=name, daemon=True,
+                                        args=(name, func, queues[index], queues[index + 1], stage_stats[name])))
+    for thread in threads:
+        thread.start()
+
+    outbox = queues[-1]
+    while True:
+        item = outbox.get()
+        if item is _END:
+            break
+        yield item
+
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise failures[0]
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='Excelのテーブル設計から変換後のYAMLを中間ファイルなしで作成')
+    parser.add_argument('--excel', type=Path, default=project_root / 'tools/config/smds_poc/smds_dbdesign.xlsx',
+                        help='テーブル設計ブック')
+    parser.add_argument('--output-dir', type=Path, default=project_root / 'tools/config/streamedix',
+                        help='出力ディレクトリ')
+    parser.add_argument('--jobs', type=int, default=1, help='シート読み込みの並列ワーカー数')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='ステージ間のキューの大きさ（テーブル数）')
+    parser.add_argument('--dictionary', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書')
+    parser.add_argument('--naming-dictionary', type=Path,
+                        default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='命名辞書（migration ルール・追加カラム・禁止語）')
+    parser.add_argument('--config', type=Path, default=project_root / 'lint/lint_config.yaml', help='lint設定')
+    parser.add_argument('--term', default='AUDIT_COLUMNS', help='追加カラムを宣言している辞書のterm id')
+    parser.add_argument('--no-migration-rules', action='store_true', help='命名辞書の migration ルールを適用しない')
+    parser.add_argument('--no-audit', action='store_true', help='監査フィールドを追加しない')
+    parser.add_argument('--no-lint', action='store_true', help='命名規約のチェックをしない')
+    parser.add_argument('--debug-dump', type=Path, metavar='DIR', help='途中の結果を書き出すディレクトリ')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('pipeline', args)
+
+    for path in [args.excel, args.naming_dictionary] + ([] if args.no_lint else [args.config]):
+        if not path.exists():
+            print(f"Error: {path} が見つかりません")
+            sys.exit(1)
+    if not args.dictionary.exists() and not has_shards(args.dictionary):
+        print(f"Error: {args.dictionary} が見つかりません")
+        sys.exit(1)
+
+    started = time.perf_counter()
+
+    # ルール・辞書は最初に一度だけ読み込み、すべてのテーブルで共有する
+    with instrumentation.phase('load_dictionary'):
+        rename_dict = load_rename_dictionary(args.dictionary)
+    if not isinstance(rename_dict, dict) or 'tables' not in rename_dict:
+        print("Error: 変換辞書の形式が不正です")
+        sys.exit(1)
+    with instrumentation.phase('load_rules'):
+        rules = None if args.no_migration_rules else load_rename_rules(args.naming_dictionary)
+        injection_rules = None if args.no_audit else load_injection_rules(args.naming_dictionary, args.term)
+        lint_rules = None if args.no_lint else load_lint_rules(args.config, args.naming_dictionary)
+
+    stages = [('structure', structure_stage(args.debug_dump)),
+              ('rename', rename_stage(rename_dict, rules, args.debug_dump))]
+    if injection_rules is not None:
+        stages.append(('audit', audit_stage(injection_rules)))
+    if lint_rules is not None:
+        stages.append(('lint', lint_stage(lint_rules)))
+    stages.append(('render', render_stage(args.output_dir)))
+
+    print(f"Excelファイルを読み込み中: {args.excel}")
+    print(f"ステージ: read → {' → '.join(name for name, _ in stages)} → write")
+    if rules is not None:
+        print(f"migration ルール: {len(rules)}件（{args.naming_dictionary.name}）")
+    try:
+        target_sheets, parsed_sheets = iter_table_sheets(args.excel, jobs=args.jobs)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"変換対象シート: {len(target_sheets)}個")
+
+    summary = {'sheets': len(target_sheets), 'success_count': 0, 'failed_count': 0,
+               'table_renamed': 0, 'columns_renamed': 0, 'columns_added': 0, 'violations': 0}
+    stage_stats = {}
+    write_stats = {'items': 0, 'busy': 0.0}
+
+    try:
+        for item in iter_pipeline(parsed_sheets, stages, args.queue_size, stage_stats):
+            if item['error'] is not None:
+                summary['failed_count'] += 1
+                print(f"\nエラー: {item['sheet']}: {item['error']}")
+                continue
+
+            write_started = time.perf_counter()
+            write_converted_text(item['text'], item['output_file'])
+            write_stats['busy'] += time.perf_counter() - write_started
+            write_stats['items'] += 1
+
+            summary['success_count'] += 1
+            if item['original_table'] != item['new_table']:
+                summary['table_renamed'] += 1
+            summary['columns_renamed'] += item['columns_converted']
+            added = item.get('added') or []
+            summary['columns_added'] += len(added)
+            violations = item.get('violations') or []
+            summary['violations'] += len(violations)
+
+            print(f"\n{item['sheet']}: {item['original_table']} → {item['new_table']}"
+                  f"（カラム変換 {item['columns_converted']}"
+                  + (f" / 追加 {', '.join(added)}" if added else '')
+                  + (f" / 違反 {len(violations)}件" if violations else '') + "）")
+            print(f"  → 保存: {item['output_file']}")
+            for violation in violations:
+                target = item['new_table'] if violation['column'] is None else f"{item['new_table']}.{violation['column']}"
+                print(f"  {target}: [{violation['rule']}] {violation['message']}")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    stage_stats['write'] = write_stats
+    elapsed = time.perf_counter() - started
+
+    print(f"\n=== 変換完了 ===")
+    print(f"成功: {summary['success_count']}/{summary['sheets']}個（エラー {summary['failed_count']}個）")
+    print(f"テーブル名変換: {summary['table_renamed']}個")
+    print(f"カラム名変換: {summary['columns_renamed']}個")
+    if injection_rules is not None:
+        print(f"追加カラム: {summary['columns_added']}個")
+    if lint_rules is not None:
+        print(f"命名規約の違反: {summary['violations']}件")
+    print(f"出力ディレクトリ: {args.output_dir}")
+    if args.debug_dump is not None:
+        print(f"途中の結果: {args.debug_dump}/{{structure,rename}}")
+    print(f"\nステージ別の処理時間（合計 {elapsed:.3f}s）:")
+    for name, stats in stage_stats.items():
+        print(f"  {name:<10} {stats['busy']:8.3f}s  {stats['items']}件")
+
+    session.finish(extra={'pipeline': summary, 'stages': stage_stats, 'elapsed': elapsed})
+    if summary['failed_count']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
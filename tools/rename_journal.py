@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+rename_dictionary.yaml の変更ジャーナル（追記専用のJSONL）
+
+Journal: dictionary/rename_dictionary.journal.jsonl（変換辞書と同じ場所）
+  1行1件の変更 {"seq", "at", "source", "op", "table", "column", "before", "after"}
+  - op: add / modify / remove（column が null ならテーブルの変換ルール）
+  - before / after: 変更前後の変換ルール（{'new', 'description'}。add の before と remove の after は null）
+  - op が compact の行は圧縮の印（それ以前の変更は rename_dictionary.yaml、シャードがあればシャードに反映済み）
+
+Usage: python rename_journal.py log [--since SEQ]   ジャーナルの一覧
+       python rename_journal.py compact             ジャーナルを rename_dictionary.yaml（シャードがあれば
+                                                    変更のあったシャードと索引）に反映して空にする
+       python rename_journal.py rollback SEQ        SEQ の時点（SEQ の変更の直後）の状態に戻す
+
+update_rename_dictionary.py は辞書全体（シャードでも）を書き直さず、追加した項目だけをジャーナルに追記する。
+書き込み量は変更の件数に比例し、辞書の大きさによらない。
+load_rename_dictionary（yaml_rename.py）などの読み込みは rename_dictionary.yaml に
+ジャーナルを重ねた内容を返す。各行は変更後の値そのものを持つため、同じ行を2回適用しても結果は同じ。
+変換辞書がシャード（rename_shards.py）に分かれていれば、索引の journal_seq より後の変更を
+シャードを読み込むときにそのシャードの分だけ重ねる（JournaledShardStore）。
+シャードより後に rename_dictionary.yaml へ compact された、またはジャーナルが索引の journal_seq より
+古い場合は、変更を落とさないよう ValueError にする。
+rollback は SEQ より後の変更を打ち消す行（逆の変更）を新しい順に追記するだけで、
+既存の行は書き換えない（rollback 自体も log に残り、さらに rollback できる）。
+compact より前の時点には戻せない。
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from rename_shards import (DEFAULT_CACHE_SIZE, ShardStore, has_shards, join_store, rename_dictionary_view,
+                           shard_dir_for, table_group, write_shard, write_shard_index)
+from yaml_io import dump_yaml, load_yaml
+
+
+COMPACT_OP = 'compact'
+INVERSE_OPS = {'add': 'remove', 'remove': 'add', 'modify': 'modify'}
+
+
+def journal_path_for(rename_dict_path):
+    """rename_dictionary.yaml に対応するジャーナルの場所"""
+    return Path(rename_dict_path).with_suffix('.journal.jsonl')
+
+
+def read_journal(journal_path):
+    """
+    ジャーナルを読み込む（ファイルがなければ空）
+    返り値: (行番号つきの変更 [(行番号, 変更)], 最後の compact の seq)
+            変更は最後の compact より後のものだけ
+    """
+    entries = []
+    compacted_seq = 0
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get('op') == COMPACT_OP:
+                    entries = []
+                    compacted_seq = entry['seq']
+                else:
+                    entries.append((line_number, entry))
+    except FileNotFoundError:
+        pass
+    return entries, compacted_seq
+
+
+def last_seq(journal_path):
+    """最後の行の seq（ファイルの末尾だけを読む）"""
+    try:
+        with open(journal_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            block = b''
+            position = end
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                block = f.read(step) + block
+                lines = block.rstrip(b'\n').split(b'\n')
+                if len(lines) > 1 or position == 0:
+                    last = lines[-1].strip()
+                    return json.loads(last)['seq'] if last else 0
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+def make_change(op, table, column, before, after):
+    """変更1件（seq / at / source は append_changes で付ける）"""
+    return {'op': op, 'table': table, 'column': column, 'before': before, 'after': after}
+
+
+def append_changes(journal_path, changes, source):
+    """
+    変更をジャーナルに追記する（書き込むのは追記分だけ）
+    返り値: 追記した変更（seq / at / source つき）
+    """
+    if not changes:
+        return []
+    seq = last_seq(journal_path)
+    at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    entries = []
+    for change in changes:
+        seq += 1
+        entries.append({'seq': seq, 'at': at, 'source': source, **change})
+
+    with instrumentation.phase('write'):
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+    return entries
+
+
+def apply_change(rename_dict, change):
+    """変更1件を変換辞書（通常のdict）に適用する"""
+    table, column, after = change['table'], change.get('column'), change.get('after')
+    if column is None:
+        tables = rename_dict.setdefault('tables', {})
+        if after is None:
+            tables.pop(table, None)
+        else:
+            tables[table] = after
+        return
+
+    columns = rename_dict.setdefault('columns', {})
+    if after is None:
+        table_columns = columns.get(table)
+        if table_columns:
+            table_columns.pop(column, None)
+            if not table_columns:
+                del columns[table]
+    else:
+        if columns.get(table) is None:
+            columns[table] = {}
+        columns[table][column] = after
+
+
+def apply_journal(rename_dict, journal_path):
+    """ジャーナルの未反映の変更を変換辞書に重ねる。返り値: 適用した件数"""
+    entries, _ = read_journal(journal_path)
+    for _, change in entries:
+        apply_change(rename_dict, change)
+    return len(entries)
+
+
+class JournaledShardStore(ShardStore):
+    """シャードを読み込むときに、索引の journal_seq より後のジャーナルの変更を重ねる ShardStore"""
+
+    def __init__(self, shard_dir, journal_path, cache_size=DEFAULT_CACHE_SIZE):
+        super().__init__(shard_dir, cache_size)
+        entries, compacted_seq = read_journal(journal_path)
+        base_seq = self.index.get('journal_seq') or 0
+        latest = entries[-1][1]['seq'] if entries else compacted_seq
+        if compacted_seq > base_seq:
+            raise ValueError(f"ジャーナルは seq {compacted_seq} まで rename_dictionary.yaml に compact 済みですが、"
+                             f"シャードは seq {base_seq} までしか反映していません"
+                             f"（{self.shard_dir.name} を削除して rename_shards.py split で作り直してください）")
+        if latest < base_seq:
+            raise ValueError(f"ジャーナル（最後の seq {latest}）がシャードの索引（journal_seq {base_seq}）より古いです")
+
+        # 変更をシャードごとに分ける（索引にないテーブルは split と同じグループのシャードに入れる）
+        self.pending = {}
+        for _, change in entries:
+            if change['seq'] <= base_seq:
+                continue
+            shard_name = self.table_shards.get(change['table'])
+            if shard_name is None:
+                shard_name = self.table_shards[change['table']] = table_group(change['table'], self.prefix_length)
+            self.pending.setdefault(shard_name, []).append(change)
+        self.journal_seq = max(base_seq, latest)
+
+    def load_shard(self, shard_name):
+        shard = super().load_shard(shard_name)
+        for change in self.pending.get(shard_name, ()):
+            apply_change(shard, change)
+        return shard
+
+
+def load_sharded_with_journal(rename_dict_path, cache_size=DEFAULT_CACHE_SIZE):
+    """シャードに分かれた変換辞書を、ジャーナルを重ねて読み込む（解析するのは索引とジャーナルだけ）"""
+    store = JournaledShardStore(shard_dir_for(rename_dict_path), journal_path_for(rename_dict_path), cache_size)
+    return rename_dictionary_view(store)
+
+
+def load_with_journal(rename_dict_path):
+    """
+    変換辞書の現在の内容（通常のdict）を返す
+    シャードがあればすべてのシャード、なければ rename_dictionary.yaml に、ジャーナルを重ねる
+    """
+    if has_shards(rename_dict_path):
+        with instrumentation.phase('journal'):
+            return join_store(JournaledShardStore(shard_dir_for(rename_dict_path), journal_path_for(rename_dict_path)))
+
+    rename_dict = load_yaml(rename_dict_path) or {}
+    with instrumentation.phase('journal'):
+        apply_journal(rename_dict, journal_path_for(rename_dict_path))
+    return rename_dict
+
+
+def _write_compact_marker(journal_path, seq):
+    """ジャーナルを compact の印1行に置き換える"""
+    marker = {'seq': seq, 'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'source': 'compact', 'op': COMPACT_OP}
+    temporary = journal_path.with_suffix('.jsonl.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(marker, ensure_ascii=False) + '\n')
+    os.replace(temporary, journal_path)
+
+
+def compact(rename_dict_path):
+    """
+    ジャーナルを rename_dictionary.yaml（シャードがあればシャード）に反映し、ジャーナルを compact の印1行にする
+    返り値: 反映した件数
+    """
+    rename_dict_path = Path(rename_dict_path)
+    if has_shards(rename_dict_path):
+        return compact_shards(rename_dict_path)
+
+    journal_path = journal_path_for(rename_dict_path)
+    entries, _ = read_journal(journal_path)
+    if not entries:
+        return 0
+
+    rename_dict = load_yaml(rename_dict_path) or {}
+    for _, change in entries:
+        apply_change(rename_dict, change)
+
+    # 辞書を置き換えてから印を書く（途中で止まっても、ジャーナルの再適用で同じ結果になる）
+    temporary = rename_dict_path.with_suffix('.yaml.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        dump_yaml(rename_dict, f)
+    os.replace(temporary, rename_dict_path)
+    _write_compact_marker(journal_path, entries[-1][1]['seq'])
+    return len(entries)
+
+
+def compact_shards(rename_dict_path):
+    """
+    ジャーナルを変更のあったシャードだけに反映し、索引の journal_seq を進めてジャーナルを compact の印1行にする
+    返り値: 反映した件数
+    """
+    journal_path = journal_path_for(rename_dict_path)
+    shard_dir = shard_dir_for(rename_dict_path)
+    store = JournaledShardStore(shard_dir, journal_path)
+    if store.journal_seq == (store.index.get('journal_seq') or 0):
+        return 0
+
+    # シャード → 索引 → 印の順に書く（途中で止まっても、索引の journal_seq より後の変更を重ね直すだけ）
+    for shard_name in sorted(store.pending):
+        write_shard(shard_dir, shard_name, store.shard(shard_name))
+    store.index['journal_seq'] = store.journal_seq
+    write_shard_index(shard_dir, store.index)
+    _write_compact_marker(journal_path, store.journal_seq)
+    return sum(len(changes) for changes in store.pending.values())
+
+
+def rollback(rename_dict_path, seq):
+    """
+    seq の変更の直後の状態に戻す（seq より後の変更を打ち消す行を追記する）
+    返り値: 追記した変更
+    """
+    journal_path = journal_path_for(rename_dict_path)
+    entries, compacted_seq = read_journal(journal_path)
+    if seq < compacted_seq:
+        raise ValueError(f"seq {seq} は compact（seq {compacted_seq}）より前のため戻せません")
+
+    changes = []
+    for _, change in reversed(entries):
+        if change['seq'] <= seq:
+            break
+        changes.append(make_change(INVERSE_OPS[change['op']], change['table'], change.get('column'),
+                                   change.get('after'), change.get('before')))
+    return append_changes(journal_path, changes, f'rollback:{seq}')
+
+
+def _format_entry(entry):
+    target = entry['table'] if entry.get('column') is None else f"{entry['table']}.{entry['column']}"
+    before = (entry.get('before') or {}).get('new')
+    after = (entry.get('after') or {}).get('new')
+    return f"{entry['seq']:>6} {entry['at']} {entry['op']:<6} {target}: {before} → {after}  ({entry['source']})"
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='rename_dictionary.yaml の変更ジャーナル')
+    parser.add_argument('command', choices=['log', 'compact', 'rollback'])
+    parser.add_argument('seq', nargs='?', type=int, help='rollback で戻す時点の seq')
+    parser.add_argument('--since', type=int, default=0, help='log で表示する seq の下限（これより後）')
+    parser.add_argument('--dictionary', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書ファイル')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('rename_journal', args)
+
+    journal_path = journal_path_for(args.dictionary)
+
+    if args.command == 'log':
+        entries, compacted_seq = read_journal(journal_path)
+        for _, entry in entries:
+            if entry['seq'] > args.since:
+                print(_format_entry(entry))
+        print(f"\n未反映の変更: {len(entries)}件（compact 済み: seq {compacted_seq} まで）")
+
+    elif args.command == 'compact':
+        try:
+            with instrumentation.phase('compact'):
+                count = compact(args.dictionary)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        target = shard_dir_for(args.dictionary) if has_shards(args.dictionary) else args.dictionary
+        print(f"ジャーナルを反映しました: {count}件 → {target}")
+
+    else:
+        if args.seq is None:
+            print("Error: rollback には戻す時点の seq を指定してください")
+            sys.exit(1)
+        try:
+            entries = rollback(args.dictionary, args.seq)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        for entry in entries:
+            print(_format_entry(entry))
+        print(f"\nseq {args.seq} の時点に戻しました（打ち消し {len(entries)}件）")
+
+    session.finish()
+
+
+if __name__ == '__main__':
+    main()
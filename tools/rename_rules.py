@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+命名辞書の migration ルール（ワイルドカード・トークン置換）を1つの照合器にコンパイルするモジュール
+
+Input: dictionary/naming_dictionary_v0.2.1.yaml の terms[].migration
+       - rename_columns: { from: "*_datetime", to: "*_at" } / { from: regdate, to: created_at }
+       - rename_tokens:  { from: medical_equipment, to: medical_device }
+Usage: python rename_rules.py [name ...]   ルール一覧の表示と、name に適用した結果の確認
+
+yaml_rename.py からは変換辞書（rename_dictionary.yaml）で変換が決まらない名前にだけ適用する。
+優先順位は次のとおりで、どこで決まったかを変換レポートに記録する。
+  1. 変換辞書の完全一致（new が旧名と異なるもの）          rule = 'rename_dictionary'
+  2. rename_columns（カラム名のみ。完全一致・ワイルドカードを宣言順に）
+  3. rename_tokens（テーブル名・カラム名。_ 区切りのトークン列として宣言順に）
+2 は全ルールを1つの正規表現の選択肢（名前付きグループ）にまとめて fullmatch を1回、
+3 は全トークンを1つの正規表現にまとめて sub を1回だけ行う（ルールごとに照合しない）。
+new が旧名のままの変換辞書の項目は「未決定」として扱い、ルールを適用する。
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from yaml_io import load_yaml
+
+
+class RenameRules:
+    """コンパイル済みの migration ルール"""
+
+    def __init__(self, column_rules, token_rules):
+        """
+        column_rules: [(rule_id, from, to)]  from / to の * はワイルドカード
+        token_rules:  [(rule_id, from, to)]
+        """
+        self.column_rules = list(column_rules)
+        self.token_rules = list(token_rules)
+
+        # rename_columns: 選択肢 r<i> ごとに * の部分を r<i>_<j> で取り出す
+        alternatives = []
+        self._column_targets = {}
+        for i, (rule_id, source, target) in enumerate(self.column_rules):
+            parts = source.split('*')
+            pattern = ''.join(
+                re.escape(part) + (f'(?P<r{i}_{j}>.+?)' if j < len(parts) - 1 else '')
+                for j, part in enumerate(parts))
+            alternatives.append(f'(?P<r{i}>{pattern})')
+            self._column_targets[f'r{i}'] = (rule_id, target.split('*'), len(parts) - 1)
+        self._column_regex = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+
+        # rename_tokens: _ 区切りのトークン境界で一致させる
+        self._tokens = {}
+        for rule_id, source, target in self.token_rules:
+            self._tokens.setdefault(source.lower(), (rule_id, target))
+        self._token_regex = None
+        if self._tokens:
+            words = '|'.join(re.escape(source) for _, source, _ in self.token_rules)
+            self._token_regex = re.compile(f'(?<![^_])(?:{words})(?![^_])', re.IGNORECASE)
+
+    def __len__(self):
+        return len(self.column_rules) + len(self.token_rules)
+
+    def as_spec(self):
+        """JSONにできる形（naming_daemon.py で送るため）。RenameRules(**spec) で元に戻せる"""
+        return {'column_rules': [list(rule) for rule in self.column_rules],
+                'token_rules': [list(rule) for rule in self.token_rules]}
+
+    def _match_column(self, name):
+        if self._column_regex is None:
+            return None
+        m = self._column_regex.fullmatch(name)
+        if m is None:
+            return None
+        group = m.lastgroup
+        rule_id, target_parts, wildcards = self._column_targets[group]
+        if wildcards == 0 or len(target_parts) == 1:
+            return ''.join(target_parts), rule_id
+        captured = [m.group(f'{group}_{j}') for j in range(wildcards)]
+        pieces = [target_parts[0]]
+        for j, part in enumerate(target_parts[1:]):
+            pieces.append(captured[min(j, wildcards - 1)])
+            pieces.append(part)
+        return ''.join(pieces), rule_id
+
+    def _replace_tokens(self, name):
+        if self._token_regex is None:
+            return name, []
+        fired = []
+
+        def replace(m):
+            rule_id, target = self._tokens[m.group(0).lower()]
+            # 置換後の形がすでに含まれている場合（medical_device_classification の
+            # device_classification など）は置き換えない
+            start = m.end() - len(target)
+            if start >= 0 and m.string[start:m.end()].lower() == target.lower() and (
+                    start == 0 or m.string[start - 1] == '_'):
+                return m.group(0)
+            if rule_id not in fired:
+                fired.append(rule_id)
+            return target
+
+        return self._token_regex.sub(replace, name), fired
+
+    def apply(self, name, kind='column'):
+        """
+        name にルールを適用する
+        kind: 'table'（rename_tokens のみ）または 'column'
+        返り値: (新しい名前, 適用したルールのリスト)。適用なしなら (name, [])
+        """
+        fired = []
+        new_name = name
+        if kind == 'column':
+            matched = self._match_column(name)
+            if matched is not None:
+                new_name, rule_id = matched
+                fired.append(rule_id)
+        new_name, token_rules = self._replace_tokens(new_name)
+        fired.extend(token_rules)
+        if new_name == name:
+            return name, []
+        return new_name, fired
+
+
+def compile_rename_rules(naming_dict):
+    """命名辞書の terms[].migration から RenameRules を作る"""
+    column_rules = []
+    token_rules = []
+    for term in (naming_dict or {}).get('terms') or []:
+        if not isinstance(term, dict):
+            continue
+        term_id = term.get('id')
+        migration = term.get('migration') or {}
+        for i, rule in enumerate(migration.get('rename_columns') or []):
+            if isinstance(rule, dict) and rule.get('from') and rule.get('to'):
+                source, target = str(rule['from']), str(rule['to'])
+                column_rules.append((f'{term_id}.rename_columns[{i}]: {source} → {target}', source, target))
+        for i, rule in enumerate(migration.get('rename_tokens') or []):
+            if isinstance(rule, dict) and rule.get('from') and rule.get('to'):
+                source, target = str(rule['from']), str(rule['to'])
+                token_rules.append((f'{term_id}.rename_tokens[{i}]: {source} → {target}', source, target))
+    return RenameRules(column_rules, token_rules)
+
+
+def load_rename_rules(naming_dict_path):
+    """命名辞書ファイルを読み込んで RenameRules を作る"""
+    return compile_rename_rules(load_yaml(naming_dict_path))
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='命名辞書の migration ルールの確認')
+    parser.add_argument('names', nargs='*', help='ルールを適用してみる名前')
+    parser.add_argument('--kind', choices=['table', 'column'], default='column', help='names の種別')
+    parser.add_argument('--naming-dictionary', type=Path,
+                        default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml', help='命名辞書ファイル')
+    args = parser.parse_args()
+
+    if not args.naming_dictionary.exists():
+        print(f"Error: {args.naming_dictionary} が見つかりません")
+        sys.exit(1)
+    rules = load_rename_rules(args.naming_dictionary)
+
+    print(f"rename_columns: {len(rules.column_rules)}件")
+    for rule_id, _, _ in rules.column_rules:
+        print(f"  {rule_id}")
+    print(f"rename_tokens: {len(rules.token_rules)}件")
+    for rule_id, _, _ in rules.token_rules:
+        print(f"  {rule_id}")
+
+    for name in args.names:
+        new_name, fired = rules.apply(name, args.kind)
+        print(f"\n{name} → {new_name}")
+        for rule_id in fired:
+            print(f"  ← {rule_id}")
+
+
+if __name__ == '__main__':
+    main()
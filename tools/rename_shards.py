@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+rename_dictionary.yaml をテーブルのグループごとのシャードに分割・結合するスクリプト
+
+Layout: dictionary/rename_dictionary.d/index.yaml    version / notes と テーブル名 → シャード名 の索引、
+                                                     シャードに反映済みのジャーナルの seq（journal_seq）
+        dictionary/rename_dictionary.d/<shard>.yaml  そのグループのテーブルの tables / columns
+                                                     （rename_dictionary.yaml と同じ形）
+
+Usage: python rename_shards.py split [--dictionary PATH] [--prefix-length 3]
+       python rename_shards.py join  [--dictionary PATH] [--output PATH]
+       python rename_shards.py info  [--dictionary PATH]
+  split: 変換辞書の現在の内容（rename_dictionary.yaml、シャードがあればシャード。どちらも
+         未反映のジャーナルを重ねたもの）から rename_dictionary.d/ を作り直す
+  join:  シャードに未反映のジャーナルを重ねて結合し、rename_dictionary.yaml（または --output）に書き出す
+  info:  シャードの一覧と件数
+
+rename_dictionary.d/index.yaml があれば、yaml_rename.load_rename_dictionary はシャードを使う。
+読み込むのは索引だけで、各シャードは実際に引かれたテーブルの分だけを初回参照時に解析し、
+LRU（既定 32シャード）で保持する。1ファイルだけを変換する場合は、そのテーブルの
+シャード1つしか解析しない。
+変更はシャードでもジャーナル（rename_journal.py）に追記する。索引の journal_seq より後の変更は、
+シャードを読み込んだときにそのシャードのテーブルの分だけを重ねる（rename_journal.JournaledShardStore）。
+rename_journal.py compact は変更のあったシャードと索引を書き戻してジャーナルを空にする。
+テーブルのグループは、テーブル名の英数字の先頭 prefix-length 文字（mst / tbl / raw など）。
+一度シャードに入ったテーブルは、索引に従って同じシャードに残る。
+naming_daemon.py は load_rename_dictionary 経由でシャードを使い、索引・シャードが
+書き換わると読み込み直す。dictionary_flat.py / validate_dictionaries.py は
+rename_dictionary.yaml をそのまま読むため、シャードを更新した後は join で反映する。
+"""
+
+import argparse
+import re
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+
+import instrumentation
+from yaml_io import dump_yaml, load_yaml
+
+
+SHARD_INDEX = 'index.yaml'
+DEFAULT_PREFIX_LENGTH = 3
+DEFAULT_CACHE_SIZE = 32
+# 索引だけにあり、変換辞書（rename_dictionary.yaml）の項目ではないキー
+INDEX_KEYS = ('tables', 'journal_seq', 'prefix_length')
+
+
+def shard_dir_for(rename_dict_path):
+    """rename_dictionary.yaml に対応するシャードのディレクトリ（rename_dictionary.d）"""
+    return Path(rename_dict_path).with_suffix('.d')
+
+
+def has_shards(rename_dict_path):
+    """シャードの索引があるかどうか"""
+    return (shard_dir_for(rename_dict_path) / SHARD_INDEX).exists()
+
+
+def table_group(table_name, prefix_length=DEFAULT_PREFIX_LENGTH):
+    """テーブルのグループ名（シャード名）"""
+    prefix = re.sub(r'[^a-z0-9]', '', str(table_name).lower())[:prefix_length]
+    return prefix or '_'
+
+
+def split_rename_dictionary(rename_dict, prefix_length=DEFAULT_PREFIX_LENGTH, index=None, journal_seq=0):
+    """
+    変換辞書をシャードに分ける
+    index を渡すと、索引にあるテーブルはそのシャードのままにする
+    journal_seq: rename_dict に反映済みのジャーナルの seq
+    返り値: (索引 {'version', 'notes', 'prefix_length', 'journal_seq', 'tables': {テーブル名: シャード名}},
+             {シャード名: {'tables', 'columns'}})
+    """
+    assigned = dict((index or {}).get('tables') or {})
+    new_index = {key: value for key, value in (rename_dict or {}).items() if key not in ('tables', 'columns')}
+    new_index['prefix_length'] = prefix_length
+    new_index['journal_seq'] = journal_seq
+    new_index['tables'] = {}
+    shards = {}
+
+    def shard_of(table_name):
+        shard_name = assigned.get(table_name) or table_group(table_name, prefix_length)
+        new_index['tables'].setdefault(table_name, shard_name)
+        return shards.setdefault(shard_name, {'tables': {}, 'columns': {}})
+
+    for table_name, info in ((rename_dict or {}).get('tables') or {}).items():
+        shard_of(table_name)['tables'][table_name] = info
+    for table_name, table_columns in ((rename_dict or {}).get('columns') or {}).items():
+        shard_of(table_name)['columns'][table_name] = table_columns
+    return new_index, shards
+
+
+def write_shard(shard_dir, shard_name, shard):
+    """シャード1つを書き出す（空のセクションは省略）"""
+    data = {section: shard[section] for section in ('tables', 'columns') if shard.get(section)}
+    with open(Path(shard_dir) / f'{shard_name}.yaml', 'w', encoding='utf-8') as f:
+        dump_yaml(data, f)
+
+
+def write_shard_index(shard_dir, index):
+    """索引を書き出す"""
+    with open(Path(shard_dir) / SHARD_INDEX, 'w', encoding='utf-8') as f:
+        dump_yaml(index, f)
+
+
+def load_shard_index(shard_dir):
+    """索引を読み込む"""
+    index = load_yaml(Path(shard_dir) / SHARD_INDEX) or {}
+    index.setdefault('tables', {})
+    return index
+
+
+class ShardStore:
+    """索引とシャードの読み込み（シャードは初回参照時に解析し、LRUで保持）"""
+
+    def __init__(self, shard_dir, cache_size=DEFAULT_CACHE_SIZE):
+        self.shard_dir = Path(shard_dir)
+        self.cache_size = cache_size
+        with instrumentation.phase('load_index'):
+            self.index = load_shard_index(self.shard_dir)
+        self.table_shards = self.index['tables']
+        self.prefix_length = self.index.get('prefix_length') or DEFAULT_PREFIX_LENGTH
+        self._cache = OrderedDict()
+        self.loads = 0
+
+    def __getstate__(self):
+        # ワーカープロセスへは索引だけを渡し、シャードはワーカー側で読み込む
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        return state
+
+    def shard_names(self):
+        return list(dict.fromkeys(self.table_shards.values()))
+
+    def shard(self, shard_name):
+        """シャードを返す（{'tables', 'columns'}）"""
+        shard = self._cache.get(shard_name)
+        if shard is not None:
+            self._cache.move_to_end(shard_name)
+            return shard
+
+        with instrumentation.phase('load_shard'):
+            shard = self.load_shard(shard_name)
+        self.loads += 1
+        self._cache[shard_name] = shard
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return shard
+
+    def load_shard(self, shard_name):
+        """シャードのファイルを解析する（ファイルがなければ空）"""
+        path = self.shard_dir / f'{shard_name}.yaml'
+        shard = (load_yaml(path) if path.exists() else None) or {}
+        return {'tables': shard.get('tables') or {}, 'columns': shard.get('columns') or {}}
+
+    def section(self, table_name, section):
+        """テーブルのシャードの tables / columns（索引にないテーブルは None）"""
+        shard_name = self.table_shards.get(table_name)
+        if shard_name is None:
+            return None
+        return self.shard(shard_name)[section]
+
+
+class ShardedSection(Mapping):
+    """シャードに分かれた tables / columns を1つのMappingとして引く"""
+
+    def __init__(self, store, section):
+        self.store = store
+        self.section = section
+
+    def __getitem__(self, table_name):
+        entries = self.store.section(table_name, self.section)
+        if entries is None or table_name not in entries:
+            raise KeyError(table_name)
+        return entries[table_name]
+
+    def __contains__(self, table_name):
+        entries = self.store.section(table_name, self.section)
+        return entries is not None and table_name in entries
+
+    def __iter__(self):
+        # すべてのシャードを読み込む（全件の走査用）
+        for table_name in self.store.table_shards:
+            if table_name in self:
+                yield table_name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def rename_dictionary_view(store):
+    """
+    ShardStore を rename_dictionary.yaml を読み込んだものと同じ形のdictにする
+    （tables / columns はMappingで、引いたときにシャードを読み込む）
+    """
+    rename_dict = {key: value for key, value in store.index.items() if key not in INDEX_KEYS}
+    rename_dict['tables'] = ShardedSection(store, 'tables')
+    rename_dict['columns'] = ShardedSection(store, 'columns')
+    return rename_dict
+
+
+def load_sharded_rename_dictionary(shard_dir, cache_size=DEFAULT_CACHE_SIZE):
+    """シャードに分かれた変換辞書を読み込む（解析するのは索引だけ。ジャーナルは重ねない）"""
+    return rename_dictionary_view(ShardStore(shard_dir, cache_size))
+
+
+def shard_store_of(rename_dict):
+    """load_sharded_rename_dictionary で読み込んだ辞書なら ShardStore、それ以外は None"""
+    tables = (rename_dict or {}).get('tables')
+    return tables.store if isinstance(tables, ShardedSection) else None
+
+
+def join_store(store):
+    """ShardStore のすべてのシャードを読み込んで1つの変換辞書（通常のdict）にする"""
+    store.cache_size = len(store.shard_names()) + 1
+    view = rename_dictionary_view(store)
+    rename_dict = {key: value for key, value in view.items() if key not in ('tables', 'columns')}
+    rename_dict['tables'] = dict(view['tables'].items())
+    rename_dict['columns'] = dict(view['columns'].items())
+    return rename_dict
+
+
+def join_shards(shard_dir):
+    """
+    すべてのシャードを読み込んで1つの変換辞書（通常のdict。ジャーナルは重ねない）にする
+    返り値: (変換辞書, 索引)
+    """
+    store = ShardStore(shard_dir)
+    return join_store(store), store.index
+
+
+def split_shards(rename_dict_path, prefix_length=DEFAULT_PREFIX_LENGTH):
+    """
+    変換辞書の現在の内容（シャードまたは rename_dictionary.yaml に、ジャーナルを重ねたもの）から
+    シャードを作り直す
+    返り値: (索引, {シャード名: シャード})
+    """
+    # rename_journal が rename_shards を使うため、ここで読み込む
+    from rename_journal import journal_path_for, last_seq, load_with_journal
+
+    shard_dir = shard_dir_for(rename_dict_path)
+    # 読み込む前に seq を控える（読み込み中に追記された変更は、次の読み込みで重ねても結果は同じ）
+    journal_seq = last_seq(journal_path_for(rename_dict_path))
+    with instrumentation.phase('load'):
+        rename_dict = load_with_journal(rename_dict_path)
+    index, shards = split_rename_dictionary(rename_dict, prefix_length, journal_seq=journal_seq)
+
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    with instrumentation.phase('write'):
+        for shard_name, shard in shards.items():
+            write_shard(shard_dir, shard_name, shard)
+        for stale in shard_dir.glob('*.yaml'):
+            if stale.name != SHARD_INDEX and stale.stem not in shards:
+                stale.unlink()
+        # 索引は最後に書く（索引があればシャードが使われる）
+        write_shard_index(shard_dir, index)
+    return index, shards
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='rename_dictionary.yaml のシャード分割・結合')
+    parser.add_argument('command', choices=['split', 'join', 'info'])
+    parser.add_argument('--dictionary', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書ファイル（シャードは同じ場所の rename_dictionary.d）')
+    parser.add_argument('--prefix-length', type=int, default=DEFAULT_PREFIX_LENGTH,
+                        help='split でグループ分けに使うテーブル名の先頭文字数')
+    parser.add_argument('--output', type=Path, help='join の出力先（既定: --dictionary）')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('rename_shards', args)
+
+    shard_dir = shard_dir_for(args.dictionary)
+
+    if args.command == 'split':
+        if not args.dictionary.exists() and not has_shards(args.dictionary):
+            print(f"Error: {args.dictionary} が見つかりません")
+            sys.exit(1)
+        try:
+            index, shards = split_shards(args.dictionary, args.prefix_length)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"シャード: {len(shards)}個 / テーブル {len(index['tables'])}個 → {shard_dir}"
+              f"（ジャーナル seq {index['journal_seq']} まで反映）")
+
+    else:
+        if not (shard_dir / SHARD_INDEX).exists():
+            print(f"Error: {shard_dir / SHARD_INDEX} が見つかりません（先に split を実行してください）")
+            sys.exit(1)
+        if args.command == 'join':
+            from rename_journal import JournaledShardStore, journal_path_for
+            try:
+                rename_dict = join_store(JournaledShardStore(shard_dir, journal_path_for(args.dictionary)))
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            output = args.output or args.dictionary
+            with instrumentation.phase('write'):
+                with open(output, 'w', encoding='utf-8') as f:
+                    dump_yaml(rename_dict, f)
+            print(f"結合: テーブル {len(rename_dict['tables'])}個 / カラム定義 {len(rename_dict['columns'])}テーブル → {output}")
+        else:
+            index = load_shard_index(shard_dir)
+            counts = {}
+            for shard_name in index['tables'].values():
+                counts[shard_name] = counts.get(shard_name, 0) + 1
+            for shard_name, count in sorted(counts.items()):
+                size = (shard_dir / f'{shard_name}.yaml').stat().st_size
+                print(f"  {shard_name}.yaml: テーブル {count}個 ({size:,} bytes)")
+            print(f"シャード: {len(counts)}個 / テーブル {len(index['tables'])}個"
+                  f"（ジャーナル seq {index.get('journal_seq') or 0} まで反映）")
+
+    session.finish()
+
+
+if __name__ == '__main__':
+    main()
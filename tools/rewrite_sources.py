@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+SQL・アプリケーションのソースコード中の旧テーブル名・旧カラム名を新命名に書き換えるスクリプト
+
+Input: ソースのファイルまたはディレクトリ（複数指定可）
+Dictionary: dictionary/rename_dictionary.yaml
+            dictionary/naming_dictionary_v0.2.1.yaml（migration ルール。--no-migration-rules で使わない）
+Output: schema/derived/rewrite/YYYY-MM-DD/rewrite.patch         unified diff（--in-place なしのとき）
+        schema/derived/rewrite/YYYY-MM-DD/rewrite_report.csv    ファイルごとの置換件数と内訳
+        schema/derived/rewrite/YYYY-MM-DD/rewrite_summary.json  全体の件数・除外した変換
+
+Usage: python rewrite_sources.py [--in-place] [--jobs N] [--ignore-case]
+                                 [--kinds tables,columns] [--ext .sql,.py,...]
+                                 [--naming-dictionary PATH] [--no-migration-rules] path ...
+  既定ではファイルを書き換えず、パッチ（カレントディレクトリからの相対パス。
+  `git apply` / `patch -p1` で適用できる）を出力する。--in-place でその場で書き換える。
+
+変換ルールは generate_migration.py の実行計画と同じもの（競合でマイグレーションから
+除いた変換は使わない。migration ルールの適用も同じ）を使い、DBとソースの名前がずれないようにする。
+全ての旧名を1つのトライ木にまとめて正規表現（1つのオートマトン）にコンパイルし、
+識別子の境界（英数字と _ 以外）で区切られたものだけを置換する。
+各ファイルはmmapして走査し、一致がなければ内容を読み込まない。
+置換は1回の走査で同時に行うため、A→B と B→C が連鎖していても A が C になることはない。
+
+- テーブル名: schema.table の形で書かれていればスキーマも含めて置換する
+  （新しい名前がスキーマ付きの場合は新しいスキーマ、ない場合は元のスキーマを残す）
+- カラム名: テーブルによって変換先が異なる旧カラム名、名前を変えずに残すテーブルがある旧カラム名、
+  旧テーブル名と同じ旧カラム名はどのテーブルのものか判断できないため置換せず、サマリに記録する
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from generate_migration import build_plan
+from rename_rules import load_rename_rules
+from yaml_rename import apply_rules_to_dictionary, load_rename_dictionary
+
+
+DEFAULT_EXTENSIONS = ('.sql', '.py', '.java', '.kt', '.scala', '.cs', '.go', '.rb', '.php',
+                      '.js', '.ts', '.xml', '.yaml', '.yml', '.json', '.properties', '.sh')
+EXCLUDED_DIRS = {'.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv', '.tox',
+                 'build', 'dist', 'target'}
+KINDS = ('tables', 'columns')
+DIFF_CONTEXT = 3
+
+_IDENT = rb'[A-Za-z_][A-Za-z0-9_]*'
+_WORD_CHARS = rb'A-Za-z0-9_'
+
+
+def collect_renames(rename_dict, default_schema='public', kinds=KINDS):
+    """
+    ソースの書き換えに使う変換を集める
+    返り値: (テーブルの変換 {(スキーマ, 旧名): (スキーマ, 新名)}, カラムの変換 {旧名: 新名},
+             除外した変換のリスト)
+    """
+    plan = build_plan(rename_dict, default_schema)
+    table_renames = dict(plan['table_moves']) if 'tables' in kinds else {}
+    table_bare_names = {name for _, name in plan['existing']}
+    skipped = [dict(conflict, reason=f"マイグレーションの競合: {conflict['reason']}")
+               for conflict in plan['conflicts']]
+
+    column_renames = {}
+    if 'columns' in kinds:
+        # 旧カラム名ごとの変換先（名前を変えないテーブルでは旧名のまま）
+        targets = {}
+        for table, table_name in plan['existing'].items():
+            moves = plan['column_moves'].get(table, {})
+            for column_name in (rename_dict.get('columns') or {}).get(table_name) or {}:
+                targets.setdefault(column_name, {}).setdefault(moves.get(column_name, column_name), []).append(
+                    table_name)
+
+        for column_name, by_target in targets.items():
+            new_names = [new for new in by_target if new != column_name]
+            if not new_names:
+                continue
+            if len(by_target) > 1:
+                detail = '; '.join(f"{new}: {', '.join(tables)}" for new, tables in by_target.items())
+                skipped.append({'kind': 'column', 'table': None, 'old': column_name, 'new': new_names,
+                                'reason': f'テーブルによって変換先が異なる（{detail}）'})
+            elif column_name in table_bare_names:
+                skipped.append({'kind': 'column', 'table': None, 'old': column_name, 'new': new_names[0],
+                                'reason': '旧テーブル名と同じ名前'})
+            else:
+                column_renames[column_name] = new_names[0]
+
+    return table_renames, column_renames, skipped
+
+
+def _trie_regex(words):
+    """単語の集合をトライ木の形の正規表現（bytes）にする（長い一致を優先）"""
+    trie = {}
+    for word in words:
+        node = trie
+        for byte in word:
+            node = node.setdefault(byte, {})
+        node[None] = True
+
+    def build(node):
+        terminal = None in node
+        branches = [re.escape(bytes([byte])) + build(child) for byte, child in sorted(
+            (byte, child) for byte, child in node.items() if byte is not None)]
+        if not branches:
+            return b''
+        body = branches[0] if len(branches) == 1 else b'(?:' + b'|'.join(branches) + b')'
+        if terminal:
+            body = (body if len(branches) == 1 and len(body) == 1 else b'(?:' + body + b')') + b'?'
+        return body
+
+    return build(trie)
+
+
+class SourceRewriter:
+    """旧名 → 新名の置換（全ての旧名を1つの正規表現にまとめたもの）"""
+
+    def __init__(self, table_renames, column_renames, default_schema='public', ignore_case=False):
+        fold = (lambda name: name.lower()) if ignore_case else (lambda name: name)
+        self.default_schema = fold(default_schema.encode('utf-8'))
+        self.ignore_case = ignore_case
+
+        self.tables = {(fold(schema.encode('utf-8')), fold(name.encode('utf-8'))): (new_schema.encode('utf-8'),
+                                                                                   new_name.encode('utf-8'))
+                       for (schema, name), (new_schema, new_name) in table_renames.items()}
+        self.columns = {fold(old.encode('utf-8')): new.encode('utf-8') for old, new in column_renames.items()}
+        self.fold = fold
+        # 修飾子がこれらのスキーマ名なら schema.table とみなす（カラムの修飾子とは扱わない）
+        self.schemas = {schema for schema, _ in self.tables} | {self.default_schema} | {
+            fold(schema) for schema, _ in self.tables.values()}
+
+        names = {name for _, name in self.tables} | set(self.columns)
+        flags = re.IGNORECASE if ignore_case else 0
+        if names:
+            # (修飾子.)?旧名 。修飾子はスキーマ（テーブル名の場合）またはテーブル名・別名（カラム名の場合）
+            self.pattern = re.compile(
+                rb'(?<![' + _WORD_CHARS + rb'])(?:(' + _IDENT + rb')\.)?(' + _trie_regex(sorted(names))
+                + rb')(?![' + _WORD_CHARS + rb'])', flags)
+        else:
+            self.pattern = re.compile(rb'(?!)')
+
+    def _table_name(self, new, qualified):
+        schema, name = new
+        if qualified or schema != self.default_schema:
+            return schema + b'.' + name
+        return name
+
+    def _replace(self, match, changes):
+        qualifier, name = match.group(1), match.group(2)
+        key = self.fold(name)
+
+        if qualifier is not None and self.fold(qualifier) in self.schemas:
+            new = self.tables.get((self.fold(qualifier), key))
+            if new is None:
+                return match.group(0)
+            changes[(match.group(0), self._table_name(new, True))] += 1
+            return self._table_name(new, True)
+
+        replaced = None
+        if (self.default_schema, key) in self.tables:
+            new = self.tables[(self.default_schema, key)]
+            replaced = self._table_name(new, False)
+        elif key in self.columns:
+            replaced = self.columns[key]
+        if replaced is not None:
+            changes[(name, replaced)] += 1
+        else:
+            replaced = name
+
+        if qualifier is not None:
+            # 修飾子自体が旧テーブル名の場合（旧テーブル名.旧カラム名）
+            new = self.tables.get((self.default_schema, self.fold(qualifier)))
+            if new is not None:
+                changes[(qualifier, self._table_name(new, False))] += 1
+                qualifier = self._table_name(new, False)
+            return qualifier + b'.' + replaced
+        return replaced
+
+    def search(self, data):
+        return self.pattern.search(data)
+
+    def rewrite(self, data):
+        """返り値: (置換後のbytes, Counter{(旧, 新): 件数})"""
+        changes = Counter()
+        rewritten = self.pattern.sub(lambda match: self._replace(match, changes), data)
+        return rewritten, changes
+
+
+def unified_diff(display_path, old_data, new_data, context=DIFF_CONTEXT):
+    """
+    行数が変わらない置換のunified diff（bytes）
+    識別子の置換では行が増減しないため、変更行の前後だけを比べて作る
+    """
+    old_lines = old_data.splitlines(keepends=True)
+    new_lines = new_data.splitlines(keepends=True)
+    changed = [i for i, (old, new) in enumerate(zip(old_lines, new_lines)) if old != new]
+    if not changed:
+        return b''
+
+    # 変更行を前後 context 行ごとに hunk にまとめる
+    hunks = []
+    start, end = changed[0], changed[0]
+    for i in changed[1:]:
+        if i - end > context * 2:
+            hunks.append((start, end))
+            start = i
+        end = i
+    hunks.append((start, end))
+
+    def line(prefix, text):
+        if text.endswith(b'\n'):
+            return prefix + text
+        return prefix + text + b'\n\\ No newline at end of file\n'
+
+    path = display_path.encode('utf-8', 'surrogateescape')
+    out = [b'--- a/' + path + b'\n', b'+++ b/' + path + b'\n']
+    for first, last in hunks:
+        lo = max(0, first - context)
+        hi = min(len(old_lines), last + context + 1)
+        out.append(b'@@ -%d,%d +%d,%d @@\n' % (lo + 1, hi - lo, lo + 1, hi - lo))
+        i = lo
+        while i < hi:
+            if old_lines[i] == new_lines[i]:
+                out.append(line(b' ', old_lines[i]))
+                i += 1
+                continue
+            j = i
+            while j < hi and old_lines[j] != new_lines[j]:
+                j += 1
+            out.extend(line(b'-', text) for text in old_lines[i:j])
+            out.extend(line(b'+', text) for text in new_lines[i:j])
+            i = j
+    return b''.join(out)
+
+
+def rewrite_file(path, rewriter, in_place=False, base_dir=None):
+    """
+    ファイル1件を走査して置換
+    返り値: {'file', 'replacements', 'changes': {'旧→新': 件数}, 'patch': bytes | None, 'timings'}
+    """
+    result = {'file': str(path), 'replacements': 0, 'changes': {}, 'patch': None}
+    with instrumentation.collect_phases() as phases:
+        try:
+            with instrumentation.phase('scan'):
+                with open(path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        return result
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        if b'\0' in mapped[:8192] or rewriter.search(mapped) is None:
+                            return result
+                        data = mapped[:]
+
+            with instrumentation.phase('rewrite'):
+                rewritten, changes = rewriter.rewrite(data)
+            if not changes:
+                return result
+
+            result['replacements'] = sum(changes.values())
+            result['changes'] = {f"{old.decode('utf-8')}→{new.decode('utf-8')}": n
+                                 for (old, new), n in changes.most_common()}
+            if in_place:
+                with instrumentation.phase('write'):
+                    with open(path, 'wb') as f:
+                        f.write(rewritten)
+            else:
+                with instrumentation.phase('diff'):
+                    display_path = os.path.relpath(path, base_dir) if base_dir else str(path)
+                    result['patch'] = unified_diff(Path(display_path).as_posix(), data, rewritten)
+        except OSError as e:
+            result['error'] = str(e)
+        finally:
+            result['timings'] = phases
+    return result
+
+
+def iter_source_files(paths, extensions, excluded_dirs=EXCLUDED_DIRS):
+    """対象ファイルを列挙（ディレクトリは再帰的に。除外ディレクトリは辿らない）"""
+    for path in map(Path, paths):
+        if path.is_file():
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in excluded_dirs)
+            for name in sorted(files):
+                if extensions is None or os.path.splitext(name)[1].lower() in extensions:
+                    yield Path(root) / name
+
+
+# ワーカープロセスごとに一度だけ作る置換器
+_worker_rewriter = None
+
+
+def _init_worker(table_renames, column_renames, default_schema, ignore_case, timings=False):
+    """ワーカー起動時に置換用の正規表現をコンパイルする"""
+    global _worker_rewriter
+    _worker_rewriter = SourceRewriter(table_renames, column_renames, default_schema, ignore_case)
+    instrumentation.enable_in_worker(timings)
+
+
+def _rewrite_in_worker(path, in_place, base_dir):
+    return rewrite_file(path, _worker_rewriter, in_place, base_dir)
+
+
+def iter_rewrites(files, table_renames, column_renames, default_schema, ignore_case,
+                  in_place=False, base_dir=None, jobs=1):
+    """ファイルを置換し、入力順に結果を返す（jobs > 1 の場合はプロセスプールに分散）"""
+    if jobs <= 1 or len(files) <= 1:
+        rewriter = SourceRewriter(table_renames, column_renames, default_schema, ignore_case)
+        for path in files:
+            yield rewrite_file(path, rewriter, in_place, base_dir)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(table_renames, column_renames, default_schema, ignore_case,
+                                       instrumentation.enabled())) as executor:
+        chunksize = max(1, min(256, len(files) // (jobs * 4)))
+        yield from executor.map(_rewrite_in_worker, files, [in_place] * len(files),
+                                [base_dir] * len(files), chunksize=chunksize)
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='ソースコード中の旧テーブル名・旧カラム名を書き換え')
+    parser.add_argument('paths', nargs='+', help='対象のファイルまたはディレクトリ')
+    parser.add_argument('--dictionary', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書ファイル')
+    parser.add_argument('--naming-dictionary', type=Path,
+                        default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='migration ルールを読む命名辞書')
+    parser.add_argument('--no-migration-rules', action='store_true', help='命名辞書の migration ルールを適用しない')
+    parser.add_argument('--in-place', action='store_true', help='ファイルをその場で書き換える（既定: パッチを出力）')
+    parser.add_argument('--jobs', type=int, default=1, help='並列ワーカー数（既定: 1 = シリアル実行）')
+    parser.add_argument('--kinds', default=','.join(KINDS), help='置換する対象（tables,columns）')
+    parser.add_argument('--ext', default=','.join(DEFAULT_EXTENSIONS),
+                        help="ディレクトリから探す拡張子（カンマ区切り。'*' ですべて）")
+    parser.add_argument('--ignore-case', action='store_true', help='大文字・小文字を区別せずに一致させる')
+    parser.add_argument('--default-schema', default='public', help='スキーマ名のないテーブルのスキーマ')
+    parser.add_argument('--output-dir', type=Path,
+                        default=project_root / 'schema/derived/rewrite' / datetime.now().strftime('%Y-%m-%d'),
+                        help='出力先（既定: schema/derived/rewrite/YYYY-MM-DD）')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('rewrite_sources', args)
+
+    kinds = [kind for kind in args.kinds.split(',') if kind]
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"--kinds に不明な値: {', '.join(sorted(unknown))}")
+    extensions = None if args.ext == '*' else {
+        ext if ext.startswith('.') else f'.{ext}' for ext in args.ext.lower().split(',') if ext}
+
+    started = time.perf_counter()
+    rename_dict = load_rename_dictionary(args.dictionary, use_snapshot=False)
+    if not args.no_migration_rules:
+        rename_dict = apply_rules_to_dictionary(rename_dict, load_rename_rules(args.naming_dictionary))
+    with instrumentation.phase('compile'):
+        table_renames, column_renames, skipped = collect_renames(rename_dict, args.default_schema, kinds)
+
+    files = list(iter_source_files(args.paths, extensions))
+    print(f"変換ルール: テーブル {len(table_renames)} / カラム {len(column_renames)}（除外 {len(skipped)}）")
+    print(f"対象ファイル: {len(files)}個")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    patch_path = args.output_dir / 'rewrite.patch'
+    report_path = args.output_dir / 'rewrite_report.csv'
+    summary_path = args.output_dir / 'rewrite_summary.json'
+
+    totals = Counter()
+    changed_files = 0
+    replacements = 0
+    errors = []
+    patch = None if args.in_place else open(patch_path, 'wb')
+    try:
+        with open(report_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['file', 'replacements', 'changes'])
+            for result in iter_rewrites(files, table_renames, column_renames, args.default_schema,
+                                        args.ignore_case, in_place=args.in_place, base_dir=Path.cwd(),
+                                        jobs=args.jobs):
+                instrumentation.record_file(result['file'], result.get('timings'))
+                if 'error' in result:
+                    errors.append({'file': result['file'], 'error': result['error']})
+                    continue
+                if not result['replacements']:
+                    continue
+
+                changed_files += 1
+                replacements += result['replacements']
+                totals.update(result['changes'])
+                writer.writerow([result['file'], result['replacements'],
+                                 '; '.join(f'{change}×{n}' for change, n in result['changes'].items())])
+                if patch is not None:
+                    patch.write(result['patch'])
+    finally:
+        if patch is not None:
+            patch.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'dictionary': str(args.dictionary),
+        'dictionary_version': rename_dict.get('version'),
+        'migration_rules': not args.no_migration_rules,
+        'mode': 'in-place' if args.in_place else 'patch',
+        'files_scanned': len(files),
+        'files_changed': changed_files,
+        'replacements': replacements,
+        'table_rules': len(table_renames),
+        'column_rules': len(column_renames),
+        'changes': dict(totals.most_common()),
+        'skipped_rules': skipped,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+    }
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"\n=== 書き換え結果 ===")
+    print(f"変更ファイル: {changed_files} / {len(files)} / 置換: {replacements}件 / 所要時間: {elapsed:.2f}s")
+    for change, n in totals.most_common(10):
+        print(f"  {change}: {n}")
+    if errors:
+        print(f"⚠️  読み込めなかったファイル: {len(errors)}件")
+    if args.in_place:
+        print("ファイルをその場で書き換えました")
+    else:
+        print(f"パッチ: {patch_path}（`git apply` または `patch -p1` で適用）")
+    print(f"レポート: {report_path}")
+    print(f"サマリ: {summary_path}")
+    session.finish(extra={'files_changed': changed_files, 'replacements': replacements})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+テーブル名・カラム名をトークンに分解して出現数を数えるスクリプト
+
+Input: schema/tables/**/*.yaml（既定。ファイル/ディレクトリを複数指定可）
+Dictionary: dictionary/naming_dictionary_v0.2.1.yaml（forbidden / migration.rename_tokens）
+Output: schema/derived/scans/YYYY-MM-DD/token_counts.csv
+
+Usage: python scan_tokens.py [--jobs N] [--output PATH] [path ...]
+
+- snake_case はアンダースコアで分解（`core.xxx` のスキーマ部分も1トークン）
+- `serialnumber` のような連結された旧名は、既知の語（辞書の語と、
+  snake_case 識別子に現れた語）で最小分割して数える
+- YAMLの読み込みと集計はプロセスプールで行い、ワーカーごとのCounterを最後にマージする
+"""
+
+import argparse
+import csv
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from yaml_io import load_yaml
+
+
+# 連結名の分割に使う語の最短長（これより短い語は分割片として使わない）
+MIN_PIECE_LENGTH = 2
+# これより短いトークンは連結名とみなさない
+MIN_SEGMENT_LENGTH = 6
+
+_SPLIT_RE = re.compile(r'[._\s]+')
+_CAMEL_RE = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+
+
+def split_identifier(identifier):
+    """識別子をsnake_case / camelCase / スキーマ修飾で分解して小文字のトークンにする"""
+    tokens = []
+    for part in _SPLIT_RE.split(str(identifier)):
+        if part:
+            tokens.extend(piece.lower() for piece in _CAMEL_RE.split(part) if piece)
+    return tokens
+
+
+def load_token_flags(naming_dict):
+    """
+    命名辞書から判定用の語を取り出す
+    返り値: (forbidden {token: term_id}, rename_tokens {phrase: to}, vocabulary set)
+    """
+    forbidden = {}
+    rename_tokens = {}
+    vocabulary = set()
+
+    for term in (naming_dict or {}).get('terms', []):
+        term_id = term.get('id', '')
+        tokens = term.get('forbidden') or []
+        if isinstance(tokens, dict):
+            tokens = [t for values in tokens.values() for t in values]
+        for token in tokens:
+            if '*' not in str(token):
+                forbidden.setdefault(str(token).lower(), term_id)
+
+        for rule in (term.get('migration') or {}).get('rename_tokens') or []:
+            rename_tokens[str(rule['from']).lower()] = str(rule['to'])
+
+        words = [(term.get('canonical') or {}).get('en', '')]
+        words += ((term.get('synonyms') or {}).get('en') or []) if isinstance(term.get('synonyms'), dict) else []
+        for word in words:
+            if re.fullmatch(r'[A-Za-z0-9_]+', str(word)):
+                vocabulary.update(split_identifier(word))
+
+    vocabulary.update(forbidden)
+    for phrase, to in rename_tokens.items():
+        vocabulary.update(split_identifier(phrase))
+        vocabulary.update(split_identifier(to))
+
+    return forbidden, rename_tokens, vocabulary
+
+
+def _iter_identifiers(yaml_data):
+    """テーブル定義から (種別, 識別子) を列挙"""
+    table_name = yaml_data.get('table_name')
+    if table_name:
+        yield 'table', str(table_name)
+    for col in yaml_data.get('columns') or []:
+        if isinstance(col, dict) and col.get('name'):
+            yield 'column', str(col['name'])
+
+
+def compile_phrase_regex(phrases):
+    """複数語の語句（medical_equipment など）をトークン境界で探す正規表現"""
+    phrases = sorted((p for p in phrases if '_' in p), key=len, reverse=True)
+    if not phrases:
+        return None
+    return re.compile(r'(?:^|(?<=_))(?:' + '|'.join(map(re.escape, phrases)) + r')(?=_|$)')
+
+
+def scan_files(yaml_files, phrases=()):
+    """
+    ファイル群をスキャンしてトークンを数える（ワーカー1タスク分）
+    返り値: {'table': Counter, 'column': Counter, 'words': Counter, 'phrases': Counter,
+             'identifiers': int, 'errors': [...]}
+      words: 複数トークンの識別子に現れたトークン（連結名の分割辞書に使う）
+      phrases: 複数語の語句の出現数
+    """
+    counts = {'table': Counter(), 'column': Counter(), 'words': Counter(), 'phrases': Counter(),
+              'identifiers': 0, 'errors': []}
+    phrase_regex = compile_phrase_regex(phrases)
+
+    for yaml_file in yaml_files:
+        try:
+            yaml_data = load_yaml(yaml_file)
+        except Exception as e:
+            counts['errors'].append((str(yaml_file), str(e)))
+            continue
+        if not isinstance(yaml_data, dict) or 'table_name' not in yaml_data:
+            continue
+
+        for kind, identifier in _iter_identifiers(yaml_data):
+            tokens = split_identifier(identifier)
+            counts['identifiers'] += 1
+            counts[kind].update(tokens)
+            if len(tokens) > 1:
+                counts['words'].update(tokens)
+                if phrase_regex is not None:
+                    counts['phrases'].update(phrase_regex.findall('_'.join(tokens)))
+
+    return counts
+
+
+def _scan_files_in_worker(args):
+    """ワーカー側のスキャン（引数はタプルで受け取る）"""
+    return scan_files(*args)
+
+
+def merge_counts(results):
+    """ワーカーごとの集計をマージ"""
+    merged = {'table': Counter(), 'column': Counter(), 'words': Counter(), 'phrases': Counter(),
+              'identifiers': 0, 'errors': []}
+    for counts in results:
+        for key in ('table', 'column', 'words', 'phrases'):
+            merged[key].update(counts[key])
+        merged['identifiers'] += counts['identifiers']
+        merged['errors'].extend(counts['errors'])
+    return merged
+
+
+def segment_token(token, vocabulary, max_word_length):
+    """
+    連結されたトークンを既知の語で最小個数に分割する（分割できなければNone）
+    例: serialnumber → ['serial', 'number']
+    """
+    n = len(token)
+    # best[i] = token[:i] を分割する最小の語数と直前の分割位置
+    best = [None] * (n + 1)
+    best[0] = (0, 0)
+    for end in range(MIN_PIECE_LENGTH, n + 1):
+        for start in range(max(0, end - max_word_length), end - MIN_PIECE_LENGTH + 1):
+            if best[start] is None or token[start:end] not in vocabulary:
+                continue
+            candidate = (best[start][0] + 1, start)
+            if best[end] is None or candidate < best[end]:
+                best[end] = candidate
+
+    if best[n] is None or best[n][0] < 2:
+        return None
+
+    pieces = []
+    end = n
+    while end > 0:
+        start = best[end][1]
+        pieces.append(token[start:end])
+        end = start
+    return pieces[::-1]
+
+
+def expand_concatenated(counter, vocabulary):
+    """
+    連結名と思われるトークンを分割した結果のCounterと、分割表を返す
+    返り値: (Counter, {元トークン: [分割後の語]})
+    """
+    max_word_length = max((len(word) for word in vocabulary), default=0)
+    expanded = Counter()
+    segmented = {}
+
+    for token, count in counter.items():
+        pieces = None
+        if token not in vocabulary and len(token) >= MIN_SEGMENT_LENGTH:
+            pieces = segment_token(token, vocabulary, max_word_length)
+        if pieces:
+            segmented[token] = pieces
+            for piece in pieces:
+                expanded[piece] += count
+        else:
+            expanded[token] += count
+
+    return expanded, segmented
+
+
+def build_rows(table_counts, column_counts, forbidden, rename_tokens, phrase_counts):
+    """CSVの行を作る（出現数の多い順）"""
+    rows = []
+    for token in set(table_counts) | set(column_counts):
+        flag = ''
+        suggestion = ''
+        if token in forbidden:
+            flag = f'forbidden:{forbidden[token]}'
+        elif token in rename_tokens:
+            flag = 'rename_token'
+            suggestion = rename_tokens[token]
+        rows.append((token, table_counts[token] + column_counts[token],
+                     table_counts[token], column_counts[token], flag, suggestion))
+
+    # 複数語の語句は語句単位の行にする（table_count / column_count は集計しない）
+    for phrase, count in phrase_counts.items():
+        rows.append((phrase, count, '', '', 'rename_token', rename_tokens[phrase]))
+
+    rows.sort(key=lambda row: (-row[1], row[0]))
+    return rows
+
+
+def iter_yaml_files(paths):
+    """対象パスからYAMLファイルを列挙"""
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(path.rglob('*.yaml'))
+        elif path.suffix == '.yaml' and path.exists():
+            yield path
+
+
+def scan(paths, phrases=(), jobs=1):
+    """全ファイルをスキャンしてマージ済みの集計を返す"""
+    yaml_files = list(iter_yaml_files(paths))
+    phrases = tuple(phrases)
+
+    if jobs <= 1 or len(yaml_files) <= 1:
+        return merge_counts([scan_files(yaml_files, phrases)]), len(yaml_files)
+
+    # ワーカーごとに数十ファイル単位でまとめて渡し、Counterの受け渡し回数を抑える
+    chunk_size = max(1, len(yaml_files) // (jobs * 4))
+    chunks = [yaml_files[i:i + chunk_size] for i in range(0, len(yaml_files), chunk_size)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        tasks = [(chunk, phrases) for chunk in chunks]
+        return merge_counts(executor.map(_scan_files_in_worker, tasks)), len(yaml_files)
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='識別子のトークン出現数を集計')
+    parser.add_argument('paths', nargs='*', default=[project_root / 'schema/tables'],
+                        help='対象のYAMLファイルまたはディレクトリ（既定: schema/tables）')
+    parser.add_argument('--dictionary', default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='命名辞書ファイル')
+    parser.add_argument('--output', type=Path,
+                        default=project_root / 'schema/derived/scans' / datetime.now().strftime('%Y-%m-%d')
+                        / 'token_counts.csv',
+                        help='出力CSV（既定: schema/derived/scans/YYYY-MM-DD/token_counts.csv）')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='並列ワーカー数')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('scan_tokens', args)
+
+    forbidden, rename_tokens, vocabulary = load_token_flags(load_yaml(args.dictionary))
+
+    with instrumentation.phase('scan'):
+        counts, file_count = scan(args.paths, phrases=rename_tokens, jobs=args.jobs)
+    for file_name, error in counts['errors']:
+        print(f"読み込みエラー: {file_name}: {error}")
+
+    # 複数トークンの識別子に現れた語も分割辞書に加える
+    vocabulary = vocabulary | {word for word in counts['words'] if len(word) >= MIN_PIECE_LENGTH}
+
+    with instrumentation.phase('segment'):
+        table_counts, table_segmented = expand_concatenated(counts['table'], vocabulary)
+        column_counts, column_segmented = expand_concatenated(counts['column'], vocabulary)
+    segmented = {**table_segmented, **column_segmented}
+
+    rows = build_rows(table_counts, column_counts, forbidden, rename_tokens, counts['phrases'])
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['token', 'count', 'table_count', 'column_count', 'flag', 'suggestion'])
+        writer.writerows(rows)
+
+    flagged = [row for row in rows if row[4]]
+    print(f"スキャン完了: {file_count}ファイル / {counts['identifiers']}識別子 / {len(rows)}トークン")
+    print(f"連結名を分割: {len(segmented)}個（例: "
+          + ', '.join(f"{k}→{'_'.join(v)}" for k, v in list(segmented.items())[:5]) + "）")
+    print(f"要確認トークン: {len(flagged)}個")
+    for row in flagged[:20]:
+        print(f"  {row[0]}: {row[1]}回 [{row[4]}]{' → ' + row[5] if row[5] else ''}")
+    print(f"出力: {args.output}")
+    session.finish(extra={'files': file_count, 'identifiers': counts['identifiers']})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+日付スナップショット間のテーブル定義の差分を出すスクリプト
+
+Usage: python schema_diff.py A B [--output-dir DIR] [--jobs N]
+  例: python schema_diff.py schema/tables/2025-09-11 schema/tables/2025-09-12
+
+Input: A, B それぞれのディレクトリ配下の *.yaml（テーブル定義）
+Output: DIR/schema_diff.md, DIR/schema_diff.json（既定: schema/derived/diff/YYYY-MM-DD/）
+
+両方のツリーを table_name / カラム名 のハッシュ索引にしてから突き合わせるため、
+テーブル同士の総当たり比較は行わない。
+- テーブルのリネーム: metadata.conversion_info.original_table_name、
+  またはカラム構成（旧名ベース）のシグネチャ一致で検出
+- カラムのリネーム: old_name で検出
+- 変更: data_type / nullable / primary_key
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from yaml_io import load_yaml
+
+
+COMPARED_FIELDS = ('data_type', 'nullable', 'primary_key')
+
+
+def load_table_summary(file_path):
+    """テーブル定義YAMLから差分に必要な項目だけを取り出す（テーブル定義以外はNone）"""
+    yaml_data = load_yaml(file_path)
+    if not isinstance(yaml_data, dict) or 'table_name' not in yaml_data:
+        return None
+
+    conversion_info = (yaml_data.get('metadata') or {}).get('conversion_info') or {}
+    columns = {}
+    for col in yaml_data.get('columns') or []:
+        if not isinstance(col, dict) or not col.get('name'):
+            continue
+        columns[str(col['name'])] = {
+            'old_name': col.get('old_name'),
+            'data_type': col.get('data_type'),
+            'nullable': col.get('nullable'),
+            'primary_key': col.get('primary_key'),
+        }
+
+    return {
+        'table_name': str(yaml_data['table_name']),
+        'original_table_name': conversion_info.get('original_table_name'),
+        'file': str(file_path),
+        'columns': columns,
+    }
+
+
+def index_tree(root, jobs=1):
+    """ディレクトリ配下のテーブル定義を table_name → summary の索引にする"""
+    yaml_files = sorted(Path(root).rglob('*.yaml'))
+
+    if jobs > 1 and len(yaml_files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(yaml_files) // (jobs * 4))
+            summaries = list(executor.map(load_table_summary, yaml_files, chunksize=chunksize))
+    else:
+        summaries = [load_table_summary(f) for f in yaml_files]
+
+    tables = {}
+    for summary in summaries:
+        if summary is None:
+            continue
+        if summary['table_name'] in tables:
+            print(f"注意: {summary['table_name']} が重複しています"
+                  f" ({tables[summary['table_name']]['file']}, {summary['file']})")
+        tables[summary['table_name']] = summary
+    return tables
+
+
+def _column_signature(column_names):
+    """カラム構成のシグネチャ（順不同）"""
+    return hash(frozenset(column_names))
+
+
+def _old_column_names(summary):
+    """カラムを旧名（old_nameがあればold_name）で並べたもの"""
+    return [col['old_name'] or name for name, col in summary['columns'].items()]
+
+
+def match_renamed_tables(tables_a, tables_b, removed, added):
+    """
+    削除側（A）と追加側（B）からリネームされたテーブルの組を見つける
+    返り値: [{'from', 'to', 'method'}, ...]
+    """
+    renamed = []
+    removed_set = set(removed)
+    matched_added = set()
+
+    # 1) 変換情報（original_table_name）による一致
+    for name in added:
+        original = tables_b[name]['original_table_name']
+        if original and original in removed_set:
+            renamed.append({'from': original, 'to': name, 'method': 'original_table_name'})
+            removed_set.discard(original)
+            matched_added.add(name)
+
+    # 2) カラム構成のシグネチャによる一致（一意に決まるものだけ）
+    signatures = {}
+    for name in removed:
+        if name in removed_set and tables_a[name]['columns']:
+            signatures.setdefault(_column_signature(tables_a[name]['columns']), []).append(name)
+
+    for name in added:
+        if name in matched_added or not tables_b[name]['columns']:
+            continue
+        for column_names in (_old_column_names(tables_b[name]), tables_b[name]['columns']):
+            candidates = [c for c in signatures.get(_column_signature(column_names), ())
+                          if c in removed_set]
+            if len(candidates) == 1:
+                renamed.append({'from': candidates[0], 'to': name, 'method': 'column_signature'})
+                removed_set.discard(candidates[0])
+                matched_added.add(name)
+                break
+
+    return renamed
+
+
+def diff_columns(columns_a, columns_b):
+    """同一テーブル（またはリネーム前後）のカラム差分"""
+    removed = [name for name in columns_a if name not in columns_b]
+    added = [name for name in columns_b if name not in columns_a]
+
+    removed_set = set(removed)
+    renamed = []
+    for name in added:
+        old_name = columns_b[name]['old_name']
+        if old_name and old_name != name and old_name in removed_set:
+            renamed.append({'from': old_name, 'to': name})
+            removed_set.discard(old_name)
+
+    renamed_to = {r['to'] for r in renamed}
+    pairs = [(name, name) for name in columns_b if name in columns_a]
+    pairs += [(r['from'], r['to']) for r in renamed]
+
+    changed = []
+    for name_a, name_b in pairs:
+        col_a = columns_a[name_a]
+        col_b = columns_b[name_b]
+        for field in COMPARED_FIELDS:
+            if col_a[field] != col_b[field]:
+                changed.append({'column': name_b, 'field': field,
+                                'from': col_a[field], 'to': col_b[field]})
+
+    return {
+        'added': [name for name in added if name not in renamed_to],
+        'removed': [name for name in removed if name in removed_set],
+        'renamed': renamed,
+        'changed': changed,
+    }
+
+
+def diff_trees(tables_a, tables_b):
+    """2つの索引の差分を求める"""
+    removed = [name for name in tables_a if name not in tables_b]
+    added = [name for name in tables_b if name not in tables_a]
+    renamed = match_renamed_tables(tables_a, tables_b, removed, added)
+
+    renamed_from = {r['from'] for r in renamed}
+    renamed_to = {r['to'] for r in renamed}
+
+    pairs = [(name, name) for name in tables_b if name in tables_a]
+    pairs += [(r['from'], r['to']) for r in renamed]
+
+    changed = []
+    for name_a, name_b in sorted(pairs, key=lambda pair: pair[1]):
+        column_diff = diff_columns(tables_a[name_a]['columns'], tables_b[name_b]['columns'])
+        if any(column_diff.values()):
+            changed.append({'table': name_b, 'from_table': name_a, **column_diff})
+
+    return {
+        'tables': {
+            'added': sorted(name for name in added if name not in renamed_to),
+            'removed': sorted(name for name in removed if name not in renamed_from),
+            'renamed': sorted(renamed, key=lambda r: r['to']),
+        },
+        'changed': changed,
+    }
+
+
+def summarize(diff):
+    """件数サマリー"""
+    return {
+        'tables_added': len(diff['tables']['added']),
+        'tables_removed': len(diff['tables']['removed']),
+        'tables_renamed': len(diff['tables']['renamed']),
+        'tables_changed': len(diff['changed']),
+        'columns_added': sum(len(t['added']) for t in diff['changed']),
+        'columns_removed': sum(len(t['removed']) for t in diff['changed']),
+        'columns_renamed': sum(len(t['renamed']) for t in diff['changed']),
+        'columns_changed': sum(len(t['changed']) for t in diff['changed']),
+    }
+
+
+def render_markdown(diff, summary, path_a, path_b):
+    """差分をMarkdownにする"""
+    lines = [
+        '# スキーマ差分レポート',
+        '',
+        f'- A: `{path_a}`',
+        f'- B: `{path_b}`',
+        f'- 作成日時: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
+        '',
+        '## サマリー',
+        '',
+        f'- テーブル追加: {summary["tables_added"]}',
+        f'- テーブル削除: {summary["tables_removed"]}',
+        f'- テーブル名変更: {summary["tables_renamed"]}',
+        f'- カラム変更のあるテーブル: {summary["tables_changed"]}',
+        f'- カラム追加/削除/名前変更/属性変更: {summary["columns_added"]}/{summary["columns_removed"]}'
+        f'/{summary["columns_renamed"]}/{summary["columns_changed"]}',
+        '',
+    ]
+
+    tables = diff['tables']
+    if tables['added']:
+        lines += ['## 追加されたテーブル', ''] + [f'- `{name}`' for name in tables['added']] + ['']
+    if tables['removed']:
+        lines += ['## 削除されたテーブル', ''] + [f'- `{name}`' for name in tables['removed']] + ['']
+    if tables['renamed']:
+        lines += ['## 名前が変わったテーブル', '']
+        lines += [f'- `{r["from"]}` → `{r["to"]}` ({r["method"]})' for r in tables['renamed']]
+        lines.append('')
+
+    if diff['changed']:
+        lines += ['## カラムの変更', '']
+        for table in diff['changed']:
+            title = table['table']
+            if table['from_table'] != table['table']:
+                title = f"{table['from_table']} → {table['table']}"
+            lines += [f'### {title}', '']
+            lines += [f'- 追加: `{name}`' for name in table['added']]
+            lines += [f'- 削除: `{name}`' for name in table['removed']]
+            lines += [f'- 名前変更: `{r["from"]}` → `{r["to"]}`' for r in table['renamed']]
+            lines += [f'- 変更: `{c["column"]}`.{c["field"]}: `{c["from"]}` → `{c["to"]}`'
+                      for c in table['changed']]
+            lines.append('')
+
+    return '\n'.join(lines)
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='テーブル定義スナップショットの差分')
+    parser.add_argument('a', type=Path, help='比較元ディレクトリ')
+    parser.add_argument('b', type=Path, help='比較先ディレクトリ')
+    parser.add_argument('--output-dir', type=Path,
+                        default=project_root / 'schema/derived/diff' / datetime.now().strftime('%Y-%m-%d'),
+                        help='レポートの出力先（既定: schema/derived/diff/YYYY-MM-DD）')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='YAML読み込みの並列数')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('schema_diff', args)
+
+    for path in (args.a, args.b):
+        if not path.is_dir():
+            print(f"Error: {path} が見つかりません")
+            sys.exit(1)
+
+    with instrumentation.phase('index'):
+        tables_a = index_tree(args.a, jobs=args.jobs)
+        tables_b = index_tree(args.b, jobs=args.jobs)
+    print(f"A: {len(tables_a)}テーブル / B: {len(tables_b)}テーブル")
+
+    with instrumentation.phase('diff'):
+        diff = diff_trees(tables_a, tables_b)
+    summary = summarize(diff)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    markdown_path = args.output_dir / 'schema_diff.md'
+    json_path = args.output_dir / 'schema_diff.json'
+
+    with open(markdown_path, 'w', encoding='utf-8') as f:
+        f.write(render_markdown(diff, summary, args.a, args.b))
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'a': str(args.a), 'b': str(args.b), 'summary': summary, **diff},
+                  f, ensure_ascii=False, indent=2)
+
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+    print(f"レポート: {markdown_path}")
+    print(f"JSON: {json_path}")
+    session.finish(extra={'summary': summary})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+rename_dictionary.yaml で未変換（new が旧名のまま）の名前に、変換先の候補を提案するスクリプト
+
+Index: dictionary/naming_dictionary_v0.2.1.yaml        正規語・同義語・rename_tokens
+       dictionary/product_fields_dictionary_v0.2.1.yaml 正規語・同義語
+       dictionary/rename_dictionary.yaml                 確定済みの変換（new が旧名と異なるもの）
+Output: schema/derived/suggestions/YYYY-MM-DD/suggestions.csv
+        （name, kind, table, rank, score, target, matched, matched_kind, source）
+
+Usage: python suggest_names.py [--top 5] [--threshold 0.3] [name ...]
+  name を省略すると変換辞書の未変換のテーブル名・カラム名すべてを対象にする。
+
+名前を文字3-gram（先頭 ^ と末尾 $ を付ける）の集合にして転置索引を作り、
+Jaccard係数が threshold 以上の候補を順位付けして返す。
+検索は prefix filtering で、出現の少ない3-gramから「一致しうる最少個数」分の
+転置リストだけを引いて候補を絞り、候補ごとに正確な係数を計算する。
+全件との比較はしないため、数万件の索引でも1件あたりの検索は索引の大きさにほぼよらない。
+"""
+
+import argparse
+import csv
+import math
+import time
+from datetime import datetime
+from pathlib import Path
+
+import instrumentation
+from dictionary_flat import iter_term_entries
+from yaml_io import load_yaml
+from yaml_rename import load_rename_dictionary
+
+
+NGRAM = 3
+# テーブル名・カラム名それぞれの検索で使う索引の種別
+TABLE_KINDS = frozenset({'table', 'canonical', 'synonym', 'rename_token'})
+COLUMN_KINDS = frozenset({'column', 'canonical', 'synonym', 'rename_token'})
+# 命名辞書の語（名前の一部として置き換える）
+TERM_KINDS = frozenset({'canonical', 'synonym', 'rename_token'})
+
+
+def ngrams(name, n=NGRAM):
+    """名前の文字n-gramの集合（小文字化し、先頭と末尾に印を付ける）"""
+    padded = f'^{name.lower()}$'
+    return frozenset(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+def replace_tokens(name, word, replacement):
+    """
+    name の _ 区切りのトークン列に word のトークン列が含まれていれば replacement に置き換える
+    （例: medical_equipment_ledger, medical_equipment → medical_device_ledger）。含まれなければ None
+    """
+    tokens = name.split('_')
+    word_tokens = word.lower().split('_')
+    lowered = [token.lower() for token in tokens]
+    width = len(word_tokens)
+    for start in range(len(tokens) - width + 1):
+        if lowered[start:start + width] == word_tokens:
+            return '_'.join(tokens[:start] + [replacement] + tokens[start + width:])
+    return None
+
+
+class SuggestionIndex:
+    """文字n-gramの転置索引"""
+
+    def __init__(self, n=NGRAM):
+        self.n = n
+        self.entries = []       # [(一致した名前, 変換先, 種別, 出典)]
+        self.grams = []         # 項目ごとのn-gram集合
+        self.postings = {}      # n-gram → 項目番号のリスト
+        self.counts = []        # 同じ変換が登録された回数（同点時に多いものを優先）
+        self._ids = {}
+
+    def add(self, name, target, kind, source):
+        """索引に1件追加（同じ 名前・変換先・種別 は1件にまとめる）"""
+        name, target = str(name), str(target)
+        key = (name, target, kind)
+        if not name:
+            return
+        if key in self._ids:
+            self.counts[self._ids[key]] += 1
+            return
+
+        entry_id = self._ids[key] = len(self.entries)
+        grams = ngrams(name, self.n)
+        self.entries.append((name, target, kind, source))
+        self.grams.append(grams)
+        self.counts.append(1)
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(entry_id)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def suggest(self, name, top=5, threshold=0.3, kinds=None):
+        """
+        name に近い項目を係数の高い順に返す
+        返り値: [{'target', 'matched', 'kind', 'source', 'score', 'count'}]（変換先ごとに最高の1件）
+        命名辞書の語が名前の一部に含まれる場合、target はその部分を置き換えた名前になる
+        """
+        query = ngrams(name, self.n)
+        size = len(query)
+        # Jaccard ≥ threshold には共通のn-gramが min_overlap 個以上必要で、
+        # 出現の少ない順に (size - min_overlap + 1) 個のうち少なくとも1つを共有する
+        min_overlap = max(1, math.ceil(threshold * size))
+        probes = sorted(query, key=lambda gram: len(self.postings.get(gram, ())))[:size - min_overlap + 1]
+
+        candidates = set()
+        for gram in probes:
+            candidates.update(self.postings.get(gram, ()))
+
+        lowered = name.lower()
+        best = {}
+        for entry_id in candidates:
+            matched, target, kind, source = self.entries[entry_id]
+            if kinds is not None and kind not in kinds:
+                continue
+            grams = self.grams[entry_id]
+            # 大きさの差だけで threshold に届かないものは共通部分を数えない
+            if min(size, len(grams)) < threshold * max(size, len(grams)):
+                continue
+            overlap = len(query & grams)
+            score = overlap / (size + len(grams) - overlap)
+            if score < threshold:
+                continue
+            if kind in TERM_KINDS:
+                # 語が名前の一部として含まれていれば、その部分だけを置き換えた名前を提案する
+                target = replace_tokens(name, matched, target) or target
+            if target.lower() == lowered:
+                continue
+            previous = best.get(target)
+            if previous is None or score > previous['score']:
+                best[target] = {'target': target, 'matched': matched, 'kind': kind,
+                                'source': source, 'score': round(score, 4), 'count': self.counts[entry_id]}
+
+        ranked = sorted(best.values(), key=lambda s: (-s['score'], -s['count'],
+                                                     abs(len(s['matched']) - len(name)), s['target']))
+        return ranked[:top]
+
+
+def build_suggestion_index(rename_dict, naming_dict=None, product_fields_dict=None):
+    """命名辞書・商品項目辞書の語と、変換辞書の確定済みの変換から索引を作る"""
+    index = SuggestionIndex()
+
+    for word, kind, canonical, term_id in iter_term_entries(naming_dict, product_fields_dict):
+        if kind == 'forbidden' or not canonical or not canonical.replace('_', '').isalnum():
+            continue  # パターン（"*_at / *_on" など）は候補にしない
+        index.add(word, canonical, kind, term_id)
+
+    for table_name, info in ((rename_dict or {}).get('tables') or {}).items():
+        new = (info or {}).get('new')
+        if new and new != table_name:
+            index.add(table_name, new, 'table', 'rename_dictionary')
+
+    for table_name, table_columns in ((rename_dict or {}).get('columns') or {}).items():
+        for column_name, info in (table_columns or {}).items():
+            new = (info or {}).get('new') if isinstance(info, dict) else None
+            if new and new != column_name:
+                index.add(column_name, new, 'column', f'rename_dictionary:{table_name}')
+
+    return index
+
+
+def load_suggestion_index(rename_dict_path, naming_dict_path, product_fields_dict_path, rename_dict=None):
+    """辞書ファイルを読み込んで索引を作る（変換辞書を読み込み済みなら rename_dict で渡す）"""
+    if rename_dict is None:
+        rename_dict = load_rename_dictionary(rename_dict_path, use_snapshot=False)
+    return build_suggestion_index(rename_dict, load_yaml(naming_dict_path), load_yaml(product_fields_dict_path))
+
+
+def iter_unmapped_names(rename_dict):
+    """変換辞書で new が旧名のままの名前 (名前, 'table' | 'column', テーブル名)"""
+    for table_name, info in (rename_dict.get('tables') or {}).items():
+        if (info or {}).get('new') in (None, table_name):
+            yield table_name, 'table', table_name
+
+    seen = set()
+    for table_name, table_columns in (rename_dict.get('columns') or {}).items():
+        for column_name, info in (table_columns or {}).items():
+            if isinstance(info, dict) and info.get('new') in (None, column_name) and column_name not in seen:
+                seen.add(column_name)
+                yield column_name, 'column', table_name
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='未変換の名前に変換先の候補を提案')
+    parser.add_argument('names', nargs='*', help='候補を探す名前（既定: 変換辞書の未変換の名前すべて）')
+    parser.add_argument('--kind', choices=['table', 'column'], help='names の種別（既定: 区別しない）')
+    parser.add_argument('--top', type=int, default=5, help='名前ごとの候補数')
+    parser.add_argument('--threshold', type=float, default=0.3, help='候補とするJaccard係数の下限')
+    parser.add_argument('--dictionary', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書ファイル')
+    parser.add_argument('--naming-dictionary', type=Path,
+                        default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml', help='命名辞書ファイル')
+    parser.add_argument('--product-fields-dictionary', type=Path,
+                        default=project_root / 'dictionary/product_fields_dictionary_v0.2.1.yaml',
+                        help='商品項目辞書ファイル')
+    parser.add_argument('--output', type=Path,
+                        default=project_root / 'schema/derived/suggestions' / datetime.now().strftime('%Y-%m-%d')
+                        / 'suggestions.csv', help='候補一覧CSVの出力先')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('suggest_names', args)
+
+    rename_dict = load_rename_dictionary(args.dictionary, use_snapshot=False)
+    with instrumentation.phase('index'):
+        index = load_suggestion_index(args.dictionary, args.naming_dictionary, args.product_fields_dictionary,
+                                      rename_dict=rename_dict)
+
+    if args.names:
+        queries = [(name, args.kind, None) for name in args.names]
+    else:
+        queries = list(iter_unmapped_names(rename_dict))
+    kinds_of = {'table': TABLE_KINDS, 'column': COLUMN_KINDS, None: None}
+
+    started = time.perf_counter()
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    suggested = 0
+    with open(args.output, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'kind', 'table', 'rank', 'score', 'target', 'matched', 'matched_kind', 'source'])
+        for name, kind, table_name in queries:
+            with instrumentation.phase('suggest'):
+                candidates = index.suggest(name, top=args.top, threshold=args.threshold, kinds=kinds_of[kind])
+            if candidates:
+                suggested += 1
+            print(f"{name}{f' ({kind})' if kind else ''}")
+            for rank, candidate in enumerate(candidates, 1):
+                print(f"  {rank}. {candidate['target']:40s} {candidate['score']:.3f}"
+                      f"  ← {candidate['matched']} [{candidate['kind']}: {candidate['source']}]")
+                writer.writerow([name, kind or '', table_name or '', rank, candidate['score'], candidate['target'],
+                                 candidate['matched'], candidate['kind'], candidate['source']])
+            if not candidates:
+                print("  （候補なし）")
+    elapsed = time.perf_counter() - started
+
+    print(f"\n索引: {len(index)}件 / n-gram {len(index.postings)}種類")
+    print(f"候補あり: {suggested} / {len(queries)}件（検索 {elapsed:.3f}s）")
+    print(f"候補一覧: {args.output}")
+    session.finish(extra={'index_entries': len(index), 'queries': len(queries)})
+
+
+if __name__ == '__main__':
+    main()
@@ -4,65 +4,101 @@ optiserveテーブル定義からrename_dictionary.yamlを更新するスクリ
 
 - tables: 既存のキーをnewにもセット（# optiserve v2追加）
 - columns: 既存項目があればマッチング、なければ同名セット（# claude-code set）
+- --suggest: 一致がない名前は suggest_names.py の候補のうち係数が閾値以上の1位を
+  newにセット（# suggest set）
+- 追加した項目は rename_dictionary.yaml を書き直さず、変更ジャーナル
+  （rename_journal.py の rename_dictionary.journal.jsonl）に追記する。
+  --compact でジャーナルを rename_dictionary.yaml に反映する
+- 変換辞書がシャード（rename_shards.py の rename_dictionary.d）に分かれていても同じく
+  ジャーナルに追記する（rollback もできる）。--compact では追加のあったシャードと索引だけを書き戻す
+
+Usage: python update_rename_dictionary.py [--input-dir DIR] [--dictionary PATH]
+                                          [--suggest [THRESHOLD]] [--compact] [--timings] [--profile [PATH]]
 """
 
-import yaml
+import argparse
 import os
+from collections import Counter
 from pathlib import Path
-from datetime import datetime
+
+import instrumentation
+from rename_journal import append_changes, compact, journal_path_for, load_with_journal, make_change
+from rename_shards import has_shards, shard_dir_for
+from suggest_names import COLUMN_KINDS, TABLE_KINDS, build_suggestion_index
+from yaml_io import load_yaml
 
 
 def load_yaml_file(file_path):
     """YAMLファイルを読み込む"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        return load_yaml(file_path)
     except Exception as e:
         print(f"Error loading {file_path}: {e}")
         return None
 
 
-def find_matching_column(column_name, existing_columns):
+# 既存辞書に一致がない場合の既定マッピング
+COMMON_MAPPINGS = {
+    'id': 'id',
+    'user_id': 'user_id',
+    'facility_id': 'medical_facility_id',
+    'medical_facility_id': 'medical_facility_id',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'created_by': 'created_by',
+    'updated_by': 'updated_by',
+    'name': 'name',
+    'description': 'description',
+    'status': 'status',
+    'is_active': 'is_active',
+    'sort_order': 'sort_order',
+    'display_order': 'display_order'
+}
+
+
+def add_to_column_index(column_index, column_name, new_name):
+    """カラム索引に 旧カラム名 → 新カラム名 の対応を1件追加"""
+    column_index.setdefault(column_name, Counter())[new_name] += 1
+
+
+def build_column_index(existing_columns):
+    """
+    既存のcolumnsから索引を作る（1回の実行で1度だけ）
+    返り値: {旧カラム名: Counter({新カラム名: テーブル数})}
+    """
+    column_index = {}
+    for table_columns in existing_columns.values():
+        for col_name, col_info in (table_columns or {}).items():
+            if isinstance(col_info, dict) and col_info.get('new'):
+                add_to_column_index(column_index, col_name, col_info['new'])
+    return column_index
+
+
+def find_matching_column(column_name, column_index):
     """
     既存のcolumnsから類似する項目を探す
-    返り値: (match_found, suggested_new_name)
+    返り値: (match_found, suggested_new_name, conflicts)
+      conflicts: 採用しなかった別の変換先 [(新カラム名, テーブル数), ...]
     """
-    # 完全一致
-    for table_name, table_columns in existing_columns.items():
-        for col_name, col_info in table_columns.items():
-            if col_name == column_name:
-                return True, col_info['new']
+    # 完全一致（複数の変換先がある場合は出現テーブル数の多いもの、同数なら名前順）
+    candidates = column_index.get(column_name)
+    if candidates:
+        ranked = sorted(candidates.items(), key=lambda item: (-item[1], item[0]))
+        return True, ranked[0][0], ranked[1:]
 
     # 部分一致または類似名での検索
-    common_mappings = {
-        'id': 'id',
-        'user_id': 'user_id',
-        'facility_id': 'medical_facility_id',
-        'medical_facility_id': 'medical_facility_id',
-        'created_at': 'created_at',
-        'updated_at': 'updated_at',
-        'created_by': 'created_by',
-        'updated_by': 'updated_by',
-        'name': 'name',
-        'description': 'description',
-        'status': 'status',
-        'is_active': 'is_active',
-        'sort_order': 'sort_order',
-        'display_order': 'display_order'
-    }
-
-    if column_name in common_mappings:
-        return True, common_mappings[column_name]
+    if column_name in COMMON_MAPPINGS:
+        return True, COMMON_MAPPINGS[column_name], []
 
     # 完全一致がない場合は同名を提案
-    return False, column_name
+    return False, column_name, []
 
 
-def process_optiserve_files():
+def process_optiserve_files(optiserve_dir=None):
     """optiserveファイルを処理してrename_dictionary用のデータを生成"""
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    optiserve_dir = project_root / 'tools/config/optiserve'
+    if optiserve_dir is None:
+        project_root = Path(__file__).parent.parent
+        optiserve_dir = project_root / 'tools/config/optiserve'
 
     tables_data = {}
     columns_data = {}
@@ -75,7 +111,8 @@ def process_optiserve_files():
     for yaml_file in yaml_files:
         print(f"処理中: {yaml_file.name}")
 
-        yaml_data = load_yaml_file(yaml_file)
+        with instrumentation.track_file(yaml_file.name):
+            yaml_data = load_yaml_file(yaml_file)
         if not yaml_data:
             continue
 
@@ -109,15 +146,46 @@ def process_optiserve_files():
     return tables_data, columns_data
 
 
-def update_rename_dictionary(new_tables, new_columns):
-    """rename_dictionary.yamlを更新"""
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    dict_path = project_root / 'dictionary/rename_dictionary.yaml'
+def load_suggestion_index_for(existing_dict):
+    """既存の変換辞書と命名辞書・商品項目辞書から候補の索引を作る"""
+    project_root = Path(__file__).parent.parent
+    return build_suggestion_index(existing_dict,
+                                  load_yaml_file(project_root / 'dictionary/naming_dictionary_v0.2.1.yaml'),
+                                  load_yaml_file(project_root / 'dictionary/product_fields_dictionary_v0.2.1.yaml'))
+
+
+def suggest_new_name(name, suggestions, kinds, threshold):
+    """
+    候補の1位が閾値以上ならその名前を返す
+    返り値: (新しい名前, 説明に付けるコメント) または None
+    """
+    with instrumentation.phase('suggest'):
+        candidates = suggestions.suggest(name, top=1, threshold=threshold, kinds=kinds)
+    if not candidates:
+        return None
+    best = candidates[0]
+    return best['target'], f" # suggest set ({best['matched']} {best['score']:.2f})"
+
 
-    # 既存の辞書を読み込み
-    print(f"既存辞書を読み込み: {dict_path}")
-    existing_dict = load_yaml_file(dict_path)
+def update_rename_dictionary(new_tables, new_columns, dict_path=None, suggest_threshold=None, compact_after=False):
+    """
+    rename_dictionary.yamlを更新（追加分をジャーナルに追記）
+    suggest_threshold を指定すると、一致がない名前に候補（係数が閾値以上の1位）をセットする
+    compact_after を指定すると、追記後にジャーナルを rename_dictionary.yaml に反映する
+    """
+    if dict_path is None:
+        project_root = Path(__file__).parent.parent
+        dict_path = project_root / 'dictionary/rename_dictionary.yaml'
+    dict_path = Path(dict_path)
+
+    # 既存の辞書を読み込み（シャードでも rename_dictionary.yaml でも、ジャーナルを重ねた内容）
+    sharded = has_shards(dict_path)
+    print(f"既存辞書を読み込み: {shard_dir_for(dict_path) if sharded else dict_path}{'（シャード）' if sharded else ''}")
+    try:
+        existing_dict = load_with_journal(dict_path)
+    except Exception as e:
+        print(f"Error loading {dict_path}: {e}")
+        existing_dict = None
     if not existing_dict:
         print("既存辞書の読み込みに失敗")
         return False
@@ -128,19 +196,35 @@ def update_rename_dictionary(new_tables, new_columns):
     print(f"既存tables: {len(existing_tables)}個")
     print(f"既存columns: {len(existing_columns)}個")
 
+    suggestions = None
+    suggested = 0
+    if suggest_threshold is not None:
+        with instrumentation.phase('index'):
+            suggestions = load_suggestion_index_for(existing_dict)
+
+    # 追加した項目（ジャーナルに追記する変更）
+    changes = []
+
     # tablesセクションを更新
     tables_added = 0
     for table_name, table_info in new_tables.items():
         if table_name not in existing_tables:
+            new_name, comment = table_info['new'], " # optiserve v2追加"
+            suggestion = suggestions and suggest_new_name(table_name, suggestions, TABLE_KINDS, suggest_threshold)
+            if suggestion:
+                (new_name, comment), suggested = suggestion, suggested + 1
             existing_tables[f"{table_name}"] = {
-                'new': table_info['new'],
-                'description': f"{table_info['description']} # optiserve v2追加"
+                'new': new_name,
+                'description': f"{table_info['description']}{comment}"
             }
+            changes.append(make_change('add', table_name, None, None, existing_tables[table_name]))
             tables_added += 1
-            print(f"  tables追加: {table_name}")
+            print(f"  tables追加: {table_name}{f' -> {new_name}' if new_name != table_name else ''}")
 
     # columnsセクションを更新
+    column_index = build_column_index(existing_columns)
     columns_added = 0
+    conflicts_found = 0
     for table_name, table_columns in new_columns.items():
         if table_name not in existing_columns:
             existing_columns[table_name] = {}
@@ -148,38 +232,52 @@ def update_rename_dictionary(new_tables, new_columns):
         for col_name, col_info in table_columns.items():
             if col_name not in existing_columns[table_name]:
                 # 既存columnsから類似項目を検索
-                match_found, suggested_new = find_matching_column(col_name, existing_columns)
+                with instrumentation.phase('match'):
+                    match_found, suggested_new, conflicts = find_matching_column(col_name, column_index)
 
                 comment = " # claude-code set" if match_found else " # optiserve v2追加"
+                suggestion = (not match_found and suggestions
+                              and suggest_new_name(col_name, suggestions, COLUMN_KINDS, suggest_threshold))
+                if suggestion:
+                    (suggested_new, comment), suggested = suggestion, suggested + 1
 
                 existing_columns[table_name][col_name] = {
                     'new': suggested_new,
                     'description': f"{col_info['description']}{comment}"
                 }
+                changes.append(make_change('add', table_name, col_name, None, existing_columns[table_name][col_name]))
+                add_to_column_index(column_index, col_name, suggested_new)
                 columns_added += 1
                 print(f"  columns追加: {table_name}.{col_name} -> {suggested_new}")
 
+                if conflicts:
+                    conflicts_found += 1
+                    others = ', '.join(f"{name}({count})" for name, count in conflicts)
+                    print(f"    注意: 他の変換先あり: {others}")
+
     # 更新された辞書を保存
     existing_dict['tables'] = existing_tables
     existing_dict['columns'] = existing_columns
 
-    # バックアップファイル名
-    backup_path = dict_path.with_suffix(f'.yaml.backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
-
     try:
-        # 現在のファイルをバックアップ
-        with open(dict_path, 'r', encoding='utf-8') as src, \
-             open(backup_path, 'w', encoding='utf-8') as dst:
-            dst.write(src.read())
-
-        # 更新されたファイルを保存
-        with open(dict_path, 'w', encoding='utf-8') as f:
-            yaml.dump(existing_dict, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        # 追加分だけをジャーナルに追記（辞書全体・シャードは書き直さない）
+        journal_path = journal_path_for(dict_path)
+        entries = append_changes(journal_path, changes, 'update_rename_dictionary')
+        saved_label = (f"{journal_path.name} seq {entries[0]['seq']}-{entries[-1]['seq']}" if entries
+                       else f"{journal_path.name}（追記なし）")
+        if compact_after:
+            with instrumentation.phase('compact'):
+                compacted = compact(dict_path)
+            target = shard_dir_for(dict_path).name if sharded else dict_path.name
+            saved_label += f" → {target} に {compacted}件を反映"
 
         print(f"\n更新完了:")
         print(f"  tables追加: {tables_added}個")
         print(f"  columns追加: {columns_added}個")
-        print(f"  バックアップ: {backup_path.name}")
+        print(f"  変換先の競合: {conflicts_found}個")
+        if suggestions is not None:
+            print(f"  候補をセット: {suggested}個（閾値 {suggest_threshold}）")
+        print(f"  保存先: {saved_label}")
         return True
 
     except Exception as e:
@@ -189,11 +287,22 @@ def update_rename_dictionary(new_tables, new_columns):
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description='optiserveテーブル定義からrename_dictionary.yamlを更新')
+    parser.add_argument('--input-dir', type=Path, help='テーブル定義のディレクトリ（既定: tools/config/optiserve）')
+    parser.add_argument('--dictionary', type=Path, help='変換辞書（既定: dictionary/rename_dictionary.yaml）')
+    parser.add_argument('--suggest', nargs='?', type=float, const=0.8, default=None, metavar='THRESHOLD',
+                        help='一致がない名前に係数が閾値（既定: 0.8）以上の候補をセットする')
+    parser.add_argument('--compact', action='store_true',
+                        help='追記後にジャーナルを rename_dictionary.yaml に反映する')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('update_rename_dictionary', args)
+
     print("optiserveテーブル定義からrename_dictionary.yaml更新処理を開始")
     print("="*60)
 
     # optiserveファイルを処理
-    new_tables, new_columns = process_optiserve_files()
+    new_tables, new_columns = process_optiserve_files(args.input_dir)
 
     if not new_tables:
         print("処理対象のテーブルが見つかりませんでした")
@@ -204,10 +313,12 @@ def main():
     print(f"  新規columns: {sum(len(cols) for cols in new_columns.values())}個")
 
     # rename_dictionary.yamlを更新
-    if update_rename_dictionary(new_tables, new_columns):
+    if update_rename_dictionary(new_tables, new_columns, args.dictionary, suggest_threshold=args.suggest,
+                                compact_after=args.compact):
         print("\n処理が正常に完了しました")
     else:
         print("\n処理中にエラーが発生しました")
+    session.finish()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+辞書ファイルの形式と整合性をチェックするスクリプト
+
+Input: dictionary/naming_dictionary_v0.2.1.yaml        dictionary/schema.json で検証
+       dictionary/product_fields_dictionary_v0.2.1.yaml 組み込みのスキーマで検証
+       dictionary/rename_dictionary.yaml                 組み込みのスキーマ＋変換ルールの整合性
+Rules: lint/lint_config.yaml（変換後の名前の命名規約チェック）
+Baseline: lint/dictionary_baseline.yaml（既知の問題。--update-baseline で作り直す）
+Output: 問題の一覧（標準出力。`ファイル:行: [rule] message`）。baseline にないエラーがある場合は終了コード1
+
+Usage: python validate_dictionaries.py [--strict] [--naming PATH] [--product-fields PATH]
+                                       [--rename PATH] [--schema PATH] [--config PATH]
+                                       [--baseline PATH | --no-baseline | --update-baseline]
+  --strict: 警告（変換後の名前の命名規約違反など）もエラーとして扱う
+  --update-baseline: 今回見つかった問題をすべて既知の問題として baseline に書き直す
+
+チェック内容:
+- schema:            JSONスキーマ（type / required / properties / additionalProperties / items /
+                     enum / const / pattern / minLength / maxLength / minimum / maximum / minItems /
+                     $ref）に合っているか。スキーマは起動時に1回だけ検証関数（クロージャ）にコンパイルする
+- duplicate_key:     同じマッピング内の重複キー（YAMLの読み込みでは後勝ちで消えるもの）
+- duplicate_id:      命名辞書・商品項目辞書の term id の重複
+- forbidden_canonical: 禁止語が別の語の正規語になっている
+- duplicate_new_column: 1つのテーブルで複数の旧カラムが同じ新カラム名になる
+- duplicate_new_table:  複数の旧テーブルが同じ新テーブル名になる
+- new_table_collision:  新テーブル名が、名前を変えずに残る別のテーブルと同じ
+- lint_*（警告）:     新テーブル名・新カラム名が命名規約（lint_names.py と同じルール）に違反する
+変換辞書に未反映の変更ジャーナル（rename_journal.py）があれば重ねてからチェックし、
+ジャーナルで変更した項目の問題はジャーナルの行番号で報告する。
+baseline にある問題（ファイル・rule・パス・メッセージが同じもの。行番号は見ない）は報告せず、
+終了コードにも数えない。辞書の判断が必要な既知の問題を残したまま、新しい問題だけを止めるため。
+各ファイルはYAMLを1回だけ解析し、同時に各値の行番号を記録する。
+整合性のチェックは名前ごとのハッシュ索引で1回の走査で行う。
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+import instrumentation
+from lint_names import Baseline, compile_rules, lint_column, lint_table_name, project_relative
+from rename_journal import apply_change, journal_path_for, read_journal
+from yaml_io import SafeLoader, load_yaml
+
+
+PRODUCT_FIELDS_SCHEMA = {
+    'type': 'object',
+    'required': ['version'],
+    'properties': {
+        'version': {'type': 'string'},
+        'updated_at': {'type': 'string'},
+        'entities': {'type': 'array', 'items': {'$ref': '#/$defs/term'}},
+        'fields': {'type': 'array', 'items': {'$ref': '#/$defs/term'}},
+        'forbidden': {'type': ['array', 'object']},
+    },
+    '$defs': {
+        'term': {
+            'type': 'object',
+            'required': ['id', 'canonical'],
+            'properties': {
+                'id': {'type': 'string'},
+                'canonical': {'type': 'object', 'required': ['en']},
+                'synonyms': {'type': ['array', 'object']},
+                'lint': {'type': 'object'},
+            },
+        },
+    },
+}
+
+RENAME_DICTIONARY_SCHEMA = {
+    'type': 'object',
+    'required': ['tables'],
+    'properties': {
+        'version': {'type': ['integer', 'string']},
+        'tables': {'type': 'object', 'additionalProperties': {'$ref': '#/$defs/rule'}},
+        'columns': {
+            'type': 'object',
+            'additionalProperties': {'type': ['object', 'null'], 'additionalProperties': {'$ref': '#/$defs/rule'}},
+        },
+    },
+    '$defs': {
+        'rule': {
+            'type': 'object',
+            'required': ['new'],
+            'properties': {
+                'new': {'type': 'string', 'minLength': 1, 'pattern': r'^[A-Za-z0-9_.]+$'},
+                'description': {'type': ['string', 'null']},
+            },
+        },
+    },
+}
+
+
+# --- JSONスキーマのコンパイル ---------------------------------------------
+
+_TYPE_CHECKS = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+
+def _type_name(value):
+    for name, check in _TYPE_CHECKS.items():
+        if check(value):
+            return name
+    return type(value).__name__
+
+
+def compile_schema(schema, root=None, _refs=None):
+    """
+    JSONスキーマを検証関数にコンパイルする
+    返り値: validate(value, path, report)。違反ごとに report(path, message) を呼ぶ
+    """
+    root = schema if root is None else root
+    refs = {} if _refs is None else _refs
+
+    if '$ref' in schema:
+        ref = schema['$ref']
+        if ref not in refs:
+            if not ref.startswith('#/'):
+                raise ValueError(f"外部の $ref には対応していません: {ref}")
+            target = root
+            for part in ref[2:].split('/'):
+                target = target[part.replace('~1', '/').replace('~0', '~')]
+            refs[ref] = None  # 再帰的な参照のための仮置き
+            refs[ref] = compile_schema(target, root, refs)
+        return lambda value, path, report: refs[ref](value, path, report)
+
+    checks = []
+
+    if 'type' in schema:
+        names = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        type_checks = [_TYPE_CHECKS[name] for name in names]
+        expected = ' / '.join(names)
+
+        def check_type(value, path, report):
+            if not any(check(value) for check in type_checks):
+                report(path, f"型が {expected} ではありません（{_type_name(value)}）")
+                return False
+        checks.append(check_type)
+
+    if 'enum' in schema:
+        allowed = schema['enum']
+
+        def check_enum(value, path, report):
+            if value not in allowed:
+                report(path, f"値 {value!r} は {allowed} のいずれでもありません")
+        checks.append(check_enum)
+
+    if 'const' in schema:
+        constant = schema['const']
+
+        def check_const(value, path, report):
+            if value != constant:
+                report(path, f"値が {constant!r} ではありません")
+        checks.append(check_const)
+
+    if isinstance(schema.get('pattern'), str) or 'minLength' in schema or 'maxLength' in schema:
+        regex = re.compile(schema['pattern']) if 'pattern' in schema else None
+        min_length = schema.get('minLength')
+        max_length = schema.get('maxLength')
+
+        def check_string(value, path, report):
+            if not isinstance(value, str):
+                return
+            if regex is not None and not regex.search(value):
+                report(path, f"値 {value!r} がパターン {regex.pattern} に一致しません")
+            if min_length is not None and len(value) < min_length:
+                report(path, f"長さが {min_length} 未満です")
+            if max_length is not None and len(value) > max_length:
+                report(path, f"長さが {max_length} を超えています")
+        checks.append(check_string)
+
+    if 'minimum' in schema or 'maximum' in schema:
+        minimum = schema.get('minimum')
+        maximum = schema.get('maximum')
+
+        def check_range(value, path, report):
+            if not _TYPE_CHECKS['number'](value):
+                return
+            if minimum is not None and value < minimum:
+                report(path, f"値 {value} が最小値 {minimum} 未満です")
+            if maximum is not None and value > maximum:
+                report(path, f"値 {value} が最大値 {maximum} を超えています")
+        checks.append(check_range)
+
+    if 'required' in schema or 'properties' in schema or 'additionalProperties' in schema:
+        required = list(schema.get('required') or [])
+        properties = {name: compile_schema(sub, root, refs) for name, sub in (schema.get('properties') or {}).items()}
+        additional = schema.get('additionalProperties', True)
+        additional_validate = compile_schema(additional, root, refs) if isinstance(additional, dict) else None
+
+        def check_object(value, path, report):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    report(path, f"必須項目 '{name}' がありません")
+            for name, item in value.items():
+                validate = properties.get(name)
+                if validate is not None:
+                    validate(item, path + (name,), report)
+                elif additional_validate is not None:
+                    additional_validate(item, path + (name,), report)
+                elif additional is False:
+                    report(path + (name,), f"項目 '{name}' は定義されていません")
+        checks.append(check_object)
+
+    if 'items' in schema or 'minItems' in schema:
+        items_validate = compile_schema(schema['items'], root, refs) if isinstance(schema.get('items'), dict) else None
+        min_items = schema.get('minItems')
+
+        def check_array(value, path, report):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                report(path, f"要素数が {min_items} 未満です")
+            if items_validate is not None:
+                for i, item in enumerate(value):
+                    items_validate(item, path + (i,), report)
+        checks.append(check_array)
+
+    def validate(value, path, report):
+        for check in checks:
+            if check(value, path, report) is False:
+                return
+    return validate
+
+
+# --- YAMLの読み込み（行番号つき） --------------------------------------------
+
+def load_with_lines(file_path):
+    """
+    YAMLを1回だけ解析して (データ, 行番号の索引, 重複キーのリスト) を返す
+    行番号の索引: {パス（キー・添字のタプル。キーは文字列）: 行番号（1始まり）}
+    重複キー: [(パス, 行番号, 先に出現した行番号)]
+    """
+    with instrumentation.phase('read'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+    with instrumentation.phase('parse'):
+        loader = SafeLoader(text)
+        try:
+            node = loader.get_single_node()
+            data = loader.construct_document(node) if node is not None else None
+        finally:
+            loader.dispose()
+
+    lines = {}
+    duplicates = []
+    with instrumentation.phase('index'):
+        stack = [((), node)]
+        while stack:
+            path, current = stack.pop()
+            if current is None:
+                continue
+            lines.setdefault(path, current.start_mark.line + 1)
+            if isinstance(current, yaml.MappingNode):
+                seen = {}
+                values = {}
+                for key_node, value_node in current.value:
+                    key = str(key_node.value)
+                    line = key_node.start_mark.line + 1
+                    if key in seen and key != '<<':
+                        duplicates.append((path + (key,), line, seen[key]))
+                    seen.setdefault(key, line)
+                    lines[path + (key,)] = line
+                    values[key] = value_node
+                # 重複キーは読み込みと同じく後勝ちの値の行番号を記録する
+                stack.extend((path + (key,), value_node) for key, value_node in values.items())
+            elif isinstance(current, yaml.SequenceNode):
+                for i, item in enumerate(current.value):
+                    stack.append((path + (i,), item))
+    return data, lines, duplicates
+
+
+class Reporter:
+    """問題を ファイル:行 つきで集める"""
+
+    def __init__(self):
+        self.problems = []
+
+    def for_file(self, file_path, lines):
+        def line_of(path):
+            path = tuple(str(p) if not isinstance(p, int) else p for p in path)
+            while path and path not in lines:
+                path = path[:-1]
+            return lines.get(path, 1)
+
+        display = Path(file_path)
+        if display.is_absolute():
+            try:
+                display = display.relative_to(Path.cwd())
+            except ValueError:
+                pass
+
+        def report(path, message, rule='schema', severity='error', line=None):
+            self.problems.append({'file': str(display), 'line': line or line_of(path), 'path': _format_path(path),
+                                  'rule': rule, 'severity': severity, 'message': message})
+        return report
+
+
+class DictionaryBaseline(Baseline):
+    """既知の辞書の問題（dictionary_baseline.yaml）"""
+
+    FIELDS = ('file', 'rule', 'path', 'message')
+    HEADER = ('# 既知の辞書の問題（validate_dictionaries.py --update-baseline で作成）\n'
+              '# ここにある問題は報告せず、新しい問題だけで終了コード1にする\n')
+
+    def consume_problem(self, problem):
+        """問題が baseline にあれば True"""
+        return self.match((project_relative(problem['file']), problem['rule'], problem['path'], problem['message']))
+
+
+def overlay_journal(data, journal_path, report, reporter):
+    """
+    変換辞書にジャーナルの変更を重ね、ジャーナルで変更した項目をジャーナルの行で報告する report を返す
+    """
+    entries, _ = read_journal(journal_path)
+    if not entries or not isinstance(data, dict):
+        return report
+
+    journal_lines = {}
+    for line_number, change in entries:
+        apply_change(data, change)
+        if change.get('column') is None:
+            journal_lines[('tables', change['table'])] = line_number
+        else:
+            journal_lines[('columns', change['table'], change['column'])] = line_number
+    journal_report = reporter.for_file(journal_path, journal_lines)
+
+    def overlay_report(path, *args, **kwargs):
+        key = tuple(path)
+        while key and key not in journal_lines:
+            key = key[:-1]
+        (journal_report if key else report)(path, *args, **kwargs)
+    return overlay_report
+
+
+def _format_path(path):
+    return ''.join(f'[{p}]' if isinstance(p, int) else (f'.{p}' if i else str(p)) for i, p in enumerate(path))
+
+
+# --- 整合性のチェック ---------------------------------------------------
+
+def _iter_terms(data, sections):
+    for section in sections:
+        items = (data or {}).get(section)
+        if isinstance(items, list):
+            for i, term in enumerate(items):
+                if isinstance(term, dict):
+                    yield (section, i), term
+
+
+def _words(value):
+    if isinstance(value, dict):
+        return [str(item) for items in value.values() for item in (items or [])]
+    return [str(item) for item in (value or [])]
+
+
+def check_terms(files, report_for):
+    """
+    命名辞書・商品項目辞書の語の整合性
+    files: [(ファイル, データ, 語のセクション名のタプル)]
+    """
+    canonicals = {}
+    for file_path, data, sections in files:
+        report = report_for[file_path]
+        ids = {}
+        for path, term in _iter_terms(data, sections):
+            term_id = term.get('id')
+            if term_id in ids:
+                report(path + ('id',), f"term id '{term_id}' が重複しています（{_format_path(ids[term_id])}）",
+                       rule='duplicate_id')
+            ids.setdefault(term_id, path)
+            canonical = (term.get('canonical') or {}).get('en') if isinstance(term.get('canonical'), dict) else None
+            if canonical:
+                canonicals.setdefault(str(canonical).lower(), (file_path, term_id))
+
+    for file_path, data, sections in files:
+        report = report_for[file_path]
+        forbidden = [(path + ('forbidden',), term.get('id'), term.get('forbidden'))
+                     for path, term in _iter_terms(data, sections)]
+        forbidden.append((('forbidden',), 'forbidden', (data or {}).get('forbidden')))
+        for path, term_id, words in forbidden:
+            for word in _words(words):
+                owner = canonicals.get(word.lower())
+                if owner is not None and owner[1] != term_id:
+                    report(path, f"禁止語 '{word}' が {owner[1]} の正規語です", rule='forbidden_canonical')
+
+
+def check_rename_dictionary(data, report, rules=None):
+    """変換辞書の変換ルールの整合性（1回の走査で索引を作って判定）"""
+    tables = (data or {}).get('tables')
+    columns = (data or {}).get('columns')
+    tables = tables if isinstance(tables, dict) else {}
+    columns = columns if isinstance(columns, dict) else {}
+
+    def new_of(rule):
+        return rule.get('new') if isinstance(rule, dict) and isinstance(rule.get('new'), str) else None
+
+    # 新テーブル名 → 旧テーブル名
+    by_new_table = {}
+    for old, rule in tables.items():
+        new = new_of(rule)
+        if new is None:
+            continue
+        by_new_table.setdefault(new, []).append(old)
+        if rules is not None and new != old:
+            for rule_name, message in lint_table_name(new, rules):
+                report(('tables', old, 'new'), f"新テーブル名 '{new}': {message}", rule=f'lint_{rule_name}',
+                       severity='warning')
+
+    for new, olds in by_new_table.items():
+        renamed = [old for old in olds if old != new]
+        if new in olds:
+            # 名前を変えずに残るテーブルと衝突する
+            for old in renamed:
+                report(('tables', old, 'new'), f"新テーブル名 '{new}' は名前を変えずに残るテーブルと同じです",
+                       rule='new_table_collision')
+        elif len(renamed) > 1:
+            for old in renamed:
+                report(('tables', old, 'new'), f"新テーブル名 '{new}' が重複しています（{', '.join(renamed)}）",
+                       rule='duplicate_new_table')
+
+    for table_name, table_columns in columns.items():
+        if not isinstance(table_columns, dict):
+            continue
+        by_new_column = {}
+        for old, rule in table_columns.items():
+            new = new_of(rule)
+            if new is None:
+                continue
+            by_new_column.setdefault(new, []).append(old)
+            if rules is not None and new != old:
+                for rule_name, message in lint_column({'name': new}, rules):
+                    report(('columns', table_name, old, 'new'), f"新カラム名 '{new}': {message}",
+                           rule=f'lint_{rule_name}', severity='warning')
+
+        for new, olds in by_new_column.items():
+            if len(olds) > 1:
+                for old in olds:
+                    report(('columns', table_name, old, 'new'),
+                           f"{table_name} の新カラム名 '{new}' が重複しています（{', '.join(olds)}）",
+                           rule='duplicate_new_column')
+
+
+def validate_dictionaries(paths, lint=True):
+    """
+    辞書ファイルを検証する
+    paths: {'naming', 'product_fields', 'rename', 'schema', 'config'}
+    返り値: Reporter
+    """
+    reporter = Reporter()
+    with instrumentation.phase('compile'):
+        with open(paths['schema'], 'r', encoding='utf-8') as f:
+            naming_validate = compile_schema(json.load(f))
+        product_validate = compile_schema(PRODUCT_FIELDS_SCHEMA)
+        rename_validate = compile_schema(RENAME_DICTIONARY_SCHEMA)
+
+    loaded = {}
+    report_for = {}
+    for key, validate in (('naming', naming_validate), ('product_fields', product_validate),
+                          ('rename', rename_validate)):
+        file_path = paths[key]
+        data, lines, duplicates = load_with_lines(file_path)
+        report = report_for[file_path] = reporter.for_file(file_path, lines)
+        loaded[key] = data
+        for path, line, first_line in duplicates:
+            report(path, f"キー '{path[-1]}' が重複しています（{first_line}行目）", rule='duplicate_key', line=line)
+        if key == 'rename':
+            report = report_for[file_path] = overlay_journal(data, journal_path_for(file_path), report, reporter)
+        with instrumentation.phase('schema'):
+            validate(data, (), report)
+
+    with instrumentation.phase('check'):
+        check_terms([(paths['naming'], loaded['naming'], ('terms',)),
+                     (paths['product_fields'], loaded['product_fields'], ('entities', 'fields'))], report_for)
+        rules = None
+        if lint and isinstance(loaded['naming'], dict):
+            rules = compile_rules(load_yaml(paths['config']), loaded['naming'])
+        check_rename_dictionary(loaded['rename'], report_for[paths['rename']], rules)
+
+    return reporter
+
+
+def main():
+    """メイン処理"""
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    parser = argparse.ArgumentParser(description='辞書ファイルの形式と整合性のチェック')
+    parser.add_argument('--naming', type=Path, default=project_root / 'dictionary/naming_dictionary_v0.2.1.yaml',
+                        help='命名辞書ファイル')
+    parser.add_argument('--product-fields', type=Path,
+                        default=project_root / 'dictionary/product_fields_dictionary_v0.2.1.yaml',
+                        help='商品項目辞書ファイル')
+    parser.add_argument('--rename', type=Path, default=project_root / 'dictionary/rename_dictionary.yaml',
+                        help='変換辞書ファイル')
+    parser.add_argument('--schema', type=Path, default=project_root / 'dictionary/schema.json',
+                        help='命名辞書のJSONスキーマ')
+    parser.add_argument('--config', type=Path, default=project_root / 'lint/lint_config.yaml', help='lint設定ファイル')
+    parser.add_argument('--no-lint', action='store_true', help='変換後の名前の命名規約チェックをしない')
+    parser.add_argument('--strict', action='store_true', help='警告もエラーとして扱う')
+    parser.add_argument('--baseline', type=Path, default=project_root / 'lint/dictionary_baseline.yaml',
+                        help='既知の問題の一覧（ここにある問題は報告しない）')
+    parser.add_argument('--no-baseline', action='store_true', help='baseline を使わずにすべての問題を報告する')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='今回見つかった問題で baseline を書き直す（終了コードは0）')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('validate_dictionaries', args)
+
+    started = time.perf_counter()
+    paths = {'naming': args.naming, 'product_fields': args.product_fields, 'rename': args.rename,
+             'schema': args.schema, 'config': args.config}
+    reporter = validate_dictionaries(paths, lint=not args.no_lint)
+    elapsed = time.perf_counter() - started
+
+    baseline = DictionaryBaseline(None if args.no_baseline else args.baseline, load=not args.update_baseline)
+    problems = [problem for problem in sorted(reporter.problems, key=lambda p: (p['file'], p['line']))
+                if not baseline.consume_problem(problem)]
+    for problem in problems:
+        label = '' if problem['severity'] == 'error' else '（警告）'
+        print(f"{problem['file']}:{problem['line']}: [{problem['rule']}]{label} {problem['path']}: "
+              f"{problem['message']}")
+
+    errors = sum(1 for p in problems if p['severity'] == 'error')
+    warnings = sum(1 for p in problems if p['severity'] == 'warning')
+    if baseline.matched:
+        print(f"既知の問題（{baseline.path.name}）: {baseline.matched}件")
+    print(f"\n辞書チェック完了: エラー {errors}件 / 警告 {warnings}件 ({elapsed:.3f}s)")
+    if args.update_baseline:
+        baseline.save()
+        print(f"baseline を更新しました: {len(baseline.seen)}件 → {args.baseline}")
+        errors = warnings = 0
+    session.finish(extra={'errors': errors, 'warnings': warnings, 'baseline_matched': baseline.matched})
+    sys.exit(1 if errors or (args.strict and warnings) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,76 +4,127 @@ Excel のテーブル設計をYAMLに変換するスクリプト
 
 Input: tools/config/smds_poc/smds_dbdesign.xlsx
 Output: tools/config/smds_poc/[テーブル名].yaml
+
+Usage: python xlsx_to_yaml.py [--engine openpyxl|pandas] [--jobs N] [--excel PATH] [--output-dir DIR]
+  --engine openpyxl: 読み取り専用モードで行を順に読み、B列が空の行で打ち切る（既定）
+  --engine pandas:   シートごとにDataFrameを作成する従来方式
+  --jobs N:          N個のワーカープロセスでシートを並列に読み込む（openpyxlのみ）
+                     各ワーカーはブックを1回ずつ開き、連続したシートの範囲を受け持つ。
+                     ブックを開く時間はシートを読む時間より長いことが多く（smds_dbdesign.xlsx は
+                     開くのに約0.3s、29シートの読み込みは約0.06s）、並列にして得をするのは
+                     数百シート以上のブックを複数コアで読む場合だけのため、ワーカー数は
+                     CPU数と「MIN_SHEETS_PER_JOB シートにつき1つ」までに抑える（1になればシリアル実行）
+  --timings / --profile: 処理時間の計測（instrumentation.py）。シートの読み込み時間は --jobs 1 のときのみ
 """
 
-import pandas as pd
-import yaml
+import argparse
+import math
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
 
+import instrumentation
+from yaml_io import NullAsEmptyDumper, write_table_yaml
+
+
+# 変換対象外のシート
+EXCLUDED_SHEETS = ['templete', '入力シート', '入力規則']
+
+# ワーカー1つあたりの最小シート数（これより少なければワーカーを増やさない）
+MIN_SHEETS_PER_JOB = 100
+
+# A:description, B:name/old_name, C:data_type, D:primary_key, E:nullable, F:未使用, G:comment
+SHEET_COLUMN_COUNT = 7
+
 
 def read_excel_sheets(excel_path):
     """Excelファイルから対象シートを読み込む"""
+    import pandas as pd
+
     # 全シート名を取得
     xls = pd.ExcelFile(excel_path)
     target_sheets = [sheet for sheet in xls.sheet_names 
-                    if sheet not in ['templete', '入力シート', '入力規則']]
+                    if sheet not in EXCLUDED_SHEETS]
     
     return xls, target_sheets
 
 
-def parse_table_sheet(xls, sheet_name):
-    """各シートからテーブル定義を読み込む"""
-    df = pd.read_excel(xls, sheet_name=sheet_name, header=None)
+def _isna(value):
+    """空セル判定（openpyxlのNone / pandasのNaN）"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _pad_row(row):
+    """行をA〜G列の長さにそろえる"""
+    row = tuple(row)
+    if len(row) < SHEET_COLUMN_COUNT:
+        row += (None,) * (SHEET_COLUMN_COUNT - len(row))
+    return row
+
+
+def parse_column_row(row):
+    """カラム定義1行をdictにする"""
+    # primary_keyの判定（D列が'○'の場合True）
+    is_primary_key = str(row[3]).strip() == '○' if not _isna(row[3]) else False
     
-    # B1セル（インデックス0,1）= description, B2セル（インデックス1,1）= table_name
-    description = df.iloc[0, 1] if not pd.isna(df.iloc[0, 1]) else ""
-    table_name = df.iloc[1, 1] if not pd.isna(df.iloc[1, 1]) else sheet_name
+    # nullableの判定（E列）
+    nullable_val = row[4] if not _isna(row[4]) else True
+    if isinstance(nullable_val, str):
+        nullable = nullable_val.strip().lower() not in ['false', 'no', '×', 'x']
+    else:
+        nullable = bool(nullable_val)
     
-    # 3行目（インデックス2）はヘッダー行のため、4行目（インデックス3）からカラム定義を読み込む
-    # A:description, B:name/old_name, C:data_type, D:primary_key, E:nullable, F:未使用, G:comment
-    columns_data = []
+    return {
+        'name': str(row[1]).strip(),
+        'old_name': str(row[1]).strip(),  # name と同じ値をセット
+        'description': str(row[0]).strip() if not _isna(row[0]) else '',
+        'data_type': str(row[2]).strip() if not _isna(row[2]) else '',
+        'primary_key': is_primary_key,
+        'nullable': nullable,
+        'comment': str(row[6]).strip() if not _isna(row[6]) and str(row[6]).strip() != 'nan' else None
+    }
+
+
+def parse_table_rows(rows, sheet_name):
+    """
+    シートの行（先頭行から順に並んだタプル）からテーブル定義を読み込む
+    B列が空の行に達した時点で読み込みを終了し、残りの行は読まない
+    """
+    rows = iter(rows)
+    first_row = _pad_row(next(rows, ()))
+    second_row = _pad_row(next(rows, ()))
     
-    # 3行目（インデックス2）がヘッダー行かどうか確認
-    header_row = df.iloc[2] if len(df) > 2 else None
-    start_row = 3 if header_row is not None and (
-        str(header_row[1]).strip() in ['レコード名', 'name'] or 
-        str(header_row[2]).strip() in ['タイプ', 'type']
-    ) else 2
+    # B1セル = description, B2セル = table_name
+    description = first_row[1] if not _isna(first_row[1]) else ""
+    table_name = second_row[1] if not _isna(second_row[1]) else sheet_name
     
-    for i in range(start_row, len(df)):  # ヘッダー行をスキップして開始
-        row = df.iloc[i]
+    # 3行目はヘッダー行のため、4行目からカラム定義を読み込む
+    columns_data = []
+    
+    # 3行目がヘッダー行かどうか確認
+    header_row = next(rows, None)
+    if header_row is not None:
+        header_row = _pad_row(header_row)
+        is_header = (
+            str(header_row[1]).strip() in ['レコード名', 'name'] or 
+            str(header_row[2]).strip() in ['タイプ', 'type']
+        )
+        body_rows = rows if is_header else chain([header_row], rows)
         
-        # B列（name）が空の場合は終了
-        if pd.isna(row[1]) or str(row[1]).strip() == '':
-            break
+        for row in body_rows:  # ヘッダー行をスキップして開始
+            row = _pad_row(row)
             
-        # ヘッダー行の値かどうか確認してスキップ
-        if str(row[1]).strip() in ['レコード名', 'name']:
-            continue
+            # B列（name）が空の場合は終了
+            if _isna(row[1]) or str(row[1]).strip() == '':
+                break
+                
+            # ヘッダー行の値かどうか確認してスキップ
+            if str(row[1]).strip() in ['レコード名', 'name']:
+                continue
             
-        # primary_keyの判定（D列が'○'の場合True）
-        is_primary_key = str(row[3]).strip() == '○' if not pd.isna(row[3]) else False
-        
-        # nullableの判定（E列）
-        nullable_val = row[4] if not pd.isna(row[4]) else True
-        if isinstance(nullable_val, str):
-            nullable = nullable_val.strip().lower() not in ['false', 'no', '×', 'x']
-        else:
-            nullable = bool(nullable_val)
-        
-        column = {
-            'name': str(row[1]).strip(),
-            'old_name': str(row[1]).strip(),  # name と同じ値をセット
-            'description': str(row[0]).strip() if not pd.isna(row[0]) else '',
-            'data_type': str(row[2]).strip() if not pd.isna(row[2]) else '',
-            'primary_key': is_primary_key,
-            'nullable': nullable,
-            'comment': str(row[6]).strip() if not pd.isna(row[6]) and str(row[6]).strip() != 'nan' else None
-        }
-        
-        columns_data.append(column)
+            columns_data.append(parse_column_row(row))
     
     return {
         'table_name': str(table_name).strip(),
@@ -82,6 +133,103 @@ def parse_table_sheet(xls, sheet_name):
     }
 
 
+def parse_table_sheet(xls, sheet_name):
+    """各シートからテーブル定義を読み込む（pandas: シート全体をDataFrame化）"""
+    import pandas as pd
+
+    with instrumentation.phase('read_sheet'):
+        df = pd.read_excel(xls, sheet_name=sheet_name, header=None)
+        return parse_table_rows(df.itertuples(index=False, name=None), sheet_name)
+
+
+def open_workbook(excel_path):
+    """読み取り専用モードでブックを開く（シートは行単位で遅延読み込みされる）"""
+    from openpyxl import load_workbook
+
+    return load_workbook(excel_path, read_only=True, data_only=True)
+
+
+def list_target_sheets(workbook):
+    """変換対象のシート名一覧"""
+    return [sheet for sheet in workbook.sheetnames if sheet not in EXCLUDED_SHEETS]
+
+
+def parse_table_sheet_streaming(workbook, sheet_name):
+    """各シートからテーブル定義を読み込む（openpyxl: 行を順に読み、空行で打ち切る）"""
+    with instrumentation.phase('read_sheet'):
+        worksheet = workbook[sheet_name]
+        rows = worksheet.iter_rows(min_row=1, min_col=1, max_col=SHEET_COLUMN_COUNT, values_only=True)
+        return parse_table_rows(rows, sheet_name)
+
+
+# ワーカープロセスごとに一度だけ開くブック
+_worker_workbook = None
+
+
+def _init_worker(excel_path):
+    """ワーカー起動時にブックを開く"""
+    global _worker_workbook
+    _worker_workbook = open_workbook(excel_path)
+
+
+def _parse_sheet_in_worker(sheet_name):
+    """ワーカー側のシート読み込み"""
+    try:
+        return sheet_name, parse_table_sheet_streaming(_worker_workbook, sheet_name), None
+    except Exception as e:
+        return sheet_name, None, str(e)
+
+
+def effective_jobs(jobs, sheet_count):
+    """実際に使うワーカー数（CPU数と MIN_SHEETS_PER_JOB シートにつき1つまで）"""
+    return max(1, min(jobs, os.cpu_count() or 1, sheet_count // MIN_SHEETS_PER_JOB))
+
+
+def iter_table_sheets(excel_path, engine='openpyxl', jobs=1):
+    """
+    対象シートを読み込み、シート順に (sheet_name, table_info, error) を返す
+    jobs は effective_jobs で抑えたワーカー数で使う
+    返り値: (対象シート名リスト, イテレータ)
+    """
+    if engine == 'pandas':
+        xls, target_sheets = read_excel_sheets(excel_path)
+
+        def parse_all():
+            for sheet_name in target_sheets:
+                try:
+                    yield sheet_name, parse_table_sheet(xls, sheet_name), None
+                except Exception as e:
+                    yield sheet_name, None, str(e)
+
+        return target_sheets, parse_all()
+
+    workbook = open_workbook(excel_path)
+    target_sheets = list_target_sheets(workbook)
+    jobs = effective_jobs(jobs, len(target_sheets))
+
+    if jobs <= 1:
+        def parse_all():
+            for sheet_name in target_sheets:
+                try:
+                    yield sheet_name, parse_table_sheet_streaming(workbook, sheet_name), None
+                except Exception as e:
+                    yield sheet_name, None, str(e)
+            workbook.close()
+
+        return target_sheets, parse_all()
+
+    workbook.close()
+
+    def parse_parallel():
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(excel_path,)) as executor:
+            # ワーカーごとに連続したシートの範囲を1回で渡す
+            chunksize = math.ceil(len(target_sheets) / jobs)
+            yield from executor.map(_parse_sheet_in_worker, target_sheets, chunksize=chunksize)
+
+    return target_sheets, parse_parallel()
+
+
 def create_yaml_structure(table_info):
     """YAML構造を作成"""
     yaml_data = {
@@ -118,52 +266,27 @@ def create_yaml_structure(table_info):
 
 
 def save_yaml(yaml_data, output_path):
-    """YAMLファイルを保存"""
-    # カスタムYAML表現設定
-    class CustomDumper(yaml.SafeDumper):
-        def write_line_break(self, data=None):
-            super().write_line_break(data)
-            if len(self.indents) == 1:
-                super().write_line_break()
-
-    # YAMLの出力設定
-    yaml.add_representer(type(None), lambda dumper, value: dumper.represent_scalar('tag:yaml.org,2002:null', ''))
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        # ヘッダーコメント
-        f.write('#- metadata -----------------------------------------------\n')
-        
-        # yamlデータを文字列として取得して手動で整形
-        yaml_str = yaml.dump(yaml_data, 
-                           default_flow_style=False, 
-                           allow_unicode=True,
-                           sort_keys=False,
-                           indent=2)
-        
-        # セクション区切りを追加
-        lines = yaml_str.split('\n')
-        result_lines = []
-        in_columns = False
-        
-        for i, line in enumerate(lines):
-            if line.startswith('table_name:'):
-                result_lines.append('\n#- tableinfo ----------------------------------------------')
-            elif line.startswith('columns:'):
-                result_lines.append('\n#- columns info -------------------------------------------')
-                in_columns = True
-            
-            result_lines.append(line)
-        
-        f.write('\n'.join(result_lines))
+    """YAMLファイルを保存（None は空値として出力）"""
+    write_table_yaml(yaml_data, output_path, dumper=NullAsEmptyDumper)
 
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description='Excelのテーブル設計をYAMLに変換')
+    parser.add_argument('--engine', choices=['openpyxl', 'pandas'], default='openpyxl',
+                        help='読み込み方式（既定: openpyxl の読み取り専用ストリーミング）')
+    parser.add_argument('--jobs', type=int, default=1, help='並列ワーカー数（openpyxlのみ）')
+    parser.add_argument('--excel', type=Path, help='テーブル設計ブック（既定: tools/config/smds_poc/smds_dbdesign.xlsx）')
+    parser.add_argument('--output-dir', type=Path, help='出力ディレクトリ（既定: tools/config/smds_poc）')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('xlsx_to_yaml', args)
+
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     
-    excel_path = project_root / 'tools/config/smds_poc/smds_dbdesign.xlsx'
-    output_dir = project_root / 'tools/config/smds_poc'
+    excel_path = args.excel or project_root / 'tools/config/smds_poc/smds_dbdesign.xlsx'
+    output_dir = args.output_dir or project_root / 'tools/config/smds_poc'
     
     if not excel_path.exists():
         print(f"Error: {excel_path} が見つかりません")
@@ -172,18 +295,20 @@ def main():
     try:
         # Excelファイルを読み込み
         print(f"Excelファイルを読み込み中: {excel_path}")
-        xls, target_sheets = read_excel_sheets(excel_path)
+        target_sheets, parsed_sheets = iter_table_sheets(excel_path, engine=args.engine, jobs=args.jobs)
         
         print(f"変換対象シート: {target_sheets}")
+        if args.engine == 'openpyxl' and args.jobs > 1:
+            print(f"並列ワーカー数: {effective_jobs(args.jobs, len(target_sheets))}（指定: {args.jobs}）")
         
         # 各シートを処理
         success_count = 0
-        for sheet_name in target_sheets:
+        for sheet_name, table_info, error in parsed_sheets:
             print(f"\n処理中: {sheet_name}")
             
             try:
-                # シートからテーブル定義を読み込み
-                table_info = parse_table_sheet(xls, sheet_name)
+                if error is not None:
+                    raise RuntimeError(error)
                 
                 # YAML構造を作成
                 yaml_data = create_yaml_structure(table_info)
@@ -193,7 +318,8 @@ def main():
                 output_file = output_dir / f"{table_name}.yaml"
                 
                 # YAMLファイルを保存
-                save_yaml(yaml_data, output_file)
+                with instrumentation.track_file(sheet_name):
+                    save_yaml(yaml_data, output_file)
                 
                 print(f"  → 保存: {output_file}")
                 print(f"  → テーブル名: {table_name}")
@@ -205,6 +331,7 @@ def main():
                 continue
         
         print(f"\n変換完了: {success_count}/{len(target_sheets)}個のテーブル定義を変換しました")
+        session.finish(extra={'sheets': len(target_sheets), 'success_count': success_count})
         
     except Exception as e:
         print(f"Error: {e}")
@@ -212,4 +339,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+各ツール共通のYAML入出力
+
+libyaml（CSafeLoader / CSafeDumper）が使える環境ではC実装を使い、
+使えない環境では純Python実装（SafeLoader / SafeDumper）にフォールバックする。
+テーブル定義YAMLの出力は従来どおり `#- metadata` / `#- tableinfo` / `#- columns info`
+のセクション区切りを付け、キー順も入力のまま（sort_keys=False）とする。
+読み込み・出力は instrumentation のフェーズ（read / parse / dump / headers / write）として計測される。
+"""
+
+import yaml
+
+from instrumentation import phase
+
+
+HAS_LIBYAML = getattr(yaml, '__with_libyaml__', False)
+
+# C実装はlibyaml付きでビルドされたPyYAMLにだけ存在する
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+SafeDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def _represent_null_as_empty(dumper, value):
+    return dumper.represent_scalar('tag:yaml.org,2002:null', '')
+
+
+class NullAsEmptyDumper(SafeDumper):
+    """None を `key:`（空値）として出力するDumper（xlsx_to_yaml.pyの出力形式）"""
+
+
+class PyNullAsEmptyDumper(yaml.SafeDumper):
+    """NullAsEmptyDumper の純Python版"""
+
+
+NullAsEmptyDumper.add_representer(type(None), _represent_null_as_empty)
+PyNullAsEmptyDumper.add_representer(type(None), _represent_null_as_empty)
+
+# C実装 → 同じ出力になる純Python実装
+_PYTHON_DUMPERS = {
+    SafeDumper: yaml.SafeDumper,
+    NullAsEmptyDumper: PyNullAsEmptyDumper,
+}
+
+# 改行や制御文字を含む文字列はダブルクォートで出力され、折り返し位置が
+# libyamlと純Python実装で異なる。この長さを超えるものがあれば純Python実装で出力する
+_FOLDING_RISK_LENGTH = 40
+
+
+METADATA_HEADER = '#- metadata -----------------------------------------------'
+TABLEINFO_HEADER = '#- tableinfo ----------------------------------------------'
+COLUMNS_HEADER = '#- columns info -------------------------------------------'
+
+
+def load_yaml_text(text, loader=None):
+    """YAML文字列を読み込む"""
+    with phase('parse'):
+        return yaml.load(text, Loader=loader or SafeLoader)
+
+
+def load_yaml(file_path, loader=None):
+    """YAMLファイルを読み込む"""
+    with phase('read'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    return load_yaml_text(text, loader=loader)
+
+
+def _has_folded_double_quoted(data):
+    """ダブルクォートで折り返し出力される文字列を含むか"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            if (len(value) > _FOLDING_RISK_LENGTH
+                    and ('\n' in value or not value.isprintable())):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return False
+
+
+def dump_yaml(data, stream=None, dumper=None):
+    """各ツール共通の書式でYAMLを出力（streamがNoneなら文字列を返す）"""
+    dumper = dumper or SafeDumper
+    if dumper in _PYTHON_DUMPERS and _has_folded_double_quoted(data):
+        # 出力を従来（純Python実装）とバイト単位で揃える
+        dumper = _PYTHON_DUMPERS[dumper]
+
+    with phase('dump'):
+        return yaml.dump(data, stream,
+                         Dumper=dumper,
+                         default_flow_style=False,
+                         allow_unicode=True,
+                         sort_keys=False,
+                         indent=2)
+
+
+def render_table_yaml(yaml_data, dumper=None):
+    """テーブル定義をセクション区切り付きのYAML文字列にする"""
+    yaml_str = dump_yaml(yaml_data, dumper=dumper)
+
+    # セクション区切りを追加
+    with phase('headers'):
+        result_lines = []
+        for line in yaml_str.split('\n'):
+            if line.startswith('table_name:'):
+                result_lines.append('\n' + TABLEINFO_HEADER)
+            elif line.startswith('columns:'):
+                result_lines.append('\n' + COLUMNS_HEADER)
+
+            result_lines.append(line)
+
+        # ヘッダーコメント
+        return METADATA_HEADER + '\n' + '\n'.join(result_lines)
+
+
+def write_text(text, output_path):
+    """テキストをファイルに書き込む（親ディレクトリがなければ作成）"""
+    with phase('write'):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def write_table_yaml(yaml_data, output_path, dumper=None):
+    """テーブル定義をセクション区切り付きで保存"""
+    write_text(render_table_yaml(yaml_data, dumper=dumper), output_path)
@@ -5,19 +5,75 @@
 Input: tools/config/optiserve/*.yaml（既存opiserveファイル）
 Process: dictionary/rename_dictionary.yamlの変換ルールを適用
 Output: tools/config/streamedix/optiserve/*.yaml（新命名）
+
+Usage: python yaml_rename.py [--jobs N] [--no-snapshot] [--input-dir DIR] [--output-dir DIR] [--dictionary PATH]
+                             [--naming-dictionary PATH] [--no-migration-rules] [--resume]
+  --jobs N: N個のワーカープロセスで並列変換（出力はシリアル実行とバイト単位で同一）
+  --no-snapshot: 辞書スナップショット（dictionary_flat.py）を使わずYAMLを読み込む
+  --timings / --profile: 処理時間の計測（instrumentation.py）。--timings のメトリクスは
+                 conversion_report.md と同じ場所に conversion_metrics.json として出力
+  --no-migration-rules: 命名辞書の migration ルール（rename_rules.py）を適用しない
+  --resume: 中断した実行の続きから変換する（conversion_report.jsonl に成功が記録済みのファイルは飛ばす）
+
+変換結果は1ファイル終わるごとに conversion_report.jsonl に1行ずつ追記する
+（旧・新テーブル名、カラムごとの変換と適用ルール、処理時間、エラー）。
+conversion_report.md は最後にこのJSONLを読み直して作るため、変換結果をメモリに溜めない。
+
+変換辞書で変換が決まらない名前（辞書にないもの・new が旧名のままのもの）には、
+命名辞書の migration ルール（*_datetime → *_at などのワイルドカード、rename_tokens）を適用する。
+変換辞書の完全一致が優先され、どのルールで変換したかを conversion_report.md に記録する。
 """
 
-import yaml
+import argparse
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+import instrumentation
+from dictionary_flat import load_fresh_snapshot
+from rename_journal import apply_change, journal_path_for, load_sharded_with_journal, read_journal
+from rename_rules import load_rename_rules
+from rename_shards import has_shards
+from yaml_io import load_yaml, render_table_yaml, write_text
+
+
+# 変換辞書の完全一致で変換した場合に記録するルール名
+DICTIONARY_RULE = 'rename_dictionary'
+
+
+def default_snapshot_path(rename_dict_path):
+    """rename_dictionary.yamlに対応するスナップショット（dictionary_flat.pyで作成）の場所"""
+    project_root = Path(rename_dict_path).resolve().parent.parent
+    return project_root / 'schema/derived/dictionary_flat/dictionary_flat.bin'
+
+
+def load_rename_dictionary(rename_dict_path, use_snapshot=True):
+    """
+    rename_dictionary.yamlを読み込む
+    シャード（rename_shards.py の rename_dictionary.d）があれば索引だけを読み、
+    各シャードは引かれたときに読み込む（シャードに未反映のジャーナルの変更はそのとき重ねる）。
+    なければ最新のスナップショットをYAMLを解析せずにmmapした索引として使う
+    （どちらも tables / columns はMappingとして同じ形で引ける）
+    ジャーナル（rename_journal.py）に未反映の変更があれば、YAMLを読み込んで重ねる
+    """
+    if has_shards(rename_dict_path):
+        return load_sharded_with_journal(rename_dict_path)
+
+    journal, _ = read_journal(journal_path_for(rename_dict_path))
+    if use_snapshot and not journal:
+        flat = load_fresh_snapshot(default_snapshot_path(rename_dict_path), rename=rename_dict_path)
+        if flat is not None:
+            rename_dict = flat.as_rename_dict()
+            rename_dict['version'] = flat.meta.get('rename_version')
+            return rename_dict
 
-def load_rename_dictionary(rename_dict_path):
-    """rename_dictionary.yamlを読み込む"""
-    with open(rename_dict_path, 'r', encoding='utf-8') as f:
-        rename_dict = yaml.safe_load(f)
+    rename_dict = load_yaml(rename_dict_path)
+    for _, change in journal:
+        apply_change(rename_dict, change)
 
     return rename_dict
 
@@ -45,14 +101,76 @@ def rename_column_name(table_name, column_name, rename_dict):
     return column_name  # 変換ルールがない場合はそのまま
 
 
-def process_yaml_file(input_path, rename_dict):
+def resolve_table_name(table_name, rename_dict, rules=None):
+    """
+    テーブル名を変換（変換辞書の完全一致 → migration ルールの順）
+    返り値: (新テーブル名, 適用したルール)。変換しない場合のルールは None
+    """
+    new_name = rename_table_name(table_name, rename_dict)
+    if new_name != table_name:
+        return new_name, DICTIONARY_RULE
+    if rules is not None:
+        new_name, fired = rules.apply(table_name, 'table')
+        if fired:
+            return new_name, ', '.join(fired)
+    return table_name, None
+
+
+def resolve_column_name(table_name, column_name, rename_dict, rules=None):
+    """カラム名を変換（返り値は resolve_table_name と同じ形）"""
+    new_name = rename_column_name(table_name, column_name, rename_dict)
+    if new_name != column_name:
+        return new_name, DICTIONARY_RULE
+    if rules is not None:
+        new_name, fired = rules.apply(column_name, 'column')
+        if fired:
+            return new_name, ', '.join(fired)
+    return column_name, None
+
+
+def apply_rules_to_dictionary(rename_dict, rules):
+    """
+    変換辞書の各項目の new を resolve_table_name / resolve_column_name の結果にした変換辞書を返す
+    （new が旧名のままの項目にだけ migration ルールが効く。元の辞書は変更しない）
+    辞書全体を走査する generate_migration.py / rewrite_sources.py が、yaml_rename.py と同じ
+    変換を使うためのもの
+    """
+    if rules is None:
+        return rename_dict
+    resolved = {key: value for key, value in rename_dict.items() if key not in ('tables', 'columns')}
+    resolved['tables'] = {
+        table_name: {**(rule or {}), 'new': resolve_table_name(table_name, rename_dict, rules)[0]}
+        for table_name, rule in (rename_dict.get('tables') or {}).items()}
+    resolved['columns'] = {
+        table_name: {column_name: {**(rule or {}),
+                                   'new': resolve_column_name(table_name, column_name, rename_dict, rules)[0]}
+                     for column_name, rule in (column_rules or {}).items()}
+        for table_name, column_rules in (rename_dict.get('columns') or {}).items()}
+    return resolved
+
+
+def process_yaml_file(input_path, rename_dict, rules=None):
     """YAMLファイルを処理して変換（オリジナルのname/old_nameフィールドを直接変更）"""
-    with open(input_path, 'r', encoding='utf-8') as f:
-        yaml_data = yaml.safe_load(f)
+    yaml_data = load_yaml(input_path)
+    return process_table_data(yaml_data, rename_dict, input_path.name, rules)
+
+
+def process_table_data(yaml_data, rename_dict, source_name, rules=None):
+    """
+    テーブル定義（YAMLと同じ構造のdict）を変換（name/old_nameフィールドを直接変更）
+    source_name は conversion_info.source_file に記録する変換元の名前
+    rules: migration ルール（rename_rules.RenameRules）。None なら変換辞書のみ
+    返り値: (yaml_data, 変換統計, 旧テーブル名, 新テーブル名)
+            変換統計の renames に変換ごとの {'kind', 'old', 'new', 'rule'}
+    """
+    renames = []
 
     # テーブル名を変換
     original_table_name = yaml_data.get('table_name', '')
-    new_table_name = rename_table_name(original_table_name, rename_dict)
+    with instrumentation.phase('lookup'):
+        new_table_name, rule = resolve_table_name(original_table_name, rename_dict, rules)
+    if rule is not None:
+        renames.append({'kind': 'table', 'old': original_table_name, 'new': new_table_name, 'rule': rule})
 
     # テーブル名を新しい名前に変更
     yaml_data['table_name'] = new_table_name
@@ -62,7 +180,7 @@ def process_yaml_file(input_path, rename_dict):
         yaml_data['metadata'] = {}
 
     yaml_data['metadata']['conversion_info'] = {
-        'source_file': str(input_path.name),
+        'source_file': str(source_name),
         'original_table_name': original_table_name,
         'conversion_date': datetime.now().strftime('%Y-%m-%d'),
         'applied_rules': 'rename_dictionary.yaml v1'
@@ -70,13 +188,16 @@ def process_yaml_file(input_path, rename_dict):
 
     # カラム情報を変換（既存の構造を保持しつつ、nameフィールドのみ変更）
     original_columns = yaml_data.get('columns', [])
-    conversion_stats = {'columns_converted': 0}
+    conversion_stats = {'columns_converted': 0, 'renames': renames}
 
     for col in original_columns:
         original_name = col.get('name', '')
-        new_name = rename_column_name(original_table_name, original_name, rename_dict)
+        with instrumentation.phase('lookup'):
+            new_name, rule = resolve_column_name(original_table_name, original_name, rename_dict, rules)
 
         if original_name != new_name:
+            renames.append({'kind': 'column', 'old': original_name, 'new': new_name, 'rule': rule})
+
             # old_nameが未設定の場合、元のnameを記録
             if 'old_name' not in col or col.get('old_name') == original_name:
                 col['old_name'] = original_name
@@ -88,83 +209,249 @@ def process_yaml_file(input_path, rename_dict):
     return yaml_data, conversion_stats, original_table_name, new_table_name
 
 
-def save_converted_yaml(yaml_data, output_path):
-    """変換されたYAMLファイルを保存"""
-    # ディレクトリを作成
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+def render_converted_yaml(yaml_data):
+    """変換されたYAMLデータをセクション区切り付きの文字列にする"""
+    return render_table_yaml(yaml_data)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        # ヘッダーコメント
-        f.write('#- metadata -----------------------------------------------\n')
 
-        # YAMLデータを整形して出力
-        yaml_str = yaml.dump(yaml_data,
-                           default_flow_style=False,
-                           allow_unicode=True,
-                           sort_keys=False,
-                           indent=2)
+def write_converted_text(text, output_path):
+    """render_converted_yamlの結果をファイルに書き込む"""
+    write_text(text, output_path)
 
-        # セクション区切りを追加
-        lines = yaml_str.split('\n')
-        result_lines = []
 
-        for i, line in enumerate(lines):
-            if line.startswith('table_name:'):
-                result_lines.append('\n#- tableinfo ----------------------------------------------')
-            elif line.startswith('columns:'):
-                result_lines.append('\n#- columns info -------------------------------------------')
+def save_converted_yaml(yaml_data, output_path):
+    """変換されたYAMLファイルを保存"""
+    write_converted_text(render_converted_yaml(yaml_data), output_path)
 
-            result_lines.append(line)
 
-        f.write('\n'.join(result_lines))
+def convert_file(yaml_file, rename_dict, output_dir, rules=None):
+    """
+    1ファイルを変換して出力テキストを作る（書き込みは呼び出し側）
+    返り値: 変換結果のdict（失敗時は'error'を含む。計測が有効なら'timings'にフェーズ別の時間）
+    """
+    started = time.perf_counter()
+    with instrumentation.collect_phases() as timings:
+        try:
+            converted_data, conv_stats, original_table, new_table = process_yaml_file(yaml_file, rename_dict, rules)
 
+            # 出力ファイル名を新しいテーブル名で決定
+            output_file = output_dir / f"{new_table}.yaml"
 
-def generate_conversion_report(conversion_stats, output_dir):
-    """変換レポートを生成"""
+            result = {
+                'yaml_file': yaml_file,
+                'original_table': original_table,
+                'new_table': new_table,
+                'columns_converted': conv_stats['columns_converted'],
+                'renames': conv_stats['renames'],
+                'output_file': output_file,
+                'text': render_converted_yaml(converted_data),
+            }
+        except Exception as e:
+            result = {'yaml_file': yaml_file, 'error': str(e)}
+
+    result['timings'] = timings
+    result['duration'] = time.perf_counter() - started
+    return result
+
+
+# ワーカープロセスごとに一度だけ受け取る変換辞書と migration ルール
+_worker_rename_dict = None
+_worker_rules = None
+
+
+def _init_worker(rename_dict, timings=False, rules=None):
+    """ワーカー起動時に変換辞書を受け取る"""
+    global _worker_rename_dict, _worker_rules
+    _worker_rename_dict = rename_dict
+    _worker_rules = rules
+    instrumentation.enable_in_worker(timings)
+
+
+def _convert_file_in_worker(yaml_file, output_dir):
+    """ワーカー側の変換処理"""
+    return convert_file(yaml_file, _worker_rename_dict, output_dir, _worker_rules)
+
+
+def iter_conversions(yaml_files, rename_dict, output_dir, jobs=1, rules=None):
+    """
+    ファイルを変換し、入力順に結果を返す
+
+    jobs > 1 の場合は変換（読み込み・リネーム・整形）をプロセスプールに分散する。
+    書き込みは呼び出し側が入力順に行うため、同じ出力名になるファイルがあっても
+    シリアル実行と同じ結果になる。
+    """
+    if jobs <= 1 or len(yaml_files) <= 1:
+        for yaml_file in yaml_files:
+            yield convert_file(yaml_file, rename_dict, output_dir, rules)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(rename_dict, instrumentation.enabled(), rules)) as executor:
+        chunksize = max(1, len(yaml_files) // (jobs * 4))
+        yield from executor.map(_convert_file_in_worker, yaml_files,
+                                [output_dir] * len(yaml_files), chunksize=chunksize)
+
+
+def report_stream_path(output_dir):
+    """変換結果を1ファイルずつ追記するJSONLの場所"""
+    return output_dir / 'conversion_report.jsonl'
+
+
+def read_recorded_files(jsonl_path):
+    """
+    conversion_report.jsonl で変換に成功したファイル名（--resume で飛ばすもの）
+    書き込み途中で中断した末尾の行は取り除く
+    """
+    recorded = set()
+    if not jsonl_path.exists():
+        return recorded
+
+    with open(jsonl_path, 'rb+') as f:
+        good_end = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            record = json.loads(line)
+            good_end += len(line)
+            if record.get('type') == 'file':
+                if record.get('error'):
+                    recorded.discard(record['file'])
+                else:
+                    recorded.add(record['file'])
+        f.truncate(good_end)
+    return recorded
+
+
+def write_report_record(stream, record):
+    """変換結果を1行追記する（中断しても書き終えた行は残る）"""
+    stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+    stream.flush()
+
+
+def iter_report_records(jsonl_path):
+    """conversion_report.jsonl のファイルごとの記録（同じファイルが複数回あれば最後のもの）"""
+    # 1回目は各ファイルの最後の記録の位置だけを覚え、2回目にその行だけを返す
+    final_lines = {}
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            record = json.loads(line)
+            if record.get('type') == 'file':
+                final_lines[record['file']] = line_number
+
+    wanted = set(final_lines.values())
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            if line_number in wanted:
+                yield json.loads(line)
+
+
+def generate_conversion_report(jsonl_path, output_dir):
+    """conversion_report.jsonl から変換レポート（Markdown）を生成"""
     report_path = output_dir / 'conversion_report.md'
 
+    summary = {'total_files': 0, 'success_count': 0, 'failed_count': 0, 'table_renamed': 0,
+               'columns_renamed': 0}
+    rule_counts = {}
+    for record in iter_report_records(jsonl_path):
+        summary['total_files'] += 1
+        if record.get('error'):
+            summary['failed_count'] += 1
+            continue
+        summary['success_count'] += 1
+        if record['original_table'] != record['new_table']:
+            summary['table_renamed'] += 1
+        summary['columns_renamed'] += record['columns_converted']
+        for rename in record.get('renames') or []:
+            rule_counts[rename['rule']] = rule_counts.get(rename['rule'], 0) + 1
+
     with open(report_path, 'w', encoding='utf-8') as f:
         f.write(f'# YAML変換レポート\n\n')
         f.write(f'変換日時: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n\n')
         f.write(f'## 変換サマリー\n\n')
-        f.write(f'- 処理対象ファイル数: {conversion_stats["total_files"]}\n')
-        f.write(f'- 変換成功: {conversion_stats["success_count"]}\n')
-        f.write(f'- 変換失敗: {conversion_stats["failed_count"]}\n')
-        f.write(f'- テーブル名変換: {conversion_stats["table_renamed"]}\n')
-        f.write(f'- カラム名変換: {conversion_stats["columns_renamed"]}\n\n')
+        f.write(f'- 処理対象ファイル数: {summary["total_files"]}\n')
+        f.write(f'- 変換成功: {summary["success_count"]}\n')
+        f.write(f'- 変換失敗: {summary["failed_count"]}\n')
+        f.write(f'- テーブル名変換: {summary["table_renamed"]}\n')
+        f.write(f'- カラム名変換: {summary["columns_renamed"]}\n\n')
 
-        if conversion_stats["conversions"]:
+        if summary["success_count"]:
             f.write(f'## 変換詳細\n\n')
-            for conv in conversion_stats["conversions"]:
-                f.write(f'### {conv["original_file"]}\n')
+            for conv in iter_report_records(jsonl_path):
+                if conv.get('error'):
+                    continue
+                f.write(f'### {conv["file"]}\n')
                 f.write(f'- 元テーブル名: `{conv["original_table"]}`\n')
                 f.write(f'- 新テーブル名: `{conv["new_table"]}`\n')
                 f.write(f'- カラム変換数: {conv["columns_converted"]}\n')
-                f.write(f'- 出力ファイル: `{conv["output_file"]}`\n\n')
-
-        if conversion_stats["errors"]:
+                f.write(f'- 出力ファイル: `{conv["output_file"]}`\n')
+                f.write(f'- 処理時間: {conv["duration_ms"]} ms\n')
+                if conv.get('renames'):
+                    f.write(f'- 変換内容:\n')
+                    for rename in conv['renames']:
+                        f.write(f'  - {rename["kind"]} `{rename["old"]}` → `{rename["new"]}` ({rename["rule"]})\n')
+                f.write('\n')
+
+            if rule_counts:
+                f.write(f'## 適用ルール別の変換数\n\n')
+                for rule, count in sorted(rule_counts.items(), key=lambda item: (-item[1], item[0])):
+                    f.write(f'- {rule}: {count}\n')
+                f.write('\n')
+
+        if summary["failed_count"]:
             f.write(f'## エラー詳細\n\n')
-            for error in conversion_stats["errors"]:
-                f.write(f'- {error["file"]}: {error["error"]}\n')
+            for error in iter_report_records(jsonl_path):
+                if error.get('error'):
+                    f.write(f'- {error["file"]}: {error["error"]}\n')
+
+    return summary
 
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description='rename_dictionary.yamlによるYAML一括変換')
+    parser.add_argument('--jobs', type=int, default=1, help='並列ワーカー数（既定: 1 = シリアル実行）')
+    parser.add_argument('--no-snapshot', action='store_true', help='辞書スナップショットを使わない')
+    parser.add_argument('--input-dir', type=Path, help='入力ディレクトリ（既定: tools/config/optiserve）')
+    parser.add_argument('--output-dir', type=Path, help='出力ディレクトリ（既定: tools/config/streamedix/optiserve）')
+    parser.add_argument('--dictionary', type=Path, help='変換辞書（既定: dictionary/rename_dictionary.yaml）')
+    parser.add_argument('--naming-dictionary', type=Path,
+                        help='migration ルールを読む命名辞書（既定: dictionary/naming_dictionary_v0.2.1.yaml）')
+    parser.add_argument('--no-migration-rules', action='store_true', help='命名辞書の migration ルールを適用しない')
+    parser.add_argument('--resume', action='store_true',
+                        help='conversion_report.jsonl に成功が記録済みのファイルを飛ばして続きから変換する')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('yaml_rename', args)
+
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
 
     # パス設定
-    input_dir = project_root / 'tools/config/optiserve'
-    rename_dict_path = project_root / 'dictionary/rename_dictionary.yaml'
-    output_dir = project_root / 'tools/config/streamedix/optiserve'
+    input_dir = args.input_dir or project_root / 'tools/config/optiserve'
+    rename_dict_path = args.dictionary or project_root / 'dictionary/rename_dictionary.yaml'
+    output_dir = args.output_dir or project_root / 'tools/config/streamedix/optiserve'
+    naming_dict_path = args.naming_dictionary or project_root / 'dictionary/naming_dictionary_v0.2.1.yaml'
 
     # rename_dictionary.yamlを読み込み
-    if not rename_dict_path.exists():
+    if not rename_dict_path.exists() and not has_shards(rename_dict_path):
         print(f"Error: {rename_dict_path} が見つかりません")
         sys.exit(1)
 
     print(f"変換辞書を読み込み中: {rename_dict_path}")
-    rename_dict = load_rename_dictionary(rename_dict_path)
+    with instrumentation.phase('load_dictionary'):
+        rename_dict = load_rename_dictionary(rename_dict_path, use_snapshot=not args.no_snapshot)
+    if not isinstance(rename_dict, dict) or 'tables' not in rename_dict:
+        print("Error: 変換辞書の形式が不正です")
+        sys.exit(1)
+
+    rules = None
+    if not args.no_migration_rules:
+        if not naming_dict_path.exists():
+            print(f"Error: {naming_dict_path} が見つかりません")
+            sys.exit(1)
+        with instrumentation.phase('load_rules'):
+            rules = load_rename_rules(naming_dict_path)
+        print(f"migration ルール: {len(rules)}件（{naming_dict_path.name}）")
 
     # 入力ディレクトリの確認
     if not input_dir.exists():
@@ -178,47 +465,76 @@ def main():
         print(f"Error: {input_dir} にYAMLファイルが見つかりません")
         sys.exit(1)
 
+    # 中断した実行の続き: 記録済みのファイルを飛ばす
+    jsonl_path = report_stream_path(output_dir)
+    if args.resume:
+        recorded = read_recorded_files(jsonl_path)
+        skipped = [f for f in yaml_files if f.name in recorded]
+        yaml_files = [f for f in yaml_files if f.name not in recorded]
+        print(f"再開: 記録済みの {len(skipped)}個を飛ばします")
+
     print(f"処理対象ファイル: {len(yaml_files)}個")
 
-    # 変換統計
+    # 変換統計（この実行の分の件数だけ。ファイルごとの結果は conversion_report.jsonl へ）
     conversion_stats = {
         'total_files': len(yaml_files),
         'success_count': 0,
         'failed_count': 0,
         'table_renamed': 0,
         'columns_renamed': 0,
-        'conversions': [],
-        'errors': []
     }
 
+    if args.jobs > 1:
+        print(f"並列ワーカー数: {args.jobs}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report_stream = open(jsonl_path, 'a' if args.resume else 'w', encoding='utf-8')
+    write_report_record(report_stream, {
+        'type': 'run',
+        'started_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'input_dir': str(input_dir),
+        'dictionary': str(rename_dict_path),
+        'migration_rules': rules is not None,
+        'resume': args.resume,
+        'files': len(yaml_files),
+    })
+
     # 各ファイルを処理
-    for yaml_file in yaml_files:
+    for result in iter_conversions(yaml_files, rename_dict, output_dir, jobs=args.jobs, rules=rules):
+        yaml_file = result['yaml_file']
         print(f"\n処理中: {yaml_file.name}")
+        started = time.perf_counter()
 
         try:
-            # YAMLファイルを変換
-            converted_data, conv_stats, original_table, new_table = process_yaml_file(yaml_file, rename_dict)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
 
-            # 出力ファイル名を新しいテーブル名で決定
-            output_file = output_dir / f"{new_table}.yaml"
+            original_table = result['original_table']
+            new_table = result['new_table']
+            output_file = result['output_file']
 
             # 変換されたYAMLを保存
-            save_converted_yaml(converted_data, output_file)
+            with instrumentation.track_file(yaml_file.name, result['timings']):
+                write_converted_text(result['text'], output_file)
 
             # 統計を更新
             conversion_stats['success_count'] += 1
             if original_table != new_table:
                 conversion_stats['table_renamed'] += 1
 
-            columns_converted = conv_stats['columns_converted']
+            columns_converted = result['columns_converted']
             conversion_stats['columns_renamed'] += columns_converted
 
-            conversion_stats['conversions'].append({
-                'original_file': yaml_file.name,
+            write_report_record(report_stream, {
+                'type': 'file',
+                'file': yaml_file.name,
                 'original_table': original_table,
                 'new_table': new_table,
                 'columns_converted': columns_converted,
-                'output_file': output_file.name
+                'output_file': output_file.name,
+                'renames': result['renames'],
+                'duration_ms': round((result['duration'] + time.perf_counter() - started) * 1000, 3),
+                'error': None,
             })
 
             print(f"  → 保存: {output_file}")
@@ -228,21 +544,28 @@ def main():
         except Exception as e:
             print(f"  → エラー: {e}")
             conversion_stats['failed_count'] += 1
-            conversion_stats['errors'].append({
+            write_report_record(report_stream, {
+                'type': 'file',
                 'file': yaml_file.name,
-                'error': str(e)
+                'duration_ms': round((result.get('duration', 0) + time.perf_counter() - started) * 1000, 3),
+                'error': str(e),
             })
+    report_stream.close()
 
-    # 変換レポートを生成
+    # 変換レポートを生成（conversion_report.jsonl から）
     print(f"\n変換レポートを生成中...")
-    generate_conversion_report(conversion_stats, output_dir)
+    generate_conversion_report(jsonl_path, output_dir)
+    session.finish(metrics_path=output_dir / 'conversion_metrics.json', extra={
+        'conversion': {key: conversion_stats[key] for key in
+                       ('total_files', 'success_count', 'failed_count', 'table_renamed', 'columns_renamed')},
+    })
 
     print(f"\n=== 変換完了 ===")
     print(f"成功: {conversion_stats['success_count']}/{conversion_stats['total_files']}個")
     print(f"テーブル名変換: {conversion_stats['table_renamed']}個")
     print(f"カラム名変換: {conversion_stats['columns_renamed']}個")
     print(f"出力ディレクトリ: {output_dir}")
-    print(f"レポート: {output_dir / 'conversion_report.md'}")
+    print(f"レポート: {output_dir / 'conversion_report.md'}（{jsonl_path.name}）")
     print(f"\n注意: オリジナルファイルは変更されていません。")
     print(f"変換後のファイルは {output_dir} に新しいテーブル名で保存されています。")
 
@@ -2,23 +2,73 @@
 """
 特定のYAMLファイルだけを変換するスクリプト
 
-Usage: python yaml_rename_specific.py file1.yaml file2.yaml
+Usage: python yaml_rename_specific.py [--no-daemon] [--no-migration-rules] [--timings] [--profile [PATH]]
+                                      file1.yaml file2.yaml
+
+naming_daemon.py が起動していれば、変換辞書は対象テーブル分だけを migration ルールと一緒に
+サーバーから受け取る（辞書全体の読み込みを省略する）。変換辞書がシャード（rename_shards.py）に
+分かれていれば、対象テーブルのシャードだけを読み込む。
+変換辞書で決まらない名前には yaml_rename.py と同じく命名辞書の migration ルール（rename_rules.py）を適用する。
+各ファイルは1回だけ読み込み、テーブル名の取得（サーバーへの問い合わせ）と変換の両方に使う。
 """
 
-import yaml
+import argparse
 import sys
 from pathlib import Path
-from datetime import datetime
 
+import instrumentation
 # メインのyaml_rename.pyから必要な関数をインポート
-from yaml_rename import load_rename_dictionary, process_yaml_file, save_converted_yaml
+from yaml_rename import load_rename_dictionary, process_table_data, save_converted_yaml
+from rename_rules import RenameRules, load_rename_rules
+from rename_shards import has_shards, shard_store_of
+from yaml_io import load_yaml
+
+
+def load_target_files(yaml_files):
+    """
+    対象ファイルを1回ずつ読み込む
+    返り値: [(データ, 読み込みのフェーズ時間, エラー)]（ファイルがなければ データ・エラーとも None）
+    """
+    loaded = []
+    for yaml_file in yaml_files:
+        yaml_data = error = None
+        with instrumentation.collect_phases() as phases:
+            if yaml_file.exists():
+                try:
+                    yaml_data = load_yaml(yaml_file)
+                except Exception as e:
+                    error = e
+        loaded.append((yaml_data, phases, error))
+    return loaded
+
+
+def load_rename_subset_from_daemon(rename_dict_path, naming_dict_path, table_names):
+    """
+    naming daemon から対象テーブル分の変換辞書と migration ルールを受け取る
+    返り値: (rename_dict, RenameRules)。サーバーが起動していなければNone
+    """
+    from naming_daemon import connect
+    client = connect(dictionary=naming_dict_path, rename_dictionary=rename_dict_path)
+    if client is None:
+        return None
+
+    try:
+        response = client.call('rename_dict_subset', tables=table_names)
+        return response['rename_dict'], RenameRules(**response['migration_rules'])
+    finally:
+        client.close()
 
 
 def main():
     """特定ファイルのみを変換"""
-    if len(sys.argv) < 2:
-        print("Usage: python yaml_rename_specific.py file1.yaml file2.yaml ...")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='特定のYAMLファイルだけを変換')
+    parser.add_argument('files', nargs='+', help='tools/config/smds_poc 内のファイル名')
+    parser.add_argument('--no-daemon', action='store_true', help='naming daemon を使わない')
+    parser.add_argument('--no-migration-rules', action='store_true', help='命名辞書の migration ルールを適用しない')
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    session = instrumentation.start('yaml_rename_specific', args)
+    target_files = args.files
 
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
@@ -27,17 +77,34 @@ def main():
     input_dir = project_root / 'tools/config/smds_poc'
     rename_dict_path = project_root / 'dictionary/rename_dictionary.yaml'
     output_dir = project_root / 'tools/config/streamedix'
+    naming_dict_path = project_root / 'dictionary/naming_dictionary_v0.2.1.yaml'
 
     # rename_dictionary.yamlを読み込み
-    if not rename_dict_path.exists():
+    if not rename_dict_path.exists() and not has_shards(rename_dict_path):
         print(f"Error: {rename_dict_path} が見つかりません")
         sys.exit(1)
 
-    print(f"変換辞書を読み込み中: {rename_dict_path}")
-    rename_dict = load_rename_dictionary(rename_dict_path)
+    yaml_files = [input_dir / f for f in target_files]
+    loaded = load_target_files(yaml_files)
+
+    rename_dict = rules = None
+    if not args.no_daemon:
+        table_names = [yaml_data.get('table_name', '') for yaml_data, _, _ in loaded if isinstance(yaml_data, dict)]
+        subset = load_rename_subset_from_daemon(rename_dict_path, naming_dict_path, table_names)
+        if subset is not None:
+            rename_dict, rules = subset
+            print(f"変換辞書: naming daemon から取得（{len(rename_dict['tables'])}テーブル分）")
+    if rename_dict is None:
+        print(f"変換辞書を読み込み中: {rename_dict_path}")
+        rename_dict = load_rename_dictionary(rename_dict_path)
+        if not args.no_migration_rules:
+            rules = load_rename_rules(naming_dict_path)
+    if args.no_migration_rules:
+        rules = None
+    elif rules is not None:
+        print(f"migration ルール: {len(rules)}件（{naming_dict_path.name}）")
 
     # 指定されたファイルを処理
-    target_files = sys.argv[1:]
     print(f"処理対象ファイル: {target_files}")
 
     conversion_stats = {
@@ -48,9 +115,7 @@ def main():
         'columns_renamed': 0
     }
 
-    for filename in target_files:
-        yaml_file = input_dir / filename
-
+    for filename, yaml_file, (yaml_data, phases, error) in zip(target_files, yaml_files, loaded):
         if not yaml_file.exists():
             print(f"エラー: {yaml_file} が見つかりません")
             conversion_stats['failed_count'] += 1
@@ -59,14 +124,18 @@ def main():
         print(f"\n処理中: {filename}")
 
         try:
-            # YAMLファイルを変換
-            converted_data, conv_stats, original_table, new_table = process_yaml_file(yaml_file, rename_dict)
+            if error is not None:
+                raise error
+            with instrumentation.track_file(filename, phases):
+                # 読み込み済みのテーブル定義を変換
+                converted_data, conv_stats, original_table, new_table = process_table_data(
+                    yaml_data, rename_dict, yaml_file.name, rules)
 
-            # 出力ファイル名を新しいテーブル名で決定
-            output_file = output_dir / f"{new_table}.yaml"
+                # 出力ファイル名を新しいテーブル名で決定
+                output_file = output_dir / f"{new_table}.yaml"
 
-            # 変換されたYAMLを保存
-            save_converted_yaml(converted_data, output_file)
+                # 変換されたYAMLを保存
+                save_converted_yaml(converted_data, output_file)
 
             # 統計を更新
             conversion_stats['success_count'] += 1
@@ -88,7 +157,12 @@ def main():
     print(f"成功: {conversion_stats['success_count']}/{conversion_stats['total_files']}個")
     print(f"テーブル名変換: {conversion_stats['table_renamed']}個")
     print(f"カラム名変換: {conversion_stats['columns_renamed']}個")
+    store = shard_store_of(rename_dict)
+    if store is not None:
+        print(f"読み込んだシャード: {store.loads}/{len(store.shard_names())}個")
+    session.finish(extra={key: conversion_stats[key] for key in
+                          ('total_files', 'success_count', 'failed_count', 'table_renamed', 'columns_renamed')})
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()